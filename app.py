@@ -6,10 +6,20 @@ from config import get_config
 from extensions import db, login_manager, migrate, mail, limiter
 from logger import setup_logging
 from cache_config import configure_caching, cache_busting_url
-import warnings
-
-# Suppress Flask-Limiter in-memory storage warning (acceptable for development)
-warnings.filterwarnings('ignore', message='.*Using the in-memory storage.*')
+from compression import configure_compression
+from query_instrumentation import configure_instrumentation
+from metrics import configure_metrics
+from profiling import configure_profiling
+from sqlite_tuning import configure_sqlite
+from write_queue import configure_write_queue
+from read_replicas import configure_replicas
+from user_cache import configure_user_cache, load_user as load_cached_user
+from article_similarity import configure_article_similarity
+from visitor_sketches import configure_visitor_sketches
+from visit_gate import configure_visit_gate
+from static_snapshots import configure_static_snapshots
+from sitemaps import configure_sitemaps
+from rate_limit_storage import configure_rate_limit_storage
 
 # Load environment variables from .env file
 load_dotenv()
@@ -30,9 +40,21 @@ def create_app():
     # Setup logging
     setup_logging(app)
     
+    # Per-request query counts and Server-Timing header
+    configure_instrumentation(app)
+    
+    # Prometheus metrics and /metrics endpoint
+    configure_metrics(app)
+    
+    # Opt-in sampling profiler for slow endpoints
+    configure_profiling(app)
+    
     # Configure caching and cache headers
     configure_caching(app)
     
+    # Brotli/gzip responses and precompressed static files
+    configure_compression(app)
+    
     # Make cache_busting_url available in templates
     app.jinja_env.globals.update(cache_busting_url=cache_busting_url)
     
@@ -42,21 +64,13 @@ def create_app():
         return {'now': datetime}
     
     # Custom Jinja2 filter for linebreaks (Django-like behavior)
+    # Article pages use the stored Article.content_html; this is the fallback
+    # for rows that have not been rendered yet (see `flask render-articles`)
     def linebreaks(value):
         """Convert newlines to <br> tags and paragraphs to <p> tags"""
         from markupsafe import Markup
-        if not value:
-            return ''
-        # Replace double newlines with paragraph tags
-        paragraphs = value.split('\n\n')
-        formatted_paragraphs = []
-        for para in paragraphs:
-            # Replace single newlines with <br> tags
-            para = para.replace('\n', '<br>')
-            # Wrap in paragraph tags
-            if para.strip():
-                formatted_paragraphs.append(f'<p>{para}</p>')
-        return Markup('\n'.join(formatted_paragraphs))
+        from models import render_content_html
+        return Markup(render_content_html(value))
     
     app.jinja_env.filters['linebreaks'] = linebreaks
     
@@ -65,16 +79,43 @@ def create_app():
     login_manager.init_app(app)
     migrate.init_app(app, db)
     mail.init_app(app)
+    
+    # Rate limit counters shared across worker processes
+    configure_rate_limit_storage(app)
     limiter.init_app(app)
+    
+    # SQLite pragmas (WAL etc.) and the single-writer queue for counters
+    configure_sqlite(app)
+    configure_write_queue(app)
+    
+    # Route public GET reads to replicas (DATABASE_REPLICA_URLS)
+    configure_replicas(app)
 
     # Import models HERE (after db.init_app) - fixes circular import
     from models import User, Article, Comment, Message, Visit
     
-    # User loader for Flask-Login
+    # User loader for Flask-Login (cached snapshots, see user_cache.py)
+    configure_user_cache(app)
+    
     @login_manager.user_loader
     def load_user(user_id):
         """Load user by ID for Flask-Login"""
-        return User.query.get(int(user_id))
+        return load_cached_user(int(user_id))
+    
+    # "More like this" index, updated as articles are approved
+    configure_article_similarity(app)
+    
+    # Unique-visitor sketches, updated as visits are recorded
+    configure_visitor_sketches(app)
+    
+    # Crawler and repeat-view filter for article view counts
+    configure_visit_gate(app)
+    
+    # Static page snapshots, re-rendered as content changes
+    configure_static_snapshots(app)
+    
+    # Sitemap and feed files, regenerated as articles change
+    configure_sitemaps(app)
     
     # Note: db.create_all() is no longer used - migrations handle schema creation
     # For development setup, run: flask db upgrade
@@ -91,7 +132,7 @@ def create_app():
         return response
     
     # ------------------ REGISTER BLUEPRINTS ------------------
-    from blueprints import auth_bp, articles_bp, admin_bp, comments_bp, contact_bp, public_bp
+    from blueprints import auth_bp, articles_bp, admin_bp, comments_bp, contact_bp, public_bp, feeds_bp
     from blueprints.services import bp as services_bp
     from blueprints.bookings import bp as bookings_bp
     
@@ -101,9 +142,14 @@ def create_app():
     app.register_blueprint(comments_bp)
     app.register_blueprint(contact_bp)
     app.register_blueprint(public_bp)
+    app.register_blueprint(feeds_bp)
     app.register_blueprint(services_bp)
     app.register_blueprint(bookings_bp)
     
+    # ------------------ CLI COMMANDS ------------------
+    from commands import register_commands
+    register_commands(app)
+    
     # ------------------ ERROR HANDLERS ------------------
     @app.errorhandler(404)
     def page_not_found(error):
@@ -0,0 +1,543 @@
+"""
+Article Similarity
+Offline TF-IDF "more like this" recommendations for the article page
+
+The index tokenises the title and content of every published article into a
+sparse TF-IDF matrix held as NumPy CSR arrays (indptr, indices, data). Cosine
+neighbours are scored in vectorised batches through an inverted (CSC) view of
+the same matrix, and each article's top matches are stored in the
+article_neighbor table, so the request path is one indexed lookup
+(Article.similar_articles).
+
+Build or rebuild the whole index with `flask build-neighbors`. The fitted
+vocabulary, IDF weights and matrix are saved next to the database
+(SIMILAR_ARTICLES_INDEX_PATH); when an article is approved afterwards it is
+scored against the saved matrix and merged into the stored lists of the
+articles it resembles, without refitting. Rebuild periodically so new
+vocabulary and changed IDF weights are picked up.
+
+Incremental updates run on a background thread after the approving request
+has committed, never on the request itself. Every read-modify-write of the
+saved index (and of the stored lists) holds an exclusive file lock next to
+it, so concurrent workers and the CLI take turns, each re-reading the index
+the previous one saved.
+"""
+
+import os
+import queue
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from file_utils import file_lock
+from logger import get_logger
+from models import Article, ArticleNeighbor
+
+logger = get_logger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9]{2,}")
+STOP_WORDS = frozenset("""
+    about above after again against all also and any are because been before being below between both
+    but can could did does doing down during each few for from further had has have having her here
+    hers herself him himself his how into its itself just more most must not now off once only other
+    our ours ourselves out over own same shall she should some such than that the their theirs them
+    themselves then there these they this those through too under until very was were what when where
+    which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+TITLE_WEIGHT = 2            # Title terms count as this many occurrences
+MIN_DF = 2                  # Terms in a single article cannot link two articles
+MAX_DF_RATIO = 0.5          # Terms in more than this share of articles...
+MAX_DF_FLOOR = 100          # ...and in more than this many are dropped as noise
+TERMS_PER_ARTICLE = 40      # Highest-weighted terms kept per article
+BATCH_CELLS = 4_000_000     # Score matrix cells per batch (rows x articles)
+FETCH_SIZE = 1000
+
+
+def tokenize(title, content):
+    """
+    Term counts for an article
+
+    Args:
+        title: Article title (counted TITLE_WEIGHT times)
+        content: Article body
+
+    Returns:
+        Counter of term -> occurrences
+    """
+    counts = Counter(
+        token for token in TOKEN_PATTERN.findall((content or '').lower()) if token not in STOP_WORDS
+    )
+    for token in TOKEN_PATTERN.findall((title or '').lower()):
+        if token not in STOP_WORDS:
+            counts[token] += TITLE_WEIGHT
+    return counts
+
+
+def _row_ids(indptr):
+    """Row number of every stored entry of a CSR matrix"""
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def _prune_and_normalize(indptr, indices, data):
+    """Keep each row's TERMS_PER_ARTICLE largest weights and scale rows to unit length"""
+    rows = _row_ids(indptr)
+    order = np.lexsort((-data, rows))
+    rank = np.arange(len(order)) - np.repeat(indptr[:-1], np.diff(indptr))
+    keep = order[rank < TERMS_PER_ARTICLE]
+    keep.sort()
+
+    rows, indices, data = rows[keep], indices[keep], data[keep]
+    norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(indptr) - 1))
+    data = (data / norms[rows]).astype(np.float32)
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=len(indptr) - 1))))
+    return indptr, indices.astype(np.int32), data
+
+
+class TfidfIndex:
+    """
+    Fitted vocabulary plus the L2-normalised TF-IDF rows of indexed articles
+
+    Attributes:
+        terms: Vocabulary, column order
+        idf: Inverse document frequency per column
+        article_ids: Article id per row
+        indptr, indices, data: CSR matrix (rows = articles, columns = terms)
+    """
+
+    def __init__(self, terms, idf, article_ids, indptr, indices, data):
+        self.terms = terms
+        self.idf = idf
+        self.article_ids = article_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.vocabulary = {term: column for column, term in enumerate(terms.tolist())}
+        self._build_postings()
+
+    @classmethod
+    def fit(cls, documents):
+        """
+        Fit the vocabulary and IDF weights and vectorise the documents
+
+        Args:
+            documents: Iterable of (article_id, Counter of term counts)
+
+        Returns:
+            TfidfIndex
+        """
+        vocabulary, article_ids, indptr, term_ids, counts = {}, [], [0], [], []
+        for article_id, terms in documents:
+            article_ids.append(article_id)
+            term_ids.extend(vocabulary.setdefault(term, len(vocabulary)) for term in terms)
+            counts.extend(terms.values())
+            indptr.append(len(term_ids))
+
+        article_ids = np.array(article_ids, dtype=np.int64)
+        indptr = np.array(indptr, dtype=np.int64)
+        term_ids = np.array(term_ids, dtype=np.int64)
+        counts = np.array(counts, dtype=np.float64)
+        total = len(article_ids)
+
+        df = np.bincount(term_ids, minlength=len(vocabulary))
+        max_df = max(MAX_DF_RATIO * total, MAX_DF_FLOOR)
+        kept = (df >= MIN_DF) & (df <= max_df)
+        columns = np.full(len(vocabulary), -1, dtype=np.int64)
+        columns[kept] = np.arange(kept.sum())
+        terms = np.array(list(vocabulary), dtype=object)[kept].astype(str)
+        idf = np.log((1 + total) / (1 + df[kept])) + 1
+
+        mask = kept[term_ids]
+        rows = _row_ids(indptr)[mask]
+        term_ids = columns[term_ids[mask]]
+        data = (1 + np.log(counts[mask])) * idf[term_ids]
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=total))))
+
+        return cls(terms, idf, article_ids, *_prune_and_normalize(indptr, term_ids, data))
+
+    def vectorize(self, documents):
+        """
+        Vectorise documents with the fitted vocabulary (unknown terms are ignored)
+
+        Args:
+            documents: List of Counter of term counts
+
+        Returns:
+            Tuple of CSR arrays (indptr, indices, data)
+        """
+        indptr, indices, counts = [0], [], []
+        for terms in documents:
+            for term, count in terms.items():
+                column = self.vocabulary.get(term)
+                if column is not None:
+                    indices.append(column)
+                    counts.append(count)
+            indptr.append(len(indices))
+        indices = np.array(indices, dtype=np.int64)
+        data = (1 + np.log(np.array(counts, dtype=np.float64))) * self.idf[indices]
+        return _prune_and_normalize(np.array(indptr, dtype=np.int64), indices, data)
+
+    def _build_postings(self):
+        """Inverted view: for each term, the rows containing it and their weights"""
+        order = np.argsort(self.indices, kind='stable')
+        self.posting_rows = _row_ids(self.indptr)[order].astype(np.int32)
+        self.posting_data = self.data[order]
+        self.posting_indptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(self.indices, minlength=len(self.terms))))
+        )
+
+    def replace(self, article_ids, rows):
+        """
+        Add or replace the rows of some articles
+
+        Args:
+            article_ids: Article id per new row
+            rows: CSR arrays (indptr, indices, data) from vectorize
+        """
+        article_ids = np.asarray(article_ids, dtype=np.int64)
+        keep = ~np.isin(self.article_ids, article_ids)
+        lengths = np.diff(self.indptr)[keep]
+        entries = np.repeat(keep, np.diff(self.indptr))
+        new_indptr, new_indices, new_data = rows
+
+        self.article_ids = np.concatenate((self.article_ids[keep], article_ids))
+        self.indices = np.concatenate((self.indices[entries], new_indices))
+        self.data = np.concatenate((self.data[entries], new_data))
+        self.indptr = np.concatenate(
+            ([0], np.cumsum(np.concatenate((lengths, np.diff(new_indptr)))))
+        )
+        self._build_postings()
+
+    def neighbors(self, rows, k, exclude=None):
+        """
+        Top-k cosine neighbours among the indexed articles
+
+        Args:
+            rows: CSR arrays (indptr, indices, data) of the query vectors
+            k: Neighbours per query
+            exclude: Optional article id per query to leave out (itself)
+
+        Yields:
+            List of (article_id, score) per query, best first
+        """
+        indptr, indices, data = rows
+        total = len(self.article_ids)
+        queries = len(indptr) - 1
+        if total == 0:
+            yield from ([] for _ in range(queries))
+            return
+
+        row_of_article = {article_id: row for row, article_id in enumerate(self.article_ids.tolist())}
+        batch = max(1, BATCH_CELLS // total)
+        for start in range(0, queries, batch):
+            stop = min(start + batch, queries)
+            first, last = indptr[start], indptr[stop]
+            query_rows = _row_ids(indptr[start:stop + 1] - first)
+            terms, weights = indices[first:last], data[first:last]
+
+            # Expand every (query, term) entry over the term's posting list
+            lengths = self.posting_indptr[terms + 1] - self.posting_indptr[terms]
+            expanded = int(lengths.sum())
+            offsets = np.repeat(self.posting_indptr[terms] - np.cumsum(lengths) + lengths, lengths) \
+                + np.arange(expanded)
+            scores = np.bincount(
+                np.repeat(query_rows, lengths) * total + self.posting_rows[offsets],
+                weights=np.repeat(weights, lengths) * self.posting_data[offsets],
+                minlength=(stop - start) * total
+            ).reshape(stop - start, total)
+
+            if exclude is not None:
+                for offset, article_id in enumerate(exclude[start:stop]):
+                    row = row_of_article.get(article_id)
+                    if row is not None:
+                        scores[offset, row] = 0
+
+            # k argmax passes beat a full argpartition for small k, and come out sorted
+            batch_rows = np.arange(stop - start)
+            best = np.empty((stop - start, min(k, total)), dtype=np.int64)
+            best_scores = np.empty(best.shape)
+            for position in range(best.shape[1]):
+                best[:, position] = scores.argmax(axis=1)
+                best_scores[:, position] = scores[batch_rows, best[:, position]]
+                scores[batch_rows, best[:, position]] = -1
+            for columns, values in zip(best, best_scores):
+                yield [(int(self.article_ids[column]), float(score))
+                       for column, score in zip(columns, values) if score > 0]
+
+    def save(self, path):
+        """Write the index to an .npz file (atomically)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f'{path}.tmp.npz'
+        np.savez(temporary, terms=self.terms, idf=self.idf, article_ids=self.article_ids,
+                 indptr=self.indptr, indices=self.indices, data=self.data)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as saved:
+            return cls(saved['terms'], saved['idf'], saved['article_ids'],
+                       saved['indptr'], saved['indices'], saved['data'])
+
+
+# ============================================================================
+# STORED NEIGHBOURS
+# ============================================================================
+
+def _published_documents(connection, article_ids=None):
+    """Stream (article_id, term counts) for published articles"""
+    statement = db.select(Article.id, Article.title, Article.content) \
+        .where(*Article.published_criteria()).order_by(Article.id)
+    if article_ids is not None:
+        statement = statement.where(Article.id.in_(article_ids))
+    result = connection.execution_options(stream_results=True, yield_per=FETCH_SIZE).execute(statement)
+    for article_id, title, content in result:
+        yield article_id, tokenize(title, content)
+
+
+def _store(connection, lists):
+    """
+    Replace the stored neighbours of some articles
+
+    Args:
+        connection: Connection to write on
+        lists: Dict of article_id -> [(neighbor_id, score), ...] best first
+    """
+    table = ArticleNeighbor.__table__
+    article_ids = list(lists)
+    for start in range(0, len(article_ids), FETCH_SIZE):
+        connection.execute(table.delete().where(table.c.article_id.in_(article_ids[start:start + FETCH_SIZE])))
+    rows = [
+        {'article_id': article_id, 'rank': rank, 'neighbor_id': neighbor_id, 'score': score}
+        for article_id, neighbors in lists.items()
+        for rank, (neighbor_id, score) in enumerate(neighbors)
+    ]
+    for start in range(0, len(rows), FETCH_SIZE * 10):
+        connection.execute(table.insert(), rows[start:start + FETCH_SIZE * 10])
+
+
+class SimilarityIndex:
+    """
+    Builds and incrementally updates the stored article neighbours
+
+    Args:
+        path: .npz file the fitted TfidfIndex is saved to
+        engine: Engine the background updates read and write through
+        k: Neighbours stored per article
+
+    Attributes:
+        failed: Background updates that raised
+    """
+
+    def __init__(self, path, engine=None, k=5):
+        self.path = path
+        self.engine = engine
+        self.k = k
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _exclusive(self):
+        """Serialise index updates within this process and across processes"""
+        with self._lock, file_lock(f'{self.path}.lock'):
+            yield
+
+    def rebuild(self, engine):
+        """
+        Refit the index on all published articles and rewrite every stored list
+
+        Args:
+            engine: Engine to read and write through (committed before the
+                lock is released)
+
+        Returns:
+            Number of articles indexed
+        """
+        with self._exclusive(), engine.begin() as connection:
+            index = TfidfIndex.fit(_published_documents(connection))
+            lists = dict(zip(
+                index.article_ids.tolist(),
+                index.neighbors((index.indptr, index.indices, index.data), self.k, exclude=index.article_ids)
+            ))
+            connection.execute(ArticleNeighbor.__table__.delete())
+            _store(connection, lists)
+            index.save(self.path)
+        logger.info(f"Indexed {len(lists)} articles, {len(index.terms)} terms")
+        return len(lists)
+
+    def add(self, article_ids, engine):
+        """
+        Index newly published articles against the saved index
+
+        Their own neighbour lists are written, and they are merged into the
+        lists of existing articles they now rank among. The saved index is
+        loaded after taking the lock, so another process's additions are
+        kept. No-op until the index has been built once.
+
+        Args:
+            article_ids: Articles to add (or re-index after an edit)
+            engine: Engine to read and write through (committed before the
+                lock is released)
+
+        Returns:
+            Number of articles added
+        """
+        with self._exclusive():
+            if not os.path.exists(self.path):
+                logger.debug("Similarity index not built yet; skipping incremental update")
+                return 0
+            with engine.begin() as connection:
+                index = TfidfIndex.load(self.path)
+                documents = list(_published_documents(connection, article_ids))
+                if not documents:
+                    return 0
+                new_ids = [article_id for article_id, _ in documents]
+                rows = index.vectorize([terms for _, terms in documents])
+                index.replace(new_ids, rows)
+
+                lists = dict(zip(new_ids, index.neighbors(rows, self.k, exclude=new_ids)))
+                lists.update(self._merge_reverse(connection, lists))
+                _store(connection, lists)
+                index.save(self.path)
+        logger.info(f"Added {len(new_ids)} articles to the similarity index")
+        return len(new_ids)
+
+    def submit(self, article_ids):
+        """Queue articles for add() on the background thread"""
+        self._queue.put(set(article_ids))
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='similarity-indexer', daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """Wait until every queued article has been indexed"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            batches = [self._queue.get()]
+            while True:
+                # Coalesce a burst of approvals into one update
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            article_ids = sorted(set().union(*batches))
+            try:
+                self.add(article_ids, self.engine)
+            except Exception as e:
+                # Recommendations are best-effort; the next rebuild repairs them
+                self.failed += 1
+                logger.error(f"Failed to update similar articles for {article_ids}: {e}")
+            finally:
+                for _ in batches:
+                    self._queue.task_done()
+
+    def _merge_reverse(self, connection, lists):
+        """Updated lists of existing articles that the new articles now rank in"""
+        candidates = {}
+        for new_id, neighbors in lists.items():
+            for neighbor_id, score in neighbors:
+                if neighbor_id not in lists:
+                    candidates.setdefault(neighbor_id, []).append((new_id, score))
+        if not candidates:
+            return {}
+
+        table = ArticleNeighbor.__table__
+        current = {article_id: [] for article_id in candidates}
+        ids = list(candidates)
+        for start in range(0, len(ids), FETCH_SIZE):
+            result = connection.execute(
+                db.select(table.c.article_id, table.c.neighbor_id, table.c.score)
+                .where(table.c.article_id.in_(ids[start:start + FETCH_SIZE]))
+                .order_by(table.c.article_id, table.c.rank)
+            )
+            for article_id, neighbor_id, score in result:
+                current[article_id].append((neighbor_id, score))
+
+        updated = {}
+        for article_id, additions in candidates.items():
+            existing = current[article_id]
+            added = {neighbor_id for neighbor_id, _ in additions}
+            merged = [entry for entry in existing if entry[0] not in added] + additions
+            merged.sort(key=lambda entry: -entry[1])
+            merged = merged[:self.k]
+            if merged != existing:
+                updated[article_id] = merged
+        return updated
+
+
+def get_similarity_index():
+    """The current app's SimilarityIndex, or None when disabled"""
+    return current_app.extensions.get('article_similarity')
+
+
+# ============================================================================
+# INCREMENTAL UPDATES
+# ============================================================================
+
+_APPROVED_ARTICLES_KEY = 'similarity_approved_ids'
+_INDEXED_ATTRIBUTES = ('status', 'is_draft', 'deleted_at', 'title', 'content')
+
+
+def _note_if_published(target):
+    session = object_session(target)
+    if session is not None and target.status == 'approved' and not target.is_draft \
+            and target.deleted_at is None:
+        session.info.setdefault(_APPROVED_ARTICLES_KEY, set()).add(target.id)
+
+
+@event.listens_for(Article, 'after_insert')
+def _remember_inserted_article(mapper, connection, target):
+    _note_if_published(target)
+
+
+@event.listens_for(Article, 'after_update')
+def _remember_updated_article(mapper, connection, target):
+    state = sa_inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in _INDEXED_ATTRIBUTES):
+        _note_if_published(target)
+
+
+@event.listens_for(Session, 'after_commit')
+def _index_approved_articles(session):
+    article_ids = session.info.pop(_APPROVED_ARTICLES_KEY, None)
+    if not article_ids or not has_app_context():
+        return
+    index = get_similarity_index()
+    if index is not None:
+        index.submit(article_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_articles(session):
+    session.info.pop(_APPROVED_ARTICLES_KEY, None)
+
+
+def configure_article_similarity(app: Flask):
+    """
+    Enable "more like this" recommendations (SIMILAR_ARTICLES_ENABLED,
+    SIMILAR_ARTICLES_COUNT, SIMILAR_ARTICLES_INDEX_PATH)
+    """
+    if not app.config.get('SIMILAR_ARTICLES_ENABLED', True):
+        return
+
+    path = app.config.get('SIMILAR_ARTICLES_INDEX_PATH') or \
+        os.path.join(app.instance_path, 'similarity_index.npz')
+    with app.app_context():
+        engine = db.engine
+    app.extensions['article_similarity'] = SimilarityIndex(
+        path, engine=engine, k=app.config.get('SIMILAR_ARTICLES_COUNT', 5)
+    )
@@ -0,0 +1,394 @@
+"""
+Benchmark Suite
+Scripted request scenarios with latency percentiles, throughput and query counts
+
+Drives either the in-process Flask test client or a running server
+(gunicorn, flask run) and writes a JSON report that can be compared with a
+previous run. Query counts come from the Server-Timing header added by
+query_instrumentation, so they are available in both modes.
+
+Usage (FLASK_ENV=production, against a dedicated DATABASE_URL):
+    flask seed-synthetic --articles 50000 --visits 1000000
+    python benchmark.py --iterations 200 --output bench.json
+    python benchmark.py --target http://127.0.0.1:8000 --concurrency 8 --compare bench.json
+    python benchmark.py --scenarios read_more --concurrency 8 --background-writers 4
+"""
+
+import argparse
+import json
+import math
+import platform
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+SCENARIOS = ('home', 'blog', 'read_more', 'admin_dashboard', 'booking')
+
+_SERVER_TIMING_QUERIES_RE = re.compile(r'db;[^,]*desc="(\d+) queries"')
+_CSRF_RE = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+
+# ============================================================================
+# DRIVERS
+# ============================================================================
+
+class FlaskDriver:
+    """Issue requests through the Flask test client (no network)"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        return response.status_code, response.headers, response.get_data(as_text=True)
+
+
+class HttpDriver:
+    """Issue requests to a running server over HTTP"""
+
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def request(self, method, path, data=None):
+        response = self.session.request(method, self.base_url + path, data=data, allow_redirects=False)
+        return response.status_code, response.headers, response.text
+
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+class Recorder:
+    """Collect per-request samples for one scenario (thread-safe)"""
+
+    def __init__(self):
+        self.latencies = []
+        self.queries = []
+        self.errors = 0
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+    def timed(self, driver, method, path, data=None):
+        """Issue one request and record its latency, status and query count"""
+        started = time.perf_counter()
+        status, headers, body = driver.request(method, path, data=data)
+        elapsed = time.perf_counter() - started
+
+        match = _SERVER_TIMING_QUERIES_RE.search(headers.get('Server-Timing', ''))
+        with self._lock:
+            self.latencies.append(elapsed)
+            if match:
+                self.queries.append(int(match.group(1)))
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if status >= 500:
+                self.errors += 1
+        return status, body
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100.0 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def summarize(recorder, wall_seconds):
+    """Build the JSON summary for one scenario"""
+    latencies_ms = [value * 1000 for value in recorder.latencies]
+    count = len(latencies_ms)
+    return {
+        'requests': count,
+        'errors': recorder.errors,
+        'statuses': {str(k): v for k, v in sorted(recorder.statuses.items())},
+        'throughput_rps': round(count / wall_seconds, 2) if wall_seconds else None,
+        'latency_ms': {
+            'mean': round(sum(latencies_ms) / count, 3) if count else None,
+            'p50': _round(percentile(latencies_ms, 50)),
+            'p95': _round(percentile(latencies_ms, 95)),
+            'p99': _round(percentile(latencies_ms, 99)),
+            'max': _round(max(latencies_ms) if latencies_ms else None),
+        },
+        'queries_per_request': {
+            'mean': round(sum(recorder.queries) / len(recorder.queries), 2) if recorder.queries else None,
+            'max': max(recorder.queries) if recorder.queries else None,
+        },
+    }
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+# ============================================================================
+# SCENARIOS
+# ============================================================================
+
+class Context:
+    """Data shared by scenarios: ids to request and admin credentials"""
+
+    def __init__(self, article_ids, username, password, seed):
+        self.article_ids = article_ids
+        self.username = username
+        self.password = password
+        self.seed = seed
+
+
+def _csrf_token(body):
+    match = _CSRF_RE.search(body or '')
+    return match.group(1) if match else ''
+
+
+def login_admin(driver, context):
+    """Log the driver's session in as the benchmark admin"""
+    _, _, body = driver.request('GET', '/admin/login')
+    status, _, _ = driver.request('POST', '/admin/login', data={
+        'csrf_token': _csrf_token(body),
+        'username': context.username,
+        'password': context.password,
+    })
+    if status != 302:
+        raise RuntimeError(f'Admin login failed with status {status}; run `flask seed-synthetic` first')
+
+
+def scenario_home(recorder, driver, context, rng):
+    recorder.timed(driver, 'GET', '/')
+
+
+def scenario_blog(recorder, driver, context, rng):
+    """First page, then follow one next-cursor link"""
+    status, body = recorder.timed(driver, 'GET', '/blog')
+    match = re.search(r'href="(/blog\?cursor=[^"]+)"', body or '')
+    if match:
+        recorder.timed(driver, 'GET', match.group(1).replace('&amp;', '&'))
+
+
+def scenario_read_more(recorder, driver, context, rng):
+    if context.article_ids:
+        recorder.timed(driver, 'GET', f'/read/{rng.choice(context.article_ids)}')
+
+
+def scenario_admin_dashboard(recorder, driver, context, rng):
+    recorder.timed(driver, 'GET', '/admin/dashboard')
+
+
+def scenario_booking(recorder, driver, context, rng):
+    """Intake form render and submission (the first steps of the booking flow)"""
+    status, body = recorder.timed(driver, 'GET', '/book/')
+    recorder.timed(driver, 'POST', '/book/', data={
+        'csrf_token': _csrf_token(body),
+        'full_name': 'Benchmark Client',
+        'email': 'bench-client@example.com',
+        'phone': '08012345678',
+        'company_name': 'Benchmark Ltd',
+        'cac_status': 'registered',
+        'issue_description': 'Benchmark consultation request for contract review.',
+    })
+
+
+SCENARIO_FUNCTIONS = {
+    'home': scenario_home,
+    'blog': scenario_blog,
+    'read_more': scenario_read_more,
+    'admin_dashboard': scenario_admin_dashboard,
+    'booking': scenario_booking,
+}
+
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def background_writer(driver, context, rng, stop, recorder):
+    """Like random articles (each one a counter write) until stop is set"""
+    while not stop.is_set() and context.article_ids:
+        recorder.timed(driver, 'POST', f'/like/{rng.choice(context.article_ids)}')
+
+
+def run_scenario(name, make_driver, context, iterations, concurrency, warmup=5, background_writers=0):
+    """
+    Run one scenario from several threads
+
+    Args:
+        name: Key of SCENARIO_FUNCTIONS
+        make_driver: Callable returning a fresh driver (one per thread)
+        context: Context with ids and credentials
+        iterations: Scenario iterations per thread
+        concurrency: Number of threads
+        warmup: Unrecorded iterations per thread before measuring
+        background_writers: Threads issuing counter writes while the
+            scenario runs, to check that readers do not queue behind them
+
+    Returns:
+        Summary dict (see summarize)
+    """
+    scenario = SCENARIO_FUNCTIONS[name]
+    recorder = Recorder()
+    drivers = []
+    for worker in range(concurrency):
+        driver = make_driver()
+        if name == 'admin_dashboard':
+            login_admin(driver, context)
+        rng = random.Random(f'{context.seed}-{name}-{worker}')
+        for _ in range(warmup):
+            scenario(Recorder(), driver, context, rng)
+        drivers.append((driver, rng))
+
+    def work(driver, rng):
+        for _ in range(iterations):
+            scenario(recorder, driver, context, rng)
+
+    stop = threading.Event()
+    writes = Recorder()
+    writers = [
+        threading.Thread(target=background_writer, daemon=True, args=(
+            make_driver(), context, random.Random(f'{context.seed}-writer-{worker}'), stop, writes))
+        for worker in range(background_writers)
+    ]
+    for writer in writers:
+        writer.start()
+
+    threads = [threading.Thread(target=work, args=pair) for pair in drivers]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.perf_counter() - started
+
+    stop.set()
+    for writer in writers:
+        writer.join()
+
+    summary = summarize(recorder, wall_seconds)
+    if writers:
+        summary['background_writes'] = summarize(writes, wall_seconds)
+    return summary
+
+
+def git_commit():
+    """Current commit hash, or None outside a git checkout"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    """
+    Format a per-scenario comparison against a previous report
+
+    Returns:
+        List of text lines
+    """
+    lines = [f"{'scenario':<18}{'p50 ms':>18}{'p95 ms':>18}{'rps':>18}{'queries':>16}"]
+    for name, result in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+
+        def delta(new, old):
+            if new is None or old is None:
+                return 'n/a'
+            change = f' ({(new - old) / old * 100:+.0f}%)' if old else ''
+            return f'{old:g}->{new:g}{change}'
+
+        lines.append(
+            f"{name:<18}"
+            f"{delta(result['latency_ms']['p50'], before['latency_ms']['p50']):>18}"
+            f"{delta(result['latency_ms']['p95'], before['latency_ms']['p95']):>18}"
+            f"{delta(result['throughput_rps'], before['throughput_rps']):>18}"
+            f"{delta(result['queries_per_request']['mean'], before['queries_per_request']['mean']):>16}"
+        )
+    return lines
+
+
+def load_context(app, seed):
+    """Pick article ids to request from the configured database"""
+    from models import Article
+    from synthetic_data import BENCH_ADMIN_PASSWORD, BENCH_ADMIN_USERNAME
+
+    with app.app_context():
+        ids = [row.id for row in Article.query.with_entities(Article.id)
+               .filter_by(status='approved', is_draft=False)
+               .order_by(Article.id).limit(5000)]
+    return Context(ids, BENCH_ADMIN_USERNAME, BENCH_ADMIN_PASSWORD, seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run request benchmarks and write a JSON report.')
+    parser.add_argument('--target', help='Base URL of a running server (run it with SERVER_TIMING_ENABLED=true '
+                                         'to record query counts); omit to use the in-process test client')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f'Comma-separated subset of: {", ".join(SCENARIOS)}')
+    parser.add_argument('--iterations', type=int, default=100, help='Iterations per thread per scenario')
+    parser.add_argument('--concurrency', type=int, default=1, help='Concurrent clients')
+    parser.add_argument('--background-writers', type=int, default=0,
+                        help='Threads liking articles (counter writes) during each scenario')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for request selection')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--compare', help='Previous JSON report to compare against')
+    args = parser.parse_args(argv)
+
+    from app import create_app
+    app = create_app()
+    app.config['SERVER_TIMING_ENABLED'] = True  # Query counts are read from Server-Timing
+    if app.debug or app.config.get('SQLALCHEMY_ECHO'):
+        print('Warning: debug mode or SQL echo is on; set FLASK_ENV=production for representative numbers',
+              file=sys.stderr)
+    context = load_context(app, args.seed)
+
+    if args.target:
+        make_driver = lambda: HttpDriver(args.target)
+    else:
+        make_driver = lambda: FlaskDriver(app)
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'target': args.target or 'flask-test-client',
+            'debug': app.debug,
+            'database': app.config.get('SQLALCHEMY_DATABASE_URI', '').split('@')[-1],
+            'iterations': args.iterations,
+            'concurrency': args.concurrency,
+            'background_writers': args.background_writers,
+            'seed': args.seed,
+        },
+        'scenarios': {},
+    }
+    for name in names:
+        print(f'Running {name}...', file=sys.stderr)
+        report['scenarios'][name] = run_scenario(name, make_driver, context, args.iterations, args.concurrency,
+                                                   background_writers=args.background_writers)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print('\n'.join(compare(report, baseline)), file=sys.stderr)
+
+    return report
+
+
+if __name__ == '__main__':
+    main()
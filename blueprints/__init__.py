@@ -7,5 +7,6 @@ from .admin import admin_bp
 from .comments import comments_bp
 from .contact import contact_bp
 from .public import public_bp
+from .feeds import feeds_bp
 
-__all__ = ['auth_bp', 'articles_bp', 'admin_bp', 'comments_bp', 'contact_bp', 'public_bp']
+__all__ = ['auth_bp', 'articles_bp', 'admin_bp', 'comments_bp', 'contact_bp', 'public_bp', 'feeds_bp']
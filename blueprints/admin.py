@@ -1,13 +1,19 @@
 """
 Admin Blueprint - Handles admin dashboard, article approvals, and administrative tasks.
 """
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import (Blueprint, Response, render_template, redirect, url_for, flash, request, abort, send_from_directory,
+                   current_app, stream_with_context)
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
 
 from extensions import db
-from models import Article, Visit, Message, Comment, ClientIntake
+from models import Article, Message, Comment, ClientIntake
 from security import admin_required
+from pagination import keyset_paginate, redirect_legacy_page
+from site_stats import get_dashboard_stats, invalidate_stats
+from exports import EXPORTS, EXPORT_BATCH_SIZE, FORMATS, export_chunks, parse_day
+from visitor_sketches import readers_per_article
+from profiling import profile_dir, list_profiles, slowest_by_endpoint, load_profile, top_functions, PROFILE_NAME_RE
 from logger import get_logger
 
 logger = get_logger(__name__)
@@ -22,48 +28,47 @@ admin_bp = Blueprint('admin', __name__)
 @admin_required
 def admin_dashboard():
     """Display admin dashboard with statistics and article moderation"""
-    total_articles = Article.query.count()
-    total_visits = Visit.query.count()
-    now = datetime.utcnow()
-
-    daily_visits = Visit.query.filter(Visit.timestamp >= now - timedelta(days=1)).count()
-    weekly_visits = Visit.query.filter(Visit.timestamp >= now - timedelta(weeks=1)).count()
-    monthly_visits = Visit.query.filter(Visit.timestamp >= now - timedelta(days=30)).count()
-    yearly_visits = Visit.query.filter(Visit.timestamp >= now - timedelta(days=365)).count()
-
-    readers_per_article = db.session.query(
-        Article.title, db.func.count(Visit.id)
-    ).join(Visit, Article.id == Visit.article_id).group_by(Article.id).all()
-
-    pending_page = request.args.get('pending_page', 1, type=int)
-    approved_page = request.args.get('approved_page', 1, type=int)
-    disapproved_page = request.args.get('disapproved_page', 1, type=int)
-    per_page = 3
-
-    pending = Article.query.filter_by(status='pending') \
-        .order_by(Article.date_posted.desc()) \
-        .paginate(page=pending_page, per_page=per_page)
+    stats = get_dashboard_stats()
+    article_counts = stats['articles']
+    visit_counts = stats['visits']
 
-    approved = Article.query.filter_by(status='approved') \
-        .order_by(Article.date_posted.desc()) \
-        .paginate(page=approved_page, per_page=per_page)
+    # Unique readers of the most viewed articles, from HyperLogLog sketches
+    readers = readers_per_article()
 
-    disapproved = Article.query.filter_by(status='disapproved') \
-        .order_by(Article.date_posted.desc()) \
-        .paginate(page=disapproved_page, per_page=per_page)
+    per_page = 3
+    listings = {
+        'pending': Article.cards().filter_by(status='pending', is_draft=False),
+        'approved': Article.cards().filter_by(status='approved'),
+        'disapproved': Article.cards().filter_by(status='disapproved'),
+    }
+
+    # Old ?pending_page=N (etc.) links open the same page by cursor
+    for name, query in listings.items():
+        legacy = redirect_legacy_page(query, Article.date_posted, Article.id, per_page=per_page,
+                                      page_arg=f'{name}_page', cursor_arg=f'{name}_cursor')
+        if legacy:
+            return legacy
+
+    pending, approved, disapproved = (
+        keyset_paginate(query, Article.date_posted, Article.id,
+                        cursor=request.args.get(f'{name}_cursor', '', type=str), per_page=per_page)
+        for name, query in listings.items()
+    )
+    pending.total = article_counts['pending_review']
 
     return render_template(
         'admin_dashboard.html',
         articles=pending,
-        approved_articles=approved.items,
-        disapproved_articles=disapproved.items,
-        total_articles=total_articles,
-        total_visits=total_visits,
-        daily_visits=daily_visits,
-        weekly_visits=weekly_visits,
-        monthly_visits=monthly_visits,
-        yearly_visits=yearly_visits,
-        readers_per_article=readers_per_article
+        approved_articles=approved,
+        disapproved_articles=disapproved,
+        total_articles=article_counts['total'],
+        total_visits=visit_counts['total'],
+        daily_visits=visit_counts['daily'],
+        weekly_visits=visit_counts['weekly'],
+        monthly_visits=visit_counts['monthly'],
+        yearly_visits=visit_counts['yearly'],
+        unique_visitors=stats['unique_visitors'],
+        readers_per_article=readers
     )
 
 
@@ -83,15 +88,15 @@ def admin_view_article(article_id):
             return redirect(url_for('admin.admin_dashboard')), 404
         
         # Get paginated comments
-        page = request.args.get('page', 1, type=int)
-        paginated_comments = Comment.query.filter(
-            Comment.article_id == article_id,
-            Comment.parent_id.is_(None),  # Only root comments
-            Comment.deleted_at.is_(None)  # Exclude soft-deleted comments
-        ).order_by(Comment.date_posted.desc()).paginate(
-            page=page,
-            per_page=5,
-            error_out=False
+        cursor = request.args.get('cursor', '', type=str)
+        paginated_comments = keyset_paginate(
+            Comment.query.filter(
+                Comment.article_id == article_id,
+                Comment.parent_id.is_(None),  # Only root comments
+                Comment.deleted_at.is_(None)  # Exclude soft-deleted comments
+            ),
+            Comment.date_posted, Comment.id,
+            cursor=cursor, per_page=5, with_total=True
         )
         
         logger.info(f"Admin {current_user.username} viewed article {article_id}")
@@ -114,7 +119,10 @@ def approve_article(article_id):
     try:
         article = Article.query.get_or_404(article_id)
         article.status = 'approved'
+        if not article.is_rendered():
+            article.render_content()
         db.session.commit()
+        invalidate_stats()
         logger.info(f"Article {article_id} approved by {current_user.username}")
         flash('Article approved successfully.', 'success')
     except Exception as e:
@@ -134,6 +142,7 @@ def disapprove_article(article_id):
         article = Article.query.get_or_404(article_id)
         article.status = 'disapproved'
         db.session.commit()
+        invalidate_stats()
         logger.info(f"Article {article_id} disapproved by {current_user.username}")
         flash('Article disapproved.', 'warning')
     except Exception as e:
@@ -149,10 +158,15 @@ def disapprove_article(article_id):
 @admin_required
 def approved_articles():
     """View all approved articles"""
-    page = request.args.get('page', 1, type=int)
-    articles = Article.query.filter_by(status='approved') \
-        .order_by(Article.date_posted.desc()) \
-        .paginate(page=page, per_page=12)
+    cursor = request.args.get('cursor', '', type=str)
+    query = Article.cards().filter_by(status='approved')
+    legacy = redirect_legacy_page(query, Article.date_posted, Article.id, per_page=12)
+    if legacy:
+        return legacy
+    articles = keyset_paginate(
+        query, Article.date_posted, Article.id,
+        cursor=cursor, per_page=12, with_total=True
+    )
     
     logger.info(f"Admin {current_user.username} viewed approved articles")
     return render_template('admin_approved_articles.html', articles=articles)
@@ -163,10 +177,15 @@ def approved_articles():
 @admin_required
 def disapproved_articles():
     """View all disapproved articles"""
-    page = request.args.get('page', 1, type=int)
-    articles = Article.query.filter_by(status='disapproved') \
-        .order_by(Article.date_posted.desc()) \
-        .paginate(page=page, per_page=12)
+    cursor = request.args.get('cursor', '', type=str)
+    query = Article.cards().filter_by(status='disapproved')
+    legacy = redirect_legacy_page(query, Article.date_posted, Article.id, per_page=12)
+    if legacy:
+        return legacy
+    articles = keyset_paginate(
+        query, Article.date_posted, Article.id,
+        cursor=cursor, per_page=12, with_total=True
+    )
     
     logger.info(f"Admin {current_user.username} viewed disapproved articles")
     return render_template('admin_disapproved_articles.html', articles=articles)
@@ -180,11 +199,52 @@ def disapproved_articles():
 @login_required
 @admin_required
 def view_messages():
-    """View all contact form messages"""
-    messages = Message.query.order_by(Message.date_sent.desc()).all()
+    """View contact form messages, newest first"""
+    cursor = request.args.get('cursor', '', type=str)
+    legacy = redirect_legacy_page(Message.query, Message.date_sent, Message.id, per_page=20)
+    if legacy:
+        return legacy
+    messages = keyset_paginate(
+        Message.query, Message.date_sent, Message.id,
+        cursor=cursor, per_page=20, with_total=True
+    )
     return render_template('messages.html', messages=messages)
 
 
+# ============================================================================
+# DATA EXPORTS
+# ============================================================================
+
+@admin_bp.route('/admin/export')
+@login_required
+@admin_required
+def export_data():
+    """Stream bookings, intakes, messages or visits as CSV or NDJSON"""
+    dataset = request.args.get('dataset', '', type=str)
+    export_format = request.args.get('format', 'csv', type=str)
+    if dataset not in EXPORTS or export_format not in FORMATS:
+        abort(404)
+    try:
+        start = parse_day(request.args.get('start', '', type=str))
+        end = parse_day(request.args.get('end', '', type=str))
+    except ValueError:
+        abort(400)
+    if start and end and start > end:
+        abort(400)
+
+    chunks = export_chunks(
+        db.engine, dataset, export_format, start, end,
+        batch_size=current_app.config.get('EXPORT_BATCH_SIZE', EXPORT_BATCH_SIZE)
+    )
+    filename = '_'.join([dataset] + [day.isoformat() for day in (start, end) if day]) + f'.{export_format}'
+    logger.info(f"Export of {dataset} as {export_format} ({start or 'first'} to {end or 'last'}) "
+                f"by {current_user.username}")
+
+    response = Response(stream_with_context(chunks), mimetype=FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 # ============================================================================
 # CONSULTATION REQUESTS
 # ============================================================================
@@ -194,7 +254,7 @@ def view_messages():
 @admin_required
 def consultations():
     """View all consultation requests"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor', '', type=str)
     status_filter = request.args.get('status', 'pending', type=str)
     
     query = ClientIntake.query
@@ -203,8 +263,14 @@ def consultations():
     if status_filter and status_filter != 'all':
         query = query.filter_by(status=status_filter)
     
-    # Order by most recent first
-    consultations = query.order_by(ClientIntake.submitted_at.desc()).paginate(page=page, per_page=10)
+    # Most recent first
+    legacy = redirect_legacy_page(query, ClientIntake.submitted_at, ClientIntake.id, per_page=10)
+    if legacy:
+        return legacy
+    consultations = keyset_paginate(
+        query, ClientIntake.submitted_at, ClientIntake.id,
+        cursor=cursor, per_page=10, with_total=True
+    )
     
     return render_template('admin_consultations.html', consultations=consultations, current_status=status_filter)
 
@@ -235,6 +301,7 @@ def update_consultation_status(consultation_id):
             consultation.reviewed_by_id = current_user.id
             
             db.session.commit()
+            invalidate_stats()
             logger.info(f"Consultation {consultation_id} status updated to {new_status} by {current_user.username}")
             flash(f'Consultation status updated to {new_status}.', 'success')
         else:
@@ -246,3 +313,46 @@ def update_consultation_status(consultation_id):
     
     return redirect(url_for('admin.view_consultation', consultation_id=consultation_id))
 
+
+# ============================================================================
+# REQUEST PROFILES
+# ============================================================================
+
+@admin_bp.route('/admin/profiles')
+@login_required
+@admin_required
+def profiles():
+    """List the slowest captured request profiles per endpoint"""
+    captured = list_profiles(profile_dir())
+    return render_template(
+        'admin_profiles.html',
+        groups=slowest_by_endpoint(captured),
+        total_profiles=len(captured)
+    )
+
+
+@admin_bp.route('/admin/profiles/<name>')
+@login_required
+@admin_required
+def view_profile(name):
+    """Show the hottest functions in one captured profile"""
+    loaded = load_profile(profile_dir(), name)
+    if loaded is None:
+        abort(404)
+    meta, stacks = loaded
+    return render_template(
+        'admin_profile.html',
+        profile=meta,
+        functions=top_functions(stacks),
+        total_samples=sum(stacks.values())
+    )
+
+
+@admin_bp.route('/admin/profiles/<name>/download')
+@login_required
+@admin_required
+def download_profile(name):
+    """Download collapsed stacks for flamegraph.pl or speedscope"""
+    if not PROFILE_NAME_RE.match(name):
+        abort(404)
+    return send_from_directory(profile_dir(), f'{name}.collapsed', as_attachment=True, mimetype='text/plain')
@@ -1,20 +1,25 @@
 """
 Articles Blueprint - Handles article submission, viewing, drafts, and soft deletes.
 """
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, abort
 from flask_login import login_required, current_user
+from sqlalchemy.orm import defer
 from datetime import datetime
 import os
 
 from extensions import db, limiter
-from forms import ArticleSubmissionForm, CommentForm
-from models import Article, Comment
+from forms import ArticleSubmissionForm
+from models import Article, Category, Comment
 from security import (
     admin_required, sanitize_html, sanitize_string,
     validate_image_file, validate_document_file, get_safe_filename,
     ALLOWED_IMAGE_EXTENSIONS, ALLOWED_DOCUMENT_EXTENSIONS
 )
 from logger import get_logger
+from pagination import cursor_for_page, keyset_paginate
+from site_stats import invalidate_stats
+from visit_gate import record_view
+from write_queue import get_write_queue
 
 logger = get_logger(__name__)
 articles_bp = Blueprint('articles', __name__)
@@ -77,18 +82,7 @@ def upload_cover_image():
 def submit_article():
     """Submit a new article for publication (guests and authenticated users)"""
     form = ArticleSubmissionForm()
-    form.category.choices = [(cat, cat) for cat in [
-        "Criminal Law", "Family Law", "Constitutional Law",
-        "Tech Law", "Property Law", "Administrative Law",
-        "International Law", "Contract Law", "Tort Law",
-        "Succession Law", "Corporate Law", "Commercial Law",
-        "Banking and Finance Law", "Securities Law", "Civil Litigation",
-        "Criminal Litigation", "Alternative Dispute Resolution", "Environmental Law",
-        "Energy Law", "Intellectual Property Law", "Copyright Law",
-        "Patent Law", "Trademark Law", "Trade Secrets Law",
-        "Labour and Employment Law", "Human Rights Law", "Health and Medical Law",
-        "Insurance Law", "Sports and Entertainment Law", "Cyber Law"
-    ]]
+    form.category.choices = Category.choices()
     
     if form.validate_on_submit():
         # Sanitize user inputs
@@ -198,32 +192,54 @@ def submit_article():
 
 @articles_bp.route('/article/<int:article_id>')
 @articles_bp.route('/read/<int:article_id>')
-@articles_bp.route('/read/<int:article_id>/page/<int:page>')
-def read_more(article_id, page=1):
+def read_more(article_id):
     """Display article with paginated comments"""
-    # Get article and check if it's approved and not soft-deleted
-    article = Article.query.get_or_404(article_id)
+    # Get article and check if it's approved and not soft-deleted.
+    # The page renders the stored content_html, so raw content stays deferred.
+    article = Article.query.options(defer(Article.content)).get_or_404(article_id)
     if article.is_deleted() or article.status != 'approved':
         flash("This article is no longer available.", "warning")
         return redirect(url_for('public.home')), 404
     
     # Get paginated comments (excluding soft-deleted)
-    paginated_comments = Comment.query.filter(
-        Comment.article_id == article_id,
-        Comment.parent_id.is_(None),  # Only root comments
-        Comment.deleted_at.is_(None)  # Exclude soft-deleted comments
-    ).order_by(Comment.date_posted.desc()).paginate(
-        page=page,
-        per_page=COMMENTS_PER_PAGE,
-        error_out=False
+    cursor = request.args.get('cursor', '', type=str)
+    paginated_comments = keyset_paginate(
+        _root_comments(article_id), Comment.date_posted, Comment.id,
+        cursor=cursor, per_page=COMMENTS_PER_PAGE, with_total=True
     )
     
-    form = CommentForm()
-    return render_template(
+    html = render_template(
         'read_more.html',
         article=article,
         paginated_comments=paginated_comments,
-        page=page
+        replies_by_parent=Comment.replies_for(paginated_comments.items),
+        similar_articles=article.similar_articles(),
+        also_read=article.also_read()
+    )
+    
+    # Count the view after rendering, so its commit does not expire `article`
+    # (crawlers and repeat views are dropped by the visit gate)
+    record_view(article_id)
+    return html
+
+
+@articles_bp.route('/read/<int:article_id>/page/<int:page>')
+def read_more_page(article_id, page):
+    """Redirect a legacy numbered comment page to its cursor URL"""
+    cursor = cursor_for_page(
+        _root_comments(article_id), Comment.date_posted, Comment.id, page, per_page=COMMENTS_PER_PAGE
+    )
+    if cursor is None:
+        return redirect(url_for('articles.read_more', article_id=article_id), 301)
+    return redirect(url_for('articles.read_more', article_id=article_id, cursor=cursor), 301)
+
+
+def _root_comments(article_id):
+    """Visible top-level comments of an article"""
+    return Comment.query.filter(
+        Comment.article_id == article_id,
+        Comment.parent_id.is_(None),  # Only root comments
+        Comment.deleted_at.is_(None)  # Exclude soft-deleted comments
     )
 
 
@@ -234,10 +250,20 @@ def read_more(article_id, page=1):
 @articles_bp.route('/like/<int:article_id>', methods=['POST'])
 def like_article(article_id):
     """Increment article like count"""
+    if db.session.query(Article.id).filter_by(id=article_id).scalar() is None:
+        abort(404)
+    
     try:
-        article = Article.query.get_or_404(article_id)
-        article.likes = (article.likes or 0) + 1
-        db.session.commit()
+        # Counter bumps go through the single-writer queue when there is one
+        write_queue = get_write_queue()
+        if write_queue:
+            write_queue.increment(Article, 'likes', article_id)
+        else:
+            Article.query.filter_by(id=article_id).update(
+                {Article.likes: Article.likes + 1},
+                synchronize_session=False
+            )
+            db.session.commit()
         logger.info(f"Article {article_id} liked")
         flash('You liked the article.', 'success')
     except Exception as e:
@@ -261,6 +287,7 @@ def soft_delete_article(article_id):
         article = Article.query.get_or_404(article_id)
         article.soft_delete()
         db.session.commit()
+        invalidate_stats()
         logger.info(f"Article {article_id} soft-deleted by admin")
         flash(f"Article '{article.title}' has been deleted.", "success")
     except Exception as e:
@@ -280,6 +307,7 @@ def restore_article(article_id):
         article = Article.query.get_or_404(article_id)
         article.restore()
         db.session.commit()
+        invalidate_stats()
         logger.info(f"Article {article_id} restored by admin")
         flash(f"Article '{article.title}' has been restored.", "success")
     except Exception as e:
@@ -299,6 +327,7 @@ def restore_article(article_id):
 def create_draft():
     """Create a new article draft"""
     form = ArticleSubmissionForm()
+    form.category.choices = Category.choices()
     
     if form.validate_on_submit():
         try:
@@ -341,6 +370,7 @@ def edit_draft(article_id):
         return redirect(url_for('articles.read_more', article_id=article_id))
     
     form = ArticleSubmissionForm()
+    form.category.choices = Category.choices()
     
     if form.validate_on_submit():
         try:
@@ -399,7 +429,7 @@ def submit_draft(article_id):
 @login_required
 def view_my_drafts():
     """View author's drafts"""
-    drafts = Article.query.filter_by(
+    drafts = Article.cards().filter_by(
         author=current_user.username,
         is_draft=True
     ).order_by(Article.date_submitted.desc()).all()
@@ -430,6 +460,7 @@ def edit_article(article_id):
         return redirect(url_for('articles.read_more', article_id=article_id))
     
     form = ArticleSubmissionForm()
+    form.category.choices = Category.choices()
     
     if form.validate_on_submit():
         try:
@@ -512,6 +543,7 @@ def delete_article(article_id):
         article_title = article.title
         article.soft_delete()
         db.session.commit()
+        invalidate_stats()
         logger.info(f"Article {article_id} deleted by {current_user.username}")
         flash(f"Article '{article_title}' has been deleted.", "success")
         return redirect(url_for('public.home'))
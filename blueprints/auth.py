@@ -14,6 +14,7 @@ from forms import (
 from models import User, Article, Comment
 from security import sanitize_string, validate_email
 from email_utils import send_password_reset_email
+from site_stats import get_dashboard_stats
 from logger import get_logger
 
 logger = get_logger(__name__)
@@ -173,7 +174,7 @@ def profile():
     pending_articles_count = 0
     
     if current_user.is_admin:
-        pending_articles_count = Article.query.filter_by(status='pending').count()
+        pending_articles_count = get_dashboard_stats()['articles']['pending']
     
     return render_template(
         'profile.html',
@@ -191,10 +192,13 @@ def edit_profile():
     
     if form.validate_on_submit():
         try:
-            current_user.username = sanitize_string(form.username.data, max_length=150)
-            current_user.email = sanitize_string(form.email.data, max_length=100)
+            # current_user is a read-only cached snapshot; committing the row
+            # drops it from the user cache
+            user = User.query.get(current_user.id)
+            user.username = sanitize_string(form.username.data, max_length=150)
+            user.email = sanitize_string(form.email.data, max_length=100)
             db.session.commit()
-            logger.info(f"Profile updated for user: {current_user.username}")
+            logger.info(f"Profile updated for user: {user.username}")
             flash('Your profile has been updated successfully!', 'success')
             return redirect(url_for('auth.profile'))
         except Exception as e:
@@ -216,8 +220,8 @@ def change_password():
     
     if form.validate_on_submit():
         try:
-            hashed_password = generate_password_hash(form.new_password.data)
-            current_user.password = hashed_password
+            user = User.query.get(current_user.id)
+            user.password = generate_password_hash(form.new_password.data)
             db.session.commit()
             logger.info(f"Password changed for user: {current_user.username}")
             flash('Your password has been changed successfully!', 'success')
@@ -271,18 +271,16 @@ def get_available_dates():
     now = datetime.utcnow()
     availability_slots = []
     
-    # Get availability for next 60 days
-    for days_ahead in range(1, 61):
-        check_date = (now + timedelta(days=days_ahead)).date()
-        
-        availabilities = AdminAvailability.query.filter_by(
-            date=check_date,
-            is_available=True
-        ).all()
-        
-        for avail in availabilities:
-            slots = avail.get_available_slots()
-            availability_slots.extend(slots)
+    # Get availability for next 60 days in a single range query
+    availabilities = AdminAvailability.query.filter(
+        AdminAvailability.date >= (now + timedelta(days=1)).date(),
+        AdminAvailability.date <= (now + timedelta(days=60)).date(),
+        AdminAvailability.is_available == True
+    ).order_by(AdminAvailability.date, AdminAvailability.start_time).all()
+    
+    for avail in availabilities:
+        slots = avail.get_available_slots()
+        availability_slots.extend(slots)
     
     return availability_slots
 
@@ -0,0 +1,45 @@
+"""
+Feeds Blueprint - sitemap.xml shards and RSS/Atom feeds for crawlers and readers
+"""
+from flask import Blueprint
+
+from sitemaps import ATOM_FILE, INDEX_FILE, PAGES_FILE, RSS_FILE, get_sitemap_store, shard_file
+
+feeds_bp = Blueprint('feeds', __name__)
+
+
+@feeds_bp.route(f'/{INDEX_FILE}')
+def sitemap_index():
+    """Sitemap index listing the pages sitemap and article shards"""
+    store = get_sitemap_store()
+    return store.response(INDEX_FILE, store.build_index, 'application/xml')
+
+
+@feeds_bp.route(f'/{PAGES_FILE}')
+def sitemap_pages():
+    """Sitemap of the site's fixed pages and services"""
+    store = get_sitemap_store()
+    return store.response(PAGES_FILE, store.build_pages, 'application/xml')
+
+
+@feeds_bp.route('/sitemap-articles-<int:shard>.xml')
+def sitemap_articles(shard):
+    """Sitemap of one block of published articles"""
+    store = get_sitemap_store()
+    return store.response(
+        shard_file(shard), lambda base_url: store.build_shard(shard, base_url), 'application/xml'
+    )
+
+
+@feeds_bp.route(f'/{RSS_FILE}')
+def rss():
+    """RSS 2.0 feed of the latest articles"""
+    store = get_sitemap_store()
+    return store.response(RSS_FILE, store.build_rss, 'application/rss+xml')
+
+
+@feeds_bp.route(f'/{ATOM_FILE}')
+def atom():
+    """Atom feed of the latest articles"""
+    store = get_sitemap_store()
+    return store.response(ATOM_FILE, store.build_atom, 'application/atom+xml')
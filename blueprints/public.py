@@ -3,10 +3,10 @@ Public Blueprint - Handles public-facing pages (home, about, etc.)
 """
 from flask import Blueprint, render_template, redirect, url_for, request
 
-from models import Article, User
+from models import Article, Category, User
 from logger import get_logger
-from trending_articles import TrendingQuery
-from extensions import db
+from pagination import keyset_paginate, redirect_legacy_page
+from visit_gate import record_view
 
 logger = get_logger(__name__)
 public_bp = Blueprint('public', __name__)
@@ -20,7 +20,7 @@ public_bp = Blueprint('public', __name__)
 def home():
     """Display professional law firm homepage"""
     # Get featured articles for the homepage
-    featured_articles = Article.query.filter(
+    featured_articles = Article.cards().filter(
         Article.status == 'approved',
         Article.deleted_at.is_(None),
         Article.is_draft == False
@@ -44,11 +44,12 @@ def home():
 def view_article(article_id):
     """Display article in preview/modal view with view count tracking"""
     article = Article.query.get_or_404(article_id)
+    html = render_template('view_article.html', article=article)
     
-    # Increment view count
-    TrendingQuery.increment_view_count(article_id)
+    # Count the view (crawlers and repeat views are dropped by the visit gate)
+    record_view(article_id)
     
-    return render_template('view_article.html', article=article)
+    return html
 
 
 # ============================================================================
@@ -67,26 +68,27 @@ def about():
 @public_bp.route('/blog')
 def blog():
     """Blog archive/listing page"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor', '', type=str)
     category = request.args.get('category', '', type=str)
     per_page = 12
     
-    query = Article.query.filter(
+    query = Article.cards().filter(
         Article.status == 'approved',
         Article.deleted_at.is_(None),
         Article.is_draft == False
-    ).order_by(Article.date_posted.desc())
+    )
     
     if category:
         query = query.filter(Article.category == category)
     
-    articles = query.paginate(page=page, per_page=per_page)
+    legacy = redirect_legacy_page(query, Article.date_posted, Article.id, per_page=per_page)
+    if legacy:
+        return legacy
     
-    # Get categories for sidebar
-    categories = db.session.query(Article.category).filter(
-        Article.status == 'approved',
-        Article.deleted_at.is_(None)
-    ).distinct().all()
+    articles = keyset_paginate(query, Article.date_posted, Article.id, cursor=cursor, per_page=per_page)
+    
+    # Sidebar categories come from the category table's cached counts
+    categories = Category.with_articles()
     
     return render_template('pages/blog.html',
         articles=articles,
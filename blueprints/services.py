@@ -2,8 +2,7 @@
 Services blueprint for displaying legal services
 """
 from flask import Blueprint, render_template, abort, current_app
-from models import Service, Article
-from sqlalchemy import func
+from models import Service
 
 bp = Blueprint('services', __name__, url_prefix='/services')
 
@@ -29,12 +28,8 @@ def service_detail(slug):
     """
     service = Service.query.filter_by(slug=slug, is_active=True).first_or_404()
     
-    # Get related blog articles for this service
-    related_articles = Article.query.filter_by(
-        status='approved'
-    ).filter(
-        Article.category.ilike(f'%{service.name}%')
-    ).order_by(Article.date_posted.desc()).limit(3).all()
+    # Related articles are precomputed from the service's categories
+    related_articles = service.related_articles()
     
     return render_template('services/detail.html',
         service=service,
@@ -99,13 +99,7 @@ def configure_caching(app: Flask):
         response.headers['X-Frame-Options'] = 'SAMEORIGIN'
         response.headers['X-XSS-Protection'] = '1; mode=block'
 
-        # Compression - only for regular responses, not file passthrough
-        try:
-            if not getattr(response, 'direct_passthrough', False) and len(response.data) > 1024:
-                response.headers['Vary'] = 'Accept-Encoding'
-        except RuntimeError:
-            # Skip compression for file responses in passthrough mode
-            pass
+        # Compression and Vary: Accept-Encoding are handled in compression.py
 
         return response
 
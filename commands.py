@@ -0,0 +1,210 @@
+"""
+Flask CLI commands for maintenance tasks
+Run with: flask <command> --help
+"""
+import os
+import time
+
+import click
+
+from extensions import db
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def register_commands(app):
+    """Attach maintenance commands to the app CLI"""
+
+    @app.cli.command('render-articles')
+    @click.option('--all', 'render_all', is_flag=True,
+                  help='Re-render every article, not only unrendered ones.')
+    @click.option('--batch-size', default=BACKFILL_BATCH_SIZE, show_default=True,
+                  help='Rows rendered per transaction.')
+    def render_articles(render_all, batch_size):
+        """Precompute content_html, excerpt and reading_time for articles"""
+        from models import Article
+
+        query = Article.query
+        if not render_all:
+            query = query.filter(Article.content_html.is_(None))
+
+        rendered = 0
+        last_id = 0
+        while True:
+            # Walk by primary key so each batch is a bounded index scan
+            batch = query.filter(Article.id > last_id) \
+                .order_by(Article.id) \
+                .limit(batch_size) \
+                .all()
+            if not batch:
+                break
+
+            for article in batch:
+                article.render_content()
+            db.session.commit()
+
+            rendered += len(batch)
+            last_id = batch[-1].id
+            db.session.expunge_all()
+            click.echo(f'Rendered {rendered} articles...')
+
+        click.echo(f'Done. {rendered} articles rendered.')
+
+    @app.cli.command('refresh-categories')
+    def refresh_categories():
+        """Create default categories, recompute article counts and service related articles"""
+        from models import Category, Service
+
+        Service.map_default_categories()
+        for category in Category.query.order_by(Category.name):
+            click.echo(f'{category.article_count:>8}  {category.name}')
+
+    @app.cli.command('map-service')
+    @click.argument('slug')
+    @click.argument('categories', nargs=-1, required=True)
+    def map_service(slug, categories):
+        """Set the article categories a service page draws related articles from"""
+        from models import Category, Service
+
+        service = Service.query.filter_by(slug=slug).first()
+        if service is None:
+            raise click.ClickException(f'No service with slug {slug!r}')
+        found = Category.query.filter(Category.name.in_(categories)).all()
+        missing = set(categories) - {category.name for category in found}
+        if missing:
+            raise click.ClickException(f'Unknown categories: {", ".join(sorted(missing))}')
+
+        service.categories = found
+        db.session.flush()
+        Service.refresh_related([service.id])
+        db.session.commit()
+        click.echo(f'{service.name}: {len(service.related_articles())} related articles')
+
+    @app.cli.command('build-neighbors')
+    def build_neighbors():
+        """Rebuild the TF-IDF "more like this" index and stored neighbours"""
+        from article_similarity import get_similarity_index
+
+        index = get_similarity_index()
+        if index is None:
+            raise click.ClickException('SIMILAR_ARTICLES_ENABLED is off')
+        started = time.perf_counter()
+        indexed = index.rebuild(db.engine)
+        click.echo(f'Indexed {indexed} articles in {time.perf_counter() - started:.1f}s ({index.path})')
+
+    @app.cli.command('build-covisits')
+    @click.option('--full', is_flag=True, help='Recount all visits instead of those after the high-water mark.')
+    def build_covisits(full):
+        """Update "readers also read" lists from new visits"""
+        from covisitation import build_covisitation
+
+        path = app.config.get('COVISITATION_STATE_PATH') or os.path.join(app.instance_path, 'covisitation.npz')
+        started = time.perf_counter()
+        result = build_covisitation(
+            db.engine, path, k=app.config['COVISITATION_COUNT'],
+            min_readers=app.config['COVISITATION_MIN_READERS'], full=full
+        )
+        click.echo(f"{result['readers']} readers read, {result['lists']} lists written "
+                   f'in {time.perf_counter() - started:.1f}s ({path})')
+
+    @app.cli.command('build-visitor-sketches')
+    @click.option('--days', type=int, help='Only rebuild the last N days (default: all).')
+    def build_visitor_sketches(days):
+        """Recompute unique-visitor sketches from the visit table"""
+        from datetime import datetime, timedelta
+        from visitor_sketches import rebuild_sketches
+
+        since = datetime.utcnow().date() - timedelta(days=days - 1) if days else None
+        started = time.perf_counter()
+        with db.engine.begin() as connection:
+            visits = rebuild_sketches(connection, since=since)
+        click.echo(f'Sketched {visits} visits in {time.perf_counter() - started:.1f}s')
+
+    @app.cli.command('prune-visits')
+    @click.option('--days', type=int, help='Raw visits to keep, in days (default: VISIT_RETENTION_DAYS).')
+    @click.option('--batch-size', type=int, help='Visits per transaction (default: VISIT_PRUNE_BATCH_SIZE).')
+    def prune_visits(days, batch_size):
+        """Archive, roll up and delete visits past the retention period"""
+        from visit_retention import prune_visits as prune, retention_cutoff
+
+        cutoff = retention_cutoff(days or app.config['VISIT_RETENTION_DAYS'])
+        archive_dir = app.config.get('VISIT_ARCHIVE_DIR') or os.path.join(app.instance_path, 'visit_archive')
+        started = time.perf_counter()
+        result = prune(db.engine, cutoff, archive_dir, batch_size=batch_size or app.config['VISIT_PRUNE_BATCH_SIZE'])
+        click.echo(f"Pruned {result['visits']} visits before {cutoff:%Y-%m-%d} in {result['batches']} batches "
+                   f"({result['files']} archive files in {archive_dir}, {result['partitions']} partitions dropped) "
+                   f'in {time.perf_counter() - started:.1f}s')
+
+    @app.cli.command('partition-visits')
+    @click.option('--convert', is_flag=True, help='Rebuild the visit table as a partitioned table first.')
+    def partition_visits(convert):
+        """Create upcoming monthly visit partitions (PostgreSQL)"""
+        from visit_retention import convert_to_partitioned, ensure_partitions, is_partitioned
+
+        months_ahead = app.config['VISIT_PARTITION_MONTHS_AHEAD']
+        with db.engine.begin() as connection:
+            if connection.dialect.name != 'postgresql':
+                raise click.ClickException('Visit partitioning needs PostgreSQL')
+            if convert:
+                click.echo(f'Copied {convert_to_partitioned(connection, months_ahead)} visits into a partitioned table')
+            elif not is_partitioned(connection):
+                raise click.ClickException('The visit table is not partitioned; run with --convert')
+            months = ensure_partitions(connection, months_ahead)
+        click.echo(f'Partitions in place for {months} months from this month')
+
+    @app.cli.command('benchmark-ratelimit')
+    @click.option('--checks', default=10000, show_default=True, help='Limiter hits per process.')
+    @click.option('--processes', default=4, show_default=True, help='Processes hitting shared storage at once.')
+    @click.option('--uri', help='Storage to measure (default: RATELIMIT_STORAGE_URI, compared with memory://).')
+    def benchmark_ratelimit(checks, processes, uri):
+        """Measure the per-check cost of the rate limit storage"""
+        from rate_limit_storage import benchmark_storage
+
+        uri = uri or app.config['RATELIMIT_STORAGE_URI']
+        runs = [('memory://', 1), (uri, 1), (uri, processes)]
+        for storage, workers in dict.fromkeys(runs):
+            result = benchmark_storage(storage, checks=checks, processes=workers)
+            click.echo(f"{storage} x{workers}: {result['microseconds_per_check']} us/check, "
+                       f"{result['checks_per_second']:.0f} checks/s")
+
+    @app.cli.command('export-snapshot')
+    @click.option('--directory', help='Snapshot root (default: STATIC_SNAPSHOT_DIR).')
+    def export_snapshot(directory):
+        """Render public pages into static HTML (with .gz and .br copies)"""
+        from static_snapshots import SnapshotExporter
+
+        directory = directory or app.config.get('STATIC_SNAPSHOT_DIR') or os.path.join(app.instance_path, 'snapshot')
+        exporter = SnapshotExporter(app, directory)
+        started = time.perf_counter()
+        pages = exporter.export_all()
+        click.echo(f'Wrote {pages} pages to {directory} ({exporter.removed} removed) '
+                   f'in {time.perf_counter() - started:.1f}s')
+
+    @app.cli.command('compress-static')
+    def compress_static():
+        """Write .br and .gz copies of compressible static files"""
+        from compression import precompress_static
+
+        started = time.perf_counter()
+        result = precompress_static(app.static_folder, min_size=app.config['COMPRESSION_MIN_SIZE'])
+        saved = 1 - result['compressed'] / result['original'] if result['original'] else 0
+        click.echo(f"Wrote {result['written']} compressed copies of {result['files']} files "
+                   f'({saved:.0%} smaller) in {time.perf_counter() - started:.1f}s')
+
+    @app.cli.command('seed-synthetic')
+    @click.option('--articles', default=50000, show_default=True, help='Articles to generate.')
+    @click.option('--visits', default=1000000, show_default=True, help='Visits to generate.')
+    @click.option('--comments', default=500000, show_default=True, help='Comments (including replies) to generate.')
+    @click.option('--bookings', default=10000, show_default=True, help='Bookings and consultation intakes to generate.')
+    @click.option('--seed', default=42, show_default=True, help='Random seed; same seed, same data.')
+    @click.option('--batch-size', default=5000, show_default=True, help='Rows per insert batch.')
+    def seed_synthetic(articles, visits, comments, bookings, seed, batch_size):
+        """Bulk-insert synthetic data for benchmarking (see benchmark.py)"""
+        from synthetic_data import generate, BENCH_ADMIN_USERNAME, BENCH_ADMIN_PASSWORD
+
+        inserted = generate(
+            {'articles': articles, 'visits': visits, 'comments': comments, 'bookings': bookings},
+            seed=seed, batch_size=batch_size, echo=click.echo
+        )
+        click.echo('Done. ' + ', '.join(f'{count} {label}' for label, count in inserted.items()))
+        click.echo(f'Benchmark admin: {BENCH_ADMIN_USERNAME} / {BENCH_ADMIN_PASSWORD}')
@@ -29,6 +29,27 @@ class Config:
         'pool_pre_ping': os.environ.get('SQLALCHEMY_POOL_PRE_PING', 'true').lower() == 'true',
     }
     
+    # Read replicas for GET requests to public pages (see read_replicas.py)
+    SQLALCHEMY_REPLICA_URLS = [u.strip() for u in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if u.strip()]
+    SQLALCHEMY_REPLICA_BLUEPRINTS = [
+        b.strip() for b in os.environ.get('REPLICA_BLUEPRINTS', 'public,articles,services').split(',') if b.strip()
+    ]
+    REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+    REPLICA_CHECK_INTERVAL = float(os.environ.get('REPLICA_CHECK_INTERVAL', 10))
+    REPLICA_LAG_QUERY = os.environ.get('REPLICA_LAG_QUERY')  # Defaults to the PostgreSQL replay lag
+    
+    # SQLite production profile (file databases only; see sqlite_tuning.py)
+    SQLITE_TUNING_ENABLED = os.environ.get('SQLITE_TUNING_ENABLED', 'true').lower() == 'true'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64000))  # Negative = KiB
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    
+    # Single-writer queue for view/like counters and visit inserts (see write_queue.py)
+    WRITE_QUEUE_ENABLED = os.environ.get('WRITE_QUEUE_ENABLED', 'true').lower() == 'true'
+    WRITE_QUEUE_MAX_BATCH = int(os.environ.get('WRITE_QUEUE_MAX_BATCH', 500))
+    WRITE_QUEUE_FLUSH_MS = float(os.environ.get('WRITE_QUEUE_FLUSH_MS', 50))
+    WRITE_QUEUE_RETRIES = int(os.environ.get('WRITE_QUEUE_RETRIES', 3))  # Retries of a locked/disconnected write
+    
     # Email Configuration
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
     MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
@@ -45,6 +66,42 @@ class Config:
     SESSION_COOKIE_HTTPONLY = os.environ.get('SESSION_COOKIE_HTTPONLY', 'true').lower() == 'true'
     SESSION_COOKIE_SAMESITE = os.environ.get('SESSION_COOKIE_SAMESITE', 'Lax')
     
+    # Cached user loader: seconds a logged-in user's snapshot is reused
+    USER_CACHE_ENABLED = os.environ.get('USER_CACHE_ENABLED', 'true').lower() == 'true'
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    
+    # Article view counting: crawler and repeat-view filter (per process)
+    VISIT_GATE_ENABLED = os.environ.get('VISIT_GATE_ENABLED', 'true').lower() == 'true'
+    VISIT_DEDUPE_SECONDS = int(os.environ.get('VISIT_DEDUPE_SECONDS', 1800))
+    VISIT_DEDUPE_MAX_ENTRIES = int(os.environ.get('VISIT_DEDUPE_MAX_ENTRIES', 100000))
+    
+    # HyperLogLog unique-visitor sketches (buffered per process, merged every N seconds)
+    VISITOR_SKETCHES_ENABLED = os.environ.get('VISITOR_SKETCHES_ENABLED', 'true').lower() == 'true'
+    VISITOR_SKETCH_FLUSH_SECONDS = float(os.environ.get('VISITOR_SKETCH_FLUSH_SECONDS', 10))
+    
+    # "More like this" on article pages (build with: flask build-neighbors)
+    SIMILAR_ARTICLES_ENABLED = os.environ.get('SIMILAR_ARTICLES_ENABLED', 'true').lower() == 'true'
+    SIMILAR_ARTICLES_COUNT = int(os.environ.get('SIMILAR_ARTICLES_COUNT', 5))
+    SIMILAR_ARTICLES_INDEX_PATH = os.environ.get('SIMILAR_ARTICLES_INDEX_PATH')  # Defaults to instance/similarity_index.npz
+    
+    # "Readers also read" from visits (build with: flask build-covisits)
+    COVISITATION_COUNT = int(os.environ.get('COVISITATION_COUNT', 5))
+    COVISITATION_MIN_READERS = int(os.environ.get('COVISITATION_MIN_READERS', 2))
+    COVISITATION_STATE_PATH = os.environ.get('COVISITATION_STATE_PATH')  # Defaults to instance/covisitation.npz
+    
+    # Raw visit retention (run: flask prune-visits, e.g. nightly from cron)
+    VISIT_RETENTION_DAYS = int(os.environ.get('VISIT_RETENTION_DAYS', 180))
+    VISIT_ARCHIVE_DIR = os.environ.get('VISIT_ARCHIVE_DIR')  # Defaults to instance/visit_archive
+    VISIT_PRUNE_BATCH_SIZE = int(os.environ.get('VISIT_PRUNE_BATCH_SIZE', 5000))
+    VISIT_PARTITION_MONTHS_AHEAD = int(os.environ.get('VISIT_PARTITION_MONTHS_AHEAD', 3))  # PostgreSQL only
+    
+    # Dashboard statistics: touched to drop every worker's cached counts
+    STATS_STAMP_FILE = os.environ.get('STATS_STAMP_FILE')  # Defaults to instance/stats.stamp
+    
+    # Static page snapshots for a front proxy (write with: flask export-snapshot)
+    STATIC_SNAPSHOT_ENABLED = os.environ.get('STATIC_SNAPSHOT_ENABLED', 'false').lower() == 'true'
+    STATIC_SNAPSHOT_DIR = os.environ.get('STATIC_SNAPSHOT_DIR')  # Defaults to instance/snapshot
+    
     # Upload Configuration
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'static/uploads')
@@ -52,18 +109,61 @@ class Config:
         os.environ.get('ALLOWED_EXTENSIONS', 'jpg,jpeg,png,gif,pdf,doc,docx').split(',')
     )
     
+    # Sitemaps and RSS/Atom feeds (generated on request into SITEMAP_DIR, kept until content changes)
+    SITE_URL = os.environ.get('SITE_URL')  # e.g. https://example.com; required outside debug/testing (checked at startup)
+    SITEMAP_DIR = os.environ.get('SITEMAP_DIR')  # Defaults to instance/sitemap
+    SITEMAP_SHARD_SIZE = int(os.environ.get('SITEMAP_SHARD_SIZE', 50000))  # Article ids per sitemap file
+    SITEMAP_MAX_AGE = int(os.environ.get('SITEMAP_MAX_AGE', 3600))  # Seconds before crawlers revalidate
+    FEED_SIZE = int(os.environ.get('FEED_SIZE', 20))
+    
+    # Admin CSV/NDJSON exports: rows fetched per batch while streaming
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+    
+    # Response compression (precompress static files with: flask compress-static)
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))  # Bytes
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 5))
+    COMPRESSION_CACHE_ENTRIES = int(os.environ.get('COMPRESSION_CACHE_ENTRIES', 256))  # Compressed bodies reused per process
+    
     # URL Scheme
     PREFERRED_URL_SCHEME = os.environ.get('PREFERRED_URL_SCHEME', 'http')
     
-    # Rate limiting
-    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL', 'memory://')
+    # Rate limiting: counters shared by all workers on this host (defaults to
+    # sqlite:///instance/ratelimit.db, see rate_limit_storage.py); use
+    # redis://host:6379 to share them across hosts
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI') or os.environ.get('RATELIMIT_STORAGE_URL')
     
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_THIRD_PARTY_LEVEL = os.environ.get('LOG_THIRD_PARTY_LEVEL', 'WARNING')  # Library loggers (sqlalchemy, werkzeug, ...)
     LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
     LOG_FILE = os.environ.get('LOG_FILE', 'logs/simplylawverse.log')
     LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
     LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 10))
+    LOG_SAMPLE_RATES = os.environ.get('LOG_SAMPLE_RATES', '')  # e.g. blueprints.public=0.1
+    
+    # Query instrumentation (per-request query counts and Server-Timing)
+    QUERY_INSTRUMENTATION_ENABLED = os.environ.get('QUERY_INSTRUMENTATION_ENABLED', 'true').lower() == 'true'
+    # Server-Timing is always sent to admins and in debug; this sends it to everyone
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'false').lower() == 'true'
+    SLOW_REQUEST_QUERY_THRESHOLD = int(os.environ.get('SLOW_REQUEST_QUERY_THRESHOLD', 30))
+    SLOW_REQUEST_DB_MS_THRESHOLD = float(os.environ.get('SLOW_REQUEST_DB_MS_THRESHOLD', 250))
+    
+    # Prometheus metrics (/metrics requires METRICS_TOKEN bearer auth, or an admin login if unset)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # Sampling profiler (opt-in; profiles are listed at /admin/profiles)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0.01))
+    PROFILING_ENDPOINTS = [e.strip() for e in os.environ.get('PROFILING_ENDPOINTS', '').split(',') if e.strip()]
+    PROFILING_HEADER = os.environ.get('PROFILING_HEADER', 'X-Profile')
+    PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')
+    PROFILING_INTERVAL_MS = float(os.environ.get('PROFILING_INTERVAL_MS', 5))
+    PROFILING_MIN_DURATION_MS = float(os.environ.get('PROFILING_MIN_DURATION_MS', 100))
+    PROFILING_DIR = os.environ.get('PROFILING_DIR')  # Defaults to instance/profiles
+    PROFILING_MAX_FILES = int(os.environ.get('PROFILING_MAX_FILES', 500))
     
     # Application Settings
     APP_NAME = os.environ.get('APP_NAME', 'Simply Law')
@@ -88,6 +188,9 @@ class DevelopmentConfig(Config):
     
     # Disable HTTPS requirement in development
     PREFERRED_URL_SCHEME = 'http'
+    
+    # Absolute URLs in sitemaps and feeds
+    SITE_URL = os.environ.get('SITE_URL', 'http://localhost:5000')
 
 
 class ProductionConfig(Config):
@@ -114,11 +217,27 @@ class TestingConfig(Config):
     # Use in-memory SQLite for tests
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     
+    # In-memory SQLite uses a static pool, which rejects pool sizing options
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    
     # Disable CSRF for testing
     WTF_CSRF_ENABLED = False
     
+    # Disable rate limiting for testing
+    RATELIMIT_ENABLED = False
+    RATELIMIT_STORAGE_URI = 'memory://'
+    
     # Use simple password hashing for tests (faster)
     BCRYPT_LOG_ROUNDS = 4
+    
+    # Keep tests from updating a similarity index saved under instance/
+    SIMILAR_ARTICLES_ENABLED = False
+    
+    # Merge visitor sketches on every commit so tests see them immediately
+    VISITOR_SKETCH_FLUSH_SECONDS = 0
+    
+    # The test client's host
+    SITE_URL = 'http://localhost'
 
 
 # Configuration dictionary
@@ -154,3 +273,4 @@ def validate_production_config():
                 'SECRET_KEY must be set to a strong random value in production!\n'
                 'Generate with: python -c "import secrets; print(secrets.token_hex(32))"'
             )
+
@@ -0,0 +1,93 @@
+"""
+Shared pytest fixtures
+Builds the application against an in-memory SQLite database
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import config
+from app import create_app
+from extensions import db as _db
+from models import Article
+
+
+def _stop_background_work(app):
+    """Stop threads the app started, so they do not outlive the test"""
+    buffer = app.extensions.get('visitor_sketches')
+    if buffer is not None:
+        buffer.stop()
+
+
+@pytest.fixture
+def app_factory(monkeypatch):
+    """
+    Build apps from TestingConfig with some settings overridden
+
+    Usage:
+        app = app_factory(SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "site.db"}')
+
+    The caller creates the schema; background work is stopped on teardown.
+    """
+    apps = []
+
+    def build(**settings):
+        monkeypatch.setenv('FLASK_ENV', 'testing')
+        for name, value in settings.items():
+            monkeypatch.setattr(config.TestingConfig, name, value)
+        app = create_app()
+        apps.append(app)
+        return app
+
+    yield build
+    for app in apps:
+        _stop_background_work(app)
+
+
+@pytest.fixture
+def app(app_factory):
+    """Application with a fresh schema for each test"""
+    app = app_factory()
+
+    with app.app_context():
+        _db.create_all()
+        yield app
+        _db.session.remove()
+        _stop_background_work(app)
+        _db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    """Flask test client"""
+    return app.test_client()
+
+
+@pytest.fixture
+def db(app):
+    """Database handle bound to the test application"""
+    return _db
+
+
+@pytest.fixture
+def make_article():
+    """
+    Create and commit an article in the current app context
+
+    Usage:
+        article = make_article('Title', status='pending', category='Tax Law', days_ago=2)
+
+    Other Article fields can be passed as keywords; content defaults to
+    '<title> body'.
+    """
+    def make(title='Article', status='approved', category='Corporate Law', days_ago=0, **fields):
+        fields.setdefault('content', f'{title} body')
+        if days_ago:
+            fields['date_posted'] = datetime.utcnow() - timedelta(days=days_ago)
+        article = Article(title=title, author='Author', email='author@example.com',
+                          status=status, category=category, **fields)
+        _db.session.add(article)
+        _db.session.commit()
+        return article
+
+    return make
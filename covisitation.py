@@ -0,0 +1,341 @@
+"""
+Co-visitation
+"Readers also read" lists built from the Visit table
+
+Two articles are co-visited when the same reader viewed both: visits are
+grouped by visitor_hash, or by session_id for visits without one. The batch
+job streams visits in visitor order (idx_visit_hash_date,
+idx_visit_session_date) in chunks of FETCH_SIZE, so only one reader's
+articles are held at a time. Article pairs go into a buffer that is
+periodically folded into a compact co-visitation matrix: a sorted int64 array
+of pair keys (smaller id << 32 | larger id) with a parallel array of reader
+counts.
+
+Each article's most co-visited articles are stored in article_covisit and
+read with one indexed lookup (Article.also_read). The matrix and the highest
+Visit.id counted (the high-water mark) are saved to COVISITATION_STATE_PATH,
+so `flask build-covisits` only reads the readers with newer visits and adds
+the pairs those visits created. Use --full to recount from scratch (visits
+pruned past retention are then no longer counted, see visit_retention.py).
+Runs hold a lock next to the state file, and the state is saved only after
+the lists are committed.
+
+Visits are committed some time after their id is assigned (by the write
+queue, or by concurrent workers), so a visit with an id below the mark can
+appear after a run. Each run therefore re-reads the last ID_OVERLAP ids
+below the mark and skips the ids it already counted, which are saved with
+the matrix.
+"""
+
+import os
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import func
+
+from extensions import db
+from file_utils import file_lock
+from logger import get_logger
+from models import ArticleCovisit, Visit
+
+logger = get_logger(__name__)
+
+FETCH_SIZE = 5000
+PAIR_BUFFER_SIZE = 2_000_000     # Pair keys buffered before folding into the matrix
+MAX_ARTICLES_PER_VISITOR = 100   # First distinct articles per reader counted (caps crawlers)
+ID_OVERLAP = 10000               # Visit ids below the high-water mark re-read for late commits
+KEY_SHIFT = 32
+KEY_MASK = (1 << KEY_SHIFT) - 1
+
+# Reader identity: visitor fingerprint, else the session for visits without one
+VISITOR_COLUMNS = (Visit.visitor_hash, Visit.session_id)
+
+
+def _pair_keys(first, second):
+    """Order-independent int64 keys for article id pairs"""
+    low, high = np.minimum(first, second), np.maximum(first, second)
+    return (low.astype(np.int64) << KEY_SHIFT) | high.astype(np.int64)
+
+
+def _pairs_within(articles):
+    """Keys of every pair within one reader's articles"""
+    articles = np.asarray(articles, dtype=np.int64)
+    first, second = np.triu_indices(len(articles), k=1)
+    return _pair_keys(articles[first], articles[second])
+
+
+def _pairs_between(new, old):
+    """Keys of every pair with one article from each list"""
+    new, old = np.asarray(new, dtype=np.int64), np.asarray(old, dtype=np.int64)
+    return _pair_keys(np.repeat(new, len(old)), np.tile(old, len(new)))
+
+
+class CovisitationMatrix:
+    """
+    Sparse symmetric article-by-article reader counts
+
+    Attributes:
+        keys: Sorted pair keys (smaller article id << 32 | larger article id)
+        counts: Readers who viewed both articles of each pair
+        high_water_mark: Highest Visit.id counted, or None
+        recent_ids: Visit ids counted within ID_OVERLAP of the mark
+    """
+
+    def __init__(self, keys=None, counts=None, high_water_mark=None, recent_ids=None):
+        self.keys = np.zeros(0, dtype=np.int64) if keys is None else keys
+        self.counts = np.zeros(0, dtype=np.int32) if counts is None else counts
+        self.high_water_mark = high_water_mark
+        self.recent_ids = np.zeros(0, dtype=np.int64) if recent_ids is None else recent_ids
+        self._buffer = []
+        self._buffered = 0
+
+    def add(self, keys):
+        """Count one reader for each pair key (buffered; see fold)"""
+        if len(keys):
+            self._buffer.append(keys)
+            self._buffered += len(keys)
+            if self._buffered >= PAIR_BUFFER_SIZE:
+                self.fold()
+
+    def fold(self):
+        """Merge buffered pairs into keys/counts"""
+        if not self._buffer:
+            return
+        keys, counts = np.unique(np.concatenate(self._buffer), return_counts=True)
+        self._buffer, self._buffered = [], 0
+
+        merged, inverse = np.unique(np.concatenate((self.keys, keys)), return_inverse=True)
+        self.counts = np.bincount(
+            inverse, weights=np.concatenate((self.counts, counts)), minlength=len(merged)
+        ).astype(np.int32)
+        self.keys = merged
+
+    def top_lists(self, k, min_count=1, article_ids=None):
+        """
+        Most co-visited articles per article
+
+        Args:
+            k: Articles per list
+            min_count: Minimum shared readers
+            article_ids: Only build lists for these articles
+
+        Returns:
+            Dict of article_id -> [(other_id, readers), ...] best first
+        """
+        self.fold()
+        keep = self.counts >= min_count
+        low, high = self.keys[keep] >> KEY_SHIFT, self.keys[keep] & KEY_MASK
+        counts = self.counts[keep]
+
+        # Both directions of each pair, then best-first within each article
+        sources = np.concatenate((low, high))
+        targets = np.concatenate((high, low))
+        counts = np.concatenate((counts, counts))
+        if article_ids is not None:
+            wanted = np.isin(sources, np.asarray(list(article_ids), dtype=np.int64))
+            sources, targets, counts = sources[wanted], targets[wanted], counts[wanted]
+        order = np.lexsort((targets, -counts, sources))
+        sources, targets, counts = sources[order], targets[order], counts[order]
+
+        lists = {int(article_id): [] for article_id in (article_ids or ())}
+        if not len(sources):
+            return lists
+        starts = np.flatnonzero(np.r_[True, sources[1:] != sources[:-1]])
+        rank = np.arange(len(sources)) - np.repeat(starts, np.diff(np.r_[starts, len(sources)]))
+        top = rank < k
+        for source, target, count in zip(sources[top].tolist(), targets[top].tolist(), counts[top].tolist()):
+            lists.setdefault(source, []).append((target, count))
+        return lists
+
+    def save(self, path):
+        """Write the matrix and high-water mark to an .npz file (atomically)"""
+        self.fold()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f'{path}.tmp.npz'
+        mark = -1 if self.high_water_mark is None else self.high_water_mark
+        np.savez(temporary, keys=self.keys, counts=self.counts, high_water_mark=np.array(mark, dtype=np.int64),
+                 recent_ids=np.asarray(self.recent_ids, dtype=np.int64))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as saved:
+            mark = saved['high_water_mark'].item()
+            if isinstance(mark, str):
+                # Saved before the mark was a Visit.id: a timestamp, resolved by build_covisitation
+                mark = datetime.fromisoformat(mark) if mark else None
+            elif mark < 0:
+                mark = None
+            recent_ids = saved['recent_ids'] if 'recent_ids' in saved.files else None
+            return cls(saved['keys'], saved['counts'], mark, recent_ids)
+
+
+# ============================================================================
+# BATCH JOB
+# ============================================================================
+
+def _readers(connection, column, since=None, until=None):
+    """
+    Stream (reader key, [(visit_id, article_id), ...]) grouped by reader
+
+    Args:
+        connection: Connection to read on
+        column: Visit.visitor_hash, or Visit.session_id (visits without a hash)
+        since: Only readers with a visit whose id is above this
+        until: Ignore visits with ids above this
+    """
+    statement = db.select(column, Visit.id, Visit.article_id).where(column.isnot(None))
+    if column is not Visit.visitor_hash:
+        statement = statement.where(Visit.visitor_hash.is_(None))
+    if until is not None:
+        statement = statement.where(Visit.id <= until)
+    if since is not None:
+        recent = db.select(column).where(Visit.id > since)
+        if until is not None:
+            recent = recent.where(Visit.id <= until)
+        statement = statement.where(column.in_(recent))
+    statement = statement.order_by(column, Visit.timestamp, Visit.id)
+
+    result = connection.execution_options(stream_results=True, yield_per=FETCH_SIZE).execute(statement)
+    reader, visits = None, []
+    for key, visit_id, article_id in result:
+        if key != reader:
+            if visits:
+                yield reader, visits
+            reader, visits = key, []
+        visits.append((visit_id, article_id))
+    if visits:
+        yield reader, visits
+
+
+def _reader_pairs(visits):
+    """
+    Pair keys a reader adds: all pairs of their first MAX_ARTICLES_PER_VISITOR
+    distinct articles, minus those already counted before the new visits
+    (an article with any counted visit was already paired)
+    """
+    articles = {}
+    for article_id, is_new in visits:
+        if article_id in articles:
+            articles[article_id] = articles[article_id] and is_new
+        elif len(articles) < MAX_ARTICLES_PER_VISITOR:
+            articles[article_id] = is_new
+    new = [article_id for article_id, is_new in articles.items() if is_new]
+    old = [article_id for article_id, is_new in articles.items() if not is_new]
+    if not new:
+        return None
+    keys = _pairs_within(new)
+    if old:
+        keys = np.concatenate((keys, _pairs_between(new, old)))
+    return keys
+
+
+def _store(connection, lists):
+    """
+    Replace the stored "readers also read" lists of some articles
+
+    Args:
+        connection: Connection to write on
+        lists: Dict of article_id -> [(other_id, readers), ...] best first
+    """
+    table = ArticleCovisit.__table__
+    article_ids = list(lists)
+    for start in range(0, len(article_ids), FETCH_SIZE):
+        connection.execute(table.delete().where(table.c.article_id.in_(article_ids[start:start + FETCH_SIZE])))
+    rows = [
+        {'article_id': article_id, 'rank': rank, 'other_id': other_id, 'readers': readers}
+        for article_id, others in lists.items()
+        for rank, (other_id, readers) in enumerate(others)
+    ]
+    for start in range(0, len(rows), FETCH_SIZE):
+        connection.execute(table.insert(), rows[start:start + FETCH_SIZE])
+
+
+def _update(connection, path, k, min_readers, full):
+    """
+    Count new co-visits and write the lists they change
+
+    Returns:
+        Tuple of the updated matrix (None when there are no visits, the
+        saved state is then left as it is) and the result dict
+    """
+    incremental = not full and os.path.exists(path)
+    matrix = CovisitationMatrix.load(path) if incremental else CovisitationMatrix()
+    since = matrix.high_water_mark if incremental else None
+    if isinstance(since, datetime):
+        since = connection.execute(db.select(func.max(Visit.id)).where(Visit.timestamp <= since)).scalar()
+
+    until = connection.execute(db.select(func.max(Visit.id))).scalar()
+    if until is None:
+        return None, {'readers': 0, 'lists': 0}
+
+    floor = None if since is None else since - ID_OVERLAP
+    counted = set(matrix.recent_ids.tolist()) if since is not None else set()
+    window_floor = until - ID_OVERLAP
+    recent_ids = {visit_id for visit_id in counted if visit_id > window_floor}
+
+    def is_new(visit_id):
+        return floor is None or (visit_id > floor and visit_id not in counted)
+
+    readers, touched = 0, set()
+    for column in VISITOR_COLUMNS:
+        for _, visits in _readers(connection, column, since=floor, until=until):
+            flagged = [(article_id, is_new(visit_id)) for visit_id, article_id in visits]
+            recent_ids.update(visit_id for visit_id, _ in visits if visit_id > window_floor)
+            if not any(new for _, new in flagged):
+                continue
+            readers += 1
+            keys = _reader_pairs(flagged)
+            if keys is not None and len(keys):
+                matrix.add(keys)
+                if incremental:
+                    touched.update((keys >> KEY_SHIFT).tolist())
+                    touched.update((keys & KEY_MASK).tolist())
+
+    if incremental:
+        lists = matrix.top_lists(k, min_readers, article_ids=touched) if touched else {}
+    else:
+        connection.execute(ArticleCovisit.__table__.delete())
+        lists = matrix.top_lists(k, min_readers)
+    _store(connection, lists)
+
+    matrix.high_water_mark = until
+    matrix.recent_ids = np.array(sorted(recent_ids), dtype=np.int64)
+    logger.info(
+        f"Co-visitation {'update' if incremental else 'build'}: {readers} readers, "
+        f"{len(matrix.keys)} article pairs, {len(lists)} lists written"
+    )
+    return matrix, {'readers': readers, 'lists': len(lists)}
+
+
+def build_covisitation(engine, path, k=5, min_readers=2, full=False):
+    """
+    Count co-visits up to the newest visit and refresh the stored lists
+
+    Incremental unless full is set or no saved state exists at path: only
+    readers with visits after the saved high-water mark (less ID_OVERLAP)
+    are read, only visits not counted before are added, and only the lists
+    of articles whose counts changed are rewritten.
+
+    The run holds an exclusive lock next to path, so overlapping runs take
+    turns. The matrix and high-water mark are saved only once the lists are
+    committed: if the commit fails, the next run recounts the same visits.
+
+    Args:
+        engine: Engine to read and write through (committed by this call)
+        path: .npz file holding the matrix and high-water mark
+        k: Articles per list
+        min_readers: Minimum shared readers for an article to be listed
+        full: Recount every visit
+
+    Returns:
+        Dict with the number of readers with new visits and lists written
+    """
+    with file_lock(f'{path}.lock'):
+        with engine.begin() as connection:
+            matrix, result = _update(connection, path, k, min_readers, full)
+        if matrix is not None:
+            matrix.save(path)
+    return result
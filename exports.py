@@ -0,0 +1,147 @@
+"""
+Data Exports
+Streaming CSV and NDJSON exports of bookings, intakes, messages and visits
+
+An export is one SELECT of the dataset's columns read in partitions of
+EXPORT_BATCH_SIZE rows (yield_per: a server-side cursor on PostgreSQL and
+MySQL, SQLite steps its cursor anyway) and written out by a generator, one
+chunk per partition. Memory stays flat however many rows match: a million
+visits stream in the footprint of one partition.
+
+Rows are ordered by the dataset's date column, then id, and can be limited
+to a range of days (start and end both inclusive, UTC). CSV cells that a
+spreadsheet would evaluate as a formula (starting with =, +, -, @, tab or
+carriage return) are prefixed with a quote; NDJSON values are exact.
+"""
+
+import csv
+import io
+import json
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from extensions import db
+from models import Booking, ClientIntake, Message, Visit
+
+EXPORT_BATCH_SIZE = 1000
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+Export = namedtuple('Export', ['model', 'date_column', 'columns'])
+
+# Internal fields (confirmation tokens, server-side file paths) are left out
+EXPORTS = {
+    'bookings': Export(Booking, 'created_at', (
+        'id', 'created_at', 'client_name', 'client_email', 'client_phone', 'company_name', 'cac_status',
+        'service_id', 'consultation_type_id', 'scheduled_date', 'amount_naira', 'payment_reference',
+        'payment_status', 'payment_completed_at', 'booking_status', 'consultation_date_start',
+        'consultation_date_end', 'completed_at', 'document_filename', 'email_sent', 'issue_description',
+        'admin_notes',
+    )),
+    'intakes': Export(ClientIntake, 'submitted_at', (
+        'id', 'submitted_at', 'full_name', 'email', 'phone', 'company_name', 'cac_status', 'status',
+        'reviewed_at', 'reviewed_by_id', 'document_filename', 'issue_description', 'notes',
+    )),
+    'messages': Export(Message, 'date_sent', ('id', 'date_sent', 'name', 'email', 'message')),
+    'visits': Export(Visit, 'timestamp', (
+        'id', 'timestamp', 'article_id', 'user_id', 'session_id', 'visitor_hash', 'ip_address',
+        'user_agent', 'referer', 'duration_seconds',
+    )),
+}
+
+
+def parse_day(value):
+    """
+    Parse a YYYY-MM-DD query parameter
+
+    Returns:
+        date, or None for an empty value
+
+    Raises:
+        ValueError: If the value is not a valid date
+    """
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def export_statement(name, start=None, end=None):
+    """
+    SELECT for an export, oldest first
+
+    Args:
+        name: Dataset name (a key of EXPORTS)
+        start: First day included, or None
+        end: Last day included, or None
+    """
+    export = EXPORTS[name]
+    date_column = getattr(export.model, export.date_column)
+    statement = db.select(*(getattr(export.model, column) for column in export.columns))
+    if start is not None:
+        statement = statement.where(date_column >= datetime.combine(start, datetime.min.time()))
+    if end is not None:
+        statement = statement.where(date_column < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    return statement.order_by(date_column, export.model.id)
+
+
+def stream_partitions(engine, statement, batch_size=EXPORT_BATCH_SIZE):
+    """Run a SELECT on its own connection and yield its rows batch_size at a time"""
+    with engine.connect() as connection:
+        result = connection.execution_options(yield_per=batch_size).execute(statement)
+        yield from result.partitions()
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def csv_chunks(columns, partitions):
+    """CSV text: a header line, then one chunk per partition of rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_cell(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(columns, partitions):
+    """NDJSON text: one object per row, one chunk per partition of rows"""
+    for rows in partitions:
+        yield ''.join(
+            json.dumps({column: _json_value(value) for column, value in zip(columns, row)},
+                       separators=(',', ':')) + '\n'
+            for row in rows
+        )
+
+
+def export_chunks(engine, name, export_format, start=None, end=None, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Generate an export as text chunks
+
+    Args:
+        engine: Engine to read from
+        name: Dataset name (a key of EXPORTS)
+        export_format: 'csv' or 'ndjson'
+        start: First day included, or None
+        end: Last day included, or None
+        batch_size: Rows per partition (and per chunk)
+    """
+    columns = EXPORTS[name].columns
+    partitions = stream_partitions(engine, export_statement(name, start, end), batch_size)
+    if export_format == 'csv':
+        return csv_chunks(columns, partitions)
+    return ndjson_chunks(columns, partitions)
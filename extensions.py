@@ -4,8 +4,9 @@ from flask_migrate import Migrate
 from flask_mail import Mail
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from read_replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 migrate = Migrate()
 mail = Mail()
@@ -0,0 +1,48 @@
+"""
+File Utilities
+Helpers for files the app generates and serves from disk
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock; run a single worker there
+    fcntl = None
+
+
+def write_atomic(path, data):
+    """
+    Replace a file's contents in one step
+
+    The bytes are written to a temporary file next to path and renamed over
+    it, so readers see either the old file or the new one, never a partial
+    write. The temporary name is unique per process and thread, so writers
+    that overlap (a background renderer and an export) do not collide.
+
+    Args:
+        path: File to write
+        data: Bytes to write
+    """
+    temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporary, 'wb') as output:
+        output.write(data)
+    os.replace(temporary, path)
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on path across processes (flock)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'a') as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
@@ -191,16 +191,22 @@ class ChangePasswordForm(FlaskForm):
     ])
     submit = SubmitField('Change Password')
     
+    @staticmethod
+    def _stored_password():
+        """Password hash of the logged-in user (current_user is a cached snapshot)"""
+        from models import User
+        return User.query.get(current_user.id).password
+    
     def validate_current_password(self, field):
         """Verify that current password is correct"""
         from werkzeug.security import check_password_hash
-        if not check_password_hash(current_user.password, field.data):
+        if not check_password_hash(self._stored_password(), field.data):
             raise ValidationError('Current password is incorrect.')
     
     def validate_new_password(self, field):
         """Ensure new password is different from old password"""
         from werkzeug.security import check_password_hash
-        if check_password_hash(current_user.password, field.data):
+        if check_password_hash(self._stored_password(), field.data):
             raise ValidationError('New password must be different from current password.')
         
         # Check password strength requirements
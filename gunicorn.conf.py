@@ -0,0 +1,31 @@
+"""
+Gunicorn configuration
+Loaded automatically by `gunicorn app:app` from the project root
+"""
+import os
+import shutil
+
+# Workers write Prometheus samples to per-process files in this directory
+# (see metrics.py). Must be set before prometheus_client is imported.
+prometheus_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/simplylawverse-metrics')
+
+
+def on_starting(server):
+    """Start each master run with an empty metrics directory"""
+    shutil.rmtree(prometheus_dir, ignore_errors=True)
+    os.makedirs(prometheus_dir, exist_ok=True)
+
+
+def when_ready(server):
+    """Optionally serve aggregated metrics on a separate port"""
+    port = os.environ.get('METRICS_PORT')
+    if port:
+        from prometheus_client import start_http_server
+        from metrics import build_registry
+        start_http_server(int(port), registry=build_registry())
+
+
+def child_exit(server, worker):
+    """Drop live gauges belonging to a worker that has exited"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
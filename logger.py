@@ -1,27 +1,244 @@
 """
 Logging configuration for the application.
+
+Request threads only enqueue records (QueueHandler); a single listener
+thread formats them and writes the log file, so file I/O and rotation never
+happen on the request path.
 """
+import atexit
+import copy
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+import re
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import g, has_request_context, request
+
+LOG_QUEUE_SIZE = 10000
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+# Incoming request ids are echoed into logs and headers, so keep them tame
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+# Active (queue_handler, listener) so repeated create_app() calls don't stack handlers
+_pipeline = None
+
+# Loggers created through get_logger() log at LOG_LEVEL; everything else
+# (library loggers propagating to root) at LOG_THIRD_PARTY_LEVEL
+_app_loggers = set()
+_app_level = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'module': record.module,
+            'line': record.lineno,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request id to each record (runs on the request thread)"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = g.get('request_id') if has_request_context() else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of low-severity records from noisy loggers
+
+    Args:
+        rates: Dict of logger name -> fraction of records to keep (0.0-1.0).
+            Child loggers inherit the rate of their closest configured parent.
+        max_level: Records above this level are always kept
+    """
+
+    def __init__(self, rates, max_level=logging.INFO):
+        super().__init__()
+        self.rates = rates
+        self.max_level = max_level
+        self._resolved = {}
+
+    def rate_for(self, name):
+        """Resolve the sample rate for a logger name"""
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            parts = name.split('.')
+            for i in range(len(parts), 0, -1):
+                prefix = '.'.join(parts[:i])
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno > self.max_level:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        """
+        Pass a copy of the record to the listener with its message rendered
+
+        The message is formatted here, on the calling thread, because its
+        args (ORM instances, request-bound proxies) may only render inside
+        the caller's session and request context. Unlike the stock
+        prepare(), exc_info is kept: the queue never leaves this process, so
+        the listener's formatter (e.g. JsonFormatter's 'exception' key) can
+        still render the traceback itself.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sample_rates(value):
+    """
+    Parse LOG_SAMPLE_RATES, e.g. 'blueprints.public=0.1,blueprints.articles=0.5'
+
+    Returns:
+        Dict of logger name -> rate; malformed entries are ignored
+    """
+    rates = {}
+    for item in (value or '').split(','):
+        name, _, rate = item.partition('=')
+        try:
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+
+def build_formatter(log_format):
+    """Formatter for LOG_FORMAT ('json' or 'text')"""
+    if log_format == 'json':
+        return JsonFormatter()
+    return logging.Formatter(
+        '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s [in %(pathname)s:%(lineno)d]'
+    )
+
+
+def _stop_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        return
+    handler, listener = _pipeline
+    logging.getLogger().removeHandler(handler)
+    listener.stop()
+    for target in listener.handlers:
+        target.close()
+    _pipeline = None
+
+
+def _configure_request_ids(app):
+    @app.before_request
+    def assign_request_id():
+        """Reuse a sane incoming X-Request-ID or generate one"""
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+
+    @app.after_request
+    def add_request_id_header(response):
+        """Echo the request id so clients and proxies can correlate"""
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        return response
+
 
 def setup_logging(app):
     """Configure application logging"""
+    _configure_request_ids(app)
+
     if not app.debug:
-        # Create logs directory if it doesn't exist
-        if not os.path.exists('logs'):
-            os.mkdir('logs')
-        
-        file_handler = RotatingFileHandler('logs/simplylawverse.log', maxBytes=10240000, backupCount=10)
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-        ))
-        file_handler.setLevel(logging.INFO)
-        app.logger.addHandler(file_handler)
-        
-        app.logger.setLevel(logging.INFO)
+        log_file = app.config.get('LOG_FILE', 'logs/simplylawverse.log')
+        log_dir = os.path.dirname(log_file)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+
+        file_handler = RotatingFileHandler(
+            log_file,
+            maxBytes=app.config.get('LOG_MAX_BYTES', 10240000),
+            backupCount=app.config.get('LOG_BACKUP_COUNT', 10)
+        )
+        file_handler.setFormatter(build_formatter(app.config.get('LOG_FORMAT', 'json')))
+
+        # Filters run in the calling thread before the record is queued
+        queue_handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        queue_handler.addFilter(SamplingFilter(parse_sample_rates(app.config.get('LOG_SAMPLE_RATES'))))
+        queue_handler.addFilter(RequestIdFilter())
+
+        _stop_pipeline()
+        listener = QueueListener(queue_handler.queue, file_handler, respect_handler_level=True)
+        listener.start()
+
+        global _pipeline
+        _pipeline = (queue_handler, listener)
+
+        # Module loggers (get_logger) and app.logger both propagate to root;
+        # library records below LOG_THIRD_PARTY_LEVEL never reach the queue
+        global _app_level
+        _app_level = app.config.get('LOG_LEVEL', 'INFO')
+        root = logging.getLogger()
+        root.addHandler(queue_handler)
+        root.setLevel(app.config.get('LOG_THIRD_PARTY_LEVEL', 'WARNING'))
+        for name in _app_loggers | {app.logger.name}:
+            logging.getLogger(name).setLevel(_app_level)
         app.logger.info('Simplylawverse startup')
 
+
 def get_logger(name):
-    """Get a logger instance"""
-    return logging.getLogger(name)
+    """Get an application logger (logs at LOG_LEVEL once logging is set up)"""
+    logger = logging.getLogger(name)
+    _app_loggers.add(name)
+    if _app_level is not None:
+        logger.setLevel(_app_level)
+    return logger
+
+
+# Flush queued records on interpreter shutdown
+atexit.register(_stop_pipeline)
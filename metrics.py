@@ -0,0 +1,171 @@
+"""
+Prometheus Metrics
+Request, database, template and external-call metrics in Prometheus format
+
+Multi-worker deployments: set PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py does
+this) so every worker writes its samples to shared mmap files and /metrics
+aggregates them across processes.
+"""
+
+import hmac
+import os
+import time
+
+from flask import Flask, Response, abort, g, request
+from flask_login import current_user
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Request latency',
+    ['blueprint', 'endpoint', 'method', 'status'],
+    buckets=LATENCY_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_seconds',
+    'Time spent executing SQL per request',
+    ['endpoint'],
+    buckets=LATENCY_BUCKETS
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries',
+    'SQL statements executed per request',
+    ['endpoint'],
+    buckets=QUERY_COUNT_BUCKETS
+)
+TEMPLATE_RENDER_TIME = Histogram(
+    'http_request_template_seconds',
+    'Time spent rendering templates per request',
+    ['endpoint'],
+    buckets=LATENCY_BUCKETS
+)
+QUEUE_DEPTH = Gauge(
+    'queue_depth',
+    'Items waiting in an in-process work queue',
+    ['queue'],
+    multiprocess_mode='livesum'
+)
+PAYSTACK_LATENCY = Histogram(
+    'paystack_request_duration_seconds',
+    'Paystack API call latency',
+    ['operation'],
+    buckets=LATENCY_BUCKETS
+)
+
+VIEWS_DROPPED = Counter(
+    'article_views_dropped_total',
+    'Article views not recorded by the visit gate',
+    ['reason']
+)
+COMPRESSED_RESPONSES = Counter(
+    'http_compressed_responses_total',
+    'Responses compressed by the app',
+    ['encoding']
+)
+COMPRESSION_BYTES = Counter(
+    'http_compression_bytes_total',
+    'Body bytes of compressed responses before and after compression',
+    ['stage']
+)
+
+
+def build_registry():
+    """
+    Registry to expose on /metrics
+
+    In multiprocess mode samples from every worker are merged; otherwise
+    the default in-process registry is used.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def set_queue_depth(queue, depth):
+    """Report the current depth of an in-process queue"""
+    QUEUE_DEPTH.labels(queue=queue).set(depth)
+
+
+def count_dropped_view(reason):
+    """Count an article view the visit gate did not record ('bot' or 'duplicate')"""
+    VIEWS_DROPPED.labels(reason=reason).inc()
+
+
+def count_compressed_response(encoding, original, compressed):
+    """Count a compressed response and its body size before and after"""
+    COMPRESSED_RESPONSES.labels(encoding=encoding).inc()
+    COMPRESSION_BYTES.labels(stage='original').inc(original)
+    COMPRESSION_BYTES.labels(stage='compressed').inc(compressed)
+
+
+def paystack_timer(operation):
+    """
+    Context manager timing a Paystack API call
+
+    Usage:
+        with paystack_timer('verify_transaction'):
+            response = requests.get(...)
+    """
+    return PAYSTACK_LATENCY.labels(operation=operation).time()
+
+
+def configure_metrics(app: Flask):
+    """
+    Configure request metrics and the /metrics endpoint
+
+    /metrics requires a bearer token when METRICS_TOKEN is set, otherwise
+    a logged-in admin.
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    @app.before_request
+    def start_request_timer():
+        """Record when the request started"""
+        g.metrics_started_at = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        """Observe latency, DB and template time for this request"""
+        started = g.get('metrics_started_at')
+        if started is None:
+            return response
+
+        # Unmatched URLs share one label to keep cardinality bounded
+        endpoint = request.endpoint or 'unmatched'
+        REQUEST_LATENCY.labels(
+            blueprint=request.blueprint or '',
+            endpoint=endpoint,
+            method=request.method,
+            status=str(response.status_code)
+        ).observe(time.perf_counter() - started)
+
+        stats = g.get('query_stats')
+        if stats is not None:
+            REQUEST_DB_TIME.labels(endpoint=endpoint).observe(stats.duration)
+            REQUEST_QUERIES.labels(endpoint=endpoint).observe(stats.count)
+            TEMPLATE_RENDER_TIME.labels(endpoint=endpoint).observe(stats.template_duration)
+
+        return response
+
+    def metrics_view():
+        """Expose metrics in Prometheus text format"""
+        token = app.config.get('METRICS_TOKEN')
+        if token:
+            supplied = request.headers.get('Authorization', '')
+            if not hmac.compare_digest(supplied, f'Bearer {token}'):
+                abort(401)
+        elif not (current_user.is_authenticated and current_user.is_admin):
+            abort(403)
+
+        return Response(generate_latest(build_registry()), mimetype=CONTENT_TYPE_LATEST)
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,36 @@
+"""Add visitor_sketch table for HyperLogLog unique-visitor estimates
+
+Revision ID: 0a6d3b8e41c7
+Revises: f2c58e917a3d
+Create Date: 2026-10-19 20:48:35.771604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a6d3b8e41c7'
+down_revision = 'f2c58e917a3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Backfill from existing visits with `flask build-visitor-sketches`
+    op.create_table(
+        'visitor_sketch',
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('registers', sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint('article_id', 'day')
+    )
+    with op.batch_alter_table('visitor_sketch', schema=None) as batch_op:
+        batch_op.create_index('idx_visitor_sketch_day', ['day'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('visitor_sketch', schema=None) as batch_op:
+        batch_op.drop_index('idx_visitor_sketch_day')
+
+    op.drop_table('visitor_sketch')
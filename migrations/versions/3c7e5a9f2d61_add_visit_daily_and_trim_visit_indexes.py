@@ -0,0 +1,51 @@
+"""Add visit_daily rollups and drop visit indexes covered by composites
+
+Revision ID: 3c7e5a9f2d61
+Revises: 0a6d3b8e41c7
+Create Date: 2026-10-19 22:41:07.318254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c7e5a9f2d61'
+down_revision = '0a6d3b8e41c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by `flask prune-visits`
+    op.create_table(
+        'visit_daily',
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('visits', sa.Integer(), nullable=False),
+        sa.Column('duration_seconds', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['article_id'], ['article.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('article_id', 'day')
+    )
+    with op.batch_alter_table('visit_daily', schema=None) as batch_op:
+        batch_op.create_index('idx_visit_daily_day', ['day'], unique=False)
+
+    # Each is the leading column of an idx_visit_*_date composite index
+    with op.batch_alter_table('visit', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_visit_visitor_hash'))
+        batch_op.drop_index(batch_op.f('ix_visit_user_id'))
+        batch_op.drop_index(batch_op.f('ix_visit_session_id'))
+        batch_op.drop_index(batch_op.f('ix_visit_article_id'))
+
+
+def downgrade():
+    with op.batch_alter_table('visit', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_visit_article_id'), ['article_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_visit_session_id'), ['session_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_visit_user_id'), ['user_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_visit_visitor_hash'), ['visitor_hash'], unique=False)
+
+    with op.batch_alter_table('visit_daily', schema=None) as batch_op:
+        batch_op.drop_index('idx_visit_daily_day')
+
+    op.drop_table('visit_daily')
@@ -0,0 +1,69 @@
+"""Add category table with cached published article counts
+
+Revision ID: 5b2e9d4c7a10
+Revises: c41d8a7e3f02
+Create Date: 2026-10-19 12:05:43.218716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e9d4c7a10'
+down_revision = 'c41d8a7e3f02'
+branch_labels = None
+depends_on = None
+
+# Snapshot of models.DEFAULT_CATEGORIES at the time of this migration
+DEFAULT_CATEGORIES = (
+    "Criminal Law", "Family Law", "Constitutional Law",
+    "Tech Law", "Property Law", "Administrative Law",
+    "International Law", "Contract Law", "Tort Law",
+    "Succession Law", "Corporate Law", "Commercial Law",
+    "Banking and Finance Law", "Securities Law", "Civil Litigation",
+    "Criminal Litigation", "Alternative Dispute Resolution", "Environmental Law",
+    "Energy Law", "Intellectual Property Law", "Copyright Law",
+    "Patent Law", "Trademark Law", "Trade Secrets Law",
+    "Labour and Employment Law", "Human Rights Law", "Health and Medical Law",
+    "Insurance Law", "Sports and Entertainment Law", "Cyber Law",
+)
+
+
+def upgrade():
+    category = op.create_table(
+        'category',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('article_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+
+    # Seed the form categories plus any category already used by an article,
+    # then count published articles per category
+    article = sa.table(
+        'article',
+        sa.column('category', sa.String),
+        sa.column('status', sa.String),
+        sa.column('is_draft', sa.Boolean),
+        sa.column('deleted_at', sa.DateTime),
+    )
+    connection = op.get_bind()
+    used = {row[0] for row in connection.execute(sa.select(article.c.category).distinct()) if row[0]}
+    op.bulk_insert(category, [
+        {'name': name, 'article_count': 0}
+        for name in sorted(set(DEFAULT_CATEGORIES) | used)
+    ])
+
+    published = sa.select(sa.func.count()).where(
+        article.c.category == category.c.name,
+        article.c.status == 'approved',
+        article.c.is_draft == sa.false(),
+        article.c.deleted_at.is_(None)
+    ).scalar_subquery()
+    connection.execute(category.update().values(article_count=published))
+
+
+def downgrade():
+    op.drop_table('category')
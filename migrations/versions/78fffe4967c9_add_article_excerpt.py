@@ -0,0 +1,33 @@
+"""Add article excerpt for listing cards
+
+Revision ID: 78fffe4967c9
+Revises: 735890a81e2b
+Create Date: 2026-10-19 10:12:41.381502
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '78fffe4967c9'
+down_revision = '735890a81e2b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('article', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('excerpt', sa.String(length=300), nullable=True))
+
+    # Seed excerpts for existing rows; new writes keep them in sync via the model
+    op.execute(
+        "UPDATE article SET excerpt = CASE "
+        "WHEN LENGTH(content) > 300 THEN SUBSTR(content, 1, 297) || '...' "
+        "ELSE content END"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('article', schema=None) as batch_op:
+        batch_op.drop_column('excerpt')
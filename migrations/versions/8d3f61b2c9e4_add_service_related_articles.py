@@ -0,0 +1,105 @@
+"""Map services to article categories and precompute related articles
+
+Revision ID: 8d3f61b2c9e4
+Revises: 5b2e9d4c7a10
+Create Date: 2026-10-19 15:42:17.604381
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3f61b2c9e4'
+down_revision = '5b2e9d4c7a10'
+branch_labels = None
+depends_on = None
+
+# Snapshot of models.DEFAULT_SERVICE_CATEGORIES at the time of this migration
+DEFAULT_SERVICE_CATEGORIES = {
+    'company-registration': ("Corporate Law", "Commercial Law"),
+    'contract-drafting': ("Contract Law", "Commercial Law"),
+    'compliance': ("Corporate Law", "Securities Law", "Banking and Finance Law"),
+    'regulatory-advisory': ("Administrative Law", "Banking and Finance Law", "Securities Law"),
+    'due-diligence': ("Corporate Law", "Securities Law", "Property Law"),
+    'retainer': ("Corporate Law", "Commercial Law", "Labour and Employment Law"),
+    'corporate-law': ("Corporate Law", "Commercial Law"),
+}
+RELATED_ARTICLES_PER_SERVICE = 3
+
+
+def upgrade():
+    service_category = op.create_table(
+        'service_category',
+        sa.Column('service_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['category.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['service_id'], ['service.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('service_id', 'category_id')
+    )
+    with op.batch_alter_table('service_category', schema=None) as batch_op:
+        batch_op.create_index('idx_service_category_category', ['category_id'], unique=False)
+
+    related = op.create_table(
+        'service_related_article',
+        sa.Column('service_id', sa.Integer(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['article_id'], ['article.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['service_id'], ['service.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('service_id', 'rank')
+    )
+    with op.batch_alter_table('service_related_article', schema=None) as batch_op:
+        batch_op.create_index('idx_service_related_article_article', ['article_id'], unique=False)
+
+    # Map existing services by slug, or by a category named in the service
+    # name, then store each service's most recent published articles
+    service = sa.table('service', sa.column('id', sa.Integer), sa.column('slug', sa.String),
+                       sa.column('name', sa.String))
+    category = sa.table('category', sa.column('id', sa.Integer), sa.column('name', sa.String))
+    article = sa.table(
+        'article',
+        sa.column('id', sa.Integer),
+        sa.column('category', sa.String),
+        sa.column('status', sa.String),
+        sa.column('is_draft', sa.Boolean),
+        sa.column('deleted_at', sa.DateTime),
+        sa.column('date_posted', sa.DateTime),
+    )
+    connection = op.get_bind()
+    categories = dict(connection.execute(sa.select(category.c.name, category.c.id)).all())
+
+    mapping, rows = [], []
+    for service_id, slug, name in connection.execute(sa.select(service.c.id, service.c.slug, service.c.name)):
+        names = DEFAULT_SERVICE_CATEGORIES.get(slug) or \
+            [category_name for category_name in categories if category_name.lower() in (name or '').lower()]
+        names = [category_name for category_name in names if category_name in categories]
+        mapping += [{'service_id': service_id, 'category_id': categories[category_name]}
+                    for category_name in names]
+        if not names:
+            continue
+        article_ids = connection.execute(
+            sa.select(article.c.id)
+            .where(article.c.status == 'approved', article.c.is_draft == sa.false(),
+                   article.c.deleted_at.is_(None), article.c.category.in_(names))
+            .order_by(article.c.date_posted.desc(), article.c.id.desc())
+            .limit(RELATED_ARTICLES_PER_SERVICE)
+        ).scalars()
+        rows += [{'service_id': service_id, 'rank': rank, 'article_id': article_id}
+                 for rank, article_id in enumerate(article_ids)]
+
+    if mapping:
+        op.bulk_insert(service_category, mapping)
+    if rows:
+        op.bulk_insert(related, rows)
+
+
+def downgrade():
+    with op.batch_alter_table('service_related_article', schema=None) as batch_op:
+        batch_op.drop_index('idx_service_related_article_article')
+
+    op.drop_table('service_related_article')
+    with op.batch_alter_table('service_category', schema=None) as batch_op:
+        batch_op.drop_index('idx_service_category_category')
+
+    op.drop_table('service_category')
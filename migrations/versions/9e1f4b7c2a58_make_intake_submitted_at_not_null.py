@@ -0,0 +1,40 @@
+"""Make client_intake.submitted_at NOT NULL
+
+Revision ID: 9e1f4b7c2a58
+Revises: 3c7e5a9f2d61
+Create Date: 2026-10-19 21:14:36.208417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e1f4b7c2a58'
+down_revision = '3c7e5a9f2d61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # client_intake is created by db.create_all(), not by an earlier revision
+    if not sa.inspect(op.get_bind()).has_table('client_intake'):
+        return
+
+    # Keyset pagination seeks on submitted_at, which never matches NULL; rows
+    # without one take their upload or review time, else sort last
+    op.execute(
+        "UPDATE client_intake "
+        "SET submitted_at = COALESCE(document_upload_date, reviewed_at, '1970-01-01 00:00:00') "
+        "WHERE submitted_at IS NULL"
+    )
+    with op.batch_alter_table('client_intake', schema=None) as batch_op:
+        batch_op.alter_column('submitted_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('client_intake'):
+        return
+
+    with op.batch_alter_table('client_intake', schema=None) as batch_op:
+        batch_op.alter_column('submitted_at', existing_type=sa.DateTime(), nullable=True)
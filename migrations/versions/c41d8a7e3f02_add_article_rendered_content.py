@@ -0,0 +1,29 @@
+"""Add precomputed article HTML and reading time
+
+Revision ID: c41d8a7e3f02
+Revises: 78fffe4967c9
+Create Date: 2026-10-19 11:02:17.554920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41d8a7e3f02'
+down_revision = '78fffe4967c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows are rendered with: flask render-articles
+    with op.batch_alter_table('article', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_html', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('reading_time', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('article', schema=None) as batch_op:
+        batch_op.drop_column('reading_time')
+        batch_op.drop_column('content_html')
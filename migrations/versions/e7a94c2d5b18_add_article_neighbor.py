@@ -0,0 +1,39 @@
+"""Add article_neighbor table for TF-IDF similar articles
+
+Revision ID: e7a94c2d5b18
+Revises: 8d3f61b2c9e4
+Create Date: 2026-10-19 17:26:51.093342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a94c2d5b18'
+down_revision = '8d3f61b2c9e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by `flask build-neighbors`
+    op.create_table(
+        'article_neighbor',
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('neighbor_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['article_id'], ['article.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['neighbor_id'], ['article.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('article_id', 'rank')
+    )
+    with op.batch_alter_table('article_neighbor', schema=None) as batch_op:
+        batch_op.create_index('idx_article_neighbor_neighbor', ['neighbor_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('article_neighbor', schema=None) as batch_op:
+        batch_op.drop_index('idx_article_neighbor_neighbor')
+
+    op.drop_table('article_neighbor')
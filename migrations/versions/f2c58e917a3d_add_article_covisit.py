@@ -0,0 +1,39 @@
+"""Add article_covisit table for readers-also-read lists
+
+Revision ID: f2c58e917a3d
+Revises: e7a94c2d5b18
+Create Date: 2026-10-19 19:04:12.557810
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c58e917a3d'
+down_revision = 'e7a94c2d5b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by `flask build-covisits`
+    op.create_table(
+        'article_covisit',
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('other_id', sa.Integer(), nullable=False),
+        sa.Column('readers', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['article_id'], ['article.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['other_id'], ['article.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('article_id', 'rank')
+    )
+    with op.batch_alter_table('article_covisit', schema=None) as batch_op:
+        batch_op.create_index('idx_article_covisit_other', ['other_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('article_covisit', schema=None) as batch_op:
+        batch_op.drop_index('idx_article_covisit_other')
+
+    op.drop_table('article_covisit')
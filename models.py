@@ -1,11 +1,113 @@
+from collections import Counter
 from datetime import datetime, timedelta
 from extensions import db
 from flask_login import UserMixin
 from itsdangerous import URLSafeTimedSerializer
+from sqlalchemy import event, func, inspect as sa_inspect
+from sqlalchemy.orm import load_only, object_session, validates
+from bleach import clean
+import html
+import math
 import os
 import hashlib
 from enum import Enum
 
+# Maximum length of the plain-text preview stored alongside article content
+EXCERPT_LENGTH = 300
+
+# Average adult reading speed used for reading time estimates
+WORDS_PER_MINUTE = 200
+
+# Categories offered on the article forms; seeded into the category table
+DEFAULT_CATEGORIES = (
+    "Criminal Law", "Family Law", "Constitutional Law",
+    "Tech Law", "Property Law", "Administrative Law",
+    "International Law", "Contract Law", "Tort Law",
+    "Succession Law", "Corporate Law", "Commercial Law",
+    "Banking and Finance Law", "Securities Law", "Civil Litigation",
+    "Criminal Litigation", "Alternative Dispute Resolution", "Environmental Law",
+    "Energy Law", "Intellectual Property Law", "Copyright Law",
+    "Patent Law", "Trademark Law", "Trade Secrets Law",
+    "Labour and Employment Law", "Human Rights Law", "Health and Medical Law",
+    "Insurance Law", "Sports and Entertainment Law", "Cyber Law",
+)
+
+# Article categories shown as related content on the seeded service pages
+DEFAULT_SERVICE_CATEGORIES = {
+    'company-registration': ("Corporate Law", "Commercial Law"),
+    'contract-drafting': ("Contract Law", "Commercial Law"),
+    'compliance': ("Corporate Law", "Securities Law", "Banking and Finance Law"),
+    'regulatory-advisory': ("Administrative Law", "Banking and Finance Law", "Securities Law"),
+    'due-diligence': ("Corporate Law", "Securities Law", "Property Law"),
+    'retainer': ("Corporate Law", "Commercial Law", "Labour and Employment Law"),
+    'corporate-law': ("Corporate Law", "Commercial Law"),
+}
+
+
+def _plain_text(content):
+    """Strip tags and entities from content and collapse whitespace"""
+    text = html.unescape(clean(content, tags=set(), strip=True))
+    return ' '.join(text.split())
+
+
+def make_excerpt(content, length=EXCERPT_LENGTH):
+    """
+    Build a plain-text preview of article content for listing cards
+    
+    Args:
+        content: Article body (may contain sanitized HTML)
+        length: Maximum length of the excerpt, including the ellipsis
+    
+    Returns:
+        Excerpt string with tags stripped and whitespace collapsed
+    """
+    if not content:
+        return ''
+    
+    text = _plain_text(content)
+    if len(text) <= length:
+        return text
+    
+    cut = text[:length - 3].rsplit(' ', 1)[0] or text[:length - 3]
+    return cut + '...'
+
+
+def render_content_html(content):
+    """
+    Convert article content to display HTML
+    
+    Blank lines separate <p> paragraphs and single newlines become <br>.
+    Content is sanitized on submission, so no further escaping is done.
+    
+    Args:
+        content: Sanitized article body
+    
+    Returns:
+        HTML string
+    """
+    if not content:
+        return ''
+    
+    paragraphs = []
+    for para in content.split('\n\n'):
+        if para.strip():
+            paragraphs.append('<p>' + para.replace('\n', '<br>') + '</p>')
+    return '\n'.join(paragraphs)
+
+
+def estimate_reading_time(content, words_per_minute=WORDS_PER_MINUTE):
+    """
+    Estimate reading time for article content
+    
+    Returns:
+        Whole minutes, at least 1 for non-empty content
+    """
+    if not content:
+        return 0
+    
+    words = len(_plain_text(content).split())
+    return max(1, math.ceil(words / words_per_minute))
+
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -83,6 +185,18 @@ class Article(db.Model):
     # ✅ Draft support - authors can save drafts before submission
     is_draft = db.Column(db.Boolean, default=False, nullable=False)
     
+    # ✅ Write-time rendering - derived from content whenever it changes
+    excerpt = db.Column(db.String(EXCERPT_LENGTH), nullable=True)  # Plain-text preview for listings
+    content_html = db.Column(db.Text, nullable=True)  # Display HTML for the article page
+    reading_time = db.Column(db.Integer, nullable=True)  # Minutes
+    
+    # Columns needed to render an article card in listings.
+    # Everything else (notably the large content column) stays deferred.
+    CARD_COLUMNS = (
+        'id', 'title', 'author', 'category', 'status', 'date_posted', 'date_submitted',
+        'cover_image', 'excerpt', 'reading_time', 'likes', 'views',
+    )
+    
     # Relationships
     comments = db.relationship('Comment', backref='article', lazy=True, cascade='all, delete-orphan')
     visits = db.relationship('Visit', backref='article', lazy=True, cascade='all, delete-orphan')
@@ -95,6 +209,72 @@ class Article(db.Model):
         db.Index('idx_article_is_draft', 'is_draft'),  # ✅ For draft queries
     )
     
+    @validates('content')
+    def _sync_rendered_content(self, key, content):
+        """Re-render derived fields whenever content changes"""
+        self.render_content(content)
+        return content
+    
+    def render_content(self, content=None):
+        """
+        Precompute display HTML, excerpt and reading time
+        
+        Called automatically when content is assigned; call directly to
+        backfill rows rendered before these columns existed.
+        """
+        if content is None:
+            content = self.content
+        self.content_html = render_content_html(content)
+        self.excerpt = make_excerpt(content)
+        self.reading_time = estimate_reading_time(content)
+    
+    def is_rendered(self):
+        """Check if display HTML has been precomputed"""
+        return self.content_html is not None
+    
+    @classmethod
+    def card_options(cls):
+        """Loader option that loads only CARD_COLUMNS"""
+        return load_only(*(getattr(cls, name) for name in cls.CARD_COLUMNS))
+    
+    @classmethod
+    def cards(cls):
+        """Query for listing pages - loads card columns, defers content"""
+        return cls.query.options(cls.card_options())
+    
+    # Columns that published_criteria() and is_published() depend on
+    PUBLICATION_ATTRIBUTES = ('status', 'is_draft', 'deleted_at')
+    
+    @classmethod
+    def published_criteria(cls):
+        """Filter conditions for articles visible on the public blog"""
+        return (cls.status == 'approved', cls.deleted_at.is_(None), cls.is_draft == False)
+    
+    @staticmethod
+    def is_published_state(status, is_draft, deleted_at):
+        """published_criteria() evaluated on values held in memory"""
+        return status == 'approved' and not is_draft and deleted_at is None
+    
+    def is_published(self):
+        """Whether the article is visible on the public blog"""
+        return Article.is_published_state(self.status, self.is_draft, self.deleted_at)
+    
+    def similar_articles(self):
+        """Published "more like this" article cards, best first (see article_similarity.py)"""
+        return Article.cards().join(
+            ArticleNeighbor, ArticleNeighbor.neighbor_id == Article.id
+        ).filter(
+            ArticleNeighbor.article_id == self.id, *Article.published_criteria()
+        ).order_by(ArticleNeighbor.rank).all()
+    
+    def also_read(self):
+        """Published "readers also read" article cards, most shared readers first (see covisitation.py)"""
+        return Article.cards().join(
+            ArticleCovisit, ArticleCovisit.other_id == Article.id
+        ).filter(
+            ArticleCovisit.article_id == self.id, *Article.published_criteria()
+        ).order_by(ArticleCovisit.rank).all()
+    
     def soft_delete(self):
         """Soft delete article - marks as deleted but retains data"""
         self.deleted_at = datetime.utcnow()
@@ -112,6 +292,203 @@ class Article(db.Model):
         return f'<Article {self.id}: {self.title[:30]}>'
 
 
+class ArticleNeighbor(db.Model):
+    """Precomputed TF-IDF neighbour of an article (see article_similarity.py)"""
+    __tablename__ = 'article_neighbor'
+    
+    article_id = db.Column(db.Integer, db.ForeignKey('article.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)  # 0 = most similar
+    neighbor_id = db.Column(db.Integer, db.ForeignKey('article.id', ondelete='CASCADE'), nullable=False)
+    score = db.Column(db.Float, nullable=False)  # Cosine similarity
+    
+    __table_args__ = (
+        db.Index('idx_article_neighbor_neighbor', 'neighbor_id'),
+    )
+
+
+class ArticleCovisit(db.Model):
+    """Article read by readers of another article (see covisitation.py)"""
+    __tablename__ = 'article_covisit'
+    
+    article_id = db.Column(db.Integer, db.ForeignKey('article.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)  # 0 = most shared readers
+    other_id = db.Column(db.Integer, db.ForeignKey('article.id', ondelete='CASCADE'), nullable=False)
+    readers = db.Column(db.Integer, nullable=False)  # Readers who viewed both
+    
+    __table_args__ = (
+        db.Index('idx_article_covisit_other', 'other_id'),
+    )
+
+
+class Category(db.Model):
+    """
+    Article category with a cached count of published articles
+    
+    article_count is adjusted in place (article_count = article_count + n)
+    when an article enters or leaves a category's published set through the
+    ORM, so concurrent transactions add up instead of overwriting each
+    other's recount. Bulk writes that bypass the ORM should call
+    Category.refresh_counts() (or `flask refresh-categories`).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+    article_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    @classmethod
+    def with_articles(cls):
+        """Categories that have published articles, for the blog sidebar"""
+        return cls.query.filter(cls.article_count > 0).order_by(cls.name).all()
+    
+    @classmethod
+    def choices(cls):
+        """(value, label) pairs for category select fields"""
+        names = [name for (name,) in db.session.query(cls.name).order_by(cls.name)]
+        # Before the table is seeded (flask refresh-categories), offer the defaults
+        return [(name, name) for name in names or DEFAULT_CATEGORIES]
+    
+    @staticmethod
+    def facet_counts(names=None, connection=None):
+        """
+        Count published articles per category
+        
+        Groups over (status, category), which idx_article_status_category
+        covers; the draft and deleted filters are applied to those rows.
+        
+        Args:
+            names: Only count these categories (all when None)
+            connection: Connection to run on (defaults to the session)
+        
+        Returns:
+            Dict of category name -> count (categories without articles omitted)
+        """
+        query = db.select(Article.category, func.count(Article.id)) \
+            .where(*Article.published_criteria()) \
+            .group_by(Article.category)
+        if names is not None:
+            query = query.where(Article.category.in_(names))
+        return dict((connection or db.session).execute(query).all())
+    
+    @classmethod
+    def refresh_counts(cls, names=None, connection=None):
+        """
+        Recompute article_count, creating rows for categories not seen before
+        
+        Args:
+            names: Categories to refresh (default: every known category and
+                every category that has published articles)
+            connection: Connection to run on (defaults to the session)
+        """
+        executor = connection or db.session
+        table = cls.__table__
+        counts = cls.facet_counts(names, connection)
+        
+        known_query = db.select(table.c.name)
+        if names is not None:
+            known_query = known_query.where(table.c.name.in_(names))
+        known = set(executor.execute(known_query).scalars())
+        if names is None:
+            names = known | set(counts)
+        
+        missing = [name for name in names if name not in known]
+        if missing:
+            executor.execute(table.insert(), [{'name': name, 'article_count': 0} for name in missing])
+        for name in names:
+            executor.execute(
+                table.update().where(table.c.name == name).values(article_count=counts.get(name, 0))
+            )
+    
+    @classmethod
+    def ensure_defaults(cls):
+        """Create missing DEFAULT_CATEGORIES rows and recompute every count"""
+        cls.refresh_counts()
+        cls.refresh_counts(list(DEFAULT_CATEGORIES))
+        db.session.commit()
+    
+    def __repr__(self):
+        return f'<Category {self.name}: {self.article_count}>'
+
+
+# Article columns that move an article in or out of a category's count
+_CATEGORY_COUNT_ATTRIBUTES = ('category',) + Article.PUBLICATION_ATTRIBUTES
+_CATEGORY_DELTAS_KEY = 'category_count_deltas'
+
+
+def _add_category_delta(session, name, delta):
+    if name:
+        session.info.setdefault(_CATEGORY_DELTAS_KEY, Counter())[name] += delta
+
+
+def _previous_value(state, name):
+    """Value of an attribute before the flush (active_history keeps it loaded)"""
+    history = state.attrs[name].history
+    return history.deleted[0] if history.deleted else state.attrs[name].value
+
+
+@event.listens_for(Article, 'after_insert')
+def _track_inserted_article(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        _add_category_delta(session, target.category, 1 if target.is_published() else 0)
+
+
+@event.listens_for(Article, 'after_delete')
+def _track_deleted_article(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        state = sa_inspect(target)
+        was_published = Article.is_published_state(
+            *(_previous_value(state, name) for name in Article.PUBLICATION_ATTRIBUTES)
+        )
+        _add_category_delta(session, _previous_value(state, 'category'), -1 if was_published else 0)
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    """Load the old value before a change so the category delta can be worked out"""
+
+
+for _name in _CATEGORY_COUNT_ATTRIBUTES:
+    event.listen(getattr(Article, _name), 'set', _load_previous_value, active_history=True)
+
+
+@event.listens_for(Article, 'after_update')
+def _track_article_category_change(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        return
+    state = sa_inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in _CATEGORY_COUNT_ATTRIBUTES):
+        return
+    was_published = Article.is_published_state(
+        *(_previous_value(state, name) for name in Article.PUBLICATION_ATTRIBUTES)
+    )
+    _add_category_delta(session, _previous_value(state, 'category'), -1 if was_published else 0)
+    _add_category_delta(session, target.category, 1 if target.is_published() else 0)
+
+
+@event.listens_for(db.session, 'after_flush_postexec')
+def _apply_category_deltas(session, flush_context):
+    deltas = session.info.pop(_CATEGORY_DELTAS_KEY, None)
+    if not deltas:
+        return
+    connection = session.connection()
+    table = Category.__table__
+    # Zero deltas (pending submissions, draft saves) only matter for categories without a row yet
+    known = set(connection.execute(db.select(table.c.name).where(table.c.name.in_(sorted(deltas)))).scalars())
+    changed = sorted(name for name, delta in deltas.items() if delta and name in known)
+    missing = sorted(name for name in deltas if name not in known)
+    if not changed and not missing:
+        return
+    for name in changed:
+        connection.execute(
+            table.update().where(table.c.name == name)
+            .values(article_count=table.c.article_count + deltas[name])
+        )
+    if missing:
+        # A category seen for the first time gets its row (and count) by counting
+        Category.refresh_counts(missing, connection=connection)
+    Service.refresh_related(category_names=changed + missing, connection=connection)
+
+
 class Comment(db.Model):
     """
     Comment model for article discussions.
@@ -172,6 +549,31 @@ class Comment(db.Model):
         """Check if comment is soft-deleted"""
         return self.deleted_at is not None
     
+    @classmethod
+    def replies_for(cls, comments):
+        """
+        Load the visible replies of several comments in one query
+        
+        Use this instead of comment.replies in listings, which issues one
+        query per comment.
+        
+        Returns:
+            Dict of parent comment id -> list of replies, oldest first
+        """
+        parent_ids = [comment.id for comment in comments]
+        if not parent_ids:
+            return {}
+        
+        replies = cls.query.filter(
+            cls.parent_id.in_(parent_ids),
+            cls.deleted_at.is_(None)
+        ).order_by(cls.date_posted, cls.id).all()
+        
+        grouped = {}
+        for reply in replies:
+            grouped.setdefault(reply.parent_id, []).append(reply)
+        return grouped
+    
     def __repr__(self):
         return f'<Comment {self.id}: {self.name}>'
 
@@ -200,30 +602,26 @@ class Visit(db.Model):
     article_id = db.Column(
         db.Integer,
         db.ForeignKey('article.id', name='fk_visit_article_id'),
-        nullable=False,
-        index=True  # ✅ Frequently queried
-    )
+        nullable=False
+    )  # Indexed by idx_visit_article_date
     
     # Visitor identification (in priority order)
     user_id = db.Column(
         db.Integer,
         db.ForeignKey('user.id', name='fk_visit_user_id'),
-        nullable=True,
-        index=True  # ✅ For authenticated user analytics
-    )
+        nullable=True
+    )  # Indexed by idx_visit_user_date
     session_id = db.Column(
         db.String(255),
-        nullable=True,
-        index=True  # ✅ For anonymous session tracking
-    )
+        nullable=True
+    )  # Indexed by idx_visit_session_date
     ip_address = db.Column(db.String(45), nullable=True)  # Supports IPv4 and IPv6
     
     # Visitor fingerprint (for deduplication)
     visitor_hash = db.Column(
         db.String(64),
-        nullable=True,
-        index=True  # ✅ For unique visitor identification
-    )
+        nullable=True
+    )  # Indexed by idx_visit_hash_date
     
     # Metadata
     user_agent = db.Column(db.String(500), nullable=True)
@@ -234,7 +632,8 @@ class Visit(db.Model):
     # Relationship
     user = db.relationship('User', backref='visits', foreign_keys=[user_id])
     
-    # Composite indices for analytics queries
+    # Composite indices for analytics queries (each also serves lookups on
+    # its leading column, so those columns have no index of their own)
     __table_args__ = (
         db.Index('idx_visit_article_date', 'article_id', 'timestamp'),
         db.Index('idx_visit_user_date', 'user_id', 'timestamp'),
@@ -254,8 +653,61 @@ class Visit(db.Model):
         return f'<Visit {self.id}: Article {self.article_id} at {self.timestamp}>'
 
 
+class VisitDaily(db.Model):
+    """
+    Visits per article per day, rolled up from raw visits past retention
+    (see visit_retention.py)
+    """
+    __tablename__ = 'visit_daily'
+    
+    article_id = db.Column(db.Integer, db.ForeignKey('article.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    visits = db.Column(db.Integer, nullable=False, default=0)
+    duration_seconds = db.Column(db.Integer, nullable=False, default=0)  # Total time spent on page
+    
+    __table_args__ = (
+        db.Index('idx_visit_daily_day', 'day'),
+    )
+    
+    def __repr__(self):
+        return f'<VisitDaily {self.article_id} on {self.day}: {self.visits}>'
+
+
+class VisitorSketch(db.Model):
+    """
+    HyperLogLog sketch of one day's unique visitors (see visitor_sketches.py)
+    
+    article_id 0 holds the whole-site sketch for the day, so the column has
+    no foreign key.
+    """
+    __tablename__ = 'visitor_sketch'
+    
+    article_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    registers = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed registers
+    
+    __table_args__ = (
+        db.Index('idx_visitor_sketch_day', 'day'),
+    )
+    
+    def __repr__(self):
+        return f'<VisitorSketch {self.article_id} on {self.day}>'
+
+
 # ==================== CORPORATE LAW SERVICES ====================
 
+# Related articles precomputed for each service page
+RELATED_ARTICLES_PER_SERVICE = 3
+
+# Article categories each service draws related articles from
+service_categories = db.Table(
+    'service_category',
+    db.Column('service_id', db.Integer, db.ForeignKey('service.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('category_id', db.Integer, db.ForeignKey('category.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('idx_service_category_category', 'category_id'),
+)
+
+
 class Service(db.Model):
     """
     Legal service offerings model
@@ -286,6 +738,7 @@ class Service(db.Model):
     
     # Relationships
     bookings = db.relationship('Booking', backref='service', lazy=True, cascade='all, delete-orphan')
+    categories = db.relationship('Category', secondary=service_categories, lazy=True, backref='services')
     
     __table_args__ = (
         db.Index('idx_service_slug', 'slug'),
@@ -293,10 +746,109 @@ class Service(db.Model):
         db.Index('idx_service_order', 'order'),
     )
     
+    def related_articles(self):
+        """Precomputed related article cards for the service page, best first"""
+        return Article.cards().join(
+            ServiceRelatedArticle, ServiceRelatedArticle.article_id == Article.id
+        ).filter(
+            ServiceRelatedArticle.service_id == self.id
+        ).order_by(ServiceRelatedArticle.rank).all()
+    
+    @classmethod
+    def refresh_related(cls, service_ids=None, category_names=None, connection=None):
+        """
+        Recompute the stored related articles of some or all services
+        
+        Each service gets its RELATED_ARTICLES_PER_SERVICE most recent
+        published articles from its mapped categories. Called automatically
+        when articles change (see _apply_category_deltas); call it after
+        changing a service's categories.
+        
+        Args:
+            service_ids: Services to refresh
+            category_names: Refresh services mapped to any of these categories
+            connection: Connection to run on (defaults to the session)
+        
+        Both None refreshes every service.
+        """
+        executor = connection or db.session
+        mapping = db.select(service_categories.c.service_id, Category.name) \
+            .join(Category, Category.id == service_categories.c.category_id)
+        
+        if category_names is not None:
+            affected = db.select(service_categories.c.service_id) \
+                .join(Category, Category.id == service_categories.c.category_id) \
+                .where(Category.name.in_(category_names))
+            service_ids = set(service_ids or ()) | set(executor.execute(affected).scalars())
+            if not service_ids:
+                return
+        if service_ids is not None:
+            mapping = mapping.where(service_categories.c.service_id.in_(service_ids))
+        
+        # Lock the services (FOR UPDATE; SQLite serializes writers anyway) so a
+        # concurrent refresh waits for this one and then sees its articles
+        locked = db.select(cls.id).with_for_update()
+        if service_ids is not None:
+            locked = locked.where(cls.id.in_(service_ids))
+        service_ids = executor.execute(locked).scalars().all()
+        
+        names_by_service = {}
+        for service_id, name in executor.execute(mapping):
+            names_by_service.setdefault(service_id, []).append(name)
+        
+        related = ServiceRelatedArticle.__table__
+        executor.execute(related.delete().where(related.c.service_id.in_(service_ids)))
+        rows = []
+        for service_id in service_ids:
+            names = names_by_service.get(service_id)
+            if not names:
+                continue
+            article_ids = executor.execute(
+                db.select(Article.id)
+                .where(*Article.published_criteria(), Article.category.in_(names))
+                .order_by(Article.date_posted.desc(), Article.id.desc())
+                .limit(RELATED_ARTICLES_PER_SERVICE)
+            ).scalars()
+            rows += [{'service_id': service_id, 'rank': rank, 'article_id': article_id}
+                     for rank, article_id in enumerate(article_ids)]
+        if rows:
+            executor.execute(related.insert(), rows)
+    
+    @classmethod
+    def map_default_categories(cls):
+        """
+        Map services without categories using DEFAULT_SERVICE_CATEGORIES,
+        then refresh every service's related articles
+        
+        Services are matched by slug, or by containing a category in their name.
+        """
+        Category.ensure_defaults()
+        categories = {category.name: category for category in Category.query}
+        for service in cls.query.filter(~cls.categories.any()):
+            names = DEFAULT_SERVICE_CATEGORIES.get(service.slug) or \
+                [name for name in categories if name.lower() in service.name.lower()]
+            service.categories = [categories[name] for name in names if name in categories]
+        db.session.flush()
+        cls.refresh_related()
+        db.session.commit()
+    
     def __repr__(self):
         return f'<Service {self.name}>'
 
 
+class ServiceRelatedArticle(db.Model):
+    """Precomputed related article for a service page (see Service.refresh_related)"""
+    __tablename__ = 'service_related_article'
+    
+    service_id = db.Column(db.Integer, db.ForeignKey('service.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)  # 0 = shown first
+    article_id = db.Column(db.Integer, db.ForeignKey('article.id', ondelete='CASCADE'), nullable=False)
+    
+    __table_args__ = (
+        db.Index('idx_service_related_article_article', 'article_id'),
+    )
+
+
 class ConsultationType(db.Model):
     """
     Consultation type model
@@ -359,7 +911,7 @@ class ClientIntake(db.Model):
     notes = db.Column(db.Text, nullable=True)  # Admin notes
     
     # Metadata
-    submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    submitted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # Keyset pagination key
     reviewed_at = db.Column(db.DateTime, nullable=True)
     reviewed_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     
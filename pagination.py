@@ -0,0 +1,233 @@
+"""
+Keyset (Seek) Pagination
+Cursor-based pagination over (timestamp, id) for large listings
+"""
+
+from datetime import datetime
+from flask import current_app, redirect, request, url_for
+from itsdangerous import URLSafeSerializer, BadSignature
+from sqlalchemy import and_, or_
+
+from cache_config import CacheHelper
+
+CURSOR_SALT = 'keyset-cursor'
+TOTAL_CACHE_TIMEOUT = 60    # Seconds an approximate total may be reused
+TOTAL_CACHE_MAX_ENTRIES = 256
+
+# Approximate totals: cache_key -> (count, cached_at)
+_total_cache = {}
+
+
+class KeysetPage:
+    """
+    One page of keyset-paginated results.
+
+    Exposes the subset of the Flask-SQLAlchemy Pagination interface the
+    templates rely on (items, has_next, has_prev, total) plus opaque
+    next/prev cursors instead of page numbers.
+    """
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _serializer():
+    """Cursor serializer signed with the app secret key"""
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt=CURSOR_SALT)
+
+
+def encode_cursor(sort_value, row_id, direction):
+    """
+    Encode a position into an opaque, signed cursor token
+
+    Args:
+        sort_value: datetime of the boundary row
+        row_id: primary key of the boundary row
+        direction: 'next' (rows after) or 'prev' (rows before)
+
+    Returns:
+        URL-safe cursor string
+    """
+    return _serializer().dumps({
+        'v': sort_value.isoformat(),
+        'i': row_id,
+        'd': direction,
+    })
+
+
+def decode_cursor(token):
+    """
+    Decode a cursor token
+
+    Returns:
+        Tuple of (sort_value, row_id, direction) or None if the token is
+        missing, tampered with or malformed
+    """
+    if not token:
+        return None
+    try:
+        data = _serializer().loads(token)
+        direction = data['d']
+        if direction not in ('next', 'prev'):
+            return None
+        return datetime.fromisoformat(data['v']), int(data['i']), direction
+    except (BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+
+def approximate_total(query):
+    """
+    Count rows for a query, reusing a recent result when available
+
+    Totals are only used for display, so a count up to
+    TOTAL_CACHE_TIMEOUT seconds old is acceptable and saves a COUNT(*)
+    on every page turn.
+    """
+    statement = query.statement.compile()
+    cache_key = CacheHelper.get_cache_key(
+        str(statement),
+        **{k: repr(v) for k, v in statement.params.items()}
+    )
+
+    cached = _total_cache.get(cache_key)
+    if cached and CacheHelper.is_cache_fresh(cached[1], TOTAL_CACHE_TIMEOUT):
+        return cached[0]
+
+    total = query.order_by(None).count()
+    if len(_total_cache) >= TOTAL_CACHE_MAX_ENTRIES:
+        _total_cache.clear()
+    _total_cache[cache_key] = (total, datetime.utcnow())
+    return total
+
+
+def keyset_paginate(query, sort_column, id_column, cursor=None, per_page=12, with_total=False):
+    """
+    Paginate a query newest-first using a (sort_column, id) seek predicate
+
+    Each page is a bounded index range scan, so deep pages cost the same
+    as the first one. No OFFSET and, unless requested, no COUNT(*).
+
+    Args:
+        query: Filtered query (any existing ordering is replaced)
+        sort_column: Timestamp column to order by (descending)
+        id_column: Primary key column used as a tie-breaker
+        cursor: Token from a previous page's next_cursor/prev_cursor
+        per_page: Number of rows per page
+        with_total: Include an approximate total row count
+
+    Returns:
+        KeysetPage
+    """
+    total = approximate_total(query) if with_total else None
+    position = decode_cursor(cursor)
+    query = query.order_by(None)
+
+    if position is None:
+        rows = query.order_by(sort_column.desc(), id_column.desc()).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        items = rows[:per_page]
+        has_next, has_prev = has_more, False
+    else:
+        value, row_id, direction = position
+        if direction == 'next':
+            # Rows strictly older than the boundary row
+            query = query.filter(and_(
+                sort_column <= value,
+                or_(sort_column < value, id_column < row_id)
+            ))
+            rows = query.order_by(sort_column.desc(), id_column.desc()).limit(per_page + 1).all()
+            has_more = len(rows) > per_page
+            items = rows[:per_page]
+            has_next, has_prev = has_more, True
+        else:
+            # Rows strictly newer than the boundary row, fetched in reverse
+            query = query.filter(and_(
+                sort_column >= value,
+                or_(sort_column > value, id_column > row_id)
+            ))
+            rows = query.order_by(sort_column.asc(), id_column.asc()).limit(per_page + 1).all()
+            has_more = len(rows) > per_page
+            items = list(reversed(rows[:per_page]))
+            has_next, has_prev = True, has_more
+
+    sort_key = sort_column.key
+    id_key = id_column.key
+    next_cursor = prev_cursor = None
+    if items and has_next:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_key), getattr(last, id_key), 'next')
+    if items and has_prev:
+        first = items[0]
+        prev_cursor = encode_cursor(getattr(first, sort_key), getattr(first, id_key), 'prev')
+
+    return KeysetPage(items, per_page, next_cursor=next_cursor, prev_cursor=prev_cursor, total=total)
+
+
+def cursor_for_page(query, sort_column, id_column, page, per_page=12):
+    """
+    Cursor that opens the given legacy page number of a keyset listing
+
+    Used to redirect old ?page=N and /page/N links (see
+    redirect_legacy_page). Finding the boundary row needs one OFFSET
+    lookup, which is acceptable for a redirect.
+
+    Returns:
+        Cursor string, or None for the first page (or a page past the end)
+    """
+    if page <= 1:
+        return None
+    boundary = (
+        query.order_by(None)
+        .order_by(sort_column.desc(), id_column.desc())
+        .with_entities(sort_column, id_column)
+        .offset((page - 1) * per_page - 1)
+        .first()
+    )
+    if boundary is None:
+        return None
+    return encode_cursor(boundary[0], boundary[1], 'next')
+
+
+def redirect_legacy_page(query, sort_column, id_column, per_page=12, page_arg='page', cursor_arg='cursor'):
+    """
+    Redirect a request still using a numbered page (?page=N) to its cursor URL
+
+    The other query arguments are kept; page_arg is replaced by cursor_arg
+    (dropped for page 1 or a page past the end).
+
+    Args:
+        query, sort_column, id_column, per_page: As passed to keyset_paginate
+        page_arg: Query argument holding the legacy page number
+        cursor_arg: Query argument the view reads its cursor from
+
+    Returns:
+        301 redirect response, or None if the request has no page_arg
+    """
+    if page_arg not in request.args:
+        return None
+    page = request.args.get(page_arg, 1, type=int)
+    args = request.args.to_dict()
+    del args[page_arg]
+    args.pop(cursor_arg, None)
+    cursor = cursor_for_page(query, sort_column, id_column, page, per_page=per_page)
+    if cursor is not None:
+        args[cursor_arg] = cursor
+    return redirect(url_for(request.endpoint, **(request.view_args or {}), **args), 301)
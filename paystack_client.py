@@ -6,6 +6,8 @@ import os
 import requests
 from datetime import datetime
 
+from metrics import paystack_timer
+
 
 class PaystackClient:
     """
@@ -49,12 +51,13 @@ class PaystackClient:
             payload['metadata'] = metadata
         
         try:
-            response = requests.post(
-                f"{self.BASE_URL}/transaction/initialize",
-                json=payload,
-                headers=self.headers,
-                timeout=10
-            )
+            with paystack_timer('initialize_transaction'):
+                response = requests.post(
+                    f"{self.BASE_URL}/transaction/initialize",
+                    json=payload,
+                    headers=self.headers,
+                    timeout=10
+                )
             response.raise_for_status()
             data = response.json()
             
@@ -88,11 +91,12 @@ class PaystackClient:
             Response dict with transaction details and status
         """
         try:
-            response = requests.get(
-                f"{self.BASE_URL}/transaction/verify/{reference}",
-                headers=self.headers,
-                timeout=10
-            )
+            with paystack_timer('verify_transaction'):
+                response = requests.get(
+                    f"{self.BASE_URL}/transaction/verify/{reference}",
+                    headers=self.headers,
+                    timeout=10
+                )
             response.raise_for_status()
             data = response.json()
             
@@ -130,11 +134,12 @@ class PaystackClient:
             Transaction details dict
         """
         try:
-            response = requests.get(
-                f"{self.BASE_URL}/transaction/{transaction_id}",
-                headers=self.headers,
-                timeout=10
-            )
+            with paystack_timer('get_transaction'):
+                response = requests.get(
+                    f"{self.BASE_URL}/transaction/{transaction_id}",
+                    headers=self.headers,
+                    timeout=10
+                )
             response.raise_for_status()
             data = response.json()
             
@@ -174,12 +179,13 @@ class PaystackClient:
         }
         
         try:
-            response = requests.post(
-                f"{self.BASE_URL}/paymentlink",
-                json=payload,
-                headers=self.headers,
-                timeout=10
-            )
+            with paystack_timer('create_payment_link'):
+                response = requests.post(
+                    f"{self.BASE_URL}/paymentlink",
+                    json=payload,
+                    headers=self.headers,
+                    timeout=10
+                )
             response.raise_for_status()
             data = response.json()
             
@@ -0,0 +1,272 @@
+"""
+Sampling Profiler
+Opt-in statistical profiling of selected requests, stored as collapsed stacks
+
+A background thread samples the request thread's stack every
+PROFILING_INTERVAL_MS, so the profiled request runs at (almost) full speed.
+Output files use the collapsed-stack format understood by flamegraph.pl and
+speedscope, with a JSON sidecar holding request metadata.
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from fnmatch import fnmatchcase
+
+from flask import Flask, current_app, g, request
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+MAX_STACK_DEPTH = 128
+PROFILE_NAME_RE = re.compile(r'^[0-9]+-[A-Za-z0-9_.]+-[0-9a-f]{8}$')
+
+_PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class StackSampler:
+    """
+    Periodically sample one thread's call stack from a helper thread
+
+    Usage:
+        sampler = StackSampler(threading.get_ident(), interval=0.005)
+        sampler.start()
+        ...
+        stacks = sampler.stop()  # Counter of collapsed stack -> samples
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and return the collected stacks"""
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[collapse_stack(frame)] += 1
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(_PROJECT_ROOT):
+        filename = os.path.relpath(filename, _PROJECT_ROOT)
+    elif 'site-packages' in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(';', ':')
+
+
+def collapse_stack(frame):
+    """Render a frame and its callers as 'outer;...;inner'"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+def profile_dir(app=None):
+    """Directory profiles are written to (PROFILING_DIR or instance/profiles)"""
+    app = app or current_app
+    return app.config.get('PROFILING_DIR') or os.path.join(app.instance_path, 'profiles')
+
+
+def _should_profile(app):
+    header = app.config.get('PROFILING_HEADER')
+    token = app.config.get('PROFILING_TOKEN')
+    if header and token and request.headers.get(header) == token:
+        return True
+    endpoint = request.endpoint or ''
+    if any(fnmatchcase(endpoint, pattern) for pattern in app.config.get('PROFILING_ENDPOINTS', ())):
+        return True
+    return random.random() < app.config.get('PROFILING_SAMPLE_RATE', 0.0)
+
+
+def save_profile(directory, stacks, meta, max_files=500):
+    """
+    Write collapsed stacks and metadata, pruning the oldest profiles
+
+    Returns:
+        Profile name (file stem)
+    """
+    os.makedirs(directory, exist_ok=True)
+    endpoint = re.sub(r'[^A-Za-z0-9_.]', '_', meta.get('endpoint') or 'unmatched')
+    name = f'{int(time.time() * 1000)}-{endpoint}-{uuid.uuid4().hex[:8]}'
+
+    with open(os.path.join(directory, f'{name}.collapsed'), 'w') as f:
+        for stack, count in stacks.most_common():
+            f.write(f'{stack} {count}\n')
+    with open(os.path.join(directory, f'{name}.json'), 'w') as f:
+        json.dump(dict(meta, name=name), f)
+
+    names = sorted(entry[:-5] for entry in os.listdir(directory) if entry.endswith('.json'))
+    for stale in names[:max(len(names) - max_files, 0)]:
+        for suffix in ('.json', '.collapsed'):
+            try:
+                os.remove(os.path.join(directory, stale + suffix))
+            except OSError:
+                pass
+    return name
+
+
+def list_profiles(directory):
+    """
+    Load metadata for every stored profile
+
+    Returns:
+        List of metadata dicts, newest first
+    """
+    if not os.path.isdir(directory):
+        return []
+
+    profiles = []
+    for entry in sorted(os.listdir(directory), reverse=True):
+        if not entry.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, entry)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def slowest_by_endpoint(profiles, limit=5):
+    """
+    Group profiles by endpoint, keeping the slowest few of each
+
+    Returns:
+        List of (endpoint, profiles) tuples, slowest endpoint first
+    """
+    grouped = {}
+    for profile in profiles:
+        grouped.setdefault(profile.get('endpoint') or 'unmatched', []).append(profile)
+
+    result = []
+    for endpoint, items in grouped.items():
+        items.sort(key=lambda p: p.get('duration_ms', 0), reverse=True)
+        result.append((endpoint, items[:limit]))
+    result.sort(key=lambda group: group[1][0].get('duration_ms', 0), reverse=True)
+    return result
+
+
+def load_profile(directory, name):
+    """
+    Load one profile's metadata and stacks
+
+    Returns:
+        Tuple of (meta, Counter of stack -> samples) or None if not found
+    """
+    if not PROFILE_NAME_RE.match(name or ''):
+        return None
+    try:
+        with open(os.path.join(directory, f'{name}.json')) as f:
+            meta = json.load(f)
+        stacks = Counter()
+        with open(os.path.join(directory, f'{name}.collapsed')) as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack:
+                    stacks[stack] += int(count)
+    except (OSError, ValueError):
+        return None
+    return meta, stacks
+
+
+def top_functions(stacks, limit=25):
+    """
+    Summarise stacks per function
+
+    Returns:
+        List of (function, self_samples, total_samples), by total samples
+    """
+    self_counts = Counter()
+    total_counts = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        self_counts[frames[-1]] += count
+        for frame in set(frames):
+            total_counts[frame] += count
+
+    top = total_counts.most_common(limit)
+    return [(frame, self_counts[frame], total) for frame, total in top]
+
+
+def configure_profiling(app: Flask):
+    """
+    Configure the opt-in request profiler
+
+    A request is profiled when PROFILING_HEADER carries PROFILING_TOKEN, its
+    endpoint matches a PROFILING_ENDPOINTS glob (e.g. 'bookings.*'), or it
+    falls within PROFILING_SAMPLE_RATE. Profiles faster than
+    PROFILING_MIN_DURATION_MS are discarded.
+    """
+    if not app.config.get('PROFILING_ENABLED', False):
+        return
+
+    @app.before_request
+    def start_profiler():
+        """Start sampling this request if it was selected"""
+        if not _should_profile(app):
+            return
+        sampler = StackSampler(
+            threading.get_ident(),
+            interval=app.config.get('PROFILING_INTERVAL_MS', 5) / 1000
+        )
+        g.profiler = sampler
+        g.profiler_started_at = time.perf_counter()
+        sampler.start()
+
+    @app.after_request
+    def remember_status(response):
+        """Keep the status code for the profile metadata"""
+        if 'profiler' in g:
+            g.profiler_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def stop_profiler(exc):
+        """Stop sampling and store the profile"""
+        sampler = g.pop('profiler', None)
+        if sampler is None:
+            return
+
+        stacks = sampler.stop()
+        duration_ms = (time.perf_counter() - g.profiler_started_at) * 1000
+        if duration_ms < app.config.get('PROFILING_MIN_DURATION_MS', 0) or not stacks:
+            return
+
+        meta = {
+            'endpoint': request.endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': g.get('profiler_status', 500),
+            'duration_ms': round(duration_ms, 2),
+            'samples': sum(stacks.values()),
+            'request_id': g.get('request_id'),
+            'captured_at': datetime.utcnow().isoformat(),
+        }
+        try:
+            save_profile(profile_dir(app), stacks, meta, app.config.get('PROFILING_MAX_FILES', 500))
+        except OSError as e:
+            logger.error(f"Could not save profile for {request.path}: {str(e)}")
@@ -0,0 +1,218 @@
+"""
+Query Instrumentation
+Per-request SQL query counts, DB timing and Server-Timing headers
+"""
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Flask, g, has_request_context, request, before_render_template, template_rendered
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# Collectors receiving query timings on the current thread
+_local = threading.local()
+_listeners_installed = False
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+
+
+class QueryStats:
+    """Query count and timing for one request (or capture block)"""
+
+    __slots__ = ('count', 'duration', 'statements', 'template_duration', '_template_starts')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0             # Seconds spent executing SQL
+        self.statements = {}            # statement -> [count, seconds]
+        self.template_duration = 0.0    # Seconds spent rendering templates
+        self._template_starts = []
+
+    def record(self, statement, elapsed):
+        """Record one executed statement"""
+        self.count += 1
+        self.duration += elapsed
+        entry = self.statements.get(statement)
+        if entry is None:
+            self.statements[statement] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def worst_statements(self, limit=3):
+        """
+        Get the statements with the highest cumulative time
+
+        Returns:
+            List of (normalized_sql, count, milliseconds) tuples
+        """
+        grouped = {}
+        for statement, (count, elapsed) in self.statements.items():
+            key = normalize_sql(statement)
+            entry = grouped.setdefault(key, [0, 0.0])
+            entry[0] += count
+            entry[1] += elapsed
+
+        worst = sorted(grouped.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [(sql, count, elapsed * 1000) for sql, (count, elapsed) in worst]
+
+
+def normalize_sql(statement):
+    """
+    Normalize SQL for grouping and logging
+
+    Collapses whitespace, replaces literals with '?' and IN lists with a
+    single placeholder so repeated statements group together.
+    """
+    sql = _WHITESPACE_RE.sub(' ', statement).strip()
+    sql = _STRING_LITERAL_RE.sub('?', sql)
+    sql = _NUMBER_LITERAL_RE.sub('?', sql)
+    return _IN_LIST_RE.sub('(?)', sql)
+
+
+def _collectors():
+    collectors = getattr(_local, 'collectors', None)
+    if collectors is None:
+        collectors = _local.collectors = []
+    return collectors
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _collectors():
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start_time')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    for stats in _collectors():
+        stats.record(statement, elapsed)
+
+
+def install_query_listeners():
+    """Attach timing listeners to every SQLAlchemy engine (idempotent)"""
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    _listeners_installed = True
+
+
+@contextmanager
+def capture_queries():
+    """
+    Count queries executed on this thread inside a with-block
+
+    Usage:
+        with capture_queries() as stats:
+            Article.query.all()
+        assert stats.count == 1
+    """
+    install_query_listeners()
+    stats = QueryStats()
+    collectors = _collectors()
+    collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        collectors.remove(stats)
+
+
+def _template_started(sender, template, context, **extra):
+    stats = g.get('query_stats')
+    if stats is not None:
+        stats._template_starts.append(time.perf_counter())
+
+
+def _template_finished(sender, template, context, **extra):
+    stats = g.get('query_stats')
+    if stats is not None and stats._template_starts:
+        elapsed = time.perf_counter() - stats._template_starts.pop()
+        # Only count the outermost render_template call
+        if not stats._template_starts:
+            stats.template_duration += elapsed
+
+
+def _server_timing_allowed(app):
+    """Whether this response may carry the Server-Timing header"""
+    if app.config.get('SERVER_TIMING_ENABLED', False) or app.debug:
+        return True
+    user = current_user._get_current_object() if has_request_context() else None
+    return bool(user is not None and user.is_authenticated and getattr(user, 'is_admin', False))
+
+
+def configure_instrumentation(app: Flask):
+    """
+    Configure per-request query instrumentation
+
+    Logs requests whose query count or DB time exceeds the configured
+    thresholds, and adds a Server-Timing header (db, tpl, total) to
+    responses for admins, in debug mode, or everywhere when
+    SERVER_TIMING_ENABLED is set (the header discloses query counts).
+    """
+    if not app.config.get('QUERY_INSTRUMENTATION_ENABLED', True):
+        return
+
+    install_query_listeners()
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+
+    @app.before_request
+    def start_query_stats():
+        """Start collecting query timings for this request"""
+        stats = QueryStats()
+        g.query_stats = stats
+        g.request_started_at = time.perf_counter()
+        _collectors().append(stats)
+
+    @app.after_request
+    def report_query_stats(response):
+        """Emit Server-Timing and log slow or query-heavy requests"""
+        stats = g.get('query_stats')
+        if stats is None:
+            return response
+
+        total_ms = (time.perf_counter() - g.request_started_at) * 1000
+        db_ms = stats.duration * 1000
+
+        if _server_timing_allowed(app):
+            response.headers['Server-Timing'] = (
+                f'db;dur={db_ms:.2f};desc="{stats.count} queries", '
+                f'tpl;dur={stats.template_duration * 1000:.2f}, '
+                f'total;dur={total_ms:.2f}'
+            )
+
+        if (stats.count > app.config.get('SLOW_REQUEST_QUERY_THRESHOLD', 30)
+                or db_ms > app.config.get('SLOW_REQUEST_DB_MS_THRESHOLD', 250)):
+            worst = '; '.join(
+                f'[{count}x {elapsed:.1f}ms] {sql}'
+                for sql, count, elapsed in stats.worst_statements()
+            )
+            logger.warning(
+                f"Slow request {request.method} {request.path} "
+                f"endpoint={request.endpoint} queries={stats.count} "
+                f"db={db_ms:.1f}ms total={total_ms:.1f}ms worst: {worst}"
+            )
+
+        return response
+
+    @app.teardown_request
+    def stop_query_stats(exc):
+        """Stop collecting for this request, even if it failed"""
+        stats = g.pop('query_stats', None)
+        if stats is not None and stats in _collectors():
+            _collectors().remove(stats)
@@ -0,0 +1,186 @@
+"""
+Rate Limit Storage
+Rate limit counters shared by every worker process on one host
+
+With memory:// storage each gunicorn worker keeps its own counters, so a
+"10 per minute" limit allows 10 per minute per worker. SQLiteStorage keeps
+the counters in one SQLite database in WAL mode that every worker opens:
+
+    RATELIMIT_STORAGE_URI=sqlite:///relative/path.db
+    RATELIMIT_STORAGE_URI=sqlite:////absolute/path.db
+
+It is registered with the limits package under the sqlite:// scheme (on
+import) and supports the fixed-window strategy, Flask-Limiter's default.
+Each hit is a single UPSERT ... RETURNING statement in autocommit mode. The
+statement starts a new window when the stored one has expired, so a hit is
+one short write transaction without an fsync (synchronous=NORMAL). Expired
+counters are swept every SWEEP_INTERVAL hits. Connections are opened per
+thread and reopened after a fork.
+
+Without a configured RATELIMIT_STORAGE_URI, configure_rate_limit_storage
+points the limiter at instance/ratelimit.db. Across several hosts, use a
+networked backend from the limits package instead, such as
+redis://host:6379 (needs the redis package) or memcached://host:11211.
+Measure the per-check cost with `flask benchmark-ratelimit`.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import Flask
+from limits import RateLimitItemPerMinute
+from limits.storage import Storage, storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+SWEEP_INTERVAL = 1000
+BUSY_TIMEOUT = 5  # Seconds to wait for another process's write
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS ratelimit ('
+    'key TEXT PRIMARY KEY, hits INTEGER NOT NULL, expires_at REAL NOT NULL'
+    ') WITHOUT ROWID'
+)
+_INCREMENT = (
+    'INSERT INTO ratelimit (key, hits, expires_at) VALUES (:key, :amount, :expires_at) '
+    'ON CONFLICT (key) DO UPDATE SET '
+    'hits = CASE WHEN expires_at <= :now THEN :amount ELSE hits + :amount END, '
+    'expires_at = CASE WHEN expires_at <= :now THEN :expires_at ELSE expires_at END '
+    'RETURNING hits'
+)
+
+
+class SQLiteStorage(Storage):
+    """
+    limits storage backend keeping fixed-window counters in a SQLite file
+
+    Args:
+        uri: sqlite:///<path>
+        wrap_exceptions: Raise limits.errors.StorageError instead of sqlite3 errors
+        options: timeout (seconds to wait for the write lock)
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri.split('://', 1)[1][1:]
+        self.timeout = float(options.get('timeout', BUSY_TIMEOUT))
+        self._local = threading.local()
+        self._hits = 0
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        """This thread's connection (opened on first use and after a fork)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(_SCHEMA)
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        connection = self._connection()
+        hits = connection.execute(
+            _INCREMENT, {'key': key, 'amount': amount, 'expires_at': now + expiry, 'now': now}
+        ).fetchone()[0]
+        self._hits += 1
+        if self._hits % SWEEP_INTERVAL == 0:
+            connection.execute('DELETE FROM ratelimit WHERE expires_at <= ?', (now,))
+        return hits
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT hits FROM ratelimit WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT expires_at FROM ratelimit WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def check(self):
+        try:
+            self._connection().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._connection().execute('DELETE FROM ratelimit').rowcount
+
+    def clear(self, key):
+        self._connection().execute('DELETE FROM ratelimit WHERE key = ?', (key,))
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def _bench_worker(uri, checks, worker):
+    """Time `checks` limiter hits against one storage; returns elapsed seconds"""
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    limit = RateLimitItemPerMinute(1_000_000_000)
+    started = time.perf_counter()
+    for check in range(checks):
+        # Spread hits over a few hundred clients, like per-IP limits
+        limiter.hit(limit, 'bench', f'{worker}-{check % 256}')
+    return time.perf_counter() - started
+
+
+def benchmark_storage(uri, checks=10000, processes=1):
+    """
+    Measure the per-check cost of a rate limit storage
+
+    Args:
+        uri: Storage URI (memory://, sqlite:///..., redis://...)
+        checks: Limiter hits per process
+        processes: Processes hitting the storage at once (memory:// is
+            per process, so contention only shows on shared storage)
+
+    Returns:
+        Dict with 'checks', 'seconds' (wall clock), 'microseconds_per_check'
+        (mean time one check takes in a process) and 'checks_per_second'
+        (across all processes)
+    """
+    if processes == 1:
+        durations = [_bench_worker(uri, checks, 0)]
+        wall = durations[0]
+    else:
+        started = time.perf_counter()
+        with ProcessPoolExecutor(processes) as pool:
+            durations = list(pool.map(_bench_worker, [uri] * processes, [checks] * processes, range(processes)))
+        wall = time.perf_counter() - started
+    total = checks * processes
+    return {
+        'checks': total,
+        'seconds': round(wall, 3),
+        'microseconds_per_check': round(sum(durations) / total * 1e6, 1),
+        'checks_per_second': round(total / max(durations), 1),
+    }
+
+
+def configure_rate_limit_storage(app: Flask):
+    """
+    Default the limiter to the shared SQLite storage in the instance folder
+
+    Must be called before limiter.init_app(); an explicit
+    RATELIMIT_STORAGE_URI (memory://, redis://, ...) is left as is.
+    """
+    if not app.config.get('RATELIMIT_STORAGE_URI'):
+        app.config['RATELIMIT_STORAGE_URI'] = f"sqlite:///{os.path.join(app.instance_path, 'ratelimit.db')}"
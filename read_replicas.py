@@ -0,0 +1,202 @@
+"""
+Read Replicas
+Routes read-only queries from public GET pages to replica databases
+
+Each URL in SQLALCHEMY_REPLICA_URLS gets its own engine (replica_1,
+replica_2, ...) and is chosen per session by RoutingSession.get_bind():
+
+- Only SELECTs issued while handling a GET/HEAD request for one of
+  SQLALCHEMY_REPLICA_BLUEPRINTS go to a replica.
+- Once a session flushes or executes a write, it stays on the primary until
+  it is closed, so a request reads its own writes.
+- Each replica's lag is checked at most every REPLICA_CHECK_INTERVAL seconds;
+  replicas that are unreachable or further behind than
+  REPLICA_MAX_LAG_SECONDS are skipped, and reads fall back to the primary.
+"""
+
+import itertools
+import threading
+import time
+
+from flask import Flask, current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, text
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+REPLICA_KEY_PREFIX = 'replica_'
+
+# Seconds behind the primary; 0 when fully replayed (an idle primary would
+# otherwise look like growing lag)
+POSTGRES_LAG_QUERY = (
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class ReplicaSet:
+    """
+    Replica engines with health and lag tracking
+
+    Args:
+        engines: Mapping of replica name to engine
+        blueprints: Blueprints whose GET requests may read from a replica
+        max_lag: Replicas further behind than this (seconds) are skipped
+        check_interval: Seconds between lag checks of one replica
+        lag_query: SQL returning the lag in seconds; defaults per dialect
+    """
+
+    def __init__(self, engines, blueprints, max_lag=5.0, check_interval=10.0, lag_query=None):
+        self.engines = dict(engines)
+        self.blueprints = set(blueprints)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_query = lag_query
+        self._status = {}  # name -> (checked_at, usable, lag)
+        self._lock = threading.Lock()
+        self._round_robin = itertools.count()
+
+    def measure_lag(self, engine):
+        """
+        Replication lag of one replica in seconds
+
+        Returns:
+            Lag in seconds (0 when the dialect has no lag query)
+        """
+        query = self.lag_query
+        if not query and engine.dialect.name == 'postgresql':
+            query = POSTGRES_LAG_QUERY
+        with engine.connect() as connection:
+            lag = connection.execute(text(query or 'SELECT 0')).scalar()
+        return float(lag or 0)
+
+    def is_usable(self, key):
+        """Whether a replica is reachable and within max_lag (cached)"""
+        now = time.monotonic()
+        checked_at, usable, _ = self._status.get(key, (None, False, None))
+        if checked_at is not None and now - checked_at < self.check_interval:
+            return usable
+
+        with self._lock:
+            checked_at, was_usable, _ = self._status.get(key, (None, None, None))
+            if checked_at is not None and now - checked_at < self.check_interval:
+                return was_usable
+            try:
+                lag = self.measure_lag(self.engines[key])
+                usable = lag <= self.max_lag
+                reason = f"lag {lag:.1f}s"
+            except Exception as e:
+                lag = None
+                usable = False
+                reason = str(e)
+            self._status[key] = (time.monotonic(), usable, lag)
+
+        if usable != was_usable:
+            if usable:
+                logger.info(f"Replica {key} in rotation ({reason})")
+            else:
+                logger.warning(f"Replica {key} out of rotation, reading from primary ({reason})")
+        return usable
+
+    def choose(self):
+        """
+        Pick a usable replica, round-robin
+
+        Returns:
+            Replica name, or None when every replica is lagging or down
+        """
+        keys = list(self.engines)
+        start = next(self._round_robin)
+        for offset in range(len(keys)):
+            key = keys[(start + offset) % len(keys)]
+            if self.is_usable(key):
+                return key
+        return None
+
+    def status(self):
+        """Last check result per replica, for diagnostics"""
+        return {key: {'usable': usable, 'lag': lag}
+                for key, (_, usable, lag) in self._status.items()}
+
+
+def get_replica_set():
+    """The current app's ReplicaSet, or None when no replicas are configured"""
+    return current_app.extensions.get('read_replicas')
+
+
+def _replica_reads_allowed(replicas):
+    """Reads may use a replica only inside a GET request to a listed blueprint"""
+    return (
+        has_request_context()
+        and request.method in ('GET', 'HEAD')
+        and request.blueprint in replicas.blueprints
+    )
+
+
+class RoutingSession(Session):
+    """
+    Session that sends eligible SELECTs to a read replica
+
+    A session sticks to one replica for its lifetime (one request), and to
+    the primary once it has written anything.
+    """
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self._wrote = False
+        self._replica_key = None
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            is_select = clause is not None and getattr(clause, 'is_select', False)
+            if self._flushing or (clause is not None and not is_select):
+                self._wrote = True
+            elif is_select and not self._wrote:
+                engine = self._replica_engine()
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica_engine(self):
+        replicas = get_replica_set()
+        if replicas is None or not _replica_reads_allowed(replicas):
+            return None
+        if self._replica_key is None or not replicas.is_usable(self._replica_key):
+            self._replica_key = replicas.choose()
+        return replicas.engines[self._replica_key] if self._replica_key else None
+
+    def close(self):
+        super().close()
+        self._wrote = False
+        self._replica_key = None
+
+
+def configure_replicas(app: Flask):
+    """
+    Create engines for SQLALCHEMY_REPLICA_URLS and enable routing
+
+    Replicas use the same SQLALCHEMY_ENGINE_OPTIONS as the primary. URLs are
+    used as given (relative SQLite paths are not moved into instance/).
+    """
+    urls = app.config.get('SQLALCHEMY_REPLICA_URLS') or []
+    if not urls:
+        return
+
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options.setdefault('echo', app.config.get('SQLALCHEMY_ECHO', False))
+    engines = {
+        f'{REPLICA_KEY_PREFIX}{index}': create_engine(url, **options)
+        for index, url in enumerate(urls, start=1)
+    }
+
+    app.extensions['read_replicas'] = ReplicaSet(
+        engines,
+        blueprints=app.config.get('SQLALCHEMY_REPLICA_BLUEPRINTS', ['public', 'articles', 'services']),
+        max_lag=app.config.get('REPLICA_MAX_LAG_SECONDS', 5.0),
+        check_interval=app.config.get('REPLICA_CHECK_INTERVAL', 10.0),
+        lag_query=app.config.get('REPLICA_LAG_QUERY')
+    )
+    logger.info(f"Read replicas configured: {', '.join(engines)}")
@@ -0,0 +1,168 @@
+"""
+Site Statistics Service
+Aggregated counts for the admin dashboard and profile pages
+
+Counts are cached per process for STATS_CACHE_TIMEOUT seconds.
+invalidate_stats() clears the local cache and touches a stamp file
+(STATS_STAMP_FILE, default instance/stats.stamp); every process drops a
+cached result older than the stamp, so a moderation action in one worker
+is reflected by all of them on their next read.
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import case, func
+
+from extensions import db
+from models import Article, Visit, VisitDaily, ClientIntake
+from visitor_sketches import unique_visitors
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+STATS_CACHE_TIMEOUT = 30  # Seconds; moderation actions invalidate sooner
+
+ARTICLE_STATUSES = ('pending', 'approved', 'disapproved', 'archived')
+INTAKE_STATUSES = ('pending', 'reviewed', 'scheduled', 'archived')
+VISIT_WINDOWS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+    'monthly': timedelta(days=30),
+    'yearly': timedelta(days=365),
+}
+
+# Cached result: (stats, cached_at epoch seconds)
+_stats_cache = {}
+
+
+def _count_where(condition):
+    """Conditional aggregate: number of rows matching condition"""
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def get_article_counts():
+    """
+    Count articles per status in a single aggregate query
+
+    Status counts include drafts (a draft is stored as pending). Drafts are
+    also counted on their own, and 'pending_review' is the pending articles
+    that have been submitted, as listed on the dashboard.
+
+    Returns:
+        Dict with 'total', 'draft', 'pending_review' and one key per
+        ARTICLE_STATUSES entry
+    """
+    is_draft = Article.is_draft == True
+    columns = [
+        func.count(Article.id),
+        _count_where(is_draft),
+        _count_where((Article.status == 'pending') & ~is_draft),
+    ]
+    columns += [_count_where(Article.status == status) for status in ARTICLE_STATUSES]
+
+    row = db.session.query(*columns).one()
+    counts = {'total': row[0], 'draft': row[1], 'pending_review': row[2]}
+    counts.update(zip(ARTICLE_STATUSES, row[3:]))
+    return counts
+
+
+def _rolled_up_visits(*criteria):
+    """Scalar subquery: visits in visit_daily rows matching criteria"""
+    return func.coalesce(db.select(func.sum(VisitDaily.visits)).where(*criteria).scalar_subquery(), 0)
+
+
+def get_visit_counts(now=None):
+    """
+    Count visits overall and per time window in a single aggregate query
+
+    Visits pruned past retention are counted from their daily rollups
+    (whole days, see visit_retention.py).
+
+    Returns:
+        Dict with 'total' and one key per VISIT_WINDOWS entry
+    """
+    now = now or datetime.utcnow()
+    columns = [func.count(Visit.id) + _rolled_up_visits()]
+    columns += [
+        _count_where(Visit.timestamp >= now - span) + _rolled_up_visits(VisitDaily.day >= (now - span).date())
+        for span in VISIT_WINDOWS.values()
+    ]
+
+    row = db.session.query(*columns).one()
+    counts = {'total': row[0]}
+    counts.update(zip(VISIT_WINDOWS.keys(), row[1:]))
+    return counts
+
+
+def get_consultation_counts():
+    """
+    Count consultation requests per status in a single aggregate query
+
+    Returns:
+        Dict with 'total' and one key per INTAKE_STATUSES entry
+    """
+    columns = [func.count(ClientIntake.id)]
+    columns += [_count_where(ClientIntake.status == status) for status in INTAKE_STATUSES]
+
+    row = db.session.query(*columns).one()
+    counts = {'total': row[0]}
+    counts.update(zip(INTAKE_STATUSES, row[1:]))
+    return counts
+
+
+def get_dashboard_stats(use_cache=True):
+    """
+    Get all dashboard statistics
+
+    Results are cached for STATS_CACHE_TIMEOUT seconds per process, or
+    until any process calls invalidate_stats().
+
+    Returns:
+        Dict with 'articles', 'visits', 'unique_visitors' and 'consultations' count dicts
+    """
+    cached = _stats_cache.get('dashboard')
+    if use_cache and cached and time.time() - cached[1] < STATS_CACHE_TIMEOUT \
+            and cached[1] > _stamp_time():
+        return cached[0]
+
+    cached_at = time.time()
+    stats = {
+        'articles': get_article_counts(),
+        'visits': get_visit_counts(),
+        'unique_visitors': unique_visitors(VISIT_WINDOWS),
+        'consultations': get_consultation_counts(),
+    }
+    _stats_cache['dashboard'] = (stats, cached_at)
+    return stats
+
+
+def _stamp_path():
+    if not has_app_context():
+        return None
+    return current_app.config.get('STATS_STAMP_FILE') or os.path.join(current_app.instance_path, 'stats.stamp')
+
+
+def _stamp_time():
+    """When statistics were last invalidated by any process (0 if never)"""
+    path = _stamp_path()
+    try:
+        return os.stat(path).st_mtime if path else 0
+    except OSError:
+        return 0
+
+
+def invalidate_stats():
+    """Drop cached statistics in every process (call after moderation changes)"""
+    _stats_cache.clear()
+    path = _stamp_path()
+    if path:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'a'):
+                pass
+            now = time.time()
+            os.utime(path, (now, now))
+        except OSError as e:
+            logger.warning(f"Could not touch statistics stamp {path}: {e}")
@@ -0,0 +1,388 @@
+"""
+Sitemaps and Feeds
+sitemap.xml shards and RSS/Atom feeds, regenerated only when they change
+
+Building a sitemap means listing every published article, and crawlers
+fetch sitemaps and feeds often. So each file is generated on its first
+request, written under SITEMAP_DIR and served from there until a commit
+changes what it lists. The commit then deletes just that file, after
+changing a generation stamp in the directory. A build that started before
+the stamp changed read the database before that commit, so its file is
+thrown away and built again rather than served stale:
+
+- /sitemap.xml: index of the sitemaps below, with each shard's lastmod
+- /sitemap-pages.xml: home, blog, about, services and each active service
+- /sitemap-articles-<n>.xml: published articles with ids in the n-th block
+  of SITEMAP_SHARD_SIZE ids (50,000 URLs is the protocol limit). An
+  article never moves between shards, so a change regenerates one shard
+  and the index.
+- /feed.xml (RSS 2.0) and /feed.atom: the FEED_SIZE latest articles, kept
+  until the next publication (or an edit to a listed field)
+
+Responses carry Last-Modified (when the file was generated) and an ETag
+from its mtime and size. Revalidating an unchanged file costs one stat and
+returns 304 without reading it.
+
+URLs are absolute and built from SITE_URL, never from the request's Host
+header, which a client can forge into a cached file. Without SITE_URL no
+file is generated and the routes return 503 (outside debug and testing,
+the app refuses to start without it). The files live on local disk, so
+with several hosts each host regenerates its own copy (deletions on one
+host do not reach the others; point SITEMAP_DIR at shared storage to keep
+them in step).
+"""
+
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+from flask import Flask, Response, abort, current_app, has_app_context, request
+from sqlalchemy import event, func, inspect as sa_inspect
+from sqlalchemy.orm import Session, object_session
+from werkzeug.http import is_resource_modified
+
+from extensions import db
+from file_utils import write_atomic
+from logger import get_logger
+from models import Article, Service
+
+logger = get_logger(__name__)
+
+SHARD_SIZE = 50000
+FEED_SIZE = 20
+SITE_TITLE = 'Simply Law'
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+
+INDEX_FILE = 'sitemap.xml'
+PAGES_FILE = 'sitemap-pages.xml'
+RSS_FILE = 'feed.xml'
+ATOM_FILE = 'feed.atom'
+FEED_FILES = (RSS_FILE, ATOM_FILE)
+GENERATION_FILE = '.generation'  # Rewritten by every invalidation
+
+
+def shard_file(shard):
+    return f'sitemap-articles-{shard}.xml'
+
+
+def _w3c(moment):
+    """W3C datetime of a naive UTC datetime"""
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _rfc822(moment):
+    return format_datetime(moment.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def _attribute(value):
+    return escape(value, {'"': '&quot;'})
+
+
+class SitemapStore:
+    """
+    Generates, stores and serves the sitemap and feed files
+
+    Args:
+        app: Flask app (for building URL paths)
+        directory: Directory for the generated files
+        shard_size: Article ids per sitemap shard
+        feed_size: Articles per feed
+        max_age: Cache-Control max-age of the responses, in seconds
+
+    Attributes:
+        generated: Files generated by this process
+    """
+
+    def __init__(self, app, directory, shard_size=SHARD_SIZE, feed_size=FEED_SIZE, max_age=3600):
+        self.directory = directory
+        self.shard_size = shard_size
+        self.feed_size = feed_size
+        self.max_age = max_age
+        self.generated = 0
+        self._urls = app.url_map.bind('')
+        self._lock = threading.Lock()
+
+    def shard_of(self, article_id):
+        return (article_id - 1) // self.shard_size
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def invalidate(self, names):
+        """Delete generated files; each is rebuilt on its next request"""
+        # Stamp first: a build racing this commit sees the change and rebuilds
+        os.makedirs(self.directory, exist_ok=True)
+        write_atomic(self.path(GENERATION_FILE), uuid.uuid4().hex.encode())
+        for name in names:
+            self._remove(name)
+
+    def _remove(self, name):
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def _generation(self):
+        """Current generation stamp (shared by every process using the directory)"""
+        try:
+            with open(self.path(GENERATION_FILE), 'rb') as stamp:
+                return stamp.read()
+        except FileNotFoundError:
+            return b''
+
+    # ------------------------------------------------------------------
+    # Builders: return the file's bytes, or None if it has no content
+    # ------------------------------------------------------------------
+
+    def build_index(self, base_url):
+        shard = (Article.id - 1) // self.shard_size
+        rows = db.session.query(shard, func.max(Article.date_posted)).filter(
+            *Article.published_criteria()
+        ).group_by(shard).order_by(shard).all()
+
+        entries = [f'<sitemap><loc>{escape(base_url)}/{PAGES_FILE}</loc></sitemap>']
+        entries += [
+            f'<sitemap><loc>{escape(base_url)}/{shard_file(number)}</loc>'
+            f'<lastmod>{_w3c(lastmod)}</lastmod></sitemap>'
+            for number, lastmod in rows
+        ]
+        return (
+            f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n'
+            + '\n'.join(entries) + '\n</sitemapindex>\n'
+        ).encode()
+
+    def build_pages(self, base_url):
+        paths = [self._urls.build(endpoint) for endpoint in
+                 ('public.home', 'public.blog', 'public.about', 'services.index')]
+        paths += [
+            self._urls.build('services.service_detail', {'slug': slug}) for (slug,) in
+            db.session.query(Service.slug).filter_by(is_active=True).order_by(Service.order)
+        ]
+        return self._urlset(f'<url><loc>{escape(base_url + path)}</loc></url>' for path in paths)
+
+    def build_shard(self, shard, base_url):
+        first = shard * self.shard_size + 1
+        rows = db.session.query(Article.id, Article.date_posted).filter(
+            Article.id.between(first, first + self.shard_size - 1), *Article.published_criteria()
+        ).order_by(Article.id).all()
+        if not rows:
+            return None
+        return self._urlset(
+            f'<url><loc>{escape(base_url + self._article_path(article_id))}</loc>'
+            f'<lastmod>{_w3c(date_posted)}</lastmod></url>'
+            for article_id, date_posted in rows
+        )
+
+    def build_rss(self, base_url):
+        items = []
+        for article in self._feed_articles():
+            link = escape(base_url + self._article_path(article.id))
+            items.append(
+                f'<item><title>{escape(article.title)}</title><link>{link}</link>'
+                f'<guid isPermaLink="true">{link}</guid><pubDate>{_rfc822(article.date_posted)}</pubDate>'
+                f'<dc:creator>{escape(article.author)}</dc:creator><category>{escape(article.category)}</category>'
+                f'<description>{escape(article.excerpt or "")}</description></item>'
+            )
+        blog = escape(base_url + self._urls.build('public.blog'))
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<rss version="2.0" xmlns:atom="{ATOM_NS}" xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+            f'<channel><title>{SITE_TITLE}</title><link>{blog}</link>'
+            f'<description>Latest articles from {SITE_TITLE}</description>'
+            f'<atom:link href="{_attribute(base_url)}/{RSS_FILE}" rel="self" type="application/rss+xml"/>'
+            f'<lastBuildDate>{_rfc822(datetime.utcnow())}</lastBuildDate>\n'
+            + '\n'.join(items) + '\n</channel>\n</rss>\n'
+        ).encode()
+
+    def build_atom(self, base_url):
+        articles = self._feed_articles()
+        entries = []
+        for article in articles:
+            link = _attribute(base_url + self._article_path(article.id))
+            entries.append(
+                f'<entry><id>{link}</id><title>{escape(article.title)}</title>'
+                f'<link href="{link}"/><published>{_w3c(article.date_posted)}</published>'
+                f'<updated>{_w3c(article.date_posted)}</updated>'
+                f'<author><name>{escape(article.author)}</name></author>'
+                f'<category term="{_attribute(article.category)}"/>'
+                f'<summary>{escape(article.excerpt or "")}</summary></entry>'
+            )
+        updated = articles[0].date_posted if articles else datetime.utcnow()
+        return (
+            f'<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="{ATOM_NS}">\n'
+            f'<id>{escape(base_url)}/</id><title>{SITE_TITLE}</title><updated>{_w3c(updated)}</updated>'
+            f'<link href="{_attribute(base_url + self._urls.build("public.blog"))}"/>'
+            f'<link href="{_attribute(base_url)}/{ATOM_FILE}" rel="self"/>\n'
+            + '\n'.join(entries) + '\n</feed>\n'
+        ).encode()
+
+    def _article_path(self, article_id):
+        return self._urls.build('articles.read_more', {'article_id': article_id})
+
+    def _feed_articles(self):
+        return Article.cards().filter(*Article.published_criteria()).order_by(
+            Article.date_posted.desc(), Article.id.desc()
+        ).limit(self.feed_size).all()
+
+    @staticmethod
+    def _urlset(entries):
+        return (
+            f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'
+            + '\n'.join(entries) + '\n</urlset>\n'
+        ).encode()
+
+    # ------------------------------------------------------------------
+    # Serving
+    # ------------------------------------------------------------------
+
+    def _open(self, name, build):
+        """Open a generated file, generating it first if missing (None if empty)"""
+        path = self.path(name)
+        for _ in range(3):
+            try:
+                return open(path, 'rb')
+            except FileNotFoundError:
+                pass
+            with self._lock:
+                if not os.path.exists(path):
+                    site_url = current_app.config.get('SITE_URL')
+                    if not site_url:
+                        logger.error(f"SITE_URL is not set; not generating {name}")
+                        abort(503)
+                    generation = self._generation()
+                    data = build(site_url.rstrip('/'))
+                    if data is None:
+                        return None
+                    os.makedirs(self.directory, exist_ok=True)
+                    write_atomic(path, data)
+                    if self._generation() != generation:
+                        # A commit invalidated files while this one was built from older data
+                        self._remove(name)
+                        continue
+                    self.generated += 1
+                    logger.info(f"Generated {name} ({len(data)} bytes)")
+        # Only reached if concurrent commits keep invalidating the files
+        raise FileNotFoundError(path)
+
+    def response(self, name, build, mimetype):
+        """
+        Conditional response for a generated file (404 if it has no content,
+        503 if it must be generated and SITE_URL is not set)
+
+        Args:
+            name: File name (also the URL path)
+            build: Callable taking the base URL and returning the file's bytes
+            mimetype: Response mimetype
+        """
+        stream = self._open(name, build)
+        if stream is None:
+            abort(404)
+        with stream:
+            stat = os.fstat(stream.fileno())
+            etag = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+            last_modified = datetime.fromtimestamp(int(stat.st_mtime), timezone.utc)
+            if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = Response(stream.read(), mimetype=mimetype)
+            else:
+                response = Response(status=304)
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        return response
+
+
+def get_sitemap_store():
+    """The current app's SitemapStore"""
+    return current_app.extensions.get('sitemaps')
+
+
+# ============================================================================
+# CHANGE TRACKING
+# ============================================================================
+
+_STALE_KEY = 'sitemap_stale_files'
+# date_posted also moves an article in the feeds and sets its lastmod
+_PUBLICATION_ATTRIBUTES = Article.PUBLICATION_ATTRIBUTES + ('date_posted',)
+_FEED_ATTRIBUTES = ('title', 'excerpt', 'author', 'category')
+
+
+def _mark_stale(target, *names):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_STALE_KEY, set()).update(names)
+
+
+def _mark_article_stale(target):
+    store = get_sitemap_store() if has_app_context() else None
+    if store is not None:
+        _mark_stale(target, shard_file(store.shard_of(target.id)), INDEX_FILE, *FEED_FILES)
+
+
+@event.listens_for(Article, 'after_insert')
+def _track_inserted_article(mapper, connection, target):
+    if target.is_published():
+        _mark_article_stale(target)
+
+
+@event.listens_for(Article, 'after_update')
+def _track_updated_article(mapper, connection, target):
+    state = sa_inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in _PUBLICATION_ATTRIBUTES):
+        _mark_article_stale(target)
+    elif target.is_published() and any(state.attrs[name].history.has_changes() for name in _FEED_ATTRIBUTES):
+        _mark_stale(target, *FEED_FILES)
+
+
+@event.listens_for(Article, 'after_delete')
+def _track_deleted_article(mapper, connection, target):
+    _mark_article_stale(target)
+
+
+@event.listens_for(Service, 'after_insert')
+@event.listens_for(Service, 'after_update')
+@event.listens_for(Service, 'after_delete')
+def _track_service(mapper, connection, target):
+    _mark_stale(target, PAGES_FILE)
+
+
+@event.listens_for(Session, 'after_commit')
+def _delete_stale_files(session):
+    names = session.info.pop(_STALE_KEY, None)
+    if names and has_app_context():
+        store = get_sitemap_store()
+        if store is not None:
+            store.invalidate(names)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_stale_files(session):
+    session.info.pop(_STALE_KEY, None)
+
+
+def configure_sitemaps(app: Flask):
+    """
+    Serve sitemaps and feeds from files regenerated as content changes
+    (SITE_URL, SITEMAP_DIR, SITEMAP_SHARD_SIZE, FEED_SIZE, SITEMAP_MAX_AGE)
+
+    Raises:
+        ValueError: SITE_URL is not set outside debug and testing, so a
+            misconfigured deploy fails at startup rather than with 503s
+    """
+    if not app.config.get('SITE_URL') and not (app.debug or app.testing):
+        raise ValueError(
+            'SITE_URL must be set (absolute URLs in sitemaps and feeds)!\n'
+            'Example: https://simplylawverse.com'
+        )
+    directory = app.config.get('SITEMAP_DIR') or os.path.join(app.instance_path, 'sitemap')
+    app.extensions['sitemaps'] = SitemapStore(
+        app, directory,
+        shard_size=app.config.get('SITEMAP_SHARD_SIZE', SHARD_SIZE),
+        feed_size=app.config.get('FEED_SIZE', FEED_SIZE),
+        max_age=app.config.get('SITEMAP_MAX_AGE', 3600)
+    )
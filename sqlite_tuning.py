@@ -0,0 +1,68 @@
+"""
+SQLite Tuning
+Connection pragmas for running the app on a SQLite file database
+
+WAL mode lets readers proceed while a write is in progress, and
+synchronous=NORMAL is durable across application crashes (only an OS crash
+can lose the last transactions). busy_timeout makes concurrent writers wait
+for the lock instead of failing with "database is locked".
+"""
+
+from flask import Flask
+from sqlalchemy import event
+
+from extensions import db
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def is_sqlite_file(uri):
+    """True for a SQLite database stored in a file (not :memory:)"""
+    if not uri or not uri.startswith('sqlite'):
+        return False
+    return ':memory:' not in uri and uri.rstrip('/') != 'sqlite:'
+
+
+def sqlite_pragmas(config):
+    """
+    Pragmas applied to every new connection
+
+    Returns:
+        List of (pragma, value) tuples
+    """
+    return [
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('busy_timeout', int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))),
+        ('cache_size', int(config.get('SQLITE_CACHE_SIZE', -64000))),
+        ('mmap_size', int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))),
+        ('temp_store', 'MEMORY'),
+    ]
+
+
+def configure_sqlite(app: Flask):
+    """
+    Apply the production pragma profile to the app's SQLite engine
+
+    Does nothing for other databases, in-memory SQLite, or when
+    SQLITE_TUNING_ENABLED is false. Must be called after db.init_app().
+    """
+    if not app.config.get('SQLITE_TUNING_ENABLED', True):
+        return
+    if not is_sqlite_file(app.config.get('SQLALCHEMY_DATABASE_URI')):
+        return
+
+    pragmas = sqlite_pragmas(app.config)
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+    with app.app_context():
+        event.listen(db.engine, 'connect', set_pragmas)
+    logger.info('SQLite tuning enabled: ' + ', '.join(f'{name}={value}' for name, value in pragmas))
@@ -0,0 +1,319 @@
+"""
+Static Snapshots
+Pre-rendered public pages for a front proxy to serve from disk
+
+Published articles rarely change, so their pages can be served without
+Python. The exporter requests these pages through the test client, as an
+anonymous visitor without cookies:
+
+- the blog (first page; later pages and category filters use query strings)
+- each published article (articles.read_more, first page of comments)
+- the services index and each active service
+
+Each page is written to STATIC_SNAPSHOT_DIR/<path>/index.html, with
+index.html.gz (gzip -9) and index.html.br (Brotli 9) siblings.
+Every file is replaced atomically.
+
+`flask export-snapshot` writes every page and removes pages that are no
+longer public. After that, commits re-render only the pages they affect:
+
+- publishing, editing or deleting an article re-renders its page
+- a change to a published article's listing fields (title, excerpt,
+  category, ...) or to its published state also re-renders the blog and
+  the services mapped to its category
+- adding or deleting a comment re-renders its article's page
+
+Rendering runs on a background thread in each process, so the request that
+made the change does not wait for it.
+
+Some content is not refreshed incrementally: view and like counts, and the
+"more like this" and "readers also read" lists. Re-export periodically
+(e.g. nightly) to pick those up. Views of pages served from disk never
+reach the visit gate, so they are not counted.
+
+Serve snapshots only for anonymous GETs without a query string. Example
+nginx config:
+
+    map "$request_method:$args:$cookie_session" $snapshot_root {
+        default             /nonexistent;
+        "~^(GET|HEAD)::$"   /srv/simplylawverse/instance/snapshot;
+    }
+    location / {
+        root $snapshot_root;
+        gzip_static on;
+        brotli_static on;
+        try_files $uri/index.html @app;
+    }
+"""
+
+import gzip
+import os
+import queue
+import threading
+
+import brotli
+from flask import Flask, current_app, has_app_context, request
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from file_utils import write_atomic
+from logger import get_logger
+from models import Article, Category, Comment, Service, service_categories
+
+logger = get_logger(__name__)
+
+SNAPSHOT_ENVIRON_KEY = 'simplylawverse.snapshot'
+PAGE_FILE = 'index.html'
+COMPRESSED_SUFFIXES = ('.gz', '.br')
+# Brotli 11 is ~8x slower than 9 on a 40 KB page for ~10% smaller output
+BROTLI_QUALITY = 9
+
+
+def is_snapshot_request():
+    """Whether the current request is the exporter rendering a page"""
+    return bool(request.environ.get(SNAPSHOT_ENVIRON_KEY))
+
+
+class SnapshotExporter:
+    """
+    Renders public pages into a directory of static files
+
+    Args:
+        app: Flask app to render with
+        directory: Snapshot root directory
+
+    Attributes:
+        rendered: Pages written
+        removed: Pages removed because they are no longer public
+        failed: Renders that raised
+    """
+
+    def __init__(self, app, directory):
+        self.app = app
+        self.directory = directory
+        self.rendered = 0
+        self.removed = 0
+        self.failed = 0
+        self._urls = app.url_map.bind('')
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Pages
+    # ------------------------------------------------------------------
+
+    def blog_path(self):
+        return self._urls.build('public.blog')
+
+    def article_path(self, article_id):
+        return self._urls.build('articles.read_more', {'article_id': article_id})
+
+    def services_path(self):
+        return self._urls.build('services.index')
+
+    def service_path(self, slug):
+        return self._urls.build('services.service_detail', {'slug': slug})
+
+    def file_for(self, path):
+        """Snapshot file of a URL path (/blog -> <directory>/blog/index.html)"""
+        return os.path.join(self.directory, *[part for part in path.split('/') if part], PAGE_FILE)
+
+    def render(self, path):
+        """
+        Render one page into the snapshot, or remove it if it is not public
+
+        Returns:
+            True if the page was written
+        """
+        response = self.app.test_client(use_cookies=False).get(path, environ_base={SNAPSHOT_ENVIRON_KEY: True})
+        target = self.file_for(path)
+        if response.status_code != 200 or response.mimetype != 'text/html':
+            self._remove(target)
+            return False
+
+        body = response.get_data()
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        write_atomic(f'{target}.gz', gzip.compress(body, compresslevel=9, mtime=0))
+        write_atomic(f'{target}.br', brotli.compress(body, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY))
+        write_atomic(target, body)  # Last, so the page never appears without its compressed siblings
+        self.rendered += 1
+        return True
+
+    def _remove(self, target):
+        existed = os.path.exists(target)
+        for path in (target, *(target + suffix for suffix in COMPRESSED_SUFFIXES)):
+            if os.path.exists(path):
+                os.remove(path)
+        if existed:
+            self.removed += 1
+
+    def export_all(self):
+        """
+        Render every public page and remove snapshot pages that are not
+
+        Returns:
+            Number of pages written
+        """
+        with self.app.app_context():
+            article_ids = [article_id for (article_id,) in db.session.query(Article.id)
+                           .filter(*Article.published_criteria()).order_by(Article.id)]
+            slugs = [slug for (slug,) in db.session.query(Service.slug).filter_by(is_active=True)]
+
+        paths = [self.blog_path(), self.services_path()]
+        paths += [self.article_path(article_id) for article_id in article_ids]
+        paths += [self.service_path(slug) for slug in slugs]
+        written = {self.file_for(path) for path in paths if self.render(path)}
+
+        for root, _, files in os.walk(self.directory):
+            target = os.path.join(root, PAGE_FILE)
+            if PAGE_FILE in files and target not in written:
+                self._remove(target)
+        return len(written)
+
+    def affected_paths(self, article_ids=(), categories=(), listings=False):
+        """URL paths to re-render after changes to some articles (needs an app context)"""
+        paths = {self.article_path(article_id) for article_id in article_ids}
+        if listings:
+            paths.add(self.blog_path())
+        names = [name for name in categories if name]
+        if names:
+            slugs = db.session.query(Service.slug).join(
+                service_categories, service_categories.c.service_id == Service.id
+            ).join(Category, Category.id == service_categories.c.category_id).filter(
+                Category.name.in_(names), Service.is_active == True
+            ).distinct()
+            paths.update(self.service_path(slug) for (slug,) in slugs)
+        return paths
+
+    # ------------------------------------------------------------------
+    # Background re-rendering
+    # ------------------------------------------------------------------
+
+    def submit(self, article_ids=(), categories=(), listings=False):
+        """Queue re-rendering of the pages affected by changed articles"""
+        self._queue.put((set(article_ids), set(categories), listings))
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='snapshot-renderer', daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """Wait until every queued change has been rendered"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            while True:
+                # Coalesce a burst of changes into one set of renders
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                article_ids = set().union(*(job[0] for job in jobs))
+                categories = set().union(*(job[1] for job in jobs))
+                with self.app.app_context():
+                    paths = self.affected_paths(article_ids, categories, any(job[2] for job in jobs))
+                    db.session.remove()
+                for path in sorted(paths):
+                    self.render(path)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Failed to refresh static snapshot pages: {e}")
+            finally:
+                for _ in jobs:
+                    self._queue.task_done()
+
+
+def get_snapshot_exporter():
+    """The current app's SnapshotExporter, or None when snapshots are disabled"""
+    return current_app.extensions.get('static_snapshots')
+
+
+# ============================================================================
+# CHANGE TRACKING
+# ============================================================================
+
+_CHANGES_KEY = 'snapshot_changes'
+_LISTING_ATTRIBUTES = Article.PUBLICATION_ATTRIBUTES + ('title', 'excerpt', 'cover_image', 'category', 'date_posted')
+_PAGE_ATTRIBUTES = _LISTING_ATTRIBUTES + ('content_html', 'author', 'reading_time')
+_COMMENT_ATTRIBUTES = ('content', 'deleted_at')
+
+
+def _note(target, article_id, categories=(), listings=False):
+    session = object_session(target)
+    if session is None:
+        return
+    changes = session.info.setdefault(_CHANGES_KEY, {'articles': set(), 'categories': set(), 'listings': False})
+    changes['articles'].add(article_id)
+    changes['categories'].update(categories)
+    changes['listings'] = changes['listings'] or listings
+
+
+@event.listens_for(Article, 'after_insert')
+def _remember_inserted_article(mapper, connection, target):
+    if target.is_published():
+        _note(target, target.id, [target.category], listings=True)
+
+
+@event.listens_for(Article, 'after_update')
+def _remember_updated_article(mapper, connection, target):
+    state = sa_inspect(target)
+    changed = {name for name in _PAGE_ATTRIBUTES if state.attrs[name].history.has_changes()}
+    # Unchanged publication and not public now: it was never public either
+    if not changed or (not changed.intersection(Article.PUBLICATION_ATTRIBUTES) and not target.is_published()):
+        return
+    if changed.intersection(_LISTING_ATTRIBUTES):
+        categories = [target.category, *state.attrs.category.history.deleted]
+        _note(target, target.id, categories, listings=True)
+    else:
+        _note(target, target.id)
+
+
+@event.listens_for(Article, 'after_delete')
+def _remember_deleted_article(mapper, connection, target):
+    _note(target, target.id, [target.category], listings=True)
+
+
+@event.listens_for(Comment, 'after_insert')
+@event.listens_for(Comment, 'after_delete')
+def _remember_comment(mapper, connection, target):
+    _note(target, target.article_id)
+
+
+@event.listens_for(Comment, 'after_update')
+def _remember_updated_comment(mapper, connection, target):
+    state = sa_inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in _COMMENT_ATTRIBUTES):
+        _note(target, target.article_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _refresh_changed_pages(session):
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if not changes or not has_app_context():
+        return
+    exporter = get_snapshot_exporter()
+    if exporter is not None:
+        exporter.submit(changes['articles'], changes['categories'], changes['listings'])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_changes(session):
+    session.info.pop(_CHANGES_KEY, None)
+
+
+def configure_static_snapshots(app: Flask):
+    """
+    Keep the static snapshot up to date as content changes
+    (STATIC_SNAPSHOT_ENABLED, STATIC_SNAPSHOT_DIR)
+
+    Run `flask export-snapshot` once to write the full snapshot.
+    """
+    if not app.config.get('STATIC_SNAPSHOT_ENABLED', False):
+        return
+    directory = app.config.get('STATIC_SNAPSHOT_DIR') or os.path.join(app.instance_path, 'snapshot')
+    app.extensions['static_snapshots'] = SnapshotExporter(app, directory)
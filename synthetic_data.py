@@ -0,0 +1,349 @@
+"""
+Synthetic Data Generator
+Bulk-inserts reproducible, realistically skewed data for benchmarking
+
+Rows are built in Python and written with executemany-style Core inserts in
+batches, bypassing the ORM unit of work. The same seed always produces the
+same dataset, so benchmark runs on different commits are comparable.
+
+Usage:
+    flask seed-synthetic --articles 50000 --visits 1000000 --comments 500000 --bookings 10000
+"""
+
+import hashlib
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import func, insert, select
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from models import (
+    Article, Booking, Category, ClientIntake, Comment, ConsultationType, Service, User, Visit,
+    estimate_reading_time, make_excerpt, render_content_html
+)
+from visitor_sketches import rebuild_sketches
+
+DEFAULT_COUNTS = {
+    'articles': 50000,
+    'visits': 1000000,
+    'comments': 500000,
+    'bookings': 10000,
+}
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_SEED = 42
+
+BENCH_ADMIN_USERNAME = 'bench-admin'
+BENCH_ADMIN_PASSWORD = 'bench-admin-password'
+
+# Distinct article bodies; rendering is the slow part, so bodies are reused
+CONTENT_VARIANTS = 200
+REPLY_RATIO = 0.25          # Share of comments that reply to another comment
+ZIPF_EXPONENT = 1.1         # Popularity skew of visits/comments across articles
+HISTORY_DAYS = 3 * 365
+
+STATUS_WEIGHTS = {'approved': 80, 'pending': 10, 'disapproved': 7, 'archived': 3}
+CATEGORIES = (
+    'General', 'Corporate Law', 'Employment Law', 'Intellectual Property',
+    'Tax Law', 'Contract Law', 'Real Estate', 'Dispute Resolution',
+)
+WORDS = (
+    'agreement clause company director shareholder liability contract court '
+    'jurisdiction statute regulation compliance filing registration tribunal '
+    'employee employer dispute settlement arbitration damages breach notice '
+    'property lease tenant landlord tax revenue audit license trademark patent '
+    'copyright counsel hearing judgment appeal evidence witness obligation'
+).split()
+USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/124.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) AppleWebKit/605.1.15 Version/17.4 Safari/605.1.15',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148',
+    'Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 Chrome/124.0 Mobile Safari/537.36',
+)
+
+
+def _sentence(rng, words=12):
+    text = ' '.join(rng.choice(WORDS) for _ in range(words))
+    return text.capitalize() + '.'
+
+
+def _paragraphs(rng, count):
+    return '\n\n'.join(
+        ' '.join(_sentence(rng, rng.randint(8, 18)) for _ in range(rng.randint(3, 6)))
+        for _ in range(count)
+    )
+
+
+def _random_time(rng, now, days=HISTORY_DAYS):
+    return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+
+def _zipf_weights(count, exponent=ZIPF_EXPONENT):
+    """Cumulative weights giving a few very popular and a long tail of rarely read rows"""
+    return list(accumulate(1.0 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def _batched_insert(table, rows_iter, total, batch_size, label, echo):
+    """Insert rows from a generator in batches, committing after each batch"""
+    batch = []
+    written = 0
+    for row in rows_iter:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(insert(table), batch)
+            db.session.commit()
+            written += len(batch)
+            batch = []
+            echo(f'  {label}: {written}/{total}')
+    if batch:
+        db.session.execute(insert(table), batch)
+        db.session.commit()
+        written += len(batch)
+        echo(f'  {label}: {written}/{total}')
+    return written
+
+
+def ensure_bench_admin():
+    """Create the admin account benchmark scenarios log in with"""
+    user = User.query.filter_by(username=BENCH_ADMIN_USERNAME).first()
+    if user is None:
+        user = User(
+            username=BENCH_ADMIN_USERNAME,
+            email='bench-admin@example.com',
+            password=generate_password_hash(BENCH_ADMIN_PASSWORD),
+            is_admin=True
+        )
+        db.session.add(user)
+        db.session.commit()
+    return user
+
+
+def ensure_booking_catalogue():
+    """
+    Make sure at least one service and consultation type exist
+
+    Returns:
+        Tuple of (service_ids, consultation_types as (id, price) tuples)
+    """
+    if not Service.query.first():
+        db.session.add(Service(
+            name='Synthetic Advisory', slug='synthetic-advisory',
+            description='Benchmark service', detailed_content='<p>Benchmark service</p>',
+            who_needs_it='Benchmarks', typical_timeline='1 week', base_price=10000,
+            categories=Category.query.filter(Category.name.in_(CATEGORIES[:3])).all()
+        ))
+    if not ConsultationType.query.first():
+        db.session.add(ConsultationType(
+            name='Synthetic Consultation', duration_minutes=30,
+            price_naira=15000, description='Benchmark consultation'
+        ))
+    db.session.commit()
+
+    service_ids = [row.id for row in db.session.query(Service.id)]
+    types = [(row.id, row.price_naira) for row in db.session.query(ConsultationType.id, ConsultationType.price_naira)]
+    return service_ids, types
+
+
+def _article_rows(rng, count, now):
+    bodies = []
+    for _ in range(CONTENT_VARIANTS):
+        content = _paragraphs(rng, rng.randint(4, 20))
+        bodies.append((content, make_excerpt(content), render_content_html(content), estimate_reading_time(content)))
+
+    statuses = list(STATUS_WEIGHTS)
+    status_weights = list(STATUS_WEIGHTS.values())
+    for _ in range(count):
+        content, excerpt, content_html, reading_time = rng.choice(bodies)
+        submitted = _random_time(rng, now)
+        status = rng.choices(statuses, status_weights)[0]
+        yield {
+            'title': _sentence(rng, rng.randint(4, 10))[:200],
+            'content': content,
+            'excerpt': excerpt,
+            'content_html': content_html,
+            'reading_time': reading_time,
+            'author': f'Author {rng.randint(1, 500)}',
+            'email': f'author{rng.randint(1, 500)}@example.com',
+            'status': status,
+            'category': rng.choice(CATEGORIES),
+            'date_submitted': submitted,
+            'date_posted': submitted + timedelta(hours=rng.randint(0, 72)),
+            'likes': rng.randint(0, 200),
+            'views': rng.randint(0, 5000),
+            'is_draft': rng.random() < 0.02,
+        }
+
+
+def _visit_rows(rng, count, article_ids, now):
+    weights = _zipf_weights(len(article_ids))
+    while count > 0:
+        chunk = min(count, DEFAULT_BATCH_SIZE)
+        count -= chunk
+        for article_id in rng.choices(article_ids, cum_weights=weights, k=chunk):
+            ip = f'10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}'
+            user_agent = rng.choice(USER_AGENTS)
+            yield {
+                'article_id': article_id,
+                'session_id': f'sess-{rng.getrandbits(48):012x}',
+                'ip_address': ip,
+                'visitor_hash': hashlib.sha256(f'{ip}:{user_agent}'.encode()).hexdigest(),
+                'user_agent': user_agent,
+                'timestamp': _random_time(rng, now, days=365),
+                'duration_seconds': rng.randint(0, 600),
+            }
+
+
+def _comment_rows(rng, count, article_ids, now):
+    weights = _zipf_weights(len(article_ids))
+    while count > 0:
+        chunk = min(count, DEFAULT_BATCH_SIZE)
+        count -= chunk
+        for article_id in rng.choices(article_ids, cum_weights=weights, k=chunk):
+            commenter = rng.randint(1, 50000)
+            yield {
+                'article_id': article_id,
+                'name': f'Reader {commenter}',
+                'email': f'reader{commenter}@example.com',
+                'content': _sentence(rng, rng.randint(6, 40)),
+                'date_posted': _random_time(rng, now),
+            }
+
+
+def _reply_rows(rng, count, parents, now):
+    for _ in range(count):
+        parent_id, article_id, parent_posted = rng.choice(parents)
+        commenter = rng.randint(1, 50000)
+        yield {
+            'article_id': article_id,
+            'parent_id': parent_id,
+            'name': f'Reader {commenter}',
+            'email': f'reader{commenter}@example.com',
+            'content': _sentence(rng, rng.randint(6, 30)),
+            'date_posted': min(parent_posted + timedelta(hours=rng.randint(1, 240)), now),
+        }
+
+
+def _booking_rows(rng, count, start, service_ids, consultation_types, now):
+    for i in range(start, start + count):
+        type_id, price = rng.choice(consultation_types)
+        scheduled = now + timedelta(days=rng.randint(-365, 60), hours=rng.randint(9, 16))
+        paid = scheduled < now or rng.random() < 0.6
+        yield {
+            'client_name': f'Client {i}',
+            'client_email': f'client{i}@example.com',
+            'client_phone': f'080{rng.randint(10000000, 99999999)}',
+            'company_name': f'Company {rng.randint(1, 5000)} Ltd',
+            'cac_status': rng.choice(('Registered', 'Not registered')),
+            'issue_description': _sentence(rng, 30),
+            'service_id': rng.choice(service_ids),
+            'consultation_type_id': type_id,
+            'scheduled_date': scheduled,
+            'amount_naira': price,
+            'payment_reference': f'synthetic-{i}-{rng.getrandbits(32):08x}',
+            'payment_status': 'completed' if paid else 'pending',
+            'booking_status': 'completed' if scheduled < now else ('confirmed' if paid else 'pending'),
+            'created_at': scheduled - timedelta(days=rng.randint(1, 30)),
+        }
+
+
+def _intake_rows(rng, count, now):
+    statuses = ('pending', 'reviewed', 'scheduled', 'archived')
+    for i in range(count):
+        yield {
+            'full_name': f'Client {i}',
+            'email': f'client{i}@example.com',
+            'phone': f'080{rng.randint(10000000, 99999999)}',
+            'company_name': f'Company {rng.randint(1, 5000)} Ltd',
+            'issue_description': _sentence(rng, 30),
+            'status': rng.choice(statuses),
+            'submitted_at': _random_time(rng, now, days=365),
+        }
+
+
+def generate(counts=None, seed=DEFAULT_SEED, batch_size=DEFAULT_BATCH_SIZE, echo=print):
+    """
+    Generate a synthetic dataset in the current database
+
+    Must be called inside an app context. Existing rows are kept; new rows
+    are appended.
+
+    Args:
+        counts: Dict overriding DEFAULT_COUNTS ('articles', 'visits',
+            'comments', 'bookings'); consultation intakes match bookings
+        seed: Random seed, so the same arguments give the same data
+        batch_size: Rows per executemany batch / transaction
+        echo: Progress callback
+
+    Returns:
+        Dict of table label -> rows inserted
+    """
+    counts = dict(DEFAULT_COUNTS, **(counts or {}))
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    inserted = {}
+
+    ensure_bench_admin()
+
+    echo('Generating articles...')
+    first_new_id = (db.session.query(func.max(Article.id)).scalar() or 0) + 1
+    inserted['articles'] = _batched_insert(
+        Article.__table__, _article_rows(rng, counts['articles'], now),
+        counts['articles'], batch_size, 'articles', echo
+    )
+    # Core inserts bypass the ORM hooks that keep category counts current
+    Category.refresh_counts()
+    db.session.commit()
+    article_ids = [row.id for row in db.session.query(Article.id).filter(Article.id >= first_new_id)]
+    if not article_ids:
+        article_ids = [row.id for row in db.session.query(Article.id)]
+
+    if article_ids:
+        # Shuffle so popularity is not correlated with publication order
+        rng.shuffle(article_ids)
+
+        echo('Generating visits...')
+        inserted['visits'] = _batched_insert(
+            Visit.__table__, _visit_rows(rng, counts['visits'], article_ids, now),
+            counts['visits'], batch_size, 'visits', echo
+        )
+        # Core inserts bypass the ORM hook that feeds the unique-visitor sketches
+        echo('Sketching unique visitors...')
+        rebuild_sketches(db.session.connection())
+        db.session.commit()
+
+        replies = int(counts['comments'] * REPLY_RATIO)
+        top_level = counts['comments'] - replies
+        first_comment_id = (db.session.query(func.max(Comment.id)).scalar() or 0) + 1
+
+        echo('Generating comments...')
+        inserted['comments'] = _batched_insert(
+            Comment.__table__, _comment_rows(rng, top_level, article_ids, now),
+            top_level, batch_size, 'comments', echo
+        )
+        parents = db.session.execute(
+            select(Comment.id, Comment.article_id, Comment.date_posted)
+            .where(Comment.id >= first_comment_id)
+        ).all()
+        if parents:
+            inserted['comments'] += _batched_insert(
+                Comment.__table__, _reply_rows(rng, replies, parents, now),
+                replies, batch_size, 'replies', echo
+            )
+
+    echo('Generating bookings...')
+    service_ids, consultation_types = ensure_booking_catalogue()
+    Service.refresh_related()
+    db.session.commit()
+    # Offset keeps payment references unique when generating into a populated database
+    start = (db.session.query(func.max(Booking.id)).scalar() or 0) + 1
+    inserted['bookings'] = _batched_insert(
+        Booking.__table__, _booking_rows(rng, counts['bookings'], start, service_ids, consultation_types, now),
+        counts['bookings'], batch_size, 'bookings', echo
+    )
+    inserted['intakes'] = _batched_insert(
+        ClientIntake.__table__, _intake_rows(rng, counts['bookings'], now),
+        counts['bookings'], batch_size, 'intakes', echo
+    )
+
+    return inserted
@@ -0,0 +1,116 @@
+"""
+Test suite for article listing projections and write-time rendering
+Run with: python -m pytest test_article_cards.py
+"""
+
+from sqlalchemy import inspect
+
+from models import Article, make_excerpt, render_content_html, estimate_reading_time, EXCERPT_LENGTH
+from trending_articles import TrendingQuery
+
+
+def add_article(db, content='word ' * 20000, status='approved'):
+    article = Article(
+        title='Long article', content=content, author='Author',
+        email='a@example.com', status=status, category='General'
+    )
+    db.session.add(article)
+    db.session.commit()
+    return article
+
+
+class TestExcerpt:
+    """Excerpt generation tests"""
+
+    def test_strips_tags_and_truncates(self):
+        """Test that excerpts are plain text within the length limit"""
+        excerpt = make_excerpt('<p>Hello <strong>world</strong> &amp; ' + 'more ' * 200 + '</p>')
+        assert excerpt.startswith('Hello world & more')
+        assert excerpt.endswith('...')
+        assert len(excerpt) <= EXCERPT_LENGTH
+
+    def test_short_content_unchanged(self):
+        """Test that short content is kept whole"""
+        assert make_excerpt('Short body.\n\nSecond line.') == 'Short body. Second line.'
+        assert make_excerpt('') == ''
+
+    def test_excerpt_follows_content(self, app, db):
+        """Test that assigning content refreshes the stored excerpt"""
+        article = add_article(db, content='First version of the body')
+        article.content = 'Second version of the body'
+        db.session.commit()
+        assert article.excerpt == 'Second version of the body'
+
+
+class TestCardQueries:
+    """Deferred content loading tests"""
+
+    def test_cards_defer_content(self, app, db):
+        """Test that card queries leave content unloaded"""
+        add_article(db)
+        db.session.expunge_all()
+
+        article = Article.cards().first()
+        state = inspect(article)
+        assert 'content' in state.unloaded
+        assert 'excerpt' not in state.unloaded
+        assert article.excerpt.endswith('...')
+
+    def test_trending_queries_defer_content(self, app, db):
+        """Test that trending helpers return card projections"""
+        add_article(db)
+        db.session.expunge_all()
+
+        for articles in (TrendingQuery.get_most_viewed(), TrendingQuery.get_recent(),
+                         TrendingQuery.get_trending(), TrendingQuery.get_most_commented()):
+            assert articles
+            assert all('content' in inspect(a).unloaded for a in articles)
+
+    def test_increment_view_count(self, app, db):
+        """Test that view counts are incremented in place"""
+        article = add_article(db)
+        assert TrendingQuery.increment_view_count(article.id) == 1
+        assert TrendingQuery.increment_view_count(article.id) == 2
+        assert TrendingQuery.increment_view_count(999) is None
+
+
+class TestRenderedContent:
+    """Write-time rendering tests"""
+
+    def test_render_content_html(self):
+        """Test paragraph and line break conversion"""
+        assert render_content_html('One\ntwo\n\nThree') == '<p>One<br>two</p>\n<p>Three</p>'
+        assert render_content_html('') == ''
+
+    def test_reading_time(self):
+        """Test reading time rounds up to whole minutes"""
+        assert estimate_reading_time('word ' * 10) == 1
+        assert estimate_reading_time('word ' * 401) == 3
+        assert estimate_reading_time('') == 0
+
+    def test_rendered_on_submit(self, app, db):
+        """Test that new articles store HTML, excerpt and reading time"""
+        article = add_article(db, content='Para one\n\nPara two')
+        assert article.content_html == '<p>Para one</p>\n<p>Para two</p>'
+        assert article.reading_time == 1
+
+    def test_backfill_command(self, app, db):
+        """Test that render-articles fills rows missing stored HTML"""
+        article = add_article(db, content='Legacy body\n\ntext')
+        Article.query.update({Article.content_html: None, Article.reading_time: None})
+        db.session.commit()
+
+        result = app.test_cli_runner().invoke(args=['render-articles', '--batch-size', '1'])
+        assert 'Done. 1 articles rendered.' in result.output
+
+        db.session.expire_all()
+        assert Article.query.get(article.id).content_html == '<p>Legacy body</p>\n<p>text</p>'
+
+    def test_read_more_serves_stored_html(self, client, db):
+        """Test that the article page emits the stored HTML"""
+        article = add_article(db, content='Body text')
+        article.content_html = '<p>Stored rendering</p>'
+        db.session.commit()
+
+        response = client.get(f'/read/{article.id}')
+        assert b'<p>Stored rendering</p>' in response.data
@@ -0,0 +1,199 @@
+"""
+Test suite for TF-IDF "more like this" recommendations
+Run with: python -m pytest test_article_similarity.py
+"""
+
+import threading
+
+import pytest
+
+from article_similarity import SimilarityIndex, TfidfIndex, get_similarity_index, tokenize
+from extensions import db as _db
+from models import Article, ArticleNeighbor
+from query_instrumentation import capture_queries
+from write_queue import get_write_queue
+
+TOPICS = {
+    'contract': 'contract breach damages consideration offer acceptance remedy',
+    'tax': 'tax revenue audit filing deduction assessment withholding',
+    'employment': 'employee employer dismissal wages tribunal redundancy',
+}
+
+
+@pytest.fixture
+def similarity_app(tmp_path, app_factory):
+    """App with recommendations enabled and the index saved under tmp_path"""
+    app = app_factory(
+        # Incremental updates run on a background thread; give it a connection of its own
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'site.db'}",
+        SIMILAR_ARTICLES_ENABLED=True,
+        SIMILAR_ARTICLES_COUNT=2,
+        SIMILAR_ARTICLES_INDEX_PATH=str(tmp_path / 'index.npz')
+    )
+    with app.app_context():
+        _db.create_all()
+        yield app
+        get_similarity_index().flush()
+        if get_write_queue():
+            get_write_queue().flush(timeout=5)
+        _db.session.remove()
+        _db.drop_all()
+
+
+@pytest.fixture
+def topic_article(make_article):
+    """make_article with the vocabulary of one of TOPICS"""
+    def make(topic, number, status='approved'):
+        return make_article(f'{topic.title()} guide {number}', status=status,
+                            content=f'{TOPICS[topic]} part{number}')
+    return make
+
+
+def rebuild():
+    return get_similarity_index().rebuild(_db.engine)
+
+
+def approve(article):
+    article.status = 'approved'
+    _db.session.commit()
+    get_similarity_index().flush()
+
+
+def neighbor_titles(article):
+    return {similar.title for similar in article.similar_articles()}
+
+
+class TestTfidfIndex:
+    """Test the NumPy TF-IDF matrix and neighbour scoring"""
+
+    def test_tokenize(self):
+        counts = tokenize('Breach of Contract', 'The contract was breached by the seller.')
+        assert counts['contract'] == 3
+        assert 'the' not in counts and 'by' not in counts
+
+    def test_neighbors_follow_shared_terms(self):
+        documents = [(1, tokenize('Contract', 'offer acceptance breach')),
+                     (2, tokenize('Contract law', 'offer acceptance damages')),
+                     (3, tokenize('Tax', 'audit revenue filing')),
+                     (4, tokenize('Tax law', 'audit revenue deduction'))]
+        index = TfidfIndex.fit(documents)
+        rows = (index.indptr, index.indices, index.data)
+        results = list(index.neighbors(rows, 3, exclude=index.article_ids))
+
+        assert [article_id for article_id, _ in results[0]] == [2]
+        assert [article_id for article_id, _ in results[2]] == [4]
+        assert results[0][0][1] == pytest.approx(results[1][0][1])
+        assert 0 < results[0][0][1] < 1
+
+    def test_rows_are_unit_length(self):
+        index = TfidfIndex.fit([(1, tokenize('A', 'alpha beta gamma')), (2, tokenize('B', 'alpha beta delta'))])
+        for row in range(2):
+            start, stop = index.indptr[row], index.indptr[row + 1]
+            assert float((index.data[start:stop] ** 2).sum()) == pytest.approx(1, rel=1e-5)
+
+    def test_save_and_load(self, tmp_path):
+        index = TfidfIndex.fit([(1, tokenize('A', 'alpha beta')), (2, tokenize('B', 'alpha beta'))])
+        index.save(str(tmp_path / 'index.npz'))
+        loaded = TfidfIndex.load(str(tmp_path / 'index.npz'))
+        assert loaded.vocabulary == index.vocabulary
+        assert loaded.article_ids.tolist() == [1, 2]
+
+
+class TestStoredNeighbors:
+    """Test building, incremental updates and the article page"""
+
+    def test_rebuild(self, similarity_app, topic_article):
+        for number in range(3):
+            topic_article('contract', number)
+            topic_article('tax', number)
+        topic_article('contract', 9, status='pending')
+
+        assert rebuild() == 6
+        article = Article.query.filter_by(title='Contract guide 0').one()
+        assert neighbor_titles(article) == {'Contract guide 1', 'Contract guide 2'}
+        assert ArticleNeighbor.query.count() == 12
+
+    def test_approval_updates_incrementally(self, similarity_app, topic_article):
+        for number in range(2):
+            topic_article('contract', number)
+            topic_article('employment', number)
+        rebuild()
+
+        article = topic_article('employment', 5, status='pending')
+        assert neighbor_titles(article) == set()
+
+        approve(article)
+        assert neighbor_titles(article) == {'Employment guide 0', 'Employment guide 1'}
+
+        # Existing articles pick up the new one without a rebuild
+        existing = Article.query.filter_by(title='Employment guide 0').one()
+        assert 'Employment guide 5' in neighbor_titles(existing)
+
+    def test_unpublished_neighbors_hidden(self, similarity_app, topic_article):
+        first, second = topic_article('tax', 0), topic_article('tax', 1)
+        rebuild()
+        assert neighbor_titles(first) == {'Tax guide 1'}
+
+        second.soft_delete()
+        _db.session.commit()
+        assert neighbor_titles(first) == set()
+
+    def test_no_index_yet(self, similarity_app, topic_article):
+        article = topic_article('tax', 0)
+        assert neighbor_titles(article) == set()
+        assert ArticleNeighbor.query.count() == 0
+
+    def test_concurrent_updates_keep_each_other(self, similarity_app, topic_article):
+        """Test that an update re-reads the index another worker saved under the lock"""
+        for number in range(2):
+            topic_article('tax', number)
+        rebuild()
+        first, second = topic_article('tax', 5, status='pending'), topic_article('tax', 6, status='pending')
+
+        # A second worker process: its own SimilarityIndex over the same file
+        other_worker = SimilarityIndex(get_similarity_index().path, engine=_db.engine, k=2)
+        _db.session.execute(Article.__table__.update().where(Article.id == second.id).values(status='approved'))
+        _db.session.commit()
+        assert other_worker.add([second.id], _db.engine) == 1
+
+        approve(first)
+        saved = TfidfIndex.load(get_similarity_index().path)
+        assert {first.id, second.id} <= set(saved.article_ids.tolist())
+
+    def test_update_runs_off_the_request(self, similarity_app, monkeypatch, topic_article):
+        """Test that committing an approval only queues the index update"""
+        topic_article('tax', 0)
+        topic_article('tax', 1)
+        rebuild()
+        article = topic_article('tax', 2, status='pending')
+        started = threading.Event()
+        release = threading.Event()
+        index = get_similarity_index()
+        add = index.add
+
+        def slow_add(article_ids, engine):
+            started.set()
+            release.wait(5)
+            return add(article_ids, engine)
+
+        monkeypatch.setattr(index, 'add', slow_add)
+        article.status = 'approved'
+        _db.session.commit()  # Returns while the update is still running
+        assert started.wait(5)
+        assert neighbor_titles(article) == set()
+        release.set()
+        index.flush()
+        assert neighbor_titles(article) == {'Tax guide 0', 'Tax guide 1'}
+
+    def test_read_more_single_lookup(self, similarity_app, topic_article):
+        first = topic_article('contract', 0)
+        topic_article('contract', 1)
+        rebuild()
+
+        client = similarity_app.test_client()
+        with capture_queries() as stats:
+            response = client.get(f'/read/{first.id}')
+        assert response.status_code == 200
+        assert b'More Like This' in response.data
+        assert b'Contract guide 1' in response.data
+        assert sum('article_neighbor' in sql for sql, _, _ in stats.worst_statements(limit=20)) == 1
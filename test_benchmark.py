@@ -0,0 +1,84 @@
+"""
+Test suite for the benchmark suite and synthetic data generator
+Run with: python -m pytest test_benchmark.py
+"""
+
+from benchmark import Context, FlaskDriver, compare, percentile, run_scenario
+from models import Article, Booking, Comment, Visit
+from synthetic_data import BENCH_ADMIN_PASSWORD, BENCH_ADMIN_USERNAME, generate
+
+SMALL_COUNTS = {'articles': 40, 'visits': 300, 'comments': 80, 'bookings': 10}
+
+
+def quiet(message):
+    pass
+
+
+class TestSyntheticData:
+    """Generator tests"""
+
+    def test_requested_volumes(self, app, db):
+        """Test that the requested number of rows is inserted"""
+        inserted = generate(SMALL_COUNTS, batch_size=25, echo=quiet)
+
+        assert inserted['articles'] == Article.query.count() == 40
+        assert inserted['visits'] == Visit.query.count() == 300
+        assert inserted['comments'] == Comment.query.count() == 80
+        assert inserted['bookings'] == Booking.query.count() == 10
+
+    def test_rows_are_consistent(self, app, db):
+        """Test that replies share their parent's article and cards are pre-rendered"""
+        generate(SMALL_COUNTS, echo=quiet)
+
+        replies = Comment.query.filter(Comment.parent_id.isnot(None)).all()
+        assert replies
+        assert all(reply.parent.article_id == reply.article_id for reply in replies)
+        assert Article.query.filter(Article.content_html.is_(None)).count() == 0
+
+    def test_same_seed_same_data(self, app, db):
+        """Test that generation is reproducible"""
+        generate(SMALL_COUNTS, seed=7, echo=quiet)
+        first = [(a.title, a.status) for a in Article.query.order_by(Article.id)]
+        db.session.query(Article).delete()
+        db.session.commit()
+
+        generate({'articles': 40, 'visits': 0, 'comments': 0, 'bookings': 0}, seed=7, echo=quiet)
+        second = [(a.title, a.status) for a in Article.query.order_by(Article.id)]
+        assert first == second
+
+
+class TestBenchmark:
+    """Runner and report tests"""
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([], 50) is None
+
+    def test_scenarios_report_latency_and_queries(self, app, db):
+        """Test that scenarios run against the test client and count queries"""
+        generate(SMALL_COUNTS, echo=quiet)
+        ids = [a.id for a in Article.query.filter_by(status='approved', is_draft=False)]
+        context = Context(ids, BENCH_ADMIN_USERNAME, BENCH_ADMIN_PASSWORD, 42)
+
+        for name in ('blog', 'read_more', 'admin_dashboard'):
+            result = run_scenario(name, lambda: FlaskDriver(app), context, iterations=3, concurrency=1, warmup=1)
+            assert result['errors'] == 0, name
+            assert result['statuses'].get('200'), name
+            assert result['latency_ms']['p95'] >= result['latency_ms']['p50'] > 0
+            assert result['queries_per_request']['mean'] > 0
+
+    def test_compare(self):
+        """Test the comparison table against a baseline report"""
+        def report(p50, rps):
+            return {'scenarios': {'blog': {
+                'latency_ms': {'p50': p50, 'p95': p50 * 2},
+                'throughput_rps': rps,
+                'queries_per_request': {'mean': 4},
+            }}}
+
+        lines = compare(report(10.0, 50.0), report(20.0, 25.0))
+        assert 'blog' in lines[1]
+        assert '20->10 (-50%)' in lines[1]
@@ -0,0 +1,167 @@
+"""
+Test suite for the category table and cached facet counts
+Run with: python -m pytest test_categories.py
+"""
+
+import pytest
+from sqlalchemy import insert, text
+
+from models import DEFAULT_CATEGORIES, Article, Category
+from query_instrumentation import capture_queries
+
+
+def count_of(name):
+    category = Category.query.filter_by(name=name).first()
+    return category.article_count if category else None
+
+
+class TestCountMaintenance:
+    """Test that article writes keep article_count current"""
+
+    def test_insert(self, app, db, make_article):
+        make_article()
+        make_article()
+        make_article(status='pending')
+        assert count_of('Corporate Law') == 2
+
+    def test_status_change(self, app, db, make_article):
+        article = make_article(status='pending')
+        assert count_of('Corporate Law') == 0
+
+        article.status = 'approved'
+        db.session.commit()
+        assert count_of('Corporate Law') == 1
+
+        article.status = 'disapproved'
+        db.session.commit()
+        assert count_of('Corporate Law') == 0
+
+    def test_category_change_updates_both(self, app, db, make_article):
+        article = make_article()
+        article.category = 'Tort Law'
+        db.session.commit()
+        assert count_of('Corporate Law') == 0
+        assert count_of('Tort Law') == 1
+
+    def test_drafts_and_soft_deletes_not_counted(self, app, db, make_article):
+        make_article(is_draft=True)
+        article = make_article()
+        assert count_of('Corporate Law') == 1
+
+        article.soft_delete()
+        db.session.commit()
+        assert count_of('Corporate Law') == 0
+
+    def test_delete(self, app, db, make_article):
+        article = make_article()
+        db.session.delete(article)
+        db.session.commit()
+        assert count_of('Corporate Law') == 0
+
+    def test_unrelated_update_skips_refresh(self, app, db, make_article):
+        article = make_article()
+        article.title = 'Renamed'
+        with capture_queries() as stats:
+            db.session.commit()
+        assert not any('category SET' in sql or 'FROM category' in sql
+                       for sql, _, _ in stats.worst_statements(limit=10))
+
+    def test_unpublished_write_skips_related_refresh(self, app, db, make_article):
+        """Test that a pending submission locks no services and rewrites no related articles"""
+        make_article(status='pending')  # Creates the category row
+        with capture_queries() as stats:
+            make_article(status='pending')
+        statements = [sql for sql, _, _ in stats.worst_statements(limit=20)]
+        assert not any('service' in sql for sql in statements)
+        assert not any('UPDATE category' in sql for sql in statements)
+
+    def test_rollback(self, app, db, make_article):
+        article = make_article()
+        article.status = 'pending'
+        db.session.flush()
+        assert count_of('Corporate Law') == 0
+        db.session.rollback()
+        assert count_of('Corporate Law') == 1
+
+    def test_counts_adjusted_not_recounted(self, app, db, make_article):
+        """Test that writes apply deltas, so a concurrent writer's increment is not overwritten"""
+        article = make_article(status='pending')
+        make_article()
+        # Another transaction's committed article, not visible to this one's recount
+        db.session.execute(text("UPDATE category SET article_count = article_count + 1 "
+                                "WHERE name = 'Corporate Law'"))
+        db.session.commit()
+
+        article.status = 'approved'
+        db.session.commit()
+        assert count_of('Corporate Law') == 3
+
+        article.category = 'Family Law'
+        db.session.commit()
+        assert (count_of('Corporate Law'), count_of('Family Law')) == (2, 1)
+
+    def test_refresh_after_bulk_insert(self, app, db):
+        """Test that refresh_counts repairs counts after Core inserts"""
+        db.session.execute(insert(Article.__table__), [
+            {'title': f'Bulk {i}', 'content': 'Body', 'author': 'A', 'email': 'a@example.com',
+             'category': 'Tax Law', 'status': 'approved', 'is_draft': False}
+            for i in range(3)
+        ])
+        assert count_of('Tax Law') is None
+
+        Category.refresh_counts()
+        assert count_of('Tax Law') == 3
+        assert Category.facet_counts() == {'Tax Law': 3}
+
+
+class TestCategoryReads:
+    """Test the readers of the category table"""
+
+    def test_ensure_defaults(self, app, db, make_article):
+        make_article(category='General')
+        Category.ensure_defaults()
+        names = {name for name, _ in Category.choices()}
+        assert names == set(DEFAULT_CATEGORIES) | {'General'}
+        assert count_of('General') == 1
+
+    def test_choices_fall_back_to_defaults(self, app, db):
+        assert [name for name, _ in Category.choices()] == list(DEFAULT_CATEGORIES)
+
+    def test_blog_sidebar_reads_category_table(self, app, db, client, make_article):
+        make_article(category='Tax Law', title='Tax')
+        make_article(category='Cyber Law', status='pending')
+        Category.ensure_defaults()
+
+        with capture_queries() as stats:
+            response = client.get('/blog')
+        assert response.status_code == 200
+        statements = [sql for sql, _, _ in stats.worst_statements(limit=10)]
+        assert not any('DISTINCT' in sql for sql in statements)
+        assert any('FROM category' in sql for sql in statements)
+
+        html = response.get_data(as_text=True)
+        assert 'Tax Law (1)' in html
+        assert 'Cyber Law' not in html
+
+    def test_category_filter(self, app, db, client, make_article):
+        make_article(category='Tax Law', title='Taxing matters')
+        make_article(category='Tort Law', title='Torts explained')
+        response = client.get('/blog?category=Tax+Law')
+        assert b'Taxing matters' in response.data
+        assert b'Torts explained' not in response.data
+
+    def test_submit_form_uses_table(self, app, db, client):
+        Category.ensure_defaults()
+        db.session.add(Category(name='Maritime Law'))
+        db.session.commit()
+
+        response = client.get('/submit')
+        assert b'value="Maritime Law"' in response.data
+
+    def test_facet_query_uses_status_category_index(self, app, db):
+        """Test that facet counts are answered from idx_article_status_category"""
+        statement = db.select(Article.category, db.func.count(Article.id)) \
+            .where(*Article.published_criteria()).group_by(Article.category)
+        sql = str(statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        plan = ' '.join(row[3] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql)))
+        assert 'idx_article_status_category' in plan
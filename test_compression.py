@@ -0,0 +1,140 @@
+"""
+Test suite for response compression and precompressed static files
+Run with: python -m pytest test_compression.py
+"""
+
+import gzip
+import os
+
+import brotli
+import pytest
+
+from compression import Compressor, get_compressor, precompress_static
+from extensions import db as _db
+
+CSS = b'.card { margin: 0 auto; padding: 1rem; }\n' * 200
+
+
+def get(client, path, accept=None):
+    headers = {'Accept-Encoding': accept} if accept else {}
+    return client.get(path, headers=headers)
+
+
+class TestDynamicResponses:
+    """Test compression of rendered pages"""
+
+    def test_brotli_preferred(self, client):
+        plain = get(client, '/blog')
+        response = get(client, '/blog', 'gzip, deflate, br')
+        assert response.headers['Content-Encoding'] == 'br'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert brotli.decompress(response.data) == plain.data
+        assert len(response.data) < len(plain.data) * 0.3
+
+    def test_gzip_fallback(self, client):
+        plain = get(client, '/blog')
+        response = get(client, '/blog', 'gzip')
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.data) == plain.data
+        assert int(response.headers['Content-Length']) == len(response.data)
+
+    def test_identity_without_accept_encoding(self, client):
+        response = get(client, '/blog')
+        assert 'Content-Encoding' not in response.headers
+        assert 'Accept-Encoding' in response.headers['Vary']
+
+    def test_refused_encoding(self, client):
+        response = get(client, '/blog', 'br;q=0, gzip;q=0')
+        assert 'Content-Encoding' not in response.headers
+
+    def test_small_responses_untouched(self, app_factory):
+        app = app_factory(COMPRESSION_MIN_SIZE=10 ** 7)
+        with app.app_context():
+            _db.create_all()
+            response = get(app.test_client(), '/blog', 'br')
+            _db.session.remove()
+            _db.drop_all()
+        assert 'Content-Encoding' not in response.headers
+        assert 'Vary' not in response.headers or 'Accept-Encoding' not in response.headers['Vary']
+
+    def test_repeated_body_compressed_once(self, app, client):
+        compressor = get_compressor()
+        get(client, '/blog', 'br')
+        misses = compressor.misses
+        get(client, '/blog', 'br')
+        assert compressor.misses == misses
+        assert compressor.hits >= 1
+
+
+class TestCompressor:
+    """Test the compressed-body cache"""
+
+    def test_bounded_lru(self):
+        compressor = Compressor(cache_entries=2)
+        for body in (b'a' * 2000, b'b' * 2000, b'c' * 2000):
+            compressor.compress(body, 'gzip')
+        assert len(compressor) == 2
+        compressor.compress(b'a' * 2000, 'gzip')  # Evicted
+        assert compressor.misses == 4
+
+    def test_encodings_cached_separately(self):
+        compressor = Compressor()
+        body = b'<p>Repeated</p>' * 100
+        assert gzip.decompress(compressor.compress(body, 'gzip')) == body
+        assert brotli.decompress(compressor.compress(body, 'br')) == body
+        assert compressor.misses == 2
+
+    def test_disabled(self, app_factory):
+        app = app_factory(COMPRESSION_ENABLED=False)
+        with app.app_context():
+            assert get_compressor() is None
+
+
+class TestStaticFiles:
+    """Test build-time compression of static files"""
+
+    @pytest.fixture
+    def static_dir(self, app, tmp_path):
+        (tmp_path / 'css').mkdir()
+        (tmp_path / 'css' / 'site.css').write_bytes(CSS)
+        (tmp_path / 'logo.png').write_bytes(b'\x89PNG' + os.urandom(4096))
+        original = app.static_folder
+        app.static_folder = str(tmp_path)
+        yield tmp_path
+        app.static_folder = original
+
+    def test_precompress(self, static_dir):
+        result = precompress_static(str(static_dir))
+        assert (result['files'], result['written']) == (1, 2)
+        assert result['compressed'] < result['original'] * 0.1
+        assert brotli.decompress((static_dir / 'css' / 'site.css.br').read_bytes()) == CSS
+        assert gzip.decompress((static_dir / 'css' / 'site.css.gz').read_bytes()) == CSS
+        assert not (static_dir / 'logo.png.br').exists()
+        assert precompress_static(str(static_dir))['written'] == 0  # Up to date
+
+    def test_serves_sibling(self, client, static_dir):
+        precompress_static(str(static_dir))
+        response = get(client, '/static/css/site.css', 'gzip, br')
+        assert response.headers['Content-Encoding'] == 'br'
+        assert response.mimetype == 'text/css'
+        assert brotli.decompress(response.get_data()) == CSS
+
+        response = get(client, '/static/css/site.css', 'gzip')
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.get_data()) == CSS
+
+    def test_stale_sibling_ignored(self, client, static_dir):
+        precompress_static(str(static_dir))
+        stylesheet = static_dir / 'css' / 'site.css'
+        stylesheet.write_bytes(CSS + b'.new {}\n')
+        later = os.path.getmtime(stylesheet.with_suffix('.css.br')) + 10
+        os.utime(stylesheet, (later, later))
+
+        response = get(client, '/static/css/site.css', 'br')
+        assert 'Content-Encoding' not in response.headers
+        assert response.get_data().endswith(b'.new {}\n')
+
+    def test_without_sibling(self, client, static_dir):
+        response = get(client, '/static/css/site.css', 'br')
+        assert 'Content-Encoding' not in response.headers
+        assert response.get_data() == CSS
@@ -0,0 +1,228 @@
+"""
+Test suite for "readers also read" co-visitation lists
+Run with: python -m pytest test_covisitation.py
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import covisitation
+from covisitation import CovisitationMatrix, build_covisitation, _pairs_within
+from models import Article, ArticleCovisit, Visit
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def articles(db):
+    created = [Article(title=f'Article {number}', content='Body', author='Author',
+                       email='author@example.com', status='approved') for number in range(5)]
+    db.session.add_all(created)
+    db.session.commit()
+    return created
+
+
+def visit(db, article, reader, minutes=0, session_only=False):
+    db.session.add(Visit(
+        article_id=article.id, timestamp=START + timedelta(minutes=minutes),
+        visitor_hash=None if session_only else reader, session_id=f'session-{reader}'
+    ))
+    db.session.commit()
+
+
+def build(db, path, **options):
+    options.setdefault('min_readers', 1)
+    return build_covisitation(db.engine, str(path), **options)
+
+
+def stored(article):
+    return [(row.other_id, row.readers)
+            for row in ArticleCovisit.query.filter_by(article_id=article.id).order_by(ArticleCovisit.rank)]
+
+
+class TestCovisitationMatrix:
+    """Test the compact pair-count arrays"""
+
+    def test_fold_merges_counts(self):
+        matrix = CovisitationMatrix()
+        matrix.add(_pairs_within([1, 2, 3]))
+        matrix.fold()
+        matrix.add(_pairs_within([2, 1]))
+        matrix.fold()
+        assert matrix.keys.dtype == np.int64
+        assert dict(zip(matrix.keys.tolist(), matrix.counts.tolist())) == {
+            (1 << 32) | 2: 2, (1 << 32) | 3: 1, (2 << 32) | 3: 1
+        }
+
+    def test_top_lists(self):
+        matrix = CovisitationMatrix()
+        for reader in ([1, 2, 3], [1, 2], [1, 4]):
+            matrix.add(_pairs_within(reader))
+        assert matrix.top_lists(2) == {1: [(2, 2), (3, 1)], 2: [(1, 2), (3, 1)], 3: [(1, 1), (2, 1)], 4: [(1, 1)]}
+        assert matrix.top_lists(5, min_count=2) == {1: [(2, 2)], 2: [(1, 2)]}
+        assert matrix.top_lists(5, article_ids={4, 9}) == {4: [(1, 1)], 9: []}
+
+    def test_save_and_load(self, tmp_path):
+        matrix = CovisitationMatrix(high_water_mark=42, recent_ids=np.array([40, 42]))
+        matrix.add(_pairs_within([7, 8]))
+        matrix.save(str(tmp_path / 'state.npz'))
+        loaded = CovisitationMatrix.load(str(tmp_path / 'state.npz'))
+        assert loaded.keys.tolist() == matrix.keys.tolist()
+        assert loaded.high_water_mark == 42
+        assert loaded.recent_ids.tolist() == [40, 42]
+
+
+class TestBuild:
+    """Test the batch job against the Visit table"""
+
+    def test_full_build(self, app, db, articles, tmp_path):
+        first, second, third = articles[:3]
+        for reader in ('alice', 'bob'):
+            visit(db, first, reader)
+            visit(db, second, reader, minutes=1)
+        visit(db, first, 'carol')
+        visit(db, third, 'carol', minutes=1)
+        visit(db, first, 'carol', minutes=2)  # Repeat views count once
+
+        result = build(db, tmp_path / 'state.npz')
+        assert result == {'readers': 3, 'lists': 3}
+        assert stored(first) == [(second.id, 2), (third.id, 1)]
+        assert stored(third) == [(first.id, 1)]
+
+    def test_min_readers(self, app, db, articles, tmp_path):
+        visit(db, articles[0], 'alice')
+        visit(db, articles[1], 'alice', minutes=1)
+        build(db, tmp_path / 'state.npz', min_readers=2)
+        assert ArticleCovisit.query.count() == 0
+
+    def test_incremental_from_high_water_mark(self, app, db, articles, tmp_path):
+        first, second, third, fourth = articles[:4]
+        visit(db, first, 'alice')
+        visit(db, second, 'alice', minutes=1)
+        visit(db, third, 'bob', minutes=2)
+        build(db, tmp_path / 'state.npz')
+
+        # Alice reads a third article; Dave is new
+        visit(db, third, 'alice', minutes=10)
+        visit(db, fourth, 'dave', minutes=11)
+        visit(db, first, 'dave', minutes=12)
+        result = build(db, tmp_path / 'state.npz')
+
+        assert result['readers'] == 2
+        assert stored(first) == [(second.id, 1), (third.id, 1), (fourth.id, 1)]
+        assert stored(third) == [(first.id, 1), (second.id, 1)]
+        assert build(db, tmp_path / 'state.npz') == {'readers': 0, 'lists': 0}
+
+        # A full recount agrees with the incremental result
+        build(db, tmp_path / 'state.npz', full=True)
+        assert stored(first) == [(second.id, 1), (third.id, 1), (fourth.id, 1)]
+
+    def test_state_saved_after_commit(self, app, db, articles, tmp_path, monkeypatch):
+        """Test that a run whose lists are not committed leaves the saved state alone"""
+        first, second, third = articles[:3]
+        visit(db, first, 'alice')
+        visit(db, second, 'alice', minutes=1)
+        path = tmp_path / 'state.npz'
+        build(db, path)
+        visit(db, third, 'alice', minutes=2)
+
+        store = covisitation._store
+
+        def failing_store(connection, lists):
+            store(connection, lists)
+            raise RuntimeError('commit failed')
+
+        monkeypatch.setattr(covisitation, '_store', failing_store)
+        with pytest.raises(RuntimeError):
+            build(db, path)
+        assert CovisitationMatrix.load(str(path)).high_water_mark == 2
+        assert stored(first) == [(second.id, 1)]
+
+        # The next run counts the same visits again
+        monkeypatch.setattr(covisitation, '_store', store)
+        assert build(db, path)['readers'] == 1
+        assert stored(first) == [(second.id, 1), (third.id, 1)]
+
+    def test_late_commit_below_mark_counted_once(self, app, db, articles, tmp_path):
+        """Test that a visit committed after a run, with an id below the mark, is still counted"""
+        first, second, third = articles[:3]
+        visit(db, first, 'alice')
+        visit(db, second, 'alice', minutes=1)
+        late_id = Visit.query.count() + 1  # Assigned to a visit whose commit is delayed...
+        db.session.add(Visit(id=late_id + 1, article_id=first.id, timestamp=START + timedelta(minutes=2),
+                             visitor_hash='bob', session_id='session-bob'))
+        db.session.commit()  # ...while a later id commits first
+        build(db, tmp_path / 'state.npz')
+        assert stored(first) == [(second.id, 1)]
+
+        # The delayed visit finally commits, stamped before the run
+        db.session.execute(Visit.__table__.insert().values(
+            id=late_id, article_id=third.id, timestamp=START, visitor_hash='alice', session_id='session-alice'
+        ))
+        db.session.commit()
+        assert build(db, tmp_path / 'state.npz')['readers'] == 1
+        assert stored(third) == [(first.id, 1), (second.id, 1)]
+        assert stored(first) == [(second.id, 1), (third.id, 1)]
+
+        # Re-reading the overlap does not count anything twice
+        assert build(db, tmp_path / 'state.npz') == {'readers': 0, 'lists': 0}
+        build(db, tmp_path / 'state.npz', full=True)
+        assert stored(first) == [(second.id, 1), (third.id, 1)]
+
+    def test_timestamp_mark_from_older_state(self, app, db, articles, tmp_path):
+        """Test that a state file saved with a timestamp mark is resolved to a visit id"""
+        visit(db, articles[0], 'alice')
+        visit(db, articles[1], 'alice', minutes=1)
+        path = str(tmp_path / 'state.npz')
+        build(db, path)
+        matrix = CovisitationMatrix.load(path)
+        np.savez(path, keys=matrix.keys, counts=matrix.counts,
+                 high_water_mark=np.array((START + timedelta(minutes=1)).isoformat()))
+
+        visit(db, articles[2], 'alice', minutes=5)
+        assert build(db, path)['readers'] == 1
+        assert stored(articles[2]) == [(articles[0].id, 1), (articles[1].id, 1)]
+
+    def test_sessions_without_visitor_hash(self, app, db, articles, tmp_path):
+        visit(db, articles[0], 'anon', session_only=True)
+        visit(db, articles[1], 'anon', minutes=1, session_only=True)
+        build(db, tmp_path / 'state.npz')
+        assert stored(articles[0]) == [(articles[1].id, 1)]
+
+    def test_small_buffers_same_result(self, app, db, articles, tmp_path, monkeypatch):
+        """Test that folding the pair buffer often does not change counts"""
+        monkeypatch.setattr(covisitation, 'PAIR_BUFFER_SIZE', 1)
+        monkeypatch.setattr(covisitation, 'FETCH_SIZE', 2)
+        for number, reader in enumerate(('alice', 'bob', 'carol')):
+            for offset, article in enumerate(articles[:3]):
+                visit(db, article, reader, minutes=number * 10 + offset)
+        build(db, tmp_path / 'state.npz')
+        assert stored(articles[0]) == [(articles[1].id, 3), (articles[2].id, 3)]
+
+    def test_reader_cap(self, app, db, articles, tmp_path, monkeypatch):
+        monkeypatch.setattr(covisitation, 'MAX_ARTICLES_PER_VISITOR', 2)
+        for minutes, article in enumerate(articles[:3]):
+            visit(db, article, 'crawler', minutes=minutes)
+        build(db, tmp_path / 'state.npz')
+        assert stored(articles[0]) == [(articles[1].id, 1)]
+        assert stored(articles[2]) == []
+
+
+class TestArticlePage:
+    """Test the readers-also-read card"""
+
+    def test_read_more_shows_list(self, app, db, client, articles, tmp_path):
+        first, second, third = articles[:3]
+        visit(db, first, 'alice')
+        visit(db, second, 'alice', minutes=1)
+        visit(db, third, 'alice', minutes=2)
+        third.status = 'disapproved'
+        db.session.commit()
+        build(db, tmp_path / 'state.npz')
+
+        response = client.get(f'/read/{first.id}')
+        assert b'Readers Also Read' in response.data
+        assert b'Article 1' in response.data
+        assert b'Article 2' not in response.data
@@ -0,0 +1,135 @@
+"""
+Test suite for streaming admin data exports
+Run with: python -m pytest test_exports.py
+"""
+
+import csv
+import io
+import json
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from exports import EXPORTS, export_chunks, parse_day
+from models import Message, User, Visit
+
+
+@pytest.fixture
+def admin_client(app, db, client):
+    admin = User(username='admin', email='admin@example.com',
+                 password=generate_password_hash('secret'), is_admin=True)
+    db.session.add(admin)
+    db.session.commit()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin.id)
+        session['_fresh'] = True
+    return client
+
+
+def add_messages(db, days):
+    for number, day in enumerate(days):
+        db.session.add(Message(name=f'Sender {number}', email=f's{number}@example.com',
+                               message=f'Message {number}', date_sent=datetime(2026, 3, day, 12)))
+    db.session.commit()
+
+
+def add_visits(db, count, article_id=1):
+    started = datetime(2026, 1, 1)
+    db.session.execute(Visit.__table__.insert(), [
+        {'article_id': article_id, 'timestamp': started + timedelta(seconds=number), 'duration_seconds': 0,
+         'user_agent': 'Mozilla/5.0 ' + 'x' * 200}
+        for number in range(count)
+    ])
+    db.session.commit()
+
+
+class TestExportEndpoint:
+    """Test the admin export route"""
+
+    def test_csv(self, db, admin_client):
+        add_messages(db, [1, 2])
+        response = admin_client.get('/admin/export?dataset=messages&format=csv')
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == 'text/csv'
+        assert response.headers['Content-Disposition'] == 'attachment; filename="messages.csv"'
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        assert [row['name'] for row in rows] == ['Sender 0', 'Sender 1']  # Oldest first
+        assert rows[0]['date_sent'] == '2026-03-01T12:00:00'
+
+    def test_ndjson_date_range(self, db, admin_client):
+        add_messages(db, [1, 2, 3, 4])
+        response = admin_client.get('/admin/export?dataset=messages&format=ndjson&start=2026-03-02&end=2026-03-03')
+        assert response.mimetype == 'application/x-ndjson'
+        assert response.headers['Content-Disposition'] == (
+            'attachment; filename="messages_2026-03-02_2026-03-03.ndjson"'
+        )
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [record['name'] for record in records] == ['Sender 1', 'Sender 2']  # End day included
+        assert set(records[0]) == set(EXPORTS['messages'].columns)
+
+    @pytest.mark.parametrize('query, status', [
+        ('dataset=users', 404),
+        ('dataset=visits&format=xlsx', 404),
+        ('dataset=visits&start=yesterday', 400),
+        ('dataset=visits&start=2026-02-01&end=2026-01-01', 400),
+    ])
+    def test_rejects_bad_requests(self, admin_client, query, status):
+        assert admin_client.get(f'/admin/export?{query}').status_code == status
+
+    def test_admin_only(self, client):
+        response = client.get('/admin/export?dataset=visits')
+        assert response.status_code in (302, 401, 403)
+
+    @pytest.mark.parametrize('dataset', sorted(EXPORTS))
+    def test_every_dataset_exports(self, admin_client, dataset):
+        header = admin_client.get(f'/admin/export?dataset={dataset}').get_data(as_text=True)
+        assert header.strip() == ','.join(EXPORTS[dataset].columns)
+
+    def test_messages_page_paginated(self, db, admin_client):
+        add_messages(db, range(1, 26))
+        page = admin_client.get('/admin/messages').get_data(as_text=True)
+        assert 'Sender 24' in page and 'Sender 4' not in page
+        assert 'cursor=' in page
+
+
+class TestStreaming:
+    """Test chunking, escaping and memory use"""
+
+    def test_one_chunk_per_batch(self, app, db):
+        add_visits(db, 250)
+        chunks = list(export_chunks(db.engine, 'visits', 'csv', batch_size=100))
+        assert len(chunks) == 1 + 3  # Header, then 100 + 100 + 50 rows
+        assert sum(chunk.count('\n') for chunk in chunks) == 251
+
+    def test_formula_cells_neutralised(self, app, db):
+        db.session.add(Message(name='=HYPERLINK("http://evil")', email='e@example.com', message='-2+3',
+                               date_sent=datetime(2026, 3, 1)))
+        db.session.commit()
+        row = list(csv.reader(export_chunks(db.engine, 'messages', 'csv')))[1]
+        assert row[2] == '\'=HYPERLINK("http://evil")'
+        assert row[4] == "'-2+3"
+
+        record = json.loads(''.join(export_chunks(db.engine, 'messages', 'ndjson')))
+        assert record['name'] == '=HYPERLINK("http://evil")'
+
+    def test_memory_flat_in_row_count(self, app, db):
+        def peak(rows):
+            db.session.execute(Visit.__table__.delete())
+            add_visits(db, rows)
+            tracemalloc.start()
+            for _ in export_chunks(db.engine, 'visits', 'ndjson', batch_size=200):
+                pass
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return peak_bytes
+
+        assert peak(20000) < peak(2000) * 2
+
+    def test_parse_day(self):
+        assert parse_day('2026-01-31') == date(2026, 1, 31)
+        assert parse_day('') is None
+        with pytest.raises(ValueError):
+            parse_day('31/01/2026')
@@ -0,0 +1,155 @@
+"""
+Test suite for the logging pipeline
+Run with: python -m pytest test_logging.py
+"""
+
+import json
+import logging
+
+from logger import JsonFormatter, NonBlockingQueueHandler, RequestIdFilter, SamplingFilter, parse_sample_rates, setup_logging
+
+
+def make_record(name='blueprints.public', level=logging.INFO, msg='Home page accessed'):
+    return logging.LogRecord(name, level, __file__, 1, msg, None, None)
+
+
+class TestJsonFormatter:
+    """JSON formatter tests"""
+
+    def test_fields_and_extra(self):
+        """Test that records become one JSON object including extra fields"""
+        record = make_record(msg='Article %s approved')
+        record.args = (7,)
+        record.request_id = 'abc123'
+        record.article_id = 7
+
+        entry = json.loads(JsonFormatter().format(record))
+        assert entry['message'] == 'Article 7 approved'
+        assert entry['level'] == 'INFO'
+        assert entry['logger'] == 'blueprints.public'
+        assert entry['request_id'] == 'abc123'
+        assert entry['article_id'] == 7
+
+
+class TestSampling:
+    """Sampling filter tests"""
+
+    def test_parse_rates(self):
+        """Test LOG_SAMPLE_RATES parsing"""
+        assert parse_sample_rates('blueprints.public=0.1, bad, x=2') == {'blueprints.public': 0.1, 'x': 1.0}
+        assert parse_sample_rates('') == {}
+
+    def test_rates_apply_to_info_only(self):
+        """Test that noisy INFO lines are dropped while warnings are kept"""
+        sampler = SamplingFilter({'blueprints.public': 0.0})
+        assert not sampler.filter(make_record())
+        assert sampler.filter(make_record(level=logging.WARNING))
+        assert sampler.filter(make_record(name='blueprints.admin'))
+
+    def test_child_loggers_inherit_rate(self):
+        """Test that the closest configured parent rate is used"""
+        sampler = SamplingFilter({'blueprints': 0.5, 'blueprints.public': 0.1})
+        assert sampler.rate_for('blueprints.public.views') == 0.1
+        assert sampler.rate_for('blueprints.auth') == 0.5
+        assert sampler.rate_for('email_utils') == 1.0
+
+
+class TestRequestIds:
+    """Request-id correlation tests"""
+
+    def test_generated_and_echoed(self, client):
+        """Test that responses carry a request id"""
+        response = client.get('/')
+        assert len(response.headers['X-Request-ID']) == 32
+
+    def test_incoming_id_reused(self, client):
+        """Test that a well-formed upstream id is kept and junk is replaced"""
+        assert client.get('/', headers={'X-Request-ID': 'edge-42'}).headers['X-Request-ID'] == 'edge-42'
+        assert client.get('/', headers={'X-Request-ID': 'bad id;x'}).headers['X-Request-ID'] != 'bad id;x'
+        assert len(client.get('/', headers={'X-Request-ID': 'a' * 500}).headers['X-Request-ID']) == 32
+
+    def test_filter_attaches_id(self, app):
+        """Test that records logged inside a request get its id"""
+        with app.test_request_context('/'):
+            from flask import g
+            g.request_id = 'req-1'
+            record = make_record()
+            RequestIdFilter().filter(record)
+        assert record.request_id == 'req-1'
+
+
+class TestQueuePipeline:
+    """Queue handler / listener tests"""
+
+    def test_records_written_by_listener(self, app, tmp_path):
+        """Test that production logging writes JSON lines through the queue"""
+        import logger as logger_module
+
+        log_file = tmp_path / 'app.log'
+        app.debug = False
+        app.config.update(LOG_FILE=str(log_file), LOG_FORMAT='json', LOG_SAMPLE_RATES='')
+        setup_logging(app)
+        try:
+            logging.getLogger('blueprints.admin').info('Queued message')
+        finally:
+            logger_module._stop_pipeline()
+
+        messages = [json.loads(line)['message'] for line in log_file.read_text().splitlines()]
+        assert 'Queued message' in messages
+        assert 'Simplylawverse startup' in messages
+
+    def test_exceptions_keep_their_own_key(self, app, tmp_path):
+        """Test that tracebacks reach JsonFormatter as exc_info, not folded into the message"""
+        import logger as logger_module
+
+        log_file = tmp_path / 'app.log'
+        app.debug = False
+        app.config.update(LOG_FILE=str(log_file), LOG_FORMAT='json', LOG_SAMPLE_RATES='')
+        setup_logging(app)
+        try:
+            try:
+                raise ValueError('boom')
+            except ValueError:
+                logging.getLogger('blueprints.admin').exception('Export %s failed', 'visits')
+        finally:
+            logger_module._stop_pipeline()
+
+        entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+        entry = next(e for e in entries if e['message'].startswith('Export'))
+        assert entry['message'] == 'Export visits failed'
+        assert 'ValueError: boom' in entry['exception']
+
+    def test_message_rendered_on_calling_thread(self):
+        """Test that args are formatted before queueing and the original record is untouched"""
+        class Bound:
+            def __str__(self):
+                return 'article 7'
+
+        record = logging.LogRecord('blueprints.admin', logging.ERROR, __file__, 1,
+                                   'Saving %s failed', (Bound(),), (ValueError, ValueError('boom'), None))
+        prepared = NonBlockingQueueHandler(None).prepare(record)
+
+        assert prepared.msg == 'Saving article 7 failed'
+        assert prepared.args is None
+        assert prepared.exc_info is record.exc_info
+        assert record.msg == 'Saving %s failed'
+
+    def test_library_info_filtered(self, app, tmp_path):
+        """Test that library loggers only ship warnings while app loggers keep INFO"""
+        import logger as logger_module
+
+        log_file = tmp_path / 'app.log'
+        app.debug = False
+        app.config.update(LOG_FILE=str(log_file), LOG_FORMAT='json', LOG_SAMPLE_RATES='')
+        setup_logging(app)
+        try:
+            logging.getLogger('sqlalchemy.engine').info('SELECT 1')
+            logging.getLogger('sqlalchemy.engine').warning('Pool overflow')
+            logger_module.get_logger('exports').info('Export started')
+        finally:
+            logger_module._stop_pipeline()
+
+        messages = [json.loads(line)['message'] for line in log_file.read_text().splitlines()]
+        assert 'SELECT 1' not in messages
+        assert 'Pool overflow' in messages
+        assert 'Export started' in messages
@@ -0,0 +1,72 @@
+"""
+Test suite for Prometheus metrics
+Run with: python -m pytest test_metrics.py
+"""
+
+import os
+import subprocess
+import sys
+
+from werkzeug.security import generate_password_hash
+
+from models import User
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def login_admin(client, db):
+    admin = User(username='admin', email='admin@example.com',
+                 password=generate_password_hash('secret'), is_admin=True)
+    db.session.add(admin)
+    db.session.commit()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin.id)
+        session['_fresh'] = True
+
+
+class TestMetricsEndpoint:
+    """/metrics access and content tests"""
+
+    def test_anonymous_forbidden(self, client):
+        """Test that metrics are not public"""
+        assert client.get('/metrics').status_code == 403
+
+    def test_admin_can_scrape(self, client, db):
+        """Test that admins see request histograms"""
+        login_admin(client, db)
+        client.get('/blog')
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        body = response.get_data(as_text=True)
+        assert 'http_request_duration_seconds_bucket{blueprint="public",endpoint="public.blog"' in body
+        assert 'http_request_db_queries_count{endpoint="public.blog"}' in body
+
+    def test_bearer_token(self, app, client):
+        """Test token authentication for scrapers"""
+        app.config['METRICS_TOKEN'] = 'scrape-token'
+        assert client.get('/metrics').status_code == 401
+        response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-token'})
+        assert response.status_code == 200
+
+
+class TestMultiprocess:
+    """Cross-process aggregation tests"""
+
+    def run_python(self, code, env):
+        subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, env=env, check=True)
+
+    def test_samples_aggregate_across_workers(self, tmp_path):
+        """Test that observations from separate processes are merged"""
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+        observe = "from metrics import PAYSTACK_LATENCY; PAYSTACK_LATENCY.labels(operation='verify_transaction').observe(0.2)"
+        self.run_python(observe, env)
+        self.run_python(observe, env)
+
+        output = subprocess.run(
+            [sys.executable, '-c',
+             'from metrics import build_registry; from prometheus_client import generate_latest; '
+             'print(generate_latest(build_registry()).decode())'],
+            cwd=PROJECT_ROOT, env=env, check=True, capture_output=True, text=True
+        ).stdout
+        assert 'paystack_request_duration_seconds_count{operation="verify_transaction"} 2.0' in output
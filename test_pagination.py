@@ -0,0 +1,158 @@
+"""
+Test suite for keyset pagination
+Run with: python -m pytest test_pagination.py
+"""
+
+import re
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from models import Article, Comment, User
+from pagination import cursor_for_page, keyset_paginate, encode_cursor, decode_cursor
+
+
+def make_articles(db, count, same_timestamp=False):
+    """Insert approved articles, newest last"""
+    base = datetime(2026, 1, 1)
+    for i in range(count):
+        posted = base if same_timestamp else base + timedelta(minutes=i)
+        db.session.add(Article(
+            title=f'Article {i}', content='x' * 60, author='Author',
+            email='a@example.com', status='approved', category='General',
+            date_posted=posted
+        ))
+    db.session.commit()
+
+
+class TestCursorTokens:
+    """Cursor encoding tests"""
+
+    def test_round_trip(self, app):
+        """Test that a cursor decodes to the position it encodes"""
+        when = datetime(2026, 3, 1, 12, 30)
+        token = encode_cursor(when, 42, 'next')
+        assert decode_cursor(token) == (when, 42, 'next')
+
+    def test_tampered_cursor_rejected(self, app):
+        """Test that a modified token is treated as no cursor"""
+        token = encode_cursor(datetime(2026, 3, 1), 42, 'next')
+        assert decode_cursor(token[:-2] + 'xx') is None
+        assert decode_cursor('not-a-cursor') is None
+        assert decode_cursor('') is None
+
+
+class TestKeysetPaginate:
+    """Keyset pagination behaviour"""
+
+    def test_walks_all_rows_forward_and_back(self, app, db):
+        """Test that next/prev cursors visit every row exactly once"""
+        make_articles(db, 25)
+        query = Article.query.filter_by(status='approved')
+
+        seen = []
+        pages = []
+        cursor = None
+        while True:
+            page = keyset_paginate(query, Article.date_posted, Article.id, cursor=cursor, per_page=10)
+            pages.append(page)
+            seen.extend(a.id for a in page.items)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        assert [len(p.items) for p in pages] == [10, 10, 5]
+        assert len(seen) == len(set(seen)) == 25
+        assert not pages[0].has_prev
+
+        back = keyset_paginate(query, Article.date_posted, Article.id, cursor=pages[2].prev_cursor, per_page=10)
+        assert [a.id for a in back.items] == [a.id for a in pages[1].items]
+        assert back.has_next and back.has_prev
+
+    def test_ties_on_timestamp_use_id(self, app, db):
+        """Test that rows sharing a timestamp are neither skipped nor repeated"""
+        make_articles(db, 7, same_timestamp=True)
+        query = Article.query
+
+        first = keyset_paginate(query, Article.date_posted, Article.id, per_page=3)
+        second = keyset_paginate(query, Article.date_posted, Article.id, cursor=first.next_cursor, per_page=3)
+        third = keyset_paginate(query, Article.date_posted, Article.id, cursor=second.next_cursor, per_page=3)
+
+        ids = [a.id for p in (first, second, third) for a in p.items]
+        assert ids == sorted(ids, reverse=True)
+        assert len(set(ids)) == 7
+
+    def test_optional_total(self, app, db):
+        """Test that totals are only computed on request"""
+        make_articles(db, 4)
+        assert keyset_paginate(Article.query, Article.date_posted, Article.id).total is None
+        assert keyset_paginate(Article.query, Article.date_posted, Article.id, with_total=True).total == 4
+
+    def test_blog_view_uses_cursor(self, client, db):
+        """Test that the blog renders cursor links instead of page numbers"""
+        make_articles(db, 15)
+        response = client.get('/blog')
+        assert response.status_code == 200
+        assert b'cursor=' in response.data
+        assert b'page=2' not in response.data
+
+    def test_cursor_for_page(self, app, db):
+        """Test that a legacy page number maps to the same rows as walking cursors"""
+        make_articles(db, 25)
+        query = Article.query.filter_by(status='approved')
+        walked = keyset_paginate(query, Article.date_posted, Article.id, per_page=10)
+        walked = keyset_paginate(query, Article.date_posted, Article.id, cursor=walked.next_cursor, per_page=10)
+
+        cursor = cursor_for_page(query, Article.date_posted, Article.id, 2, per_page=10)
+        jumped = keyset_paginate(query, Article.date_posted, Article.id, cursor=cursor, per_page=10)
+        assert [a.id for a in jumped.items] == [a.id for a in walked.items]
+        assert cursor_for_page(query, Article.date_posted, Article.id, 1, per_page=10) is None
+        assert cursor_for_page(query, Article.date_posted, Article.id, 9, per_page=10) is None
+
+    def test_legacy_comment_page_redirects(self, client, db):
+        """Test that /read/<id>/page/<n> redirects to the cursor URL for that page"""
+        make_articles(db, 1)
+        base = datetime(2026, 1, 1)
+        for i in range(15):
+            db.session.add(Comment(article_id=1, name='Reader', email='r@example.com', content=f'Comment {i}',
+                                   date_posted=base + timedelta(minutes=i)))
+        db.session.commit()
+
+        response = client.get('/read/1/page/2')
+        assert response.status_code == 301
+        assert '/read/1?cursor=' in response.headers['Location']
+        page = client.get(response.headers['Location']).get_data(as_text=True)
+        assert 'Comment 4' in page and 'Comment 5' not in page
+
+        assert client.get('/read/1/page/7').headers['Location'].endswith('/read/1')
+
+    def test_legacy_page_argument_redirects(self, client, db):
+        """Test that ?page=N on a listing redirects to its cursor, keeping the other arguments"""
+        make_articles(db, 15)
+        response = client.get('/blog?page=2&category=General')
+        assert response.status_code == 301
+        location = response.headers['Location']
+        assert 'category=General' in location and 'cursor=' in location and 'page=' not in location
+        page = client.get(location).get_data(as_text=True)
+        assert 'Article 2' in page and 'Article 3' not in page
+
+        assert client.get('/blog?page=1').headers['Location'].endswith('/blog')
+
+    def test_dashboard_lists_paginated(self, client, db):
+        """Test that the dashboard's approved list pages by cursor and honours old approved_page links"""
+        make_articles(db, 5)
+        admin = User(username='admin', email='admin@example.com',
+                     password=generate_password_hash('secret'), is_admin=True)
+        db.session.add(admin)
+        db.session.commit()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(admin.id)
+            session['_fresh'] = True
+
+        response = client.get('/admin/dashboard?approved_page=2')
+        assert response.status_code == 301
+        assert 'approved_cursor=' in response.headers['Location']
+        page = client.get(response.headers['Location']).get_data(as_text=True)
+        cards = re.findall(r'<h3 class="font-bold text-law-dark text-sm">(Article \d)', page)
+        assert cards == ['Article 1', 'Article 0']
+        assert 'approved_cursor=' in page  # Link back to the first page
@@ -0,0 +1,127 @@
+"""
+Test suite for the sampling profiler
+Run with: python -m pytest test_profiling.py
+"""
+
+import threading
+import time
+from collections import Counter
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from models import User
+from profiling import (
+    StackSampler, configure_profiling, list_profiles, load_profile, save_profile,
+    slowest_by_endpoint, top_functions
+)
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.fixture
+def profiled_app(app, tmp_path):
+    app.config.update(
+        PROFILING_ENABLED=True, PROFILING_DIR=str(tmp_path), PROFILING_SAMPLE_RATE=0.0,
+        PROFILING_ENDPOINTS=['public.bl*'], PROFILING_MIN_DURATION_MS=0,
+        PROFILING_INTERVAL_MS=1, PROFILING_TOKEN='profile-me'
+    )
+    configure_profiling(app)
+
+    @app.before_request
+    def slow_down():
+        busy_wait(0.02)
+
+    return app
+
+
+class TestStackSampler:
+    """Sampler tests"""
+
+    def test_samples_target_thread(self):
+        """Test that the busy function shows up in collected stacks"""
+        sampler = StackSampler(threading.get_ident(), interval=0.001)
+        sampler.start()
+        busy_wait(0.05)
+        stacks = sampler.stop()
+
+        assert sum(stacks.values()) > 0
+        assert any('busy_wait (test_profiling.py' in stack for stack in stacks)
+
+    def test_top_functions(self):
+        """Test self and total sample attribution"""
+        stacks = Counter({'a;b;c': 3, 'a;b': 1, 'a;d': 2})
+        summary = {frame: (own, total) for frame, own, total in top_functions(stacks)}
+        assert summary['a'] == (0, 6)
+        assert summary['b'] == (1, 4)
+        assert summary['c'] == (3, 3)
+
+
+class TestProfileStorage:
+    """Profile file tests"""
+
+    def test_save_list_and_load(self, tmp_path):
+        """Test round-tripping a profile and grouping by endpoint"""
+        fast = save_profile(str(tmp_path), Counter({'a;b': 2}), {'endpoint': 'public.blog', 'duration_ms': 10})
+        slow = save_profile(str(tmp_path), Counter({'a;c': 5}), {'endpoint': 'public.blog', 'duration_ms': 90})
+
+        groups = slowest_by_endpoint(list_profiles(str(tmp_path)))
+        assert [p['name'] for p in groups[0][1]] == [slow, fast]
+
+        meta, stacks = load_profile(str(tmp_path), slow)
+        assert meta['duration_ms'] == 90
+        assert stacks == Counter({'a;c': 5})
+        assert load_profile(str(tmp_path), '../../etc/passwd') is None
+
+    def test_prunes_oldest(self, tmp_path):
+        """Test that only max_files profiles are kept"""
+        for _ in range(4):
+            save_profile(str(tmp_path), Counter({'a': 1}), {'endpoint': 'x'}, max_files=2)
+            time.sleep(0.002)
+        assert len(list_profiles(str(tmp_path))) == 2
+
+
+class TestMiddleware:
+    """Request selection tests"""
+
+    def test_listed_endpoint_is_profiled(self, profiled_app, tmp_path):
+        """Test that PROFILING_ENDPOINTS requests are captured"""
+        client = profiled_app.test_client()
+        client.get('/blog')
+        client.get('/about')
+
+        profiles = list_profiles(str(tmp_path))
+        assert [p['endpoint'] for p in profiles] == ['public.blog']
+        assert profiles[0]['status'] == 200
+
+    def test_header_token(self, profiled_app, tmp_path):
+        """Test that the profiling header needs the right token"""
+        profiled_app.config['PROFILING_ENDPOINTS'] = []
+        client = profiled_app.test_client()
+        client.get('/blog', headers={'X-Profile': 'wrong'})
+        assert list_profiles(str(tmp_path)) == []
+        client.get('/blog', headers={'X-Profile': 'profile-me'})
+        assert [p['endpoint'] for p in list_profiles(str(tmp_path))] == ['public.blog']
+
+    def test_admin_pages(self, profiled_app, db, tmp_path):
+        """Test the admin listing and detail pages"""
+        admin = User(username='admin', email='admin@example.com',
+                     password=generate_password_hash('secret'), is_admin=True)
+        db.session.add(admin)
+        db.session.commit()
+
+        client = profiled_app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(admin.id)
+            session['_fresh'] = True
+        client.get('/blog')
+        name = list_profiles(str(tmp_path))[0]['name']
+
+        assert b'public.blog' in client.get('/admin/profiles').data
+        assert client.get(f'/admin/profiles/{name}').status_code == 200
+        assert client.get(f'/admin/profiles/{name}/download').status_code == 200
+        assert client.get('/admin/profiles/missing').status_code == 404
@@ -0,0 +1,235 @@
+"""
+Test suite for per-endpoint SQL query budgets
+Run with: python -m pytest test_query_counts.py
+
+Every endpoint is requested against a small dataset and again after the
+dataset has grown. A test fails when the number of statements changes with
+data size (an N+1) or exceeds the budget checked in below. When a change
+legitimately needs more queries, raise the budget in the same commit.
+"""
+
+from datetime import datetime, time, timedelta
+
+import pytest
+from flask import g
+from werkzeug.security import generate_password_hash
+
+import pagination
+from extensions import db as _db
+from models import AdminAvailability, Article, ClientIntake, Comment, ConsultationType, Service, User, Visit
+from query_instrumentation import capture_queries
+from site_stats import invalidate_stats
+from trending_articles import TrendingQuery
+from visit_gate import get_visit_gate
+from visitor_sketches import get_sketch_buffer
+from write_queue import WriteQueue, get_write_queue
+
+ADMIN_PASSWORD = 'budget-secret'
+
+# Maximum SQL statements per request (the logged-in admin comes from the user cache)
+QUERY_BUDGETS = {
+    'public.home': 1,
+    'public.blog': 2,
+    'public.about': 0,
+    'articles.read_more': 6,
+    'services.index': 1,
+    'services.service_detail': 2,
+    'bookings.index': 0,
+    'bookings.select_consultation': 3,
+    'admin.admin_dashboard': 8,
+    'admin.admin_view_article': 3,
+    'admin.approved_articles': 2,
+    'admin.consultations': 2,
+    'trending.get_trending': 1,
+}
+
+
+class Dataset:
+    """Test data that can be grown in steps"""
+
+    def __init__(self, db):
+        self.db = db
+        self.now = datetime.utcnow()
+        self.added = 0
+
+        self.admin = User(username='budget-admin', email='budget@example.com',
+                          password=generate_password_hash(ADMIN_PASSWORD), is_admin=True)
+        self.service = Service(name='Contract Law', slug='contract-law', description='Contracts',
+                               detailed_content='<p>Contracts</p>', who_needs_it='Businesses',
+                               typical_timeline='1 week')
+        self.intake = ClientIntake(full_name='Client', email='client@example.com', phone='08012345678',
+                                   issue_description='Need help reviewing a supplier contract.')
+        db.session.add_all([self.admin, self.service, self.intake])
+        db.session.add(ConsultationType(name='Standard', duration_minutes=30, price_naira=15000,
+                                        description='Standard consultation'))
+        db.session.commit()
+
+        self.article = self.add_article()
+        db.session.commit()
+
+    def add_article(self, status='approved'):
+        self.added += 1
+        article = Article(
+            title=f'Budget article {self.added}', content='Contract clause. ' * 50,
+            author='Author', email='author@example.com', status=status,
+            category='Contract Law', date_posted=self.now - timedelta(hours=self.added)
+        )
+        self.db.session.add(article)
+        return article
+
+    def grow(self, scale):
+        """Add articles, comments with replies, visits and availability windows"""
+        for _ in range(3 * scale):
+            self.add_article()
+        for _ in range(scale):
+            self.add_article(status='pending')
+        self.db.session.flush()
+
+        for i in range(3 * scale):
+            comment = Comment(name='Reader', email='reader@example.com', content='Useful.',
+                              article_id=self.article.id, date_posted=self.now - timedelta(minutes=i))
+            self.db.session.add(comment)
+            self.db.session.flush()
+            for _ in range(2):
+                self.db.session.add(Comment(name='Replier', email='replier@example.com', content='Agreed.',
+                                            article_id=self.article.id, parent_id=comment.id,
+                                            date_posted=self.now))
+
+        for article in Article.query.all():
+            self.db.session.add(Visit(article_id=article.id, timestamp=self.now))
+
+        existing = AdminAvailability.query.count()
+        for day in range(existing + 1, existing + scale + 1):
+            self.db.session.add(AdminAvailability(date=(self.now + timedelta(days=day)).date(),
+                                                  start_time=time(9), end_time=time(12)))
+        self.db.session.commit()
+
+
+def reset_caches():
+    """Drop cached counts so every measurement hits the database"""
+    pagination._total_cache.clear()
+    invalidate_stats()
+    # Forget recent views so article pages always count (and write) a view
+    get_visit_gate().recent.clear()
+
+
+def measure(client, url):
+    """
+    Request a URL and count the statements it issues
+
+    Returns:
+        Tuple of (status_code, QueryStats)
+    """
+    reset_caches()
+    # Requests share the test's app context (session and g); start each one
+    # with an empty identity map and no cached user like a real request would
+    _db.session.remove()
+    g.pop('_login_user', None)
+    with capture_queries() as stats:
+        response = client.get(url)
+    # Let the writer finish before the next request shares the connection
+    get_write_queue().flush(timeout=5)
+    return response.status_code, stats
+
+
+def describe(stats):
+    return '\n'.join(f'  [{count}x] {sql}' for sql, count, _ in stats.worst_statements(limit=20))
+
+
+@pytest.fixture
+def dataset(app, db, monkeypatch):
+    # bookings/select_consultation.html is not in the tree yet; queries are
+    # all issued before rendering, so count them with a stub renderer
+    import blueprints.bookings
+    monkeypatch.setattr(blueprints.bookings, 'render_template', lambda *args, **kwargs: '')
+    # Sketch merges run every VISITOR_SKETCH_FLUSH_SECONDS in production, not per request
+    buffer = get_sketch_buffer()
+    monkeypatch.setattr(buffer, 'flush_interval', 3600)
+    # Views are written by the write queue in production, off the request thread
+    write_queue = app.extensions['write_queue'] = WriteQueue(db.engine).start()
+    yield Dataset(db)
+    write_queue.stop()
+    app.extensions.pop('write_queue')
+    buffer.flush()
+
+
+@pytest.fixture
+def admin_client(app, dataset):
+    client = app.test_client()
+    response = client.post('/admin/login', data={'username': 'budget-admin', 'password': ADMIN_PASSWORD})
+    assert response.status_code == 302
+    return client
+
+
+def endpoint_urls(dataset):
+    return {
+        'public.home': '/',
+        'public.blog': '/blog',
+        'public.about': '/about',
+        'articles.read_more': f'/read/{dataset.article.id}',
+        'services.index': '/services/',
+        'services.service_detail': '/services/contract-law',
+        'bookings.index': '/book/',
+        'bookings.select_consultation': f'/book/select-consultation/{dataset.intake.id}',
+    }
+
+
+def admin_urls(dataset):
+    return {
+        'admin.admin_dashboard': '/admin/dashboard',
+        'admin.admin_view_article': f'/admin/view/{dataset.article.id}',
+        'admin.approved_articles': '/admin/approved-articles',
+        'admin.consultations': '/admin/consultations',
+    }
+
+
+def assert_flat_and_within_budget(client, urls, dataset):
+    small = {}
+    for endpoint, url in urls.items():
+        status, stats = measure(client, url)
+        assert status == 200, f'{endpoint} returned {status}'
+        small[endpoint] = stats
+
+    dataset.grow(scale=5)
+
+    for endpoint, url in urls.items():
+        status, stats = measure(client, url)
+        assert status == 200, f'{endpoint} returned {status}'
+        assert stats.count == small[endpoint].count, (
+            f'{endpoint}: {small[endpoint].count} queries on the small dataset, '
+            f'{stats.count} after growing it (N+1?)\n{describe(stats)}'
+        )
+        assert stats.count <= QUERY_BUDGETS[endpoint], (
+            f'{endpoint}: {stats.count} queries exceeds budget of {QUERY_BUDGETS[endpoint]}\n{describe(stats)}'
+        )
+
+
+class TestQueryBudgets:
+    """Query counts must not grow with data and must stay within budget"""
+
+    def test_public_endpoints(self, app, dataset):
+        """Test public pages, services and the booking flow"""
+        dataset.grow(scale=1)
+        assert_flat_and_within_budget(app.test_client(), endpoint_urls(dataset), dataset)
+
+    def test_admin_endpoints(self, admin_client, dataset):
+        """Test admin pages for a logged-in admin"""
+        dataset.grow(scale=1)
+        assert_flat_and_within_budget(admin_client, admin_urls(dataset), dataset)
+
+    def test_trending(self, app, dataset):
+        """Test that trending scores are computed in a single query"""
+        dataset.grow(scale=1)
+        with capture_queries() as small:
+            TrendingQuery.get_trending()
+        dataset.grow(scale=5)
+        with capture_queries() as large:
+            trending = TrendingQuery.get_trending()
+
+        assert trending[0].id == dataset.article.id  # Most commented
+        assert small.count == large.count <= QUERY_BUDGETS['trending.get_trending']
+
+    def test_budgets_cover_listed_endpoints(self, dataset):
+        """Test that every measured endpoint has a budget"""
+        measured = set(endpoint_urls(dataset)) | set(admin_urls(dataset)) | {'trending.get_trending'}
+        assert measured == set(QUERY_BUDGETS)
@@ -0,0 +1,88 @@
+"""
+Test suite for per-request query instrumentation
+Run with: python -m pytest test_query_instrumentation.py
+"""
+
+import logging
+
+from werkzeug.security import generate_password_hash
+
+from models import Article, User
+from query_instrumentation import capture_queries, normalize_sql
+
+
+class TestNormalizeSql:
+    """SQL normalization tests"""
+
+    def test_literals_replaced(self):
+        """Test that literals and whitespace are normalized"""
+        sql = "SELECT *  FROM article\n WHERE id = 42 AND status = 'approved'"
+        assert normalize_sql(sql) == 'SELECT * FROM article WHERE id = ? AND status = ?'
+
+    def test_in_lists_collapsed(self):
+        """Test that IN lists of any length normalize identically"""
+        assert normalize_sql('WHERE id IN (?, ?, ?)') == normalize_sql('WHERE id IN (?)')
+
+
+class TestCaptureQueries:
+    """Query capture tests"""
+
+    def test_counts_statements(self, app, db):
+        """Test that executed statements are counted and grouped"""
+        with capture_queries() as stats:
+            Article.query.all()
+            Article.query.all()
+            Article.query.count()
+
+        assert stats.count == 3
+        assert len(stats.statements) == 2
+        sql, count, _ = stats.worst_statements(limit=1)[0]
+        assert count in (1, 2)
+
+    def test_nothing_recorded_outside_block(self, app, db):
+        """Test that capture stops when the block exits"""
+        with capture_queries() as stats:
+            pass
+        Article.query.all()
+        assert stats.count == 0
+
+
+class TestServerTiming:
+    """Server-Timing header tests"""
+
+    def test_header_present(self, client):
+        """Test that responses carry db, tpl and total timings"""
+        response = client.get('/blog')
+        timing = response.headers['Server-Timing']
+        assert timing.startswith('db;dur=')
+        assert 'queries"' in timing
+        assert 'tpl;dur=' in timing
+        assert 'total;dur=' in timing
+
+    def test_hidden_from_anonymous_clients(self, app, client):
+        """Test that outside debug only admins see the header unless enabled"""
+        app.config['DEBUG'] = False
+        assert 'Server-Timing' not in client.get('/blog').headers
+
+        app.config['SERVER_TIMING_ENABLED'] = True
+        assert 'Server-Timing' in client.get('/blog').headers
+
+    def test_sent_to_admins(self, app, db, client):
+        """Test that a logged-in admin gets the header outside debug"""
+        app.config['DEBUG'] = False
+        admin = User(username='admin', email='admin@example.com',
+                     password=generate_password_hash('secret'), is_admin=True)
+        db.session.add(admin)
+        db.session.commit()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(admin.id)
+            session['_fresh'] = True
+        assert 'Server-Timing' in client.get('/blog').headers
+
+    def test_slow_request_logged(self, app, client, caplog):
+        """Test that requests over the query threshold are logged"""
+        app.config['SLOW_REQUEST_QUERY_THRESHOLD'] = -1
+
+        with caplog.at_level(logging.WARNING, logger='query_instrumentation'):
+            client.get('/blog')
+        assert any('Slow request GET /blog' in r.getMessage() for r in caplog.records)
@@ -0,0 +1,100 @@
+"""
+Test suite for the shared SQLite rate limit storage
+Run with: python -m pytest test_rate_limit_storage.py
+"""
+
+import sqlite3
+
+import pytest
+from flask import Flask
+from limits import RateLimitItemPerMinute
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+import rate_limit_storage
+from extensions import db as _db
+from rate_limit_storage import SQLiteStorage, benchmark_storage, configure_rate_limit_storage
+
+
+@pytest.fixture
+def uri(tmp_path):
+    return f'sqlite:///{tmp_path / "ratelimit.db"}'
+
+
+@pytest.fixture
+def limited_app(uri, app_factory):
+    """App with rate limiting on, counting in the SQLite storage"""
+    app = app_factory(RATELIMIT_ENABLED=True, RATELIMIT_STORAGE_URI=uri)
+    with app.app_context():
+        _db.create_all()
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+
+
+class TestSQLiteStorage:
+    """Test the counters themselves"""
+
+    def test_registered_scheme(self, uri):
+        storage = storage_from_string(uri)
+        assert isinstance(storage, SQLiteStorage)
+        assert storage.check()
+
+    def test_window_counts_and_expires(self, uri, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr(rate_limit_storage.time, 'time', lambda: clock[0])
+        storage = SQLiteStorage(uri)
+
+        assert [storage.incr('key', 60) for _ in range(3)] == [1, 2, 3]
+        assert storage.incr('key', 60, amount=2) == 5
+        assert storage.get('key') == 5
+        assert storage.get_expiry('key') == 1060
+
+        clock[0] = 1060
+        assert storage.get('key') == 0
+        assert storage.incr('key', 60) == 1  # New window
+        assert storage.get_expiry('key') == 1120
+
+    def test_shared_between_instances(self, uri):
+        first, second = SQLiteStorage(uri), SQLiteStorage(uri)
+        first.incr('shared', 60)
+        assert second.incr('shared', 60) == 2
+
+        second.clear('shared')
+        assert first.get('shared') == 0
+        first.incr('a', 60)
+        first.incr('b', 60)
+        assert second.reset() == 2
+
+    def test_limiter_enforces_limit(self, uri):
+        limiter = FixedWindowRateLimiter(storage_from_string(uri))
+        limit = RateLimitItemPerMinute(3)
+        assert [limiter.hit(limit, 'login', '10.0.0.1') for _ in range(4)] == [True, True, True, False]
+        assert limiter.hit(limit, 'login', '10.0.0.2')
+
+    def test_shared_across_processes(self, uri, tmp_path):
+        result = benchmark_storage(uri, checks=300, processes=2)
+        assert result['checks'] == 600
+        assert result['microseconds_per_check'] > 0
+
+        with sqlite3.connect(tmp_path / 'ratelimit.db') as connection:
+            assert connection.execute('SELECT SUM(hits) FROM ratelimit').fetchone()[0] == 600
+
+
+class TestAppIntegration:
+    """Test the limiter's storage configuration"""
+
+    def test_default_is_instance_sqlite(self, tmp_path):
+        app = Flask(__name__, instance_path=str(tmp_path))
+        configure_rate_limit_storage(app)
+        assert app.config['RATELIMIT_STORAGE_URI'] == f'sqlite:///{tmp_path / "ratelimit.db"}'
+
+        app.config['RATELIMIT_STORAGE_URI'] = 'redis://cache:6379'
+        configure_rate_limit_storage(app)
+        assert app.config['RATELIMIT_STORAGE_URI'] == 'redis://cache:6379'
+
+    def test_login_limit(self, limited_app):
+        client = limited_app.test_client()
+        statuses = [client.get('/admin/login').status_code for _ in range(11)]
+        assert statuses[:10] == [200] * 10
+        assert statuses[10] == 429
@@ -0,0 +1,142 @@
+"""
+Test suite for read-replica routing
+Run with: python -m pytest test_read_replicas.py
+
+Uses two SQLite files as stand-ins for a primary and a replica. The replica
+copy of the article has a different title so tests can tell which database
+answered, and a replica_lag table lets tests simulate replication lag.
+"""
+
+import pytest
+from sqlalchemy import text
+
+from extensions import db as _db
+from models import Article, Comment
+
+
+@pytest.fixture
+def replica_app(tmp_path, app_factory):
+    """App with a primary and one replica SQLite file"""
+    app = app_factory(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "primary.db"}',
+        SQLALCHEMY_REPLICA_URLS=[f'sqlite:///{tmp_path / "replica.db"}'],
+        REPLICA_LAG_QUERY='SELECT lag FROM replica_lag',
+        REPLICA_CHECK_INTERVAL=0,
+        WRITE_QUEUE_ENABLED=False
+    )
+
+    with app.app_context():
+        _db.create_all()
+        replica = app.extensions['read_replicas'].engines['replica_1']
+        _db.metadata.create_all(replica)
+
+        article = dict(id=1, title='Primary copy', content='Body', author='A', email='a@example.com',
+                       status='approved', is_draft=False)
+        with _db.engine.begin() as connection:
+            connection.execute(Article.__table__.insert(), article)
+        with replica.begin() as connection:
+            connection.execute(Article.__table__.insert(), dict(article, title='Replica copy'))
+            connection.execute(text('CREATE TABLE replica_lag (lag FLOAT)'))
+            connection.execute(text('INSERT INTO replica_lag VALUES (0)'))
+
+        yield app
+        _db.session.remove()
+        for engine in app.extensions['read_replicas'].engines.values():
+            engine.dispose()
+        _db.engine.dispose()
+
+
+def set_lag(app, seconds):
+    with app.extensions['read_replicas'].engines['replica_1'].begin() as connection:
+        connection.execute(text('UPDATE replica_lag SET lag = :lag'), {'lag': seconds})
+
+
+def read_title(app, path='/blog', method='GET'):
+    """Title of article 1 as seen by a fresh session inside a request"""
+    _db.session.remove()
+    with app.test_request_context(path, method=method):
+        return _db.session.get(Article, 1).title
+
+
+class TestRouting:
+    """Test which database serves each query"""
+
+    def test_public_get_reads_replica(self, replica_app):
+        """Test that GET requests to public blueprints read from the replica"""
+        assert read_title(replica_app, '/blog') == 'Replica copy'
+        assert read_title(replica_app, '/services/') == 'Replica copy'
+
+    def test_article_page_served_from_replica(self, replica_app):
+        """Test a full request through the articles blueprint"""
+        _db.session.remove()
+        response = replica_app.test_client().get('/read/1')
+        assert response.status_code == 200
+        assert b'Replica copy' in response.data
+
+    def test_writes_and_other_requests_use_primary(self, replica_app):
+        """Test POSTs, other blueprints and code outside requests"""
+        assert read_title(replica_app, '/blog', method='POST') == 'Primary copy'
+        assert read_title(replica_app, '/admin/dashboard') == 'Primary copy'
+
+        _db.session.remove()
+        assert _db.session.get(Article, 1).title == 'Primary copy'
+
+    def test_read_after_write_uses_primary(self, replica_app):
+        """Test that a session sticks to the primary once it has written"""
+        _db.session.remove()
+        with replica_app.test_request_context('/read/1'):
+            assert _db.session.get(Article, 1).title == 'Replica copy'
+
+            _db.session.add(Comment(name='Reader', email='r@example.com', content='Hi', article_id=1))
+            _db.session.flush()
+            _db.session.expire_all()
+
+            assert _db.session.get(Article, 1).title == 'Primary copy'
+            assert Comment.query.count() == 1
+            _db.session.rollback()
+
+        # A new session starts on the replica again
+        assert read_title(replica_app) == 'Replica copy'
+
+    def test_bulk_update_marks_session_as_written(self, replica_app):
+        """Test that Query.update (no flush) also pins the primary"""
+        _db.session.remove()
+        with replica_app.test_request_context('/read/1'):
+            Article.query.filter_by(id=1).update({Article.views: Article.views + 1})
+            assert _db.session.query(Article.views).filter_by(id=1).scalar() == 1
+            _db.session.rollback()
+
+
+class TestLagFallback:
+    """Test that lagging or unreachable replicas are skipped"""
+
+    def test_lagging_replica_falls_back_to_primary(self, replica_app):
+        """Test lag above REPLICA_MAX_LAG_SECONDS"""
+        set_lag(replica_app, 60)
+        assert read_title(replica_app) == 'Primary copy'
+        assert replica_app.extensions['read_replicas'].status()['replica_1'] == {'usable': False, 'lag': 60.0}
+
+        set_lag(replica_app, 0.5)
+        assert read_title(replica_app) == 'Replica copy'
+
+    def test_unreachable_replica_falls_back_to_primary(self, replica_app):
+        """Test a replica whose lag check fails"""
+        with replica_app.extensions['read_replicas'].engines['replica_1'].begin() as connection:
+            connection.execute(text('DROP TABLE replica_lag'))
+
+        assert read_title(replica_app) == 'Primary copy'
+        assert replica_app.extensions['read_replicas'].status()['replica_1']['usable'] is False
+
+    def test_checks_are_cached(self, replica_app):
+        """Test that lag is not re-checked within REPLICA_CHECK_INTERVAL"""
+        replicas = replica_app.extensions['read_replicas']
+        replicas.check_interval = 3600
+        assert read_title(replica_app) == 'Replica copy'
+
+        set_lag(replica_app, 60)
+        assert read_title(replica_app) == 'Replica copy'
+
+    def test_no_replicas_configured(self, app):
+        """Test that the default configuration reads from the primary only"""
+        assert 'read_replicas' not in app.extensions
+        assert list(_db.engines) == [None]
@@ -0,0 +1,103 @@
+"""
+Test suite for service category mapping and precomputed related articles
+Run with: python -m pytest test_service_related.py
+"""
+
+import pytest
+
+from models import Category, Service, ServiceRelatedArticle
+from query_instrumentation import capture_queries
+
+
+@pytest.fixture
+def service(db):
+    Category.ensure_defaults()
+    service = Service(
+        name='Tax Advisory', slug='tax', description='Tax advice', detailed_content='<p>Tax</p>',
+        who_needs_it='Companies', typical_timeline='2 weeks', base_price=50000,
+        categories=Category.query.filter(Category.name.in_(['Corporate Law', 'Commercial Law'])).all()
+    )
+    db.session.add(service)
+    db.session.commit()
+    return service
+
+
+def related_titles(service):
+    return [article.title for article in service.related_articles()]
+
+
+class TestRelatedRefresh:
+    """Test that article writes keep the related lists current"""
+
+    def test_approval_adds_article(self, app, db, service, make_article):
+        article = make_article('Pending tax', status='pending')
+        assert related_titles(service) == []
+
+        article.status = 'approved'
+        db.session.commit()
+        assert related_titles(service) == ['Pending tax']
+
+    def test_most_recent_first_and_limited(self, app, db, service, make_article):
+        for days_ago in range(5):
+            make_article(f'Tax {days_ago}', days_ago=days_ago)
+        make_article('Commercial', category='Commercial Law', days_ago=1.5)
+        assert related_titles(service) == ['Tax 0', 'Tax 1', 'Commercial']
+
+    def test_unmapped_category_ignored(self, app, db, service, make_article):
+        make_article('Family matters', category='Family Law')
+        assert related_titles(service) == []
+
+    def test_disapprove_and_soft_delete_remove(self, app, db, service, make_article):
+        first = make_article('First')
+        second = make_article('Second', days_ago=1)
+        third = make_article('Third', days_ago=2)
+        fourth = make_article('Fourth', days_ago=3)
+        assert related_titles(service) == ['First', 'Second', 'Third']
+
+        first.status = 'disapproved'
+        db.session.commit()
+        assert related_titles(service) == ['Second', 'Third', 'Fourth']
+
+        second.soft_delete()
+        db.session.commit()
+        assert related_titles(service) == ['Third', 'Fourth']
+
+    def test_remap_with_refresh(self, app, db, service, make_article):
+        make_article('Contract', category='Contract Law')
+        service.categories = Category.query.filter_by(name='Contract Law').all()
+        db.session.flush()
+        Service.refresh_related([service.id])
+        db.session.commit()
+        assert related_titles(service) == ['Contract']
+
+    def test_map_default_categories(self, app, db, make_article):
+        db.session.add(Service(
+            name='Company Registration', slug='company-registration', description='CAC',
+            detailed_content='<p>CAC</p>', who_needs_it='Founders', typical_timeline='1 week', base_price=1
+        ))
+        db.session.commit()
+        make_article('Commercial', category='Commercial Law')
+
+        Service.map_default_categories()
+        service = Service.query.filter_by(slug='company-registration').one()
+        assert {category.name for category in service.categories} == {'Corporate Law', 'Commercial Law'}
+        assert related_titles(service) == ['Commercial']
+
+
+class TestServiceDetail:
+    """Test the service page reads the precomputed list"""
+
+    def test_page_shows_related(self, app, db, client, service, make_article):
+        make_article('Tax planning for startups')
+        response = client.get('/services/tax')
+        assert response.status_code == 200
+        assert b'Tax planning for startups' in response.data
+
+    def test_indexed_lookup(self, app, db, client, service, make_article):
+        make_article('Tax planning for startups')
+        with capture_queries() as stats:
+            client.get('/services/tax')
+        statements = [sql for sql, _, _ in stats.worst_statements(limit=10)]
+        assert not any(' LIKE ' in sql.upper() for sql in statements)
+        assert any('service_related_article' in sql for sql in statements)
+        assert ServiceRelatedArticle.query.count() == 1
@@ -0,0 +1,91 @@
+"""
+Test suite for the site statistics service
+Run with: python -m pytest test_site_stats.py
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+
+from models import Article, Visit, ClientIntake
+from site_stats import get_dashboard_stats, get_visit_counts, invalidate_stats
+
+
+def add_article(db, status, is_draft=False):
+    article = Article(
+        title=f'{status} article', content='x' * 60, author='Author',
+        email='a@example.com', status=status, category='General', is_draft=is_draft
+    )
+    db.session.add(article)
+    db.session.commit()
+    return article
+
+
+class TestDashboardStats:
+    """Aggregate count tests"""
+
+    def setup_method(self):
+        invalidate_stats()
+
+    def test_article_counts(self, app, db):
+        """Test per-status counts, with drafts also counted on their own"""
+        for status in ('pending', 'pending', 'approved', 'disapproved', 'archived'):
+            add_article(db, status)
+        add_article(db, 'pending', is_draft=True)
+
+        counts = get_dashboard_stats()['articles']
+        assert counts == {
+            'total': 6, 'draft': 1, 'pending': 3, 'pending_review': 2,
+            'approved': 1, 'disapproved': 1, 'archived': 1,
+        }
+
+    def test_visit_windows(self, app, db):
+        """Test visit counts per time window"""
+        article = add_article(db, 'approved')
+        now = datetime.utcnow()
+        for age in (timedelta(hours=1), timedelta(days=3), timedelta(days=20), timedelta(days=400)):
+            db.session.add(Visit(article_id=article.id, timestamp=now - age))
+        db.session.commit()
+
+        assert get_visit_counts(now) == {
+            'total': 4, 'daily': 1, 'weekly': 2, 'monthly': 3, 'yearly': 3,
+        }
+
+    def test_consultation_counts(self, app, db):
+        """Test consultation counts per status"""
+        for status in ('pending', 'pending', 'scheduled'):
+            db.session.add(ClientIntake(
+                full_name='Client', email='c@example.com', phone='123',
+                issue_description='Issue', status=status
+            ))
+        db.session.commit()
+
+        counts = get_dashboard_stats()['consultations']
+        assert counts['total'] == 3
+        assert counts['pending'] == 2
+        assert counts['scheduled'] == 1
+        assert counts['reviewed'] == 0
+
+    def test_cached_until_invalidated(self, app, db):
+        """Test that results are reused until invalidated"""
+        add_article(db, 'pending')
+        assert get_dashboard_stats()['articles']['pending'] == 1
+
+        add_article(db, 'pending')
+        assert get_dashboard_stats()['articles']['pending'] == 1
+
+        invalidate_stats()
+        assert get_dashboard_stats()['articles']['pending'] == 2
+
+    def test_invalidation_reaches_other_processes(self, app, db, tmp_path):
+        """Test that a stamp newer than the cached result forces a recount"""
+        app.config['STATS_STAMP_FILE'] = str(tmp_path / 'stats.stamp')
+        add_article(db, 'pending')
+        assert get_dashboard_stats()['articles']['pending'] == 1
+
+        add_article(db, 'pending')
+        # Another worker invalidated: its stamp is newer, the local cache is kept
+        stamp = tmp_path / 'stats.stamp'
+        stamp.touch()
+        os.utime(stamp, (time.time(), time.time()))
+        assert get_dashboard_stats()['articles']['pending'] == 2
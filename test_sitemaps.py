@@ -0,0 +1,210 @@
+"""
+Test suite for incrementally regenerated sitemaps and feeds
+Run with: python -m pytest test_sitemaps.py
+"""
+
+import os
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+from flask import Flask
+
+from models import Service
+from sitemaps import (
+    ATOM_NS, INDEX_FILE, PAGES_FILE, RSS_FILE, SITEMAP_NS, configure_sitemaps, get_sitemap_store, shard_file
+)
+
+NS = {'sm': SITEMAP_NS, 'atom': ATOM_NS}
+
+
+@pytest.fixture
+def store(app, tmp_path):
+    store = get_sitemap_store()
+    store.directory = str(tmp_path)
+    store.shard_size = 2
+    return store
+
+
+def locs(response):
+    assert response.status_code == 200
+    return [loc.text for loc in ElementTree.fromstring(response.data).iterfind('.//sm:loc', NS)]
+
+
+class TestSitemaps:
+    """Test the sitemap index and shards"""
+
+    def test_index_lists_shards(self, db, client, store, make_article):
+        for number in range(3):
+            make_article(f'Article {number}')
+        make_article('Pending', status='pending')  # Id 4: shard 1 still has article 3
+
+        assert locs(client.get('/sitemap.xml')) == [
+            'http://localhost/sitemap-pages.xml',
+            'http://localhost/sitemap-articles-0.xml',
+            'http://localhost/sitemap-articles-1.xml',
+        ]
+        assert locs(client.get('/sitemap-articles-0.xml')) == ['http://localhost/read/1', 'http://localhost/read/2']
+        assert locs(client.get('/sitemap-articles-1.xml')) == ['http://localhost/read/3']
+
+    def test_empty_shard_not_found(self, db, client, store, make_article):
+        make_article('Only')
+        assert client.get('/sitemap-articles-7.xml').status_code == 404
+        assert not os.path.exists(store.path(shard_file(7)))
+
+    def test_pages(self, db, client, store):
+        db.session.add(Service(name='Tax', slug='tax', description='Tax', detailed_content='<p>Tax</p>',
+                               who_needs_it='Companies', typical_timeline='1 week', base_price=1000))
+        db.session.commit()
+        assert 'http://localhost/services/tax' in locs(client.get('/sitemap-pages.xml'))
+        assert 'http://localhost/blog' in locs(client.get('/sitemap-pages.xml'))
+
+    def test_site_url(self, app, db, client, store, make_article):
+        app.config['SITE_URL'] = 'https://law.example/'
+        make_article('Absolute')
+        assert locs(client.get('/sitemap-articles-0.xml')) == ['https://law.example/read/1']
+
+    def test_requires_site_url(self, app, db, client, store, make_article):
+        """Test that a forged Host header is never written into a file"""
+        app.config['SITE_URL'] = None
+        make_article('Unset')
+        assert client.get('/sitemap-articles-0.xml', headers={'Host': 'evil.example'}).status_code == 503
+        assert client.get('/feed.xml').status_code == 503
+        assert not [name for name in os.listdir(store.directory) if not name.startswith('.')]
+
+    def test_site_url_required_at_startup(self):
+        """Test that a production app without SITE_URL fails to start instead of serving 503s"""
+        with pytest.raises(ValueError, match='SITE_URL'):
+            configure_sitemaps(Flask(__name__))
+
+
+class TestIncrementalRegeneration:
+    """Test that only files listing a changed article are rebuilt"""
+
+    def test_invalidated_during_build(self, app, store):
+        """Test that a file built from data read before a commit's invalidation is rebuilt"""
+        builds = []
+
+        def build(base_url):
+            builds.append(base_url)
+            if len(builds) == 1:
+                store.invalidate([RSS_FILE])  # A commit lands while the first build runs
+                return b'stale'
+            return b'fresh'
+
+        with app.test_request_context():
+            response = store.response(RSS_FILE, build, 'application/rss+xml')
+            assert response.get_data() == b'fresh'
+        assert len(builds) == 2
+        with open(store.path(RSS_FILE), 'rb') as generated:
+            assert generated.read() == b'fresh'
+
+    def test_served_from_file(self, db, client, store, make_article):
+        make_article('Cached')
+        client.get('/sitemap-articles-0.xml')
+        generated = store.generated
+        assert client.get('/sitemap-articles-0.xml').status_code == 200
+        assert store.generated == generated
+
+    def test_approval_regenerates_its_shard_only(self, db, client, store, make_article):
+        for number in range(3):
+            make_article(f'Article {number}')
+        pending = make_article('Pending', status='pending')
+        for path in ('/sitemap.xml', '/sitemap-articles-0.xml', '/sitemap-articles-1.xml', '/feed.xml'):
+            client.get(path)
+
+        pending.status = 'approved'
+        db.session.commit()
+
+        assert os.path.exists(store.path(shard_file(0)))
+        for name in (shard_file(1), INDEX_FILE, RSS_FILE):
+            assert not os.path.exists(store.path(name))
+        assert locs(client.get('/sitemap-articles-1.xml'))[-1] == f'http://localhost/read/{pending.id}'
+
+    def test_unlisted_changes_keep_files(self, db, client, store, make_article):
+        article = make_article('Popular')
+        client.get('/sitemap-articles-0.xml')
+        client.get('/feed.xml')
+        article.views += 10
+        make_article('Still pending', status='pending')
+        assert os.path.exists(store.path(shard_file(0)))
+        assert os.path.exists(store.path(RSS_FILE))
+
+    def test_title_edit_regenerates_feeds(self, db, client, store, make_article):
+        article = make_article('Old title')
+        client.get('/sitemap-articles-0.xml')
+        client.get('/feed.xml')
+        article.title = 'New title'
+        db.session.commit()
+        assert os.path.exists(store.path(shard_file(0)))
+        assert b'New title' in client.get('/feed.xml').data
+
+    def test_service_change_regenerates_pages(self, db, client, store):
+        service = Service(name='Tax', slug='tax', description='Tax', detailed_content='<p>Tax</p>',
+                          who_needs_it='Companies', typical_timeline='1 week', base_price=1000)
+        db.session.add(service)
+        db.session.commit()
+        client.get('/sitemap-pages.xml')
+        service.is_active = False
+        db.session.commit()
+        assert not os.path.exists(store.path(PAGES_FILE))
+        assert 'http://localhost/services/tax' not in locs(client.get('/sitemap-pages.xml'))
+
+
+class TestRevalidation:
+    """Test conditional requests"""
+
+    def test_etag_and_last_modified(self, db, client, store, make_article):
+        make_article('Revalidated')
+        response = client.get('/sitemap.xml')
+        assert response.headers['ETag'] and response.headers['Last-Modified']
+        assert response.headers['Cache-Control'] == 'public, max-age=3600'
+
+        assert client.get('/sitemap.xml', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+        assert client.get('/sitemap.xml', headers={
+            'If-Modified-Since': response.headers['Last-Modified']
+        }).status_code == 304
+
+    def test_compressed_copy_revalidates(self, db, client, store, make_article):
+        for number in range(2):
+            make_article(f'Long article title number {number} ' * 20)
+        response = client.get('/feed.xml', headers={'Accept-Encoding': 'br'})
+        assert response.headers['Content-Encoding'] == 'br'
+        assert response.headers['ETag'].startswith('W/')
+        revalidated = client.get('/feed.xml', headers={
+            'Accept-Encoding': 'br', 'If-None-Match': response.headers['ETag']
+        })
+        assert revalidated.status_code == 304
+
+    def test_change_gives_new_etag(self, db, client, store, make_article):
+        make_article('First')
+        etag = client.get('/feed.xml').headers['ETag']
+        make_article('Second')
+        response = client.get('/feed.xml', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert b'Second' in response.data
+
+
+class TestFeeds:
+    """Test the RSS and Atom feeds"""
+
+    def test_rss(self, db, client, store, make_article):
+        make_article('Older')
+        make_article('Mergers & acquisitions')
+        make_article('Hidden', status='pending')
+        response = client.get('/feed.xml')
+        assert response.mimetype == 'application/rss+xml'
+        titles = [title.text for title in ElementTree.fromstring(response.data).iterfind('channel/item/title')]
+        assert titles == ['Mergers & acquisitions', 'Older']
+
+    def test_atom(self, db, client, store, make_article):
+        store.feed_size = 1
+        make_article('Older')
+        make_article('Newest')
+        response = client.get('/feed.atom')
+        assert response.mimetype == 'application/atom+xml'
+        entries = ElementTree.fromstring(response.data).findall('atom:entry', NS)
+        assert [entry.find('atom:title', NS).text for entry in entries] == ['Newest']
+        assert entries[0].find('atom:link', NS).get('href') == 'http://localhost/read/2'
+
+    def test_discoverable(self, db, client, store):
+        assert b'application/rss+xml' in client.get('/blog').data
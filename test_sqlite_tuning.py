@@ -0,0 +1,206 @@
+"""
+Test suite for SQLite tuning and the single-writer queue
+Run with: python -m pytest test_sqlite_tuning.py
+"""
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+from extensions import db as _db
+from models import Article
+from sqlite_tuning import configure_sqlite, is_sqlite_file
+from write_queue import WriteQueue
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "queue.db"}')
+    Article.__table__.create(engine)
+    with engine.begin() as connection:
+        connection.execute(Article.__table__.insert(), [
+            {'id': 1, 'title': 'First', 'content': 'Body', 'author': 'A', 'email': 'a@example.com', 'views': 0},
+            {'id': 2, 'title': 'Second', 'content': 'Body', 'author': 'B', 'email': 'b@example.com', 'views': 0},
+        ])
+    yield engine
+    engine.dispose()
+
+
+def count_updates(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('UPDATE'):
+            statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    return statements
+
+
+class TestSQLiteTuning:
+    """Test the connection pragma profile"""
+
+    def test_is_sqlite_file(self):
+        """Test that only file-backed SQLite URIs are tuned"""
+        assert is_sqlite_file('sqlite:///site.db')
+        assert is_sqlite_file('sqlite:////var/lib/app/site.db')
+        assert not is_sqlite_file('sqlite:///:memory:')
+        assert not is_sqlite_file('sqlite://')
+        assert not is_sqlite_file('postgresql://user@localhost/app')
+        assert not is_sqlite_file(None)
+
+    def test_pragmas_applied_on_connect(self, tmp_path):
+        """Test WAL, synchronous and busy_timeout on a file database"""
+        app = Flask(__name__)
+        app.config.update(
+            SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "tuned.db"}',
+            SQLITE_BUSY_TIMEOUT_MS=7000,
+        )
+        _db.init_app(app)
+        configure_sqlite(app)
+
+        with app.app_context():
+            assert _db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert _db.session.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+            assert _db.session.execute(text('PRAGMA busy_timeout')).scalar() == 7000
+            assert _db.session.execute(text('PRAGMA temp_store')).scalar() == 2  # MEMORY
+            _db.engine.dispose()
+
+    def test_disabled(self, tmp_path):
+        """Test that SQLITE_TUNING_ENABLED=False leaves the default journal"""
+        app = Flask(__name__)
+        app.config.update(
+            SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "plain.db"}',
+            SQLITE_TUNING_ENABLED=False,
+        )
+        _db.init_app(app)
+        configure_sqlite(app)
+
+        with app.app_context():
+            assert _db.session.execute(text('PRAGMA journal_mode')).scalar() == 'delete'
+            _db.engine.dispose()
+
+
+class TestWriteQueue:
+    """Test batching and coalescing in the single-writer queue"""
+
+    def test_increments_coalesced(self, engine):
+        """Test that a burst of increments becomes a handful of UPDATEs"""
+        updates = count_updates(engine)
+        queue = WriteQueue(engine, flush_interval=0.2).start()
+        for _ in range(100):
+            queue.increment(Article, 'views', 1)
+        queue.increment(Article, 'views', 2, amount=5)
+        assert queue.flush(timeout=5)
+        queue.stop()
+
+        with engine.connect() as connection:
+            views = dict(connection.execute(text('SELECT id, views FROM article')).all())
+        assert views == {1: 100, 2: 5}
+        assert len(updates) < 10
+        assert queue.written == 101
+        assert queue.failed == 0
+
+    def test_inserts_and_calls(self, engine):
+        """Test queued inserts and callables run in the writer's transaction"""
+        queue = WriteQueue(engine).start()
+        for i in range(3, 8):
+            queue.insert(Article, {'id': i, 'title': f'Queued {i}', 'content': 'Body',
+                                   'author': 'Q', 'email': 'q@example.com'})
+        queue.submit(lambda connection: connection.execute(text('UPDATE article SET likes = 9 WHERE id = 3')))
+        queue.flush(timeout=5)
+        queue.stop()
+
+        with engine.connect() as connection:
+            assert connection.execute(text('SELECT COUNT(*) FROM article')).scalar() == 7
+            assert connection.execute(text('SELECT likes FROM article WHERE id = 3')).scalar() == 9
+
+    def test_on_commit_after_insert(self, engine):
+        """Test that on_commit runs only for inserts that were committed"""
+        committed = []
+        queue = WriteQueue(engine).start()
+        queue.insert(Article, {'id': 3, 'title': 'Queued', 'content': 'Body', 'author': 'Q',
+                               'email': 'q@example.com'}, on_commit=lambda: committed.append(3))
+        queue.flush(timeout=5)
+        queue.insert(Article, {'id': 1, 'title': 'Duplicate', 'content': 'Body', 'author': 'Q',
+                               'email': 'q@example.com'}, on_commit=lambda: committed.append(1))
+        queue.flush(timeout=5)
+        queue.stop()
+        assert committed == [3]
+
+    def test_failed_batch_is_counted(self, engine):
+        """Test that a failing batch is logged and counted, not raised"""
+        queue = WriteQueue(engine).start()
+        queue.increment(Article, 'no_such_column', 1)
+        queue.flush(timeout=5)
+        queue.stop()
+        assert queue.failed == 1
+
+    def test_failing_callable_keeps_counters(self, engine):
+        """Test that a callable's failure does not roll back the batch's increments and inserts"""
+        def fail(connection):
+            connection.execute(text("INSERT INTO article (id, title, content, author, email) "
+                                    "VALUES (1, 'Duplicate', 'Body', 'Q', 'q@example.com')"))
+
+        queue = WriteQueue(engine, flush_interval=0.2).start()
+        queue.increment(Article, 'views', 1)
+        queue.insert(Article, {'id': 3, 'title': 'Queued', 'content': 'Body', 'author': 'Q',
+                               'email': 'q@example.com'})
+        queue.submit(fail)
+        queue.flush(timeout=5)
+        queue.stop()
+
+        with engine.connect() as connection:
+            assert connection.execute(text('SELECT views FROM article WHERE id = 1')).scalar() == 1
+            assert connection.execute(text('SELECT COUNT(*) FROM article')).scalar() == 3
+        assert (queue.written, queue.failed) == (2, 1)
+
+    def test_transient_failure_retried(self, engine, monkeypatch):
+        """Test that a locked database is retried instead of dropping the batch"""
+        monkeypatch.setattr('write_queue.RETRY_PAUSE', 0)
+        attempts = []
+
+        def locked_once(connection):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OperationalError('UPDATE article', {}, Exception('database is locked'))
+            connection.execute(text('UPDATE article SET likes = 4 WHERE id = 2'))
+
+        queue = WriteQueue(engine).start()
+        queue.submit(locked_once)
+        queue.flush(timeout=5)
+        queue.stop()
+
+        with engine.connect() as connection:
+            assert connection.execute(text('SELECT likes FROM article WHERE id = 2')).scalar() == 4
+        assert (len(attempts), queue.failed) == (2, 0)
+
+    def test_full_queue_writes_synchronously(self, engine):
+        """Test back-pressure when the writer is not running"""
+        queue = WriteQueue(engine, maxsize=1)
+        queue.increment(Article, 'views', 1)  # Fills the queue
+        queue.increment(Article, 'views', 1)  # Written on this thread
+
+        with engine.connect() as connection:
+            assert connection.execute(text('SELECT views FROM article WHERE id = 1')).scalar() == 1
+
+    def test_likes_through_app(self, app, client, db):
+        """Test that likes are handed to the queue instead of written inline"""
+        article = Article(title='Queued likes', content='Body', author='A', email='a@example.com',
+                          status='approved')
+        db.session.add(article)
+        db.session.commit()
+
+        queue = WriteQueue(db.engine).start()
+        app.extensions['write_queue'] = queue
+        try:
+            for _ in range(3):
+                assert client.post(f'/like/{article.id}').status_code == 302
+            queue.flush(timeout=5)
+        finally:
+            queue.stop()
+            app.extensions.pop('write_queue')
+
+        db.session.expire_all()
+        assert db.session.get(Article, article.id).likes == 3
@@ -0,0 +1,149 @@
+"""
+Test suite for static page snapshots served by the front proxy
+Run with: python -m pytest test_static_snapshots.py
+"""
+
+import gzip
+
+import brotli
+import pytest
+
+from extensions import db as _db
+from models import Article, Category, Comment, Service
+from static_snapshots import get_snapshot_exporter
+
+
+@pytest.fixture
+def snapshot_app(tmp_path, app_factory):
+    """App with snapshots enabled and written under tmp_path"""
+    app = app_factory(
+        # Pages render on a background thread; give it a connection of its own
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'site.db'}",
+        STATIC_SNAPSHOT_ENABLED=True,
+        STATIC_SNAPSHOT_DIR=str(tmp_path / 'snapshot')
+    )
+    with app.app_context():
+        _db.create_all()
+        Category.ensure_defaults()
+        _db.session.add(Service(
+            name='Tax Advisory', slug='tax', description='Tax advice', detailed_content='<p>Tax</p>',
+            who_needs_it='Companies', typical_timeline='2 weeks', base_price=50000,
+            categories=Category.query.filter(Category.name.in_(['Corporate Law'])).all()
+        ))
+        _db.session.commit()
+        yield app
+        get_snapshot_exporter().flush()
+        _db.session.remove()
+        _db.drop_all()
+
+
+@pytest.fixture
+def exporter(snapshot_app):
+    return get_snapshot_exporter()
+
+
+def page(exporter, path):
+    """Snapshot HTML of a path, or None if it is not in the snapshot"""
+    exporter.flush()
+    try:
+        with open(exporter.file_for(path), 'rb') as snapshot:
+            return snapshot.read().decode()
+    except FileNotFoundError:
+        return None
+
+
+class TestExport:
+    """Test the full export"""
+
+    def test_writes_public_pages(self, exporter, make_article):
+        published = make_article('Published guide')
+        pending = make_article('Pending guide', status='pending')
+        exporter.flush()
+
+        assert exporter.export_all() == 4  # Blog, services index, article, service
+        assert 'Published guide' in page(exporter, '/blog')
+        assert 'Published guide' in page(exporter, exporter.article_path(published.id))
+        assert 'Tax Advisory' in page(exporter, '/services/')
+        assert page(exporter, '/services/tax') is not None
+        assert page(exporter, exporter.article_path(pending.id)) is None
+
+    def test_compressed_siblings(self, exporter, make_article):
+        article = make_article('Compressed guide')
+        exporter.export_all()
+        target = exporter.file_for(exporter.article_path(article.id))
+        with open(target, 'rb') as html, open(f'{target}.gz', 'rb') as gz, open(f'{target}.br', 'rb') as br:
+            body = html.read()
+            assert gzip.decompress(gz.read()) == body
+            assert brotli.decompress(br.read()) == body
+
+    def test_removes_stale_pages(self, exporter, make_article):
+        article = make_article('Retracted guide')
+        exporter.export_all()
+        Article.query.filter_by(id=article.id).update({'status': 'disapproved'})  # Bypasses the listeners
+        _db.session.commit()
+
+        exporter.export_all()
+        assert page(exporter, exporter.article_path(article.id)) is None
+        assert exporter.removed == 1
+
+    def test_render_not_counted_as_view(self, exporter, make_article):
+        article = make_article('Unviewed guide')
+        exporter.export_all()
+        _db.session.expire_all()
+        assert _db.session.get(Article, article.id).views == 0
+
+
+class TestIncremental:
+    """Test pages re-rendered after commits"""
+
+    def test_approval_renders_article_blog_and_service(self, exporter, make_article):
+        exporter.export_all()
+        article = make_article('Newly approved', status='pending')
+        article.status = 'approved'
+        _db.session.commit()
+
+        assert 'Newly approved' in page(exporter, exporter.article_path(article.id))
+        assert 'Newly approved' in page(exporter, '/blog')
+        assert 'Newly approved' in page(exporter, '/services/tax')
+
+    def test_comment_renders_article(self, exporter, make_article):
+        article = make_article('Discussed guide')
+        page(exporter, '/blog')
+        rendered = exporter.rendered
+        _db.session.add(Comment(name='Reader', email='reader@example.com', content='Snapshot comment',
+                                article_id=article.id))
+        _db.session.commit()
+
+        assert 'Snapshot comment' in page(exporter, exporter.article_path(article.id))
+        assert exporter.rendered == rendered + 1  # Listings untouched
+
+    def test_soft_delete_removes_article(self, exporter, make_article):
+        article = make_article('Deleted guide')
+        assert page(exporter, exporter.article_path(article.id)) is not None
+        article.soft_delete()
+        _db.session.commit()
+
+        assert page(exporter, exporter.article_path(article.id)) is None
+        assert 'Deleted guide' not in page(exporter, '/blog')
+
+    def test_view_counts_do_not_render(self, exporter, make_article):
+        article = make_article('Popular guide')
+        page(exporter, '/blog')
+        rendered = exporter.rendered
+        article.views += 1
+        _db.session.commit()
+        page(exporter, '/blog')
+        assert exporter.rendered == rendered
+
+    def test_rollback_renders_nothing(self, exporter):
+        page(exporter, '/blog')
+        rendered = exporter.rendered
+        _db.session.add(Article(title='Rolled back', content='Body', author='Author',
+                                email='author@example.com', status='approved'))
+        _db.session.flush()
+        _db.session.rollback()
+        page(exporter, '/blog')
+        assert exporter.rendered == rendered
+
+    def test_disabled_by_default(self, app):
+        assert get_snapshot_exporter() is None
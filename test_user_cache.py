@@ -0,0 +1,144 @@
+"""
+Test suite for the cached Flask-Login user loader
+Run with: python -m pytest test_user_cache.py
+"""
+
+import pytest
+from flask import g
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from models import User
+from query_instrumentation import capture_queries
+from user_cache import UserSnapshot, get_user_cache, load_user
+
+PASSWORD = 'Cache-secret1!'
+
+
+@pytest.fixture
+def admin(db):
+    user = User(username='cache-admin', email='cache@example.com',
+                password=generate_password_hash(PASSWORD), is_admin=True)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def admin_client(app, admin):
+    client = app.test_client()
+    response = client.post('/admin/login', data={'username': 'cache-admin', 'password': PASSWORD})
+    assert response.status_code == 302
+    return client
+
+
+def user_queries(stats):
+    return [sql for sql, _, _ in stats.worst_statements(limit=50) if 'FROM user' in sql]
+
+
+def fresh_request(db):
+    """Forget per-request state shared through the test app context"""
+    db.session.remove()
+    g.pop('_login_user', None)
+
+
+class TestUserSnapshot:
+    """Test the immutable snapshot returned to Flask-Login"""
+
+    def test_fields_and_login_mixin(self, app, admin):
+        snapshot = UserSnapshot.from_user(admin)
+        assert (snapshot.id, snapshot.username, snapshot.email, snapshot.is_admin) == \
+            (admin.id, 'cache-admin', 'cache@example.com', True)
+        assert snapshot.is_authenticated
+        assert snapshot.get_id() == str(admin.id)
+
+    def test_read_only(self, app, admin):
+        snapshot = UserSnapshot.from_user(admin)
+        with pytest.raises(AttributeError):
+            snapshot.is_admin = False
+        with pytest.raises(AttributeError):
+            snapshot.password
+
+
+class TestUserLoader:
+    """Test caching and invalidation"""
+
+    def test_loader_caches(self, app, db, admin):
+        """Test that the second load is served without a query"""
+        get_user_cache().clear()
+        with capture_queries() as first:
+            assert load_user(admin.id).username == 'cache-admin'
+        with capture_queries() as second:
+            assert load_user(admin.id).username == 'cache-admin'
+        assert first.count == 1
+        assert second.count == 0
+
+    def test_missing_user(self, app, db):
+        assert load_user(999) is None
+
+    def test_ttl_expiry(self, app, db, admin):
+        cache = get_user_cache()
+        cache.ttl = -1
+        cache.put(UserSnapshot.from_user(admin))
+        assert cache.get(admin.id) is None
+
+    def test_admin_pages_skip_user_query(self, app, db, admin_client):
+        """Test that logged-in admins are identified from the cache"""
+        for url in ('/admin/dashboard', '/admin/approved-articles', '/admin/consultations'):
+            fresh_request(db)
+            with capture_queries() as stats:
+                assert admin_client.get(url).status_code == 200
+            assert user_queries(stats) == [], url
+
+    def test_admin_flag_change_invalidates(self, app, db, admin, admin_client):
+        """Test that revoking admin takes effect on the next request"""
+        fresh_request(db)
+        assert admin_client.get('/admin/dashboard').status_code == 200
+
+        db.session.get(User, admin.id).is_admin = False
+        db.session.commit()
+
+        fresh_request(db)
+        assert get_user_cache().get(admin.id) is None
+        assert admin_client.get('/admin/dashboard').status_code != 200
+
+    def test_rollback_keeps_cache(self, app, db, admin):
+        load_user(admin.id)
+        admin.username = 'renamed'
+        db.session.flush()
+        db.session.rollback()
+        assert get_user_cache().get(admin.id).username == 'cache-admin'
+
+    def test_disabled(self, app, db, admin):
+        app.extensions.pop('user_cache')
+        with capture_queries() as stats:
+            assert load_user(admin.id).username == 'cache-admin'
+        assert stats.count == 1
+
+
+class TestProfileChanges:
+    """Test that profile and password changes invalidate the snapshot"""
+
+    def test_edit_profile(self, app, db, admin, admin_client):
+        fresh_request(db)
+        response = admin_client.post('/edit-profile', data={
+            'username': 'renamed-admin', 'email': 'renamed@example.com'
+        })
+        assert response.status_code == 302
+
+        fresh_request(db)
+        assert load_user(admin.id).username == 'renamed-admin'
+        assert db.session.get(User, admin.id).email == 'renamed@example.com'
+
+    def test_change_password(self, app, db, admin, admin_client):
+        fresh_request(db)
+        new_password = 'Changed-secret2!'
+        response = admin_client.post('/change-password', data={
+            'current_password': PASSWORD,
+            'new_password': new_password,
+            'confirm_password': new_password,
+        })
+        assert response.status_code == 302
+
+        fresh_request(db)
+        assert check_password_hash(db.session.get(User, admin.id).password, new_password)
+        assert get_user_cache().get(admin.id) is None
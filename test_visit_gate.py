@@ -0,0 +1,135 @@
+"""
+Test suite for the crawler and repeat-view gate on article views
+Run with: python -m pytest test_visit_gate.py
+"""
+
+import pytest
+
+from metrics import VIEWS_DROPPED
+from models import Article, Visit, VisitorSketch
+from visit_gate import RecentViews, VisitGate, get_visit_gate, is_bot
+from write_queue import WriteQueue
+
+BROWSER = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/126.0 Safari/537.36'
+
+
+@pytest.fixture
+def article(db):
+    article = Article(title='Gated', content='Body', author='Author', email='a@example.com', status='approved')
+    db.session.add(article)
+    db.session.commit()
+    return article
+
+
+def view(client, article, user_agent=BROWSER, ip='203.0.113.5'):
+    response = client.get(f'/read/{article.id}', headers={'User-Agent': user_agent},
+                          environ_base={'REMOTE_ADDR': ip})
+    assert response.status_code == 200
+
+
+def views(db, article):
+    db.session.expire_all()
+    return db.session.get(Article, article.id).views
+
+
+class TestMatchers:
+    """Test crawler detection and the recent-view set"""
+
+    @pytest.mark.parametrize('user_agent', [
+        'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
+        'Mozilla/5.0 (compatible; bingbot/2.0)', 'facebookexternalhit/1.1', 'curl/8.4.0',
+        'python-requests/2.32', 'Mozilla/5.0 HeadlessChrome/120.0', '', None,
+    ])
+    def test_bots(self, user_agent):
+        assert is_bot(user_agent)
+
+    def test_browsers(self):
+        assert not is_bot(BROWSER)
+        assert not is_bot('Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) Safari/604.1')
+
+    def test_window(self):
+        recent = RecentViews(600)
+        assert not recent.seen('a', now=0)
+        assert recent.seen('a', now=499)
+        assert not recent.seen('b', now=499)
+        assert not recent.seen('a', now=600)  # First bucket expired
+        assert len(recent) == 2
+
+    def test_bounded(self):
+        recent = RecentViews(600, max_entries=3)
+        for second, key in enumerate('abcd'):
+            recent.seen(key, now=second * 100)
+        assert len(recent) <= 3
+        assert not recent.seen('a', now=400)  # Evicted early
+
+    def test_gate_counts_drops(self):
+        gate = VisitGate(600)
+        assert gate.admit(1, 'reader', BROWSER, now=0)
+        assert gate.admit(2, 'reader', BROWSER, now=0)
+        assert not gate.admit(1, 'reader', BROWSER, now=10)
+        assert not gate.admit(1, 'other', 'Googlebot/2.1', now=10)
+        assert gate.admit(1, None, BROWSER, now=10)  # No identity, nothing to dedupe on
+        assert gate.admitted == 3
+        assert gate.dropped == {'duplicate': 1, 'bot': 1}
+
+
+class TestArticleViews:
+    """Test views recorded by the article page"""
+
+    def test_reload_counted_once(self, app, db, client, article):
+        for _ in range(3):
+            view(client, article)
+        assert views(db, article) == 1
+        assert Visit.query.count() == 1
+        assert get_visit_gate().dropped['duplicate'] == 2
+
+    def test_readers_counted_separately(self, app, db, client, article):
+        view(client, article, ip='203.0.113.5')
+        view(client, article, ip='203.0.113.6')
+        assert views(db, article) == 2
+        assert VisitorSketch.query.filter_by(article_id=article.id).count() == 1
+
+    def test_bots_dropped(self, app, db, client, article):
+        before = VIEWS_DROPPED.labels(reason='bot')._value.get()
+        view(client, article, user_agent='Mozilla/5.0 (compatible; Googlebot/2.1)')
+        view(client, article, user_agent='')
+        assert views(db, article) == 0
+        assert Visit.query.count() == 0
+        assert VIEWS_DROPPED.labels(reason='bot')._value.get() == before + 2
+
+    def test_gate_disabled(self, app, db, client, article):
+        app.extensions.pop('visit_gate')
+        view(client, article)
+        view(client, article)
+        assert views(db, article) == 2
+
+    def test_through_write_queue(self, app, db, client, article):
+        queue = WriteQueue(db.engine).start()
+        app.extensions['write_queue'] = queue
+        try:
+            view(client, article)
+            queue.flush(timeout=5)
+        finally:
+            queue.stop()
+            app.extensions.pop('write_queue')
+
+        assert views(db, article) == 1
+        visit = Visit.query.one()
+        assert (visit.article_id, visit.ip_address, visit.user_agent) == (article.id, '203.0.113.5', BROWSER)
+        assert VisitorSketch.query.filter_by(article_id=article.id).count() == 1
+
+    def test_sketched_after_commit(self, app, db, client, article):
+        """Test that a queued visit reaches the sketches only once its insert commits"""
+        queue = WriteQueue(db.engine)  # Not started: nothing is written yet
+        app.extensions['write_queue'] = queue
+        try:
+            view(client, article)
+            assert VisitorSketch.query.count() == 0
+            queue.start()
+            queue.flush(timeout=5)
+        finally:
+            queue.stop()
+            app.extensions.pop('write_queue')
+
+        assert Visit.query.count() == 1
+        assert VisitorSketch.query.filter_by(article_id=article.id).count() == 1
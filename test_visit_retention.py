@@ -0,0 +1,128 @@
+"""
+Test suite for visit retention (rollups, archives, bounded deletes)
+Run with: python -m pytest test_visit_retention.py
+"""
+
+import gzip
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from models import Article, Visit, VisitDaily, VisitorSketch
+from site_stats import get_visit_counts
+from visit_retention import (
+    is_partitioned, next_month, partition_name, prune_visits, retention_cutoff
+)
+from visitor_sketches import rebuild_sketches
+
+NOW = datetime(2026, 6, 15, 12)
+CUTOFF = retention_cutoff(30, now=NOW)
+
+
+@pytest.fixture
+def articles(db):
+    created = [Article(title=f'Article {number}', content='Body', author='Author',
+                       email='author@example.com', status='approved') for number in range(2)]
+    db.session.add_all(created)
+    db.session.commit()
+    return created
+
+
+@pytest.fixture
+def visits(db, articles):
+    """Ten visits to the first article 40 days back, three to the second 35 days back, two recent"""
+    rows = [{'article_id': articles[0].id, 'visitor_hash': f'old-{number}', 'duration_seconds': 10,
+             'timestamp': NOW - timedelta(days=40, minutes=number)} for number in range(10)]
+    rows += [{'article_id': articles[1].id, 'visitor_hash': 'older', 'duration_seconds': 5,
+              'timestamp': NOW - timedelta(days=35)} for _ in range(3)]
+    rows += [{'article_id': articles[0].id, 'visitor_hash': 'recent', 'duration_seconds': 0,
+              'timestamp': NOW - timedelta(days=1)} for _ in range(2)]
+    db.session.execute(insert(Visit.__table__), rows)
+    db.session.commit()
+    return rows
+
+
+def read_archive(path):
+    return [json.loads(line) for file in sorted(path.rglob('*.ndjson.gz'))
+            for line in gzip.open(file, 'rt', encoding='utf-8')]
+
+
+class TestPruning:
+    """Test archiving, rolling up and deleting old visits"""
+
+    def test_cutoff_is_midnight(self):
+        assert CUTOFF == datetime(2026, 5, 16)
+
+    def test_old_visits_moved_out(self, app, db, articles, visits, tmp_path):
+        result = prune_visits(db.engine, CUTOFF, str(tmp_path))
+        assert result == {'visits': 13, 'batches': 1, 'files': 1, 'partitions': 0}
+
+        assert Visit.query.count() == 2
+        daily = {(row.article_id, row.day): (row.visits, row.duration_seconds) for row in VisitDaily.query}
+        assert daily == {
+            (articles[0].id, (NOW - timedelta(days=40)).date()): (10, 100),
+            (articles[1].id, (NOW - timedelta(days=35)).date()): (3, 15),
+        }
+
+        archived = read_archive(tmp_path)
+        assert len(archived) == 13
+        assert {record['visitor_hash'] for record in archived} == {f'old-{n}' for n in range(10)} | {'older'}
+        assert archived[0]['timestamp'].startswith('2026-05-06')
+
+    def test_bounded_batches_and_rerun(self, app, db, articles, visits, tmp_path):
+        result = prune_visits(db.engine, CUTOFF, str(tmp_path), batch_size=4)
+        assert (result['visits'], result['batches']) == (13, 4)
+        assert len(read_archive(tmp_path)) == 13
+
+        assert prune_visits(db.engine, CUTOFF, str(tmp_path), batch_size=4)['visits'] == 0
+        assert db.session.query(db.func.sum(VisitDaily.visits)).scalar() == 13
+
+    def test_later_runs_add_to_rollups(self, app, db, articles, visits, tmp_path):
+        prune_visits(db.engine, CUTOFF, str(tmp_path))
+        db.session.execute(insert(Visit.__table__), [{
+            'article_id': articles[0].id, 'visitor_hash': 'late', 'duration_seconds': 1,
+            'timestamp': NOW - timedelta(days=40, hours=1)
+        }])
+        db.session.commit()
+
+        prune_visits(db.engine, CUTOFF, str(tmp_path))
+        row = db.session.get(VisitDaily, (articles[0].id, (NOW - timedelta(days=40)).date()))
+        assert (row.visits, row.duration_seconds) == (11, 101)
+
+    def test_dashboard_counts_include_rollups(self, app, db, articles, visits, tmp_path):
+        before = get_visit_counts(now=NOW)
+        prune_visits(db.engine, CUTOFF, str(tmp_path))
+        assert get_visit_counts(now=NOW) == before == {
+            'total': 15, 'daily': 2, 'weekly': 2, 'monthly': 2, 'yearly': 15
+        }
+
+    def test_sketch_rebuild_keeps_pruned_days(self, app, db, articles, visits, tmp_path):
+        rebuild_sketches(db.session.connection())
+        db.session.commit()
+        sketches = VisitorSketch.query.count()
+
+        prune_visits(db.engine, CUTOFF, str(tmp_path))
+        assert rebuild_sketches(db.session.connection()) == 2
+        db.session.commit()
+        assert VisitorSketch.query.count() == sketches
+
+
+class TestPartitioning:
+    """Test partition helpers (partitioning itself needs PostgreSQL)"""
+
+    def test_months(self):
+        assert next_month(date(2026, 1, 31)) == date(2026, 2, 1)
+        assert next_month(date(2026, 12, 1)) == date(2027, 1, 1)
+        assert partition_name(date(2026, 3, 1)) == 'visit_p2026_03'
+
+    def test_not_partitioned_on_sqlite(self, app, db):
+        with db.engine.connect() as connection:
+            assert not is_partitioned(connection)
+
+    def test_visit_indexes(self, app):
+        assert sorted(index.name for index in Visit.__table__.indexes) == [
+            'idx_visit_article_date', 'idx_visit_hash_date', 'idx_visit_session_date',
+            'idx_visit_user_date', 'ix_visit_timestamp'
+        ]
@@ -0,0 +1,227 @@
+"""
+Test suite for HyperLogLog unique-visitor sketches
+Run with: python -m pytest test_visitor_sketches.py
+"""
+
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.dialects import postgresql
+
+from models import Article, Visit, VisitorSketch
+from site_stats import VISIT_WINDOWS
+from visitor_sketches import (
+    SITE_WIDE, HyperLogLog, SketchBuffer, _merge_into_table, get_sketch_buffer, readers_per_article,
+    rebuild_sketches, unique_visitors
+)
+
+TODAY = date(2026, 3, 31)
+
+
+@pytest.fixture
+def articles(db):
+    created = [Article(title=f'Article {number}', content='Body', author='Author', email='a@example.com',
+                       status='approved', views=100 - number) for number in range(3)]
+    db.session.add_all(created)
+    db.session.commit()
+    return created
+
+
+def record(db, article, readers, day=TODAY):
+    for reader in readers:
+        db.session.add(Visit(article_id=article.id, visitor_hash=f'hash-{reader}',
+                             timestamp=datetime.combine(day, datetime.min.time()) + timedelta(hours=12)))
+    db.session.commit()
+
+
+def stored_count(article_id, day=TODAY):
+    row = VisitorSketch.query.filter_by(article_id=article_id, day=day).first()
+    return HyperLogLog.from_bytes(row.registers).count() if row else 0
+
+
+class TestHyperLogLog:
+    """Test the sketch itself"""
+
+    def test_small_sets_are_exact(self):
+        sketch = HyperLogLog()
+        for value in ['a', 'b', 'c', 'a', 'b']:
+            sketch.add(value)
+        assert sketch.count() == 3
+
+    @pytest.mark.parametrize('size', [1000, 20000, 200000])
+    def test_error_within_two_percent(self, size):
+        sketch = HyperLogLog()
+        for number in range(size):
+            sketch.add(f'visitor-{number}')
+        assert abs(sketch.count() - size) / size < 0.02
+
+    def test_merge_is_union(self):
+        first, second = HyperLogLog(), HyperLogLog()
+        for number in range(600):
+            first.add(str(number))
+        for number in range(400, 1000):
+            second.add(str(number))
+        assert abs(first.merge(second).count() - 1000) < 20
+
+    def test_compact_blob(self):
+        sketch = HyperLogLog()
+        sketch.add('only reader')
+        blob = sketch.to_bytes()
+        assert len(blob) < 100
+        assert HyperLogLog.from_bytes(blob).count() == 1
+
+
+class TestIngestion:
+    """Test that recorded visits update the stored sketches"""
+
+    def test_visits_update_article_and_site(self, app, db, articles):
+        record(db, articles[0], ['alice', 'bob', 'alice'])
+        record(db, articles[1], ['alice'])
+        assert stored_count(articles[0].id) == 2
+        assert stored_count(articles[1].id) == 1
+        assert stored_count(SITE_WIDE) == 2
+
+    def test_session_and_user_fallbacks(self, app, db, articles):
+        db.session.add(Visit(article_id=articles[0].id, session_id='s1', timestamp=datetime(2026, 3, 31)))
+        db.session.add(Visit(article_id=articles[0].id, user_id=7, timestamp=datetime(2026, 3, 31)))
+        db.session.add(Visit(article_id=articles[0].id, timestamp=datetime(2026, 3, 31)))  # Unidentified
+        db.session.commit()
+        assert stored_count(articles[0].id) == 2
+
+    def test_rollback_ignored(self, app, db, articles):
+        db.session.add(Visit(article_id=articles[0].id, visitor_hash='h', timestamp=datetime(2026, 3, 31)))
+        db.session.flush()
+        db.session.rollback()
+        db.session.add(Visit(article_id=articles[1].id, visitor_hash='h2', timestamp=datetime(2026, 3, 31)))
+        db.session.commit()
+        assert stored_count(articles[0].id) == 0
+
+    def test_buffered_until_flush(self, app, db, articles):
+        buffer = get_sketch_buffer()
+        buffer.flush_interval = 3600
+        record(db, articles[0], ['alice'])
+        assert VisitorSketch.query.count() == 0
+
+        buffer.flush()
+        assert stored_count(articles[0].id) == 1
+
+    def test_failed_flush_is_retried(self, app, db, articles, monkeypatch):
+        buffer = get_sketch_buffer()
+        buffer.flush_interval = 3600
+        record(db, articles[0], ['alice', 'bob'])
+
+        import visitor_sketches
+        original = visitor_sketches._merge_into_table
+        monkeypatch.setattr(visitor_sketches, '_merge_into_table', lambda *args: 1 / 0)
+        buffer.flush()
+        monkeypatch.setattr(visitor_sketches, '_merge_into_table', original)
+        buffer.flush()
+        assert stored_count(articles[0].id) == 2
+
+    def test_background_flush(self, tmp_path):
+        """Test that a buffer with an interval merges on its own thread, not on commit"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'sketches.db'}")
+        VisitorSketch.__table__.create(engine)
+        buffer = SketchBuffer(engine, flush_interval=0.05)
+        buffer.add(1, TODAY, 'alice')
+        buffer.add(1, TODAY, 'bob')
+
+        blob = None
+        for _ in range(100):
+            with engine.connect() as connection:
+                blob = connection.execute(
+                    select(VisitorSketch.registers).where(VisitorSketch.article_id == 1)
+                ).scalar()
+            if blob is not None:
+                break
+            time.sleep(0.05)
+        buffer.stop()
+        engine.dispose()
+        assert HyperLogLog.from_bytes(blob).count() == 2
+
+    def test_stop(self, tmp_path):
+        """Test that stopping a buffer ends its flusher, merges what is left and forgets it"""
+        import visitor_sketches
+        engine = create_engine(f"sqlite:///{tmp_path / 'sketches.db'}")
+        VisitorSketch.__table__.create(engine)
+        buffer = SketchBuffer(engine, flush_interval=3600)
+        visitor_sketches._buffers.append(buffer)
+        buffer.add(1, TODAY, 'alice')
+        thread = buffer._thread
+
+        buffer.stop()
+        assert not thread.is_alive()
+        assert buffer not in visitor_sketches._buffers
+        with engine.connect() as connection:
+            assert connection.execute(select(VisitorSketch.registers)).scalar() is not None
+        engine.dispose()
+
+    def test_merge_locks_stored_rows(self):
+        """Test that merges read stored sketches with FOR UPDATE where the database supports it"""
+        captured = []
+
+        class Recorder:
+            def execute(self, statement, *args):
+                captured.append(statement)
+                return []
+
+        _merge_into_table(Recorder(), {(1, TODAY): HyperLogLog()})
+        assert 'FOR UPDATE' in str(captured[0].compile(dialect=postgresql.dialect()))
+
+    def test_rebuild_from_bulk_inserts(self, app, db, articles):
+        db.session.execute(insert(Visit.__table__), [
+            {'article_id': articles[0].id, 'visitor_hash': f'hash-{number % 4}',
+             'timestamp': datetime(2026, 3, 30 + number % 2, 9), 'duration_seconds': 0}
+            for number in range(20)
+        ])
+        assert rebuild_sketches(db.session.connection()) == 20
+        assert stored_count(articles[0].id, date(2026, 3, 30)) == 2  # hash-0, hash-2
+        assert stored_count(articles[0].id, date(2026, 3, 31)) == 2  # hash-1, hash-3
+        assert stored_count(SITE_WIDE, date(2026, 3, 30)) == 2
+
+        # Partial rebuild leaves earlier days alone
+        db.session.execute(VisitorSketch.__table__.update().where(VisitorSketch.day == date(2026, 3, 31))
+                           .values(registers=HyperLogLog().to_bytes()))
+        rebuild_sketches(db.session.connection(), since=date(2026, 3, 31))
+        assert stored_count(articles[0].id, date(2026, 3, 31)) == 2
+        assert stored_count(articles[0].id, date(2026, 3, 30)) == 2
+
+
+class TestReading:
+    """Test windowed estimates and the admin dashboard"""
+
+    def test_windows_merge_days(self, app, db, articles):
+        record(db, articles[0], ['alice', 'bob'])
+        record(db, articles[0], ['alice', 'carol'], day=TODAY - timedelta(days=3))
+        record(db, articles[0], ['dave'], day=TODAY - timedelta(days=100))
+        record(db, articles[0], ['erin'], day=TODAY + timedelta(days=1))
+
+        assert unique_visitors(VISIT_WINDOWS, today=TODAY) == {
+            'daily': 2, 'weekly': 3, 'monthly': 3, 'yearly': 4
+        }
+        assert unique_visitors({'weekly': timedelta(weeks=1)}, article_id=articles[1].id, today=TODAY) == {'weekly': 0}
+
+    def test_readers_per_article(self, app, db, articles):
+        record(db, articles[0], ['alice'])
+        record(db, articles[1], ['alice', 'bob', 'carol'])
+        record(db, articles[1], ['zed'], day=TODAY - timedelta(days=45))
+        assert readers_per_article(today=TODAY) == [('Article 1', 3), ('Article 0', 1), ('Article 2', 0)]
+        assert readers_per_article(limit=1, today=TODAY) == [('Article 0', 1)]
+
+    def test_dashboard_shows_estimates(self, app, db, articles, client):
+        from werkzeug.security import generate_password_hash
+        from models import User
+        from site_stats import invalidate_stats
+
+        db.session.add(User(username='hll-admin', email='hll@example.com',
+                            password=generate_password_hash('pw'), is_admin=True))
+        db.session.commit()
+        record(db, articles[0], ['alice', 'bob'], day=datetime.utcnow().date())
+        invalidate_stats()
+
+        client.post('/admin/login', data={'username': 'hll-admin', 'password': 'pw'})
+        response = client.get('/admin/dashboard')
+        assert response.status_code == 200
+        assert b'Unique Visitors (est.)' in response.data
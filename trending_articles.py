@@ -3,10 +3,16 @@ Trending Articles Query Helper
 Utilities for fetching trending and most viewed articles
 """
 
+from extensions import db
 from models import Article, Comment
 from datetime import datetime, timedelta
 from sqlalchemy import desc, func
 
+from logger import get_logger
+from write_queue import get_write_queue
+
+logger = get_logger(__name__)
+
 
 class TrendingQuery:
     """Utilities for trending articles queries"""
@@ -25,7 +31,7 @@ class TrendingQuery:
         """
         cutoff_date = datetime.utcnow() - timedelta(days=days)
 
-        articles = Article.query.filter(
+        articles = Article.cards().filter(
             Article.status == 'approved',
             Article.deleted_at.is_(None),
             Article.date_posted >= cutoff_date
@@ -54,26 +60,34 @@ class TrendingQuery:
         """
         cutoff_date = datetime.utcnow() - timedelta(days=days)
 
-        # Get approved articles from last N days
-        articles = Article.query.filter(
+        # Recent comment counts per article, computed once for all candidates
+        recent_comments = db.session.query(
+            Comment.article_id,
+            func.count(Comment.id).label('comment_count')
+        ).filter(
+            Comment.deleted_at.is_(None),
+            Comment.date_posted >= cutoff_date
+        ).group_by(Comment.article_id).subquery()
+
+        # Get approved articles from last N days with their comment counts
+        rows = Article.cards().add_columns(
+            func.coalesce(recent_comments.c.comment_count, 0)
+        ).outerjoin(
+            recent_comments, recent_comments.c.article_id == Article.id
+        ).filter(
             Article.status == 'approved',
             Article.deleted_at.is_(None),
             Article.date_posted >= cutoff_date
         ).all()
 
         # Calculate trending score (views + engagement bonus)
-        for article in articles:
+        articles = []
+        for article, comment_count in rows:
             # Base score is views
             article.trending_score = article.views
 
             # Bonus for recent comments (indicates engagement)
-            recent_comments = Comment.query.filter(
-                Comment.article_id == article.id,
-                Comment.deleted_at.is_(None),
-                Comment.date_posted >= cutoff_date
-            ).count()
-
-            article.trending_score += recent_comments * 5  # Weight comments
+            article.trending_score += comment_count * 5  # Weight comments
 
             # Bonus for recent posts (decay over time)
             hours_old = (datetime.utcnow() - article.date_posted).total_seconds() / 3600
@@ -82,6 +96,8 @@ class TrendingQuery:
             elif hours_old < 72:
                 article.trending_score *= 1.2  # 20% bonus for posts < 3 days
 
+            articles.append(article)
+
         # Sort by trending score
         articles.sort(key=lambda x: x.trending_score, reverse=True)
 
@@ -95,7 +111,7 @@ class TrendingQuery:
         Returns:
             List of Article objects sorted by comment count
         """
-        articles = Article.query.filter(
+        articles = Article.cards().filter(
             Article.status == 'approved',
             Article.deleted_at.is_(None)
         ).outerjoin(Comment).group_by(Article.id).order_by(
@@ -118,7 +134,7 @@ class TrendingQuery:
         """
         cutoff_date = datetime.utcnow() - timedelta(days=days)
 
-        articles = Article.query.filter(
+        articles = Article.cards().filter(
             Article.status == 'approved',
             Article.deleted_at.is_(None),
             Article.date_posted >= cutoff_date
@@ -154,22 +170,32 @@ class TrendingQuery:
             article_id: ID of the article
         
         Returns:
-            Updated view count or None if article not found
+            Updated view count, or None if the article was not found or the
+            increment was handed to the write queue
         """
-        from extensions import db
-
-        article = Article.query.get(article_id)
-        if article:
-            article.views += 1
-            try:
-                db.session.commit()
-                return article.views
-            except Exception as e:
-                db.session.rollback()
-                print(f"Error incrementing view count: {e}")
-                return None
-
-        return None
+        # Views are coalesced by the single-writer queue so the
+        # request never writes (or waits for the SQLite write lock)
+        write_queue = get_write_queue()
+        if write_queue:
+            write_queue.increment(Article, 'views', article_id)
+            return None
+
+        # Atomic UPDATE - avoids loading the full row (and its content)
+        try:
+            updated = Article.query.filter_by(id=article_id).update(
+                {Article.views: Article.views + 1},
+                synchronize_session=False
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error incrementing view count for article {article_id}: {e}")
+            return None
+
+        if not updated:
+            return None
+
+        return db.session.query(Article.views).filter_by(id=article_id).scalar()
 
 
 # Aliases for compatibility
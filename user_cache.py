@@ -0,0 +1,171 @@
+"""
+User Cache
+Short-TTL cache of logged-in user snapshots for the Flask-Login user loader
+
+Every authenticated request needs the current user, but only a handful of
+its fields (id, username, email, is_admin). The loader returns an immutable
+UserSnapshot from a per-process cache, so an admin clicking through the
+dashboard is identified without a database round trip per page.
+
+Snapshots are dropped when a User row is updated or deleted through the ORM
+(edit profile, change/reset password, admin flag changes) once the
+transaction commits, and the cache is primed on login. Other worker
+processes see a change after at most USER_CACHE_TTL seconds.
+
+Code that needs to change the user, or read the password hash, must load
+the User row: User.query.get(current_user.id).
+"""
+
+import threading
+import time
+
+from flask import Flask, current_app, has_app_context
+from flask_login import UserMixin, user_logged_in
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from logger import get_logger
+from models import User
+
+logger = get_logger(__name__)
+
+SNAPSHOT_FIELDS = ('id', 'username', 'email', 'is_admin')
+
+
+class UserSnapshot(UserMixin):
+    """Read-only copy of the User fields needed to identify a request"""
+
+    __slots__ = SNAPSHOT_FIELDS
+
+    def __init__(self, id, username, email, is_admin):
+        for name, value in zip(SNAPSHOT_FIELDS, (id, username, email, bool(is_admin))):
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(*(getattr(user, name) for name in SNAPSHOT_FIELDS))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(
+            f"UserSnapshot is read-only; load the User row to change '{name}'"
+        )
+
+    def __repr__(self):
+        return f'<UserSnapshot {self.id}: {self.username}>'
+
+
+class UserCache:
+    """
+    Thread-safe TTL cache of UserSnapshot by user id
+
+    Args:
+        ttl: Seconds a snapshot is served before being reloaded
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}  # user id -> (snapshot, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Cached snapshot, or None when missing or expired"""
+        entry = self._entries.get(user_id)
+        if entry and entry[1] > time.monotonic():
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return None
+
+    def put(self, snapshot):
+        with self._lock:
+            self._entries[snapshot.id] = (snapshot, time.monotonic() + self.ttl)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def get_user_cache():
+    """The current app's UserCache, or None when caching is disabled"""
+    return current_app.extensions.get('user_cache')
+
+
+def load_user(user_id):
+    """
+    Flask-Login user loader backed by the cache
+
+    Args:
+        user_id: User id from the session cookie
+
+    Returns:
+        UserSnapshot, or None if the user no longer exists
+    """
+    cache = get_user_cache()
+    if cache is not None:
+        snapshot = cache.get(user_id)
+        if snapshot is not None:
+            return snapshot
+
+    user = User.query.get(user_id)
+    if user is None:
+        return None
+    snapshot = UserSnapshot.from_user(user)
+    if cache is not None:
+        cache.put(snapshot)
+    return snapshot
+
+
+# ============================================================================
+# INVALIDATION
+# ============================================================================
+
+_CHANGED_USERS_KEY = 'user_cache_changed_ids'
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _remember_changed_user(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_USERS_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_users(session):
+    user_ids = session.info.pop(_CHANGED_USERS_KEY, None)
+    if user_ids and has_app_context():
+        cache = get_user_cache()
+        if cache is not None:
+            for user_id in user_ids:
+                cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_users(session):
+    session.info.pop(_CHANGED_USERS_KEY, None)
+
+
+def _prime_on_login(sender, user, **extra):
+    cache = sender.extensions.get('user_cache')
+    if cache is not None and isinstance(user, User):
+        cache.put(UserSnapshot.from_user(user))
+
+
+def configure_user_cache(app: Flask):
+    """
+    Enable the cached user loader (USER_CACHE_ENABLED, USER_CACHE_TTL)
+
+    Call before registering the Flask-Login user_loader.
+    """
+    if not app.config.get('USER_CACHE_ENABLED', True):
+        return
+
+    app.extensions['user_cache'] = UserCache(ttl=app.config.get('USER_CACHE_TTL', 60))
+    user_logged_in.connect(_prime_on_login, app)
+    logger.info(f"User cache enabled (ttl={app.config.get('USER_CACHE_TTL', 60)}s)")
@@ -0,0 +1,228 @@
+"""
+Visit Gate
+Drops crawler hits and repeat views before article views are written
+
+Every counted view costs an UPDATE of article.views and an INSERT into
+visit. The insert is new: the blueprint views used to bump article.views
+only, but the visitor sketches, readers-also-read lists and visit
+retention all read the visit table, so each admitted view now adds a row
+(and its index entries). Both writes go through the write queue, where
+increments of one article coalesce and inserts are batched, so the
+request itself does not write. Two kinds of views are not worth either:
+
+- Crawlers: user agents matching BOT_USER_AGENTS (one precompiled,
+  case-insensitive pattern), and requests with no user agent at all.
+- Repeats: the same reader (user, else IP + user agent fingerprint) viewing
+  the same article again within VISIT_DEDUPE_SECONDS, e.g. reloads.
+
+Recent views are kept in memory as hashed (article, reader) keys in time
+buckets: the window is split into DEDUPE_BUCKETS buckets, and a whole bucket
+expires at once, so a repeat is caught for between 5/6 of the window and the
+full window. At most VISIT_DEDUPE_MAX_ENTRIES keys are held; past that the
+oldest bucket is dropped early, which can only let a repeat through. The
+set is per process, so with several workers a repeat routed to another
+worker is still counted.
+
+Dropped views are counted per reason on the gate and in the
+article_views_dropped_total metric.
+"""
+
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+from flask import Flask, current_app, request
+from flask_login import current_user
+
+from extensions import db
+from logger import get_logger
+from metrics import count_dropped_view
+from models import Article, Visit
+from static_snapshots import is_snapshot_request
+from visitor_sketches import add_visits, get_sketch_buffer
+from write_queue import get_write_queue
+
+logger = get_logger(__name__)
+
+DEDUPE_BUCKETS = 6
+
+# Substrings of crawler, preview-fetcher and HTTP-library user agents
+BOT_USER_AGENTS = (
+    'bot', 'crawl', 'spider', 'slurp', 'archiver', 'scraper',
+    'facebookexternalhit', 'embedly', 'bingpreview', 'whatsapp', 'skypeuripreview',
+    'headlesschrome', 'phantomjs', 'lighthouse', 'pingdom', 'uptime',
+    'curl/', 'wget/', 'python-requests', 'python-urllib', 'aiohttp', 'httpx',
+    'go-http-client', 'java/', 'okhttp', 'libwww-perl', 'node-fetch', 'axios/',
+)
+BOT_PATTERN = re.compile('|'.join(re.escape(agent) for agent in BOT_USER_AGENTS), re.IGNORECASE)
+
+
+def is_bot(user_agent):
+    """Whether a user agent string belongs to a crawler (or is missing)"""
+    return not user_agent or BOT_PATTERN.search(user_agent) is not None
+
+
+class RecentViews:
+    """
+    Bounded set of keys seen within a sliding time window
+
+    Args:
+        window: Seconds a key is remembered
+        buckets: Time buckets the window is split into
+        max_entries: Most keys held before the oldest bucket is dropped
+    """
+
+    def __init__(self, window, buckets=DEDUPE_BUCKETS, max_entries=100000):
+        self.bucket_seconds = window / buckets
+        self.buckets = buckets
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()  # bucket number -> set of keys, oldest first
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._size = 0
+
+    def seen(self, key, now=None):
+        """
+        Remember a key
+
+        Returns:
+            True if the key was already seen within the window
+        """
+        current = int((time.monotonic() if now is None else now) // self.bucket_seconds)
+        with self._lock:
+            self._expire(current - self.buckets + 1)
+            if any(key in keys for keys in self._buckets.values()):
+                return True
+            while self._buckets and self._size >= self.max_entries:
+                self._size -= len(self._buckets.popitem(last=False)[1])
+            self._buckets.setdefault(current, set()).add(key)
+            self._size += 1
+            return False
+
+    def _expire(self, oldest_live):
+        while self._buckets and next(iter(self._buckets)) < oldest_live:
+            self._size -= len(self._buckets.popitem(last=False)[1])
+
+
+class VisitGate:
+    """
+    Decides which article views are recorded
+
+    Attributes:
+        recent: RecentViews of (article, reader) keys
+        admitted: Views let through
+        dropped: Counter of views dropped per reason ('bot', 'duplicate')
+    """
+
+    def __init__(self, window, max_entries=100000):
+        self.recent = RecentViews(window, max_entries=max_entries)
+        self.admitted = 0
+        self.dropped = Counter()
+
+    def admit(self, article_id, reader, user_agent, now=None):
+        """
+        Whether a view should be recorded
+
+        Args:
+            article_id: Article viewed
+            reader: Reader identity (user or visitor fingerprint), or None
+            user_agent: Request user agent string
+            now: Monotonic time in seconds (default: now)
+        """
+        if is_bot(user_agent):
+            reason = 'bot'
+        elif reader is not None and self.recent.seen(hash((article_id, reader)), now):
+            reason = 'duplicate'
+        else:
+            self.admitted += 1
+            return True
+        self.dropped[reason] += 1
+        count_dropped_view(reason)
+        return False
+
+
+def get_visit_gate():
+    """The current app's VisitGate, or None when every view is recorded"""
+    return current_app.extensions.get('visit_gate')
+
+
+def record_view(article_id):
+    """
+    Record the current request's view of an article, unless the gate drops it
+
+    Bumps article.views and inserts a Visit through the write queue, so the
+    request never writes; the visit is sketched once its insert commits.
+    Only with the queue disabled (WRITE_QUEUE_ENABLED, in-memory SQLite)
+    are they written directly (errors are logged, never raised).
+
+    Pages rendered for the static snapshot are not views and are skipped.
+
+    Returns:
+        True if the view was recorded
+    """
+    if is_snapshot_request():
+        return False
+
+    user_agent = request.user_agent.string
+    user_id = current_user.id if current_user.is_authenticated else None
+    visitor_hash = Visit.generate_visitor_hash(request.remote_addr, user_agent)
+
+    gate = get_visit_gate()
+    reader = f'user:{user_id}' if user_id else visitor_hash
+    if gate is not None and not gate.admit(article_id, reader, user_agent):
+        return False
+
+    visit = Visit(
+        article_id=article_id,
+        user_id=user_id,
+        ip_address=request.remote_addr,
+        visitor_hash=visitor_hash,
+        user_agent=user_agent[:500] or None,
+        referer=(request.referrer or '')[:500] or None,
+        timestamp=datetime.utcnow(),
+        duration_seconds=0
+    )
+
+    write_queue = get_write_queue()
+    if write_queue:
+        write_queue.increment(Article, 'views', article_id)
+        buffer = get_sketch_buffer()
+        write_queue.insert(Visit, {
+            column.name: getattr(visit, column.name) for column in Visit.__table__.columns if column.name != 'id'
+        }, on_commit=(lambda: add_visits([visit], buffer)) if buffer is not None else None)
+        return True
+
+    try:
+        Article.query.filter_by(id=article_id).update(
+            {Article.views: Article.views + 1}, synchronize_session=False
+        )
+        db.session.add(visit)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to record view of article {article_id}: {e}")
+        return False
+    return True
+
+
+def configure_visit_gate(app: Flask):
+    """
+    Filter crawler and repeat article views
+
+    Enabled by VISIT_GATE_ENABLED; when off, every view is recorded.
+    """
+    if not app.config.get('VISIT_GATE_ENABLED', True):
+        return
+    app.extensions['visit_gate'] = VisitGate(
+        app.config.get('VISIT_DEDUPE_SECONDS', 1800),
+        max_entries=app.config.get('VISIT_DEDUPE_MAX_ENTRIES', 100000)
+    )
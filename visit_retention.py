@@ -0,0 +1,310 @@
+"""
+Visit Retention
+Roll up, archive and delete raw visits past the retention period
+
+Every recorded visit adds a row to the visit table and to each of its
+indexes, so left alone both grow for as long as the site runs. Raw visits
+older than VISIT_RETENTION_DAYS (whole days, up to midnight UTC) are pruned
+in batches of VISIT_PRUNE_BATCH_SIZE, each in its own short transaction:
+
+1. the batch is written to a gzip-compressed NDJSON file under
+   VISIT_ARCHIVE_DIR (<YYYY-MM>/visits-<first timestamp>-<first id>.ndjson.gz),
+2. visits and time on page are added to visit_daily per article and day,
+3. the batch is deleted.
+
+The table then holds roughly the retention period's worth of visits. The
+dashboard adds the daily rollups to its visit counts, and unique-visitor
+sketches are stored per day, so both still cover pruned days. Co-visitation
+keeps its counts in its saved matrix; only `flask build-covisits --full`
+is limited to retained visits.
+
+On PostgreSQL the table can also be range-partitioned by month on timestamp
+(`flask partition-visits --convert`). Each month is then its own table with
+its own indexes; pruning drops expired partitions once emptied, which
+returns their space at once instead of leaving it to VACUUM.
+"""
+
+import gzip
+import json
+import os
+import re
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import bindparam, func, text
+from sqlalchemy.schema import AddConstraint
+
+from extensions import db
+from logger import get_logger
+from models import Visit, VisitDaily
+
+logger = get_logger(__name__)
+
+PRUNE_BATCH_SIZE = 5000
+PARTITION_MONTHS_AHEAD = 3
+DEFAULT_PARTITION = 'visit_default'
+
+_PARTITION_NAME = re.compile(r'^visit_p(\d{4})_(\d{2})$')
+
+
+def retention_cutoff(days, now=None):
+    """Midnight (UTC) before which visits are past a retention of `days` days"""
+    today = (now or datetime.utcnow()).date()
+    return datetime.combine(today - timedelta(days=days), time.min)
+
+
+# ============================================================================
+# PRUNING
+# ============================================================================
+
+def _archive(archive_dir, rows):
+    """
+    Write a batch of visits to a gzip-compressed NDJSON file (atomically)
+
+    Returns:
+        Path of the file written
+    """
+    first = rows[0]
+    directory = os.path.join(archive_dir, first.timestamp.strftime('%Y-%m'))
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'visits-{first.timestamp:%Y%m%dT%H%M%S}-{first.id}.ndjson.gz')
+
+    temporary = f'{path}.tmp'
+    with gzip.open(temporary, 'wt', encoding='utf-8') as archive:
+        for row in rows:
+            record = row._asdict()
+            record['timestamp'] = row.timestamp.isoformat()
+            archive.write(json.dumps(record, separators=(',', ':')) + '\n')
+    os.replace(temporary, path)
+    return path
+
+
+def _roll_up(connection, rows):
+    """Add a batch of visits to the per-article, per-day totals"""
+    totals = {}
+    for row in rows:
+        key = (row.article_id, row.timestamp.date())
+        visits, duration = totals.get(key, (0, 0))
+        totals[key] = (visits + 1, duration + (row.duration_seconds or 0))
+
+    table = VisitDaily.__table__
+    stored = {
+        (article_id, day) for article_id, day in connection.execute(
+            db.select(table.c.article_id, table.c.day).where(
+                table.c.day.in_({day for _, day in totals}),
+                table.c.article_id.in_({article_id for article_id, _ in totals})
+            )
+        )
+    }
+
+    updates, inserts = [], []
+    for (article_id, day), (visits, duration) in sorted(totals.items()):
+        values = {'key_article_id': article_id, 'key_day': day, 'add_visits': visits, 'add_duration': duration}
+        if (article_id, day) in stored:
+            updates.append(values)
+        else:
+            inserts.append({'article_id': article_id, 'day': day, 'visits': visits, 'duration_seconds': duration})
+
+    if updates:
+        connection.execute(
+            table.update().where(
+                table.c.article_id == bindparam('key_article_id'), table.c.day == bindparam('key_day')
+            ).values(
+                visits=table.c.visits + bindparam('add_visits'),
+                duration_seconds=table.c.duration_seconds + bindparam('add_duration')
+            ),
+            updates
+        )
+    if inserts:
+        connection.execute(table.insert(), inserts)
+
+
+def prune_visits(engine, cutoff, archive_dir, batch_size=PRUNE_BATCH_SIZE):
+    """
+    Archive, roll up and delete visits older than cutoff
+
+    Each batch commits on its own, so an interrupted run keeps the batches
+    already done and a rerun picks up where it stopped (a batch that failed
+    is archived again under the same file name).
+
+    Args:
+        engine: Engine to run the batches on
+        cutoff: Visits before this timestamp are pruned (see retention_cutoff)
+        archive_dir: Directory for the NDJSON archive files
+        batch_size: Visits per batch
+
+    Returns:
+        Dict with the number of visits pruned, batches, archive files written
+        and partitions dropped
+    """
+    table = Visit.__table__
+    oldest = db.select(*table.c).where(table.c.timestamp < cutoff).order_by(
+        table.c.timestamp, table.c.id
+    ).limit(batch_size)
+
+    result = {'visits': 0, 'batches': 0, 'files': 0, 'partitions': 0}
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(oldest).all()
+            if not rows:
+                break
+            _archive(archive_dir, rows)
+            _roll_up(connection, rows)
+            connection.execute(table.delete().where(table.c.id.in_([row.id for row in rows])))
+        result['visits'] += len(rows)
+        result['batches'] += 1
+        result['files'] += 1
+
+    with engine.begin() as connection:
+        if is_partitioned(connection):
+            ensure_partitions(connection)
+            result['partitions'] = drop_expired_partitions(connection, cutoff)
+
+    logger.info(
+        f"Visit retention: pruned {result['visits']} visits before {cutoff:%Y-%m-%d} "
+        f"in {result['batches']} batches, dropped {result['partitions']} partitions"
+    )
+    return result
+
+
+# ============================================================================
+# POSTGRESQL PARTITIONING
+# ============================================================================
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(month):
+    """Name of the partition holding a month's visits (visit_pYYYY_MM)"""
+    return f'visit_p{month:%Y_%m}'
+
+
+def is_partitioned(connection):
+    """Whether the visit table is a PostgreSQL partitioned table"""
+    if connection.dialect.name != 'postgresql':
+        return False
+    return bool(connection.execute(text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('visit')"
+    )).scalar())
+
+
+def monthly_partitions(connection):
+    """
+    Monthly partitions attached to the visit table
+
+    Returns:
+        Sorted list of (first day of month, partition name)
+    """
+    names = connection.execute(text(
+        'SELECT child.relname FROM pg_inherits '
+        'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+        "WHERE pg_inherits.inhparent = to_regclass('visit')"
+    )).scalars()
+    months = []
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            months.append((date(int(match[1]), int(match[2]), 1), name))
+    return sorted(months)
+
+
+def _create_partitions(connection, parent, first, last):
+    """Create the monthly partitions of parent from first through last (if missing)"""
+    created, month = 0, month_start(first)
+    while month <= last:
+        following = next_month(month)
+        connection.execute(text(
+            f'CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {parent} '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+        ))
+        created, month = created + 1, following
+    return created
+
+
+def ensure_partitions(connection, months_ahead=PARTITION_MONTHS_AHEAD, today=None):
+    """
+    Create this month's and the next months' partitions if missing
+
+    Visits outside every monthly partition land in the default partition;
+    run this (it runs with every prune) well before a month starts.
+
+    Returns:
+        Number of months checked
+    """
+    month = month_start(today or datetime.utcnow().date())
+    last = month
+    for _ in range(months_ahead):
+        last = next_month(last)
+    return _create_partitions(connection, 'visit', month, last)
+
+
+def drop_expired_partitions(connection, cutoff):
+    """
+    Drop monthly partitions that end before cutoff and hold no visits
+
+    Returns:
+        Number of partitions dropped
+    """
+    dropped = 0
+    for month, name in monthly_partitions(connection):
+        if next_month(month) > cutoff.date():
+            break
+        if connection.execute(text(f'SELECT 1 FROM {name} LIMIT 1')).first() is None:
+            connection.execute(text(f'DROP TABLE {name}'))
+            dropped += 1
+    return dropped
+
+
+def convert_to_partitioned(connection, months_ahead=PARTITION_MONTHS_AHEAD):
+    """
+    Rebuild the visit table as a monthly range-partitioned table (PostgreSQL)
+
+    Copies every visit into a new partitioned table (primary key (id,
+    timestamp), as PostgreSQL requires the partition key in it), swaps it in
+    and recreates the indexes and foreign keys on it. Blocks writes to visit
+    while it runs, so run it in a quiet period.
+
+    Args:
+        connection: Connection to run on, inside a transaction
+
+    Returns:
+        Number of visits copied (0 if the table is already partitioned)
+    """
+    if connection.dialect.name != 'postgresql':
+        raise ValueError('Visit partitioning needs PostgreSQL')
+    if is_partitioned(connection):
+        return 0
+
+    table = Visit.__table__
+    today = datetime.utcnow().date()
+    oldest = connection.execute(db.select(func.min(table.c.timestamp))).scalar()
+    last = today
+    for _ in range(months_ahead):
+        last = next_month(last)
+    sequence = connection.execute(text("SELECT pg_get_serial_sequence('visit', 'id')")).scalar()
+
+    connection.execute(text('LOCK TABLE visit IN EXCLUSIVE MODE'))
+    connection.execute(text(
+        'CREATE TABLE visit_partitioned (LIKE visit INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")'
+    ))
+    connection.execute(text('ALTER TABLE visit_partitioned ADD PRIMARY KEY (id, "timestamp")'))
+    connection.execute(text(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF visit_partitioned DEFAULT'))
+    _create_partitions(connection, 'visit_partitioned', oldest.date() if oldest else today, last)
+
+    copied = connection.execute(text('INSERT INTO visit_partitioned SELECT * FROM visit')).rowcount
+    if sequence:
+        # Keep the id sequence when the old table is dropped
+        connection.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY visit_partitioned.id'))
+    connection.execute(text('DROP TABLE visit'))
+    connection.execute(text('ALTER TABLE visit_partitioned RENAME TO visit'))
+    for index in table.indexes:
+        index.create(connection)
+    for constraint in table.foreign_key_constraints:
+        connection.execute(AddConstraint(constraint))
+
+    logger.info(f'Visit table partitioned by month: {copied} visits copied')
+    return copied
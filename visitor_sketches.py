@@ -0,0 +1,444 @@
+"""
+Visitor Sketches
+HyperLogLog unique-visitor estimates per article and per day
+
+Counting unique readers with COUNT(DISTINCT visitor_hash) scans every visit
+in the window. Instead, each inserted Visit adds its reader (visitor_hash,
+else session, else user) to a HyperLogLog sketch for its article and day,
+and to a whole-site sketch for the day (article_id SITE_WIDE). Sketches have
+2**PRECISION one-byte registers (4 KB, about 1.6% standard error) and are
+stored zlib-compressed in visitor_sketch, so a day with a handful of readers
+takes a few dozen bytes.
+
+Sketches merge by taking the register-wise maximum, so any window (week,
+month, year) is the merge of its days, and writing the same additions twice
+is harmless. Visits are buffered in memory per process and merged into the
+stored sketches every VISITOR_SKETCH_FLUSH_SECONDS by a background thread
+(through the write queue when there is one), never by a request. A merge reads the
+stored rows with SELECT ... FOR UPDATE, so two workers merging the same
+(article, day) take turns instead of overwriting each other's registers; a
+concurrent insert of a new row makes the merge retry. Visits written with
+Core inserts bypass the ORM hook: pass them to add_visits once they are
+committed (e.g. from the write queue's on_commit callback), or rebuild their sketches with `flask build-visitor-sketches`.
+"""
+
+import atexit
+import hashlib
+import threading
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import and_, event, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from logger import get_logger
+from models import Article, Visit, VisitorSketch
+
+logger = get_logger(__name__)
+
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+SITE_WIDE = 0  # visitor_sketch.article_id of whole-site sketches
+FETCH_SIZE = 5000
+READERS_PER_ARTICLE_LIMIT = 10
+FLUSH_ATTEMPTS = 3  # A flush retried after losing an insert race
+
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+
+def visitor_key(visit):
+    """Reader identity of a visit, or None if it carries none"""
+    if visit.visitor_hash:
+        return visit.visitor_hash
+    if visit.session_id:
+        return f'session:{visit.session_id}'
+    if visit.user_id:
+        return f'user:{visit.user_id}'
+    return None
+
+
+class HyperLogLog:
+    """
+    HyperLogLog cardinality sketch with 2**PRECISION registers
+
+    Args:
+        registers: Optional uint8 register array to start from
+    """
+
+    __slots__ = ('registers',)
+
+    def __init__(self, registers=None):
+        self.registers = np.zeros(REGISTERS, dtype=np.uint8) if registers is None else registers
+
+    def add(self, value):
+        hashed = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+        index = hashed >> (64 - PRECISION)
+        remainder = hashed & ((1 << (64 - PRECISION)) - 1)
+        rank = (64 - PRECISION) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """Add every value seen by another sketch"""
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        """Estimated number of distinct values added"""
+        estimate = _ALPHA * REGISTERS * REGISTERS / np.ldexp(1.0, -self.registers.astype(np.int32)).sum()
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * REGISTERS and zeros:
+            estimate = REGISTERS * np.log(REGISTERS / zeros)  # Linear counting for small sets
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return zlib.compress(self.registers.tobytes())
+
+    @classmethod
+    def from_bytes(cls, blob):
+        return cls(np.frombuffer(zlib.decompress(blob), dtype=np.uint8).copy())
+
+
+def _merged(blobs):
+    sketch = HyperLogLog()
+    for blob in blobs:
+        sketch.merge(HyperLogLog.from_bytes(blob))
+    return sketch
+
+
+def _merge_into_table(connection, sketches):
+    """
+    Merge sketches into the stored rows (insert missing rows)
+
+    Existing rows are locked (FOR UPDATE) before they are read, in key
+    order; SQLite takes its database write lock instead.
+
+    Args:
+        connection: Connection to write on
+        sketches: Dict of (article_id, day) -> HyperLogLog
+    """
+    table = VisitorSketch.__table__
+    keys = sorted(sketches)
+    for start in range(0, len(keys), FETCH_SIZE):
+        chunk = keys[start:start + FETCH_SIZE]
+        stored = {
+            (article_id, day): blob for article_id, day, blob in connection.execute(
+                db.select(table.c.article_id, table.c.day, table.c.registers).where(
+                    table.c.day.in_({day for _, day in chunk}),
+                    table.c.article_id.in_({article_id for article_id, _ in chunk})
+                ).order_by(table.c.article_id, table.c.day).with_for_update()
+            )
+        }
+        inserts = []
+        for article_id, day in chunk:
+            sketch = sketches[(article_id, day)]
+            if (article_id, day) in stored:
+                sketch = HyperLogLog.from_bytes(stored[(article_id, day)]).merge(sketch)
+                connection.execute(
+                    table.update().where(table.c.article_id == article_id, table.c.day == day)
+                    .values(registers=sketch.to_bytes())
+                )
+            else:
+                inserts.append({'article_id': article_id, 'day': day, 'registers': sketch.to_bytes()})
+        if inserts:
+            connection.execute(table.insert(), inserts)
+
+
+class SketchBuffer:
+    """
+    Per-process sketches of recent visits, merged into visitor_sketch on flush
+
+    Args:
+        engine: Engine to flush through when there is no write queue
+        flush_interval: Seconds between background flushes (0 merges on every
+            commit, on the committing thread; used by the tests)
+        write_queue: WriteQueue to run merges on, or None
+    """
+
+    def __init__(self, engine, flush_interval=10, write_queue=None):
+        self.engine = engine
+        self.flush_interval = flush_interval
+        self.write_queue = write_queue
+        self._pending = {}  # (article_id, day) -> HyperLogLog
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def add(self, article_id, day, key):
+        with self._lock:
+            for sketch_key in ((article_id, day), (SITE_WIDE, day)):
+                sketch = self._pending.get(sketch_key)
+                if sketch is None:
+                    sketch = self._pending[sketch_key] = HyperLogLog()
+                sketch.add(key)
+            if self.flush_interval and not self._stopped.is_set() and (
+                    self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name='sketch-flusher', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=5):
+        """Stop the background flusher, merge what is pending and forget the buffer"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+        if self in _buffers:
+            _buffers.remove(self)
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            if not self._pending:
+                continue
+            if self.write_queue is not None:
+                self.write_queue.submit(self.flush_to)
+            else:
+                self.flush()
+
+    def _take(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def _restore(self, pending):
+        """Put back sketches whose flush failed, for the next flush"""
+        with self._lock:
+            for sketch_key, sketch in pending.items():
+                current = self._pending.get(sketch_key)
+                self._pending[sketch_key] = current.merge(sketch) if current else sketch
+
+    def flush_to(self, connection):
+        """Merge pending sketches into the table on connection"""
+        pending = self._take()
+        try:
+            if pending:
+                _merge_into_table(connection, pending)
+        except Exception:
+            self._restore(pending)
+            raise
+
+    def flush(self):
+        """Merge pending sketches in their own transaction"""
+        for attempt in range(FLUSH_ATTEMPTS):
+            if not self._pending:
+                return
+            try:
+                with self.engine.begin() as connection:
+                    self.flush_to(connection)
+                return
+            except IntegrityError:
+                # Another process inserted the same (article, day) first; its row is merged next time
+                logger.warning("Concurrent visitor sketch insert; retrying flush")
+            except Exception as e:
+                logger.error(f"Failed to flush visitor sketches: {e}")
+                return
+
+
+def get_sketch_buffer():
+    """The current app's SketchBuffer, or None when sketches are disabled"""
+    return current_app.extensions.get('visitor_sketches')
+
+
+# ============================================================================
+# INGESTION
+# ============================================================================
+
+_NEW_VISITS_KEY = 'visitor_sketch_visits'
+
+
+@event.listens_for(Visit, 'after_insert')
+def _remember_visit(mapper, connection, target):
+    key = visitor_key(target)
+    session = object_session(target)
+    if key and session is not None:
+        day = (target.timestamp or datetime.utcnow()).date()
+        session.info.setdefault(_NEW_VISITS_KEY, []).append((target.article_id, day, key))
+
+
+def _buffer(visits, buffer=None):
+    """Add (article_id, day, key) entries to the sketch buffer"""
+    if buffer is None and has_app_context():
+        buffer = get_sketch_buffer()
+    if buffer is None:
+        return
+    for article_id, day, key in visits:
+        buffer.add(article_id, day, key)
+    if not buffer.flush_interval:
+        buffer.flush()
+
+
+def add_visits(visits, buffer=None):
+    """
+    Sketch committed visits written without the ORM session (e.g. queued
+    Core inserts, once the write queue has written them)
+
+    Args:
+        visits: Visit objects (or rows with the same attributes)
+        buffer: SketchBuffer to add to (default: the current app's; pass
+            it when calling outside the app context, e.g. on the writer thread)
+    """
+    _buffer([
+        (visit.article_id, visit.timestamp.date(), key)
+        for visit in visits if (key := visitor_key(visit)) is not None
+    ], buffer)
+
+
+@event.listens_for(Session, 'after_commit')
+def _add_committed_visits(session):
+    visits = session.info.pop(_NEW_VISITS_KEY, None)
+    if visits and has_app_context():
+        _buffer(visits)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_visits(session):
+    session.info.pop(_NEW_VISITS_KEY, None)
+
+
+def rebuild_sketches(connection, since=None):
+    """
+    Recompute stored sketches from the Visit table
+
+    Args:
+        connection: Connection to read and write on (caller commits)
+        since: Only rebuild days on or after this date (default: from the
+            oldest stored visit, keeping sketches of days already pruned)
+
+    Returns:
+        Number of visits read
+    """
+    table = VisitorSketch.__table__
+    if since is None:
+        oldest = connection.execute(db.select(func.min(Visit.timestamp))).scalar()
+        if oldest is None:
+            return 0
+        since = oldest.date()
+    statement = db.select(Visit.article_id, Visit.timestamp, Visit.visitor_hash, Visit.session_id,
+                          Visit.user_id).order_by(Visit.timestamp)
+    statement = statement.where(Visit.timestamp >= datetime.combine(since, datetime.min.time()))
+    connection.execute(table.delete().where(table.c.day >= since))
+
+    sketches, visits, current_day = {}, 0, None
+    result = connection.execution_options(stream_results=True, yield_per=FETCH_SIZE).execute(statement)
+    for visit in result:
+        day = visit.timestamp.date()
+        if day != current_day and sketches:
+            # Visits arrive in time order, so finished days can be written out
+            _merge_into_table(connection, sketches)
+            sketches = {}
+        current_day = day
+        key = visitor_key(visit)
+        if key is None:
+            continue
+        visits += 1
+        for sketch_key in ((visit.article_id, day), (SITE_WIDE, day)):
+            sketch = sketches.get(sketch_key)
+            if sketch is None:
+                sketch = sketches[sketch_key] = HyperLogLog()
+            sketch.add(key)
+    if sketches:
+        _merge_into_table(connection, sketches)
+    return visits
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+def unique_visitors(windows, article_id=SITE_WIDE, today=None):
+    """
+    Estimated unique visitors over trailing windows of calendar days
+
+    Args:
+        windows: Dict of name -> timedelta (e.g. site_stats.VISIT_WINDOWS)
+        article_id: Article to count readers of (default: whole site)
+        today: Last day included (default: today, UTC)
+
+    Returns:
+        Dict of name -> estimated unique visitors
+    """
+    today = today or datetime.utcnow().date()
+    longest = max(span.days for span in windows.values())
+    rows = db.session.query(VisitorSketch.day, VisitorSketch.registers).filter(
+        VisitorSketch.article_id == article_id,
+        VisitorSketch.day > today - timedelta(days=longest),
+        VisitorSketch.day <= today
+    ).all()
+
+    sketches = [(day, HyperLogLog.from_bytes(blob)) for day, blob in rows]
+    counts = {}
+    for name, span in windows.items():
+        merged = HyperLogLog()
+        for day, sketch in sketches:
+            if day > today - timedelta(days=span.days):
+                merged.merge(sketch)
+        counts[name] = merged.count()
+    return counts
+
+
+def readers_per_article(days=30, limit=READERS_PER_ARTICLE_LIMIT, today=None):
+    """
+    Estimated unique readers of the most viewed articles over recent days
+
+    Args:
+        days: Trailing calendar days counted
+        limit: Number of articles (the most viewed published ones)
+        today: Last day included (default: today, UTC)
+
+    Returns:
+        List of (title, estimated readers), most readers first
+    """
+    today = today or datetime.utcnow().date()
+    top = db.select(Article.id, Article.title).where(
+        *Article.published_criteria()
+    ).order_by(Article.views.desc(), Article.id).limit(limit).subquery()
+    rows = db.session.query(top.c.id, top.c.title, VisitorSketch.registers).outerjoin(
+        VisitorSketch, and_(
+            VisitorSketch.article_id == top.c.id,
+            VisitorSketch.day > today - timedelta(days=days),
+            VisitorSketch.day <= today
+        )
+    ).all()
+
+    titles, blobs = {}, {}
+    for article_id, title, blob in rows:
+        titles[article_id] = title
+        if blob is not None:
+            blobs.setdefault(article_id, []).append(blob)
+
+    readers = [(title, _merged(blobs.get(article_id, ())).count()) for article_id, title in titles.items()]
+    readers.sort(key=lambda entry: (-entry[1], entry[0]))
+    return readers
+
+
+_buffers = []
+
+
+@atexit.register
+def _flush_buffers():
+    for buffer in _buffers:
+        buffer.flush()
+
+
+def configure_visitor_sketches(app: Flask):
+    """
+    Enable HyperLogLog visitor sketches (VISITOR_SKETCHES_ENABLED,
+    VISITOR_SKETCH_FLUSH_SECONDS)
+
+    Must be called after db.init_app().
+    """
+    if not app.config.get('VISITOR_SKETCHES_ENABLED', True):
+        return
+
+    with app.app_context():
+        engine = db.engine
+    buffer = SketchBuffer(
+        engine,
+        flush_interval=app.config.get('VISITOR_SKETCH_FLUSH_SECONDS', 10),
+        write_queue=app.extensions.get('write_queue')
+    )
+    app.extensions['visitor_sketches'] = buffer
+    _buffers.append(buffer)
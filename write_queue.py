@@ -0,0 +1,253 @@
+"""
+Single-Writer Queue
+Funnels small fire-and-forget writes through one background thread
+
+Counter bumps (views, likes) and append-only inserts are queued by request
+threads and written by a single writer in batched transactions. Increments
+of the same row are coalesced into one UPDATE, so a burst of 500 views on an
+article costs one write instead of 500 lock acquisitions. Requests never
+wait for the database write lock.
+
+A batch is written as separate transactions: all increments, then all
+inserts, then each queued callable on its own, so a failing callable (or a
+bad insert) cannot roll back the counters. An insert may carry an on_commit
+callback, run once the inserts transaction has committed. A transaction that fails with an
+OperationalError (database locked, connection lost) is retried up to
+`retries` times with a growing pause; other errors are logged and counted.
+
+Usage:
+    queue = get_write_queue()
+    if queue:
+        queue.increment(Article, 'views', article_id)
+"""
+
+import atexit
+import queue
+import threading
+import time
+from collections import Counter
+
+from flask import Flask, current_app
+from sqlalchemy import insert, update
+from sqlalchemy.exc import OperationalError
+
+from logger import get_logger
+from metrics import set_queue_depth
+from sqlite_tuning import is_sqlite_file
+
+logger = get_logger(__name__)
+
+QUEUE_METRIC_NAME = 'db_writes'
+RETRY_PAUSE = 0.05  # Seconds before the first retry; doubles each attempt
+
+_INCREMENT = 'increment'
+_INSERT = 'insert'
+_CALL = 'call'
+_FLUSH = 'flush'
+
+
+def _table(target):
+    return getattr(target, '__table__', target)
+
+
+class WriteQueue:
+    """
+    Batching single-writer queue bound to one SQLAlchemy engine
+
+    Args:
+        engine: Engine to write through
+        max_batch: Most queued operations written per batch
+        flush_interval: Seconds to wait for more work before writing a batch
+        maxsize: Queue capacity; when full, writes happen synchronously
+        retries: Extra attempts for a transaction failing with OperationalError
+    """
+
+    def __init__(self, engine, max_batch=500, flush_interval=0.05, maxsize=10000, retries=3):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.written = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize)
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+
+    # ------------------------------------------------------------------
+    # Producer API (request threads)
+    # ------------------------------------------------------------------
+
+    def increment(self, target, column, row_id, amount=1):
+        """Queue `column = column + amount` for the row with primary key row_id"""
+        self._put((_INCREMENT, (_table(target), column, row_id), amount))
+
+    def insert(self, target, row, on_commit=None):
+        """
+        Queue an INSERT of one row (dict of column values)
+
+        Args:
+            on_commit: Called with no arguments on the writer thread once the
+                row has been committed (not called if the insert fails)
+        """
+        self._put((_INSERT, _table(target), (row, on_commit)))
+
+    def submit(self, func):
+        """Queue func(connection) to run inside the writer's transaction"""
+        self._put((_CALL, func, None))
+
+    def flush(self, timeout=None):
+        """
+        Block until everything queued before this call has been written
+
+        Returns:
+            True if the writer caught up within timeout
+        """
+        if not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put((_FLUSH, done, None))
+        return done.wait(timeout)
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Back-pressure: write on the caller's thread rather than drop
+            self._write([item])
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        """Write out pending operations and stop the writer"""
+        if self._thread.is_alive():
+            self.flush(timeout)
+            self._stopping = True
+            self._queue.put((_FLUSH, threading.Event(), None))
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopping:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self._queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                pass
+
+            flushes = [item[1] for item in batch if item[0] == _FLUSH]
+            self._write([item for item in batch if item[0] != _FLUSH])
+            for done in flushes:
+                done.set()
+            set_queue_depth(QUEUE_METRIC_NAME, self._queue.qsize())
+
+    def _write(self, batch):
+        if not batch:
+            return
+
+        increments = Counter()
+        inserts = {}
+        committed = []
+        calls = []
+        for kind, key, value in batch:
+            if kind == _INCREMENT:
+                increments[key] += value
+            elif kind == _INSERT:
+                row, on_commit = value
+                inserts.setdefault(key, []).append(row)
+                if on_commit is not None:
+                    committed.append(on_commit)
+            else:
+                calls.append(key)
+
+        def write_increments(connection):
+            for (table, column, row_id), amount in increments.items():
+                primary_key = list(table.primary_key.columns)[0]
+                connection.execute(
+                    update(table)
+                    .where(primary_key == row_id)
+                    .values({column: table.c[column] + amount})
+                )
+
+        def write_inserts(connection):
+            for table, rows in inserts.items():
+                connection.execute(insert(table), rows)
+
+        if increments:
+            self._transaction(write_increments, 'increments', sum(1 for item in batch if item[0] == _INCREMENT))
+        if inserts and self._transaction(write_inserts, 'inserts', sum(len(rows) for rows in inserts.values())):
+            for on_commit in committed:
+                try:
+                    on_commit()
+                except Exception as e:
+                    logger.error(f"Write queue on_commit callback failed: {str(e)}")
+        for func in calls:
+            self._transaction(func, getattr(func, '__qualname__', 'callable'), 1)
+
+    def _transaction(self, func, description, operations):
+        """Run func(connection) in its own transaction, retrying transient failures"""
+        for attempt in range(self.retries + 1):
+            try:
+                with self.engine.begin() as connection:
+                    func(connection)
+                self.written += operations
+                return True
+            except OperationalError as e:
+                error = e
+                if attempt < self.retries:
+                    time.sleep(RETRY_PAUSE * 2 ** attempt)
+            except Exception as e:
+                error = e
+                break
+        self.failed += operations
+        logger.error(f"Write queue {description} ({operations} operations) failed: {str(error)}")
+        return False
+
+
+_queues = []
+
+
+def get_write_queue():
+    """The current app's write queue, or None when writes should be direct"""
+    return current_app.extensions.get('write_queue')
+
+
+def configure_write_queue(app: Flask):
+    """
+    Start the single-writer queue
+
+    Enabled by WRITE_QUEUE_ENABLED. On SQLite it keeps requests off the
+    database write lock; on other databases it still coalesces hot counters
+    and batches visit inserts, so a page view never writes on the request.
+    Not started for in-memory SQLite, whose single connection is shared.
+    Must be called after db.init_app().
+    """
+    if not app.config.get('WRITE_QUEUE_ENABLED', True):
+        return
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI')
+    if uri and uri.startswith('sqlite') and not is_sqlite_file(uri):
+        return
+
+    from extensions import db
+    with app.app_context():
+        engine = db.engine
+
+    write_queue = WriteQueue(
+        engine,
+        max_batch=app.config.get('WRITE_QUEUE_MAX_BATCH', 500),
+        flush_interval=app.config.get('WRITE_QUEUE_FLUSH_MS', 50) / 1000,
+        retries=app.config.get('WRITE_QUEUE_RETRIES', 3)
+    ).start()
+    app.extensions['write_queue'] = write_queue
+    _queues.append(write_queue)
+
+
+@atexit.register
+def _stop_queues():
+    for write_queue in _queues:
+        write_queue.stop()